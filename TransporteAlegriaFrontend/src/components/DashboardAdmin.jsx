@@ -1,23 +1,35 @@
 import React, { useState, useEffect } from "react";
-import { api } from "../services/api";
+import { api, adminService } from "../services/api";
 
 const DashboardAdmin = () => {
   const [formularios, setFormularios] = useState([]);
+  const [siguiente, setSiguiente] = useState(null); // URL de la siguiente página (cursor)
+  const [totales, setTotales] = useState({ total: 0, aprobados: 0, pendientes: 0 });
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState("");
   const [selectedFormulario, setSelectedFormulario] = useState(null);
   const [showModal, setShowModal] = useState(false);
   const [message, setMessage] = useState("");
+  const [seleccionados, setSeleccionados] = useState([]); // IDs marcados para acciones en lote
 
   useEffect(() => {
     fetchFormularios();
   }, []);
 
+  // Total de formularios según un filtro (conteo cacheado en el servidor)
+  const contarFormularios = async (filtro = "") => {
+    const response = await api.get(`/admin/formularios/?page_size=1&total=1${filtro}`);
+    return response.data.total_estimado;
+  };
+
   const fetchFormularios = async () => {
     try {
       setIsLoading(true);
       const response = await api.get("/admin/formularios/");
-      setFormularios(response.data);
+      setFormularios(response.data.results);
+      setSiguiente(response.data.next);
+      setSeleccionados([]);
+      await actualizarTotales();
     } catch (error) {
       console.error("Error obteniendo formularios:", error);
       setError("Error al cargar los formularios");
@@ -26,6 +38,30 @@ const DashboardAdmin = () => {
     }
   };
 
+  const actualizarTotales = async () => {
+    try {
+      const [total, aprobados, pendientes] = await Promise.all([
+        contarFormularios(),
+        contarFormularios("&aprobado=true"),
+        contarFormularios("&aprobado=false"),
+      ]);
+      setTotales({ total, aprobados, pendientes });
+    } catch (error) {
+      console.error("Error obteniendo totales:", error);
+    }
+  };
+
+  const cargarMas = async () => {
+    try {
+      const response = await api.get(siguiente);
+      setFormularios((actuales) => [...actuales, ...response.data.results]);
+      setSiguiente(response.data.next);
+    } catch (error) {
+      console.error("Error obteniendo formularios:", error);
+      setError("Error al cargar más formularios");
+    }
+  };
+
   const handleAprobar = async (id, aprobado) => {
     try {
       await api.patch(`/admin/padres/${id}/aprobar/`, { aprobado });
@@ -63,6 +99,57 @@ const DashboardAdmin = () => {
     }
   };
 
+  const toggleSeleccion = (id) => {
+    setSeleccionados((actuales) =>
+      actuales.includes(id) ? actuales.filter((x) => x !== id) : [...actuales, id]
+    );
+  };
+
+  const toggleSeleccionTodos = () => {
+    setSeleccionados(seleccionados.length === formularios.length ? [] : formularios.map((f) => f.id));
+  };
+
+  // Aplica en la lista el resultado por ID de una operación en lote, sin recargarla
+  const aplicarResultados = (resultados) => {
+    const porId = Object.fromEntries(resultados.map((r) => [r.id, r.resultado]));
+    setFormularios((actuales) =>
+      actuales
+        .filter((f) => !["eliminado", "no_encontrado"].includes(porId[f.id]))
+        .map((f) =>
+          porId[f.id] === "aprobado" || porId[f.id] === "desaprobado"
+            ? { ...f, aprobado: porId[f.id] === "aprobado" }
+            : f
+        )
+    );
+    setSeleccionados([]);
+    actualizarTotales();
+  };
+
+  const handleAprobarSeleccionados = async (aprobado) => {
+    try {
+      const data = await adminService.aprobarVarios({ ids: seleccionados }, aprobado);
+      aplicarResultados(data.resultados);
+      const cambiados = data.resumen[aprobado ? "aprobado" : "desaprobado"] || 0;
+      setMessage(`${cambiados} formulario(s) ${aprobado ? 'aprobado(s)' : 'desaprobado(s)'}`);
+    } catch (error) {
+      console.error("Error aprobando formularios:", error);
+      setError("Error al aprobar/desaprobar los formularios seleccionados");
+    }
+  };
+
+  const handleEliminarSeleccionados = async () => {
+    if (window.confirm(`¿Estás seguro de que quieres eliminar ${seleccionados.length} usuario(s) y sus formularios? Esta acción no se puede deshacer.`)) {
+      try {
+        const data = await adminService.eliminarVarios({ ids: seleccionados });
+        aplicarResultados(data.resultados);
+        setMessage(`${data.resumen.eliminado || 0} usuario(s) y formulario(s) eliminados`);
+      } catch (error) {
+        console.error("Error eliminando usuarios:", error);
+        setError("Error al eliminar los usuarios seleccionados");
+      }
+    }
+  };
+
   const openModal = (formulario) => {
     setSelectedFormulario(formulario);
     setShowModal(true);
@@ -140,7 +227,7 @@ const DashboardAdmin = () => {
               </div>
               <div className="ml-4">
                 <p className="text-sm font-medium text-gray-500">Total Formularios</p>
-                <p className="text-2xl font-semibold text-gray-900">{formularios.length}</p>
+                <p className="text-2xl font-semibold text-gray-900">{totales.total}</p>
               </div>
             </div>
           </div>
@@ -157,7 +244,7 @@ const DashboardAdmin = () => {
               <div className="ml-4">
                 <p className="text-sm font-medium text-gray-500">Aprobados</p>
                 <p className="text-2xl font-semibold text-gray-900">
-                  {formularios.filter(f => f.aprobado).length}
+                  {totales.aprobados}
                 </p>
               </div>
             </div>
@@ -175,7 +262,7 @@ const DashboardAdmin = () => {
               <div className="ml-4">
                 <p className="text-sm font-medium text-gray-500">Pendientes</p>
                 <p className="text-2xl font-semibold text-gray-900">
-                  {formularios.filter(f => !f.aprobado).length}
+                  {totales.pendientes}
                 </p>
               </div>
             </div>
@@ -202,8 +289,31 @@ const DashboardAdmin = () => {
 
         {/* Tabla de Formularios */}
         <div className="bg-white shadow-lg rounded-lg overflow-hidden">
-          <div className="px-6 py-4 border-b border-gray-200">
+          <div className="px-6 py-4 border-b border-gray-200 flex items-center justify-between">
             <h2 className="text-lg font-medium text-gray-900">Formularios Enviados</h2>
+            {seleccionados.length > 0 && (
+              <div className="flex space-x-3 text-sm font-medium">
+                <span className="text-gray-500">{seleccionados.length} seleccionado(s)</span>
+                <button
+                  onClick={() => handleAprobarSeleccionados(true)}
+                  className="text-green-600 hover:text-green-900"
+                >
+                  Aprobar seleccionados
+                </button>
+                <button
+                  onClick={() => handleAprobarSeleccionados(false)}
+                  className="text-yellow-600 hover:text-yellow-900"
+                >
+                  Desaprobar seleccionados
+                </button>
+                <button
+                  onClick={handleEliminarSeleccionados}
+                  className="text-red-800 hover:text-red-900"
+                >
+                  Eliminar seleccionados
+                </button>
+              </div>
+            )}
           </div>
           
           {formularios.length === 0 ? (
@@ -219,6 +329,13 @@ const DashboardAdmin = () => {
               <table className="min-w-full divide-y divide-gray-200">
                 <thead className="bg-gray-50">
                   <tr>
+                    <th className="px-6 py-3">
+                      <input
+                        type="checkbox"
+                        checked={seleccionados.length > 0 && seleccionados.length === formularios.length}
+                        onChange={toggleSeleccionTodos}
+                      />
+                    </th>
                     <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
                       Padre/Madre
                     </th>
@@ -242,6 +359,13 @@ const DashboardAdmin = () => {
                 <tbody className="bg-white divide-y divide-gray-200">
                   {formularios.map((formulario) => (
                     <tr key={formulario.id}>
+                      <td className="px-6 py-4 whitespace-nowrap">
+                        <input
+                          type="checkbox"
+                          checked={seleccionados.includes(formulario.id)}
+                          onChange={() => toggleSeleccion(formulario.id)}
+                        />
+                      </td>
                       <td className="px-6 py-4 whitespace-nowrap">
                         <div className="text-sm font-medium text-gray-900">
                           {formulario.usuario?.nombre} {formulario.usuario?.apellido}
@@ -304,6 +428,16 @@ const DashboardAdmin = () => {
                   ))}
                 </tbody>
               </table>
+              {siguiente && (
+                <div className="px-6 py-4 text-center border-t border-gray-200">
+                  <button
+                    onClick={cargarMas}
+                    className="text-blue-600 hover:text-blue-900 text-sm font-medium"
+                  >
+                    Cargar más
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { getCurrentUser, authService } from "../services/api";
+import { getCurrentUser, authService, etaService, avisosService } from "../services/api";
 import formulariosService from "../services/formulariosService";
 
 const DashboardPadre = () => {
@@ -9,6 +9,8 @@ const DashboardPadre = () => {
   const [dashboardData, setDashboardData] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const [showModal, setShowModal] = useState(false);
+  const [llegadas, setLlegadas] = useState({});
+  const [avisos, setAvisos] = useState([]);
 
   // Estado del formulario
   const [formulario, setFormulario] = useState({
@@ -29,6 +31,15 @@ const DashboardPadre = () => {
 
         const data = await formulariosService.getDashboard();
         setDashboardData(data);
+        if (data.formulario_aprobado) {
+          // La hora estimada es opcional: si falla, el panel se muestra igual
+          etaService
+            .obtener()
+            .then((estudiantes) =>
+              setLlegadas(Object.fromEntries(estudiantes.map((est) => [est.id, est.viajes])))
+            )
+            .catch(() => {});
+        }
       } catch (error) {
         console.error("Error cargando dashboard padre:", error);
         navigate("/login");
@@ -40,6 +51,32 @@ const DashboardPadre = () => {
     fetchDashboard();
   }, [navigate]);
 
+  // Avisos de llegada del transporte: se consultan cada 30 segundos con el último ID recibido
+  useEffect(() => {
+    if (!dashboardData?.formulario_aprobado) return undefined;
+    let ultimo = 0;
+    const consultar = () =>
+      avisosService
+        .obtener(ultimo)
+        .then((data) => {
+          ultimo = data.ultimo;
+          if (data.avisos.length) {
+            setAvisos((anteriores) => [...data.avisos.slice().reverse(), ...anteriores].slice(0, 5));
+          }
+        })
+        .catch(() => {});
+    consultar();
+    const intervalo = setInterval(consultar, 30000);
+    return () => clearInterval(intervalo);
+  }, [dashboardData?.formulario_aprobado]);
+
+  const textoAviso = (aviso) => {
+    const lugar = aviso.lugar === "colegio" ? aviso.nombre_lugar : "tu parada";
+    if (aviso.tipo === "cerca") return `El transporte ${aviso.placa} está a pocos minutos de ${lugar}`;
+    if (aviso.tipo === "llegada") return `El transporte ${aviso.placa} llegó a ${lugar}`;
+    return `El transporte ${aviso.placa} salió de ${lugar}`;
+  };
+
   const handleLogout = async () => {
     await authService.logout();
     navigate("/login");
@@ -125,13 +162,41 @@ const DashboardPadre = () => {
         {/* Estado del formulario */}
         {dashboardData?.estudiantes ? (
           <>
+            {avisos.length > 0 && (
+              <div className="mb-4 p-3 bg-blue-50 border border-blue-200 rounded">
+                {avisos.map((aviso) => (
+                  <p key={aviso.id} className="text-sm">
+                    {new Date(aviso.momento).toLocaleTimeString([], {
+                      hour: "2-digit",
+                      minute: "2-digit",
+                    })}{" "}
+                    · {textoAviso(aviso)}
+                  </p>
+                ))}
+              </div>
+            )}
             <p className="mb-4">
               {dashboardData.estudiantes.length} estudiante(s) registrado(s)
             </p>
             {dashboardData.estudiantes.map((est, i) => (
-              <p key={i}>
-                • {est.nombre} {est.apellido} - {est.grado}
-              </p>
+              <div key={i}>
+                <p>
+                  • {est.nombre} {est.apellido} - {est.grado}
+                </p>
+                {(llegadas[est.id] || [])
+                  .filter((viaje) => viaje.hora_estimada)
+                  .map((viaje) => (
+                    <p key={viaje.tramo} className="ml-4 text-sm text-gray-600">
+                      {viaje.tramo === "entrada" ? "Recogida" : "Llegada a casa"} estimada:{" "}
+                      {new Date(viaje.hora_estimada).toLocaleTimeString([], {
+                        hour: "2-digit",
+                        minute: "2-digit",
+                      })}
+                      {viaje.margen_minutos ? ` (± ${viaje.margen_minutos} min)` : ""}
+                      {viaje.estado === "en_curso" ? " · en camino" : ""}
+                    </p>
+                  ))}
+              </div>
             ))}
           </>
         ) : (
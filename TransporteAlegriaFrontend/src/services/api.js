@@ -40,12 +40,27 @@ api.interceptors.response.use(
   }
 );
 
+// Claves de idempotencia por contenido: reenviar los mismos datos (por ejemplo
+// tras un timeout en una conexión móvil) usa la misma clave y el servidor
+// responde con el resultado original en lugar de repetir el registro
+const clavesIdempotencia = new Map();
+
+export const claveIdempotencia = (ruta, datos) => {
+  const contenido = ruta + JSON.stringify(datos);
+  if (!clavesIdempotencia.has(contenido)) {
+    clavesIdempotencia.set(contenido, crypto.randomUUID());
+  }
+  return clavesIdempotencia.get(contenido);
+};
+
 // Servicios de autenticación
 export const authService = {
   // Registrar nuevo usuario
   async registro(userData) {
     try {
-      const response = await api.post('/auth/registro/', userData);
+      const response = await api.post('/auth/registro/', userData, {
+        headers: { 'Idempotency-Key': claveIdempotencia('/auth/registro/', userData) },
+      });
       return response.data;
     } catch (error) {
       throw error.response?.data || { error: 'Error en el registro' };
@@ -104,10 +119,10 @@ export const authService = {
 
 // Servicios para Padres
 export const padresService = {
-  // Obtener todos los padres
-  async getAll() {
+  // Obtener una página de padres ({ results, next, previous }); params: filtros, cursor, page_size
+  async getAll(params = {}) {
     try {
-      const response = await api.get('/padres/');
+      const response = await api.get('/padres/', { params });
       return response.data;
     } catch (error) {
       throw error.response?.data || { error: 'Error obteniendo padres' };
@@ -157,10 +172,10 @@ export const padresService = {
 
 // Servicios para Estudiantes
 export const estudiantesService = {
-  // Obtener todos los estudiantes
-  async getAll() {
+  // Obtener una página de estudiantes ({ results, next, previous }); params: filtros, cursor, page_size
+  async getAll(params = {}) {
     try {
-      const response = await api.get('/estudiantes/');
+      const response = await api.get('/estudiantes/', { params });
       return response.data;
     } catch (error) {
       throw error.response?.data || { error: 'Error obteniendo estudiantes' };
@@ -210,10 +225,10 @@ export const estudiantesService = {
 
 // Servicios para Tutores Receptores
 export const tutoresService = {
-  // Obtener todos los tutores
-  async getAll() {
+  // Obtener una página de tutores ({ results, next, previous }); params: filtros, cursor, page_size
+  async getAll(params = {}) {
     try {
-      const response = await api.get('/tutores/');
+      const response = await api.get('/tutores/', { params });
       return response.data;
     } catch (error) {
       throw error.response?.data || { error: 'Error obteniendo tutores' };
@@ -278,7 +293,9 @@ export const formulariosService = {
   // Enviar formulario (solo padres)
   async enviarFormulario(formularioData) {
     try {
-      const response = await api.post('/formularios/enviar/', formularioData);
+      const response = await api.post('/formularios/enviar/', formularioData, {
+        headers: { 'Idempotency-Key': claveIdempotencia('/formularios/enviar/', formularioData) },
+      });
       return response.data;
     } catch (error) {
       throw error.response?.data || { error: 'Error enviando formulario' };
@@ -298,10 +315,10 @@ export const formulariosService = {
 
 // Servicios para Administración
 export const adminService = {
-  // Obtener todos los formularios (solo admins)
-  async getFormularios() {
+  // Obtener una página de formularios (solo admins); params: aprobado, colegio, grado, cursor...
+  async getFormularios(params = {}) {
     try {
-      const response = await api.get('/admin/formularios/');
+      const response = await api.get('/admin/formularios/', { params });
       return response.data;
     } catch (error) {
       throw error.response?.data || { error: 'Error obteniendo formularios' };
@@ -347,6 +364,74 @@ export const adminService = {
       throw error.response?.data || { error: 'Error eliminando usuario' };
     }
   },
+
+  // Aprobar/desaprobar varios formularios en una operación; seleccion: { ids } o { filtro }
+  async aprobarVarios(seleccion, aprobado) {
+    try {
+      const response = await api.post('/admin/padres/aprobar/', { ...seleccion, aprobado });
+      return response.data;
+    } catch (error) {
+      throw error.response?.data || { error: 'Error aprobando formularios' };
+    }
+  },
+
+  // Eliminar varios usuarios y sus formularios en una operación; seleccion: { ids } o { filtro }
+  async eliminarVarios(seleccion) {
+    try {
+      const response = await api.post('/admin/usuarios/eliminar/', seleccion);
+      return response.data;
+    } catch (error) {
+      throw error.response?.data || { error: 'Error eliminando usuarios' };
+    }
+  },
+};
+
+export const sincronizacionService = {
+  // Cambios desde el cursor guardado (sin cursor: copia completa). Sigue pidiendo
+  // mientras el servidor indique que hay más y junta todas las páginas.
+  async obtenerCambios(since = null) {
+    const cambios = { padres: [], estudiantes: [], tutores: [], eliminados: [], completo: false };
+    let cursor = since;
+    try {
+      for (;;) {
+        const params = cursor === null ? {} : { since: cursor };
+        const { data } = await api.get('/sync/', { params });
+        cambios.completo = cambios.completo || data.completo;
+        ['padres', 'estudiantes', 'tutores', 'eliminados'].forEach((clave) => {
+          cambios[clave].push(...(data[clave] || []));
+        });
+        cursor = data.cursor;
+        if (!data.mas) break;
+      }
+      return { ...cambios, cursor };
+    } catch (error) {
+      throw error.response?.data || { error: 'Error sincronizando datos' };
+    }
+  },
+};
+
+export const etaService = {
+  // Hora estimada de llegada de hoy para cada hijo (se lee de la caché del servidor)
+  async obtener() {
+    try {
+      const response = await api.get('/eta/');
+      return response.data.estudiantes;
+    } catch (error) {
+      throw error.response?.data || { error: 'Error obteniendo la hora estimada' };
+    }
+  },
+};
+
+export const avisosService = {
+  // Avisos de llegada del transporte posteriores al último ID recibido
+  async obtener(desde = 0) {
+    try {
+      const response = await api.get('/avisos/', { params: { desde } });
+      return response.data;
+    } catch (error) {
+      throw error.response?.data || { error: 'Error obteniendo los avisos' };
+    }
+  },
 };
 
 export { api };
@@ -1,4 +1,4 @@
-import api from "./api";
+import api, { claveIdempotencia } from "./api";
 
 const formulariosService = {
   async getDashboard() {
@@ -7,7 +7,9 @@ const formulariosService = {
   },
 
   async enviarFormulario(data) {
-    const response = await api.post("/formularios/enviar/", data);
+    const response = await api.post("/formularios/enviar/", data, {
+      headers: { "Idempotency-Key": claveIdempotencia("/formularios/enviar/", data) },
+    });
     return response.data;
   },
 
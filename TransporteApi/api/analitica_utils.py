@@ -0,0 +1,261 @@
+# Utilidades para mantener y consultar los resúmenes de analítica del panel
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Padres, Estudiantes, AsignacionVehiculo, ResumenAnalitico
+
+
+# Semanas que se muestran por defecto en las gráficas
+SEMANAS_POR_DEFECTO = 26
+
+
+def inicio_semana(momento):
+    """
+    Lunes de la semana (hora local) de una fecha u hora.
+
+    Args:
+        momento: date o datetime
+
+    Returns:
+        date: Lunes de la semana
+    """
+    if hasattr(momento, 'hour'):
+        momento = timezone.localtime(momento).date() if timezone.is_aware(momento) else momento.date()
+    return momento - timedelta(days=momento.weekday())
+
+
+def nombre_franja(tramo, hora):
+    """Dimensión de una franja, por ejemplo 'entrada 07:00'"""
+    return f"{tramo} {hora.strftime('%H:%M')}"
+
+
+def sumar(metrica, periodo, dimension='', valor=1, suma=0):
+    """
+    Suma (o resta, con valores negativos) a una fila de resumen con un UPDATE atómico.
+    Si la fila no existe se crea; si otro proceso la creó a la vez, se reintenta el UPDATE.
+    """
+    filtro = ResumenAnalitico.objects.filter(metrica=metrica, periodo=periodo, dimension=dimension)
+    if filtro.update(valor=F('valor') + valor, suma=F('suma') + suma):
+        return
+    try:
+        with transaction.atomic():
+            ResumenAnalitico.objects.create(
+                metrica=metrica, periodo=periodo, dimension=dimension, valor=valor, suma=suma)
+    except IntegrityError:
+        filtro.update(valor=F('valor') + valor, suma=F('suma') + suma)
+
+
+# ============================================================================
+# ACTUALIZACIÓN INCREMENTAL (AL ESCRIBIR)
+# ============================================================================
+
+def registrar_inscripcion(estudiante, signo=1):
+    """
+    Suma (o resta al eliminar) un estudiante a las inscripciones de su colegio
+    en la semana en que la familia envió el formulario.
+    """
+    creado = Padres.objects.filter(pk=estudiante.padres_id).values_list('created_at', flat=True).first()
+    if creado is not None:
+        sumar('inscripciones', inicio_semana(creado), estudiante.Colegio or '', signo)
+
+
+def registrar_aprobaciones(fechas, signo=1):
+    """
+    Suma (o resta al desaprobar) aprobaciones y su tiempo de espera en la
+    semana de cada aprobación, con un UPDATE por semana.
+
+    Args:
+        fechas: Iterable de (created_at, fecha_aprobacion) de los padres
+        signo: 1 para sumar, -1 para restar
+    """
+    semanas = defaultdict(lambda: [0, 0])
+    for creado, aprobado in fechas:
+        if aprobado is None:
+            continue
+        semana = semanas[inicio_semana(aprobado)]
+        semana[0] += 1
+        semana[1] += int((aprobado - creado).total_seconds())
+    for semana, (n, segundos) in semanas.items():
+        sumar('aprobaciones', semana, '', signo * n, signo * segundos)
+
+
+def registrar_aprobacion(padre, signo=1):
+    """Suma (o resta) la aprobación de un solo padre"""
+    registrar_aprobaciones([(padre.created_at, padre.fecha_aprobacion)], signo)
+
+
+def actualizar_ocupacion(franjas, fecha=None):
+    """
+    Recalcula la ocupación de hoy solo en las franjas indicadas (consulta por índice).
+
+    Args:
+        franjas: Iterable de (tramo, hora)
+        fecha: Día del resumen (por defecto hoy)
+    """
+    fecha = fecha or timezone.localdate()
+    for tramo, hora in set(franjas):
+        if hora is None:
+            continue
+        total = AsignacionVehiculo.objects.filter(tramo=tramo, hora=hora).count()
+        ResumenAnalitico.objects.update_or_create(
+            metrica='ocupacion_franja', periodo=fecha, dimension=nombre_franja(tramo, hora),
+            defaults={'valor': total})
+
+
+# ============================================================================
+# CONSOLIDACIÓN NOCTURNA
+# ============================================================================
+
+def _reemplazar(metrica, filas, periodo=None):
+    """Reemplaza las filas de una métrica (o de un solo periodo) en una transacción"""
+    with transaction.atomic():
+        existentes = ResumenAnalitico.objects.filter(metrica=metrica)
+        if periodo is not None:
+            existentes = existentes.filter(periodo=periodo)
+        existentes.delete()
+        ResumenAnalitico.objects.bulk_create(filas, batch_size=1000)
+
+
+def consolidar_inscripciones():
+    """
+    Recalcula las inscripciones por colegio y semana en una sola pasada.
+
+    Returns:
+        int: Filas de resumen generadas
+    """
+    conteo = defaultdict(int)
+    filas = Estudiantes.objects.values('padres__created_at', 'Colegio').annotate(n=Count('id'))
+    for fila in filas.iterator(chunk_size=2000):
+        conteo[(inicio_semana(fila['padres__created_at']), fila['Colegio'] or '')] += fila['n']
+    _reemplazar('inscripciones', [
+        ResumenAnalitico(metrica='inscripciones', periodo=semana, dimension=colegio, valor=n)
+        for (semana, colegio), n in conteo.items()
+    ])
+    return len(conteo)
+
+
+def consolidar_aprobaciones():
+    """
+    Recalcula las aprobaciones y su tiempo de espera por semana.
+
+    Returns:
+        int: Filas de resumen generadas
+    """
+    semanas = defaultdict(lambda: [0, 0])
+    aprobados = Padres.objects.filter(aprobado=True, fecha_aprobacion__isnull=False).values_list(
+        'created_at', 'fecha_aprobacion')
+    for creado, aprobado in aprobados.iterator(chunk_size=2000):
+        semana = semanas[inicio_semana(aprobado)]
+        semana[0] += 1
+        semana[1] += int((aprobado - creado).total_seconds())
+    _reemplazar('aprobaciones', [
+        ResumenAnalitico(metrica='aprobaciones', periodo=semana, valor=n, suma=segundos)
+        for semana, (n, segundos) in semanas.items()
+    ])
+    return len(semanas)
+
+
+def consolidar_ocupacion(fecha=None):
+    """
+    Guarda la ocupación de todas las franjas del día con un solo GROUP BY.
+
+    Returns:
+        int: Filas de resumen generadas
+    """
+    fecha = fecha or timezone.localdate()
+    filas = AsignacionVehiculo.objects.values('tramo', 'hora').annotate(n=Count('id'))
+    _reemplazar('ocupacion_franja', [
+        ResumenAnalitico(metrica='ocupacion_franja', periodo=fecha,
+                         dimension=nombre_franja(fila['tramo'], fila['hora']), valor=fila['n'])
+        for fila in filas
+    ], periodo=fecha)
+    return len(filas)
+
+
+def consolidar_todo():
+    """
+    Recalcula todos los resúmenes desde las tablas de origen.
+    Corrige cualquier desvío de la actualización incremental (por ejemplo
+    cambios de colegio, que no se restan al escribir).
+
+    Returns:
+        dict: Filas generadas por métrica
+    """
+    return {
+        'inscripciones': consolidar_inscripciones(),
+        'aprobaciones': consolidar_aprobaciones(),
+        'ocupacion_franja': consolidar_ocupacion(),
+    }
+
+
+# ============================================================================
+# CONSULTA PARA LAS GRÁFICAS
+# ============================================================================
+
+def series_analitica(desde=None, hasta=None):
+    """
+    Series listas para graficar, leídas solo de la tabla de resúmenes.
+
+    Args:
+        desde: Fecha inicial (por defecto SEMANAS_POR_DEFECTO semanas atrás)
+        hasta: Fecha final (por defecto hoy)
+
+    Returns:
+        dict: Inscripciones por colegio, latencia de aprobación y ocupación por franja
+    """
+    hasta = hasta or timezone.localdate()
+    desde = desde or inicio_semana(hasta) - timedelta(weeks=SEMANAS_POR_DEFECTO - 1)
+    filas = ResumenAnalitico.objects.filter(periodo__gte=inicio_semana(desde), periodo__lte=hasta).values(
+        'metrica', 'periodo', 'dimension', 'valor', 'suma').order_by('periodo')
+
+    semanas, dias = [], []
+    semana = inicio_semana(desde)
+    while semana <= hasta:
+        semanas.append(semana)
+        semana += timedelta(weeks=1)
+
+    inscripciones = defaultdict(dict)
+    aprobaciones = {}
+    ocupacion = defaultdict(dict)
+    for fila in filas:
+        if fila['metrica'] == 'inscripciones':
+            inscripciones[fila['dimension']][fila['periodo']] = fila['valor']
+        elif fila['metrica'] == 'aprobaciones':
+            aprobaciones[fila['periodo']] = fila
+        elif fila['periodo'] >= desde:
+            ocupacion[fila['dimension']][fila['periodo']] = fila['valor']
+            if not dias or dias[-1] != fila['periodo']:
+                dias.append(fila['periodo'])
+
+    latencia = []
+    for semana in semanas:
+        fila = aprobaciones.get(semana)
+        n = fila['valor'] if fila else 0
+        latencia.append({
+            'aprobados': n,
+            'horas_promedio': round(fila['suma'] / n / 3600, 2) if n else None,
+        })
+
+    return {
+        'desde': desde,
+        'hasta': hasta,
+        'inscripciones_por_colegio': {
+            'semanas': semanas,
+            'series': [
+                {'colegio': colegio or 'Sin colegio', 'datos': [valores.get(s, 0) for s in semanas]}
+                for colegio, valores in sorted(inscripciones.items())
+            ],
+        },
+        'latencia_aprobacion': {'semanas': semanas, 'datos': latencia},
+        'ocupacion_por_franja': {
+            'dias': dias,
+            'series': [
+                {'franja': franja, 'datos': [valores.get(d, 0) for d in dias]}
+                for franja, valores in sorted(ocupacion.items())
+            ],
+        },
+    }
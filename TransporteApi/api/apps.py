@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Registrar las señales y las tareas periódicas de la aplicación
+        from . import signals  # noqa: F401
+        from . import tareas  # noqa: F401
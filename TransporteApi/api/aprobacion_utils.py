@@ -0,0 +1,125 @@
+# Utilidades para aprobar y eliminar formularios en lote
+from types import SimpleNamespace
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Usuario, Padres
+from .analitica_utils import registrar_aprobaciones
+from .email_utils import correo_aprobacion, encolar_correos
+from .eventos_utils import evento, registrar_eventos
+from .sincronizacion_utils import siguiente_version
+from .auditoria_utils import entrada, registrar
+from .archivo_utils import archivar_familias
+
+
+# Máximo de formularios por operación en lote
+MAXIMO_POR_OPERACION = 5000
+
+# IDs por consulta (SQL Server admite hasta 2100 parámetros)
+TAMANO_LOTE = 1000
+
+
+def en_lotes(ids, tamano=None):
+    """Divide una lista de IDs en listas de a lo sumo `tamano` elementos (TAMANO_LOTE por defecto)"""
+    tamano = tamano or TAMANO_LOTE
+    for inicio in range(0, len(ids), tamano):
+        yield ids[inicio:inicio + tamano]
+
+
+def aprobar_padres(ids, aprobado, actor=None):
+    """
+    Aprueba o desaprueba varios formularios con UPDATE por conjunto en una
+    sola transacción. Encola el email de aviso, el evento de dominio y la
+    entrada de auditoría de cada padre que cambió.
+
+    Args:
+        ids: IDs de Padres
+        aprobado: Nuevo estado de aprobación
+        actor: Usuario que aprueba (None = sistema)
+
+    Returns:
+        tuple: ({id: 'aprobado' | 'desaprobado' | 'sin_cambios' | 'no_encontrado'}, correos encolados)
+    """
+    ids = list(dict.fromkeys(ids))
+    resultados = {pk: 'no_encontrado' for pk in ids}
+    ahora = timezone.now()
+    correos, eventos, auditoria = [], [], []
+
+    with transaction.atomic():
+        for lote in en_lotes(ids):
+            filas = list(Padres.objects.select_for_update().filter(pk__in=lote).values(
+                'id', 'aprobado', 'created_at', 'fecha_aprobacion', 'usuario_id', 'usuario__email', 'usuario__nombre'))
+            cambian = [fila for fila in filas if fila['aprobado'] != aprobado]
+            for fila in filas:
+                resultados[fila['id']] = 'sin_cambios'
+            if not cambian:
+                continue
+
+            # Analítica: quitar las aprobaciones anteriores y sumar las nuevas
+            registrar_aprobaciones([(f['created_at'], f['fecha_aprobacion']) for f in cambian], -1)
+            Padres.objects.filter(pk__in=[f['id'] for f in cambian]).update(
+                aprobado=aprobado, fecha_aprobacion=ahora if aprobado else None, version=siguiente_version())
+            if aprobado:
+                registrar_aprobaciones([(f['created_at'], ahora) for f in cambian])
+
+            for fila in cambian:
+                resultados[fila['id']] = 'aprobado' if aprobado else 'desaprobado'
+                eventos.append(evento(f"padre.{resultados[fila['id']]}", fila['id'], {
+                    'id': fila['id'], 'usuario': fila['usuario_id'], 'aprobado': aprobado,
+                    'fecha_aprobacion': ahora if aprobado else None,
+                }))
+                auditoria.append(entrada(
+                    actor, resultados[fila['id']], 'padre', fila['id'],
+                    {'aprobado': fila['aprobado'], 'fecha_aprobacion': fila['fecha_aprobacion']},
+                    {'aprobado': aprobado, 'fecha_aprobacion': ahora if aprobado else None}))
+                if fila['usuario__email']:
+                    usuario = SimpleNamespace(email=fila['usuario__email'], nombre=fila['usuario__nombre'])
+                    correos.append(correo_aprobacion(usuario, aprobado))
+
+        # Correos y eventos se guardan en la misma transacción y se envían en segundo plano
+        encolar_correos(correos)
+        registrar_eventos(eventos)
+        registrar(auditoria)
+
+    return resultados, len(correos)
+
+
+def eliminar_familias(ids, actor=None, motivo='eliminada'):
+    """
+    Elimina varios formularios junto con sus usuarios en una sola transacción.
+    Estudiantes y tutores se eliminan en cascada. Antes de eliminarlas, las
+    familias se copian al archivo (FamiliaArchivada) y se registra un evento
+    'usuario.eliminado' por cada usuario.
+
+    Args:
+        ids: IDs de Padres
+        actor: Usuario que elimina (None = sistema)
+        motivo: Motivo del archivo ('eliminada' o 'vencida')
+
+    Returns:
+        dict: {id: 'eliminado' | 'no_encontrado'}
+    """
+    ids = list(dict.fromkeys(ids))
+    resultados = {pk: 'no_encontrado' for pk in ids}
+
+    with transaction.atomic():
+        for lote in en_lotes(ids):
+            filas = list(Padres.objects.filter(pk__in=lote).values(
+                'id', 'usuario_id', 'usuario__email', 'created_at', 'fecha_aprobacion'))
+            existentes = {fila['id']: fila['usuario_id'] for fila in filas}
+            # Analítica: las aprobaciones salen con la familia (restaurar() las vuelve a sumar)
+            registrar_aprobaciones([(f['created_at'], f['fecha_aprobacion']) for f in filas], -1)
+            registrar_eventos([
+                evento('usuario.eliminado', fila['usuario_id'], {
+                    'id': fila['usuario_id'], 'email': fila['usuario__email'], 'padre': fila['id'],
+                })
+                for fila in filas if fila['usuario_id']
+            ])
+            archivar_familias(list(existentes), motivo, actor)
+            Padres.objects.filter(pk__in=list(existentes)).delete()
+            Usuario.objects.filter(pk__in=[u for u in existentes.values() if u]).delete()
+            for pk in existentes:
+                resultados[pk] = 'eliminado'
+
+    return resultados
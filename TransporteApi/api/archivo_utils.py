@@ -0,0 +1,251 @@
+# Archivo de familias que salen de las tablas activas
+#
+# Antes de eliminar una familia (por un administrador o por formulario
+# vencido) su estado completo se copia a FamiliaArchivada en la misma
+# transacción, con una inserción por lote. Así Padres, Estudiantes y
+# Tutor_receptor solo guardan familias activas, y el historial sigue
+# disponible para auditorías y reinscripciones. Del usuario solo se
+# archiva el perfil (nunca la contraseña ni los tokens), y el archivo se
+# purga pasados ARCHIVO_MESES_RETENCION meses.
+import json
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Usuario, Padres, Estudiantes, Tutor_receptor, FamiliaArchivada
+from .analitica_utils import registrar_aprobacion
+from .auditoria_utils import entrada, registrar
+from .eventos_utils import evento, registrar_eventos, datos_entidad
+from .sincronizacion_utils import cambios_versionados
+
+
+# Versión del formato de `datos`; restaurar() rechaza versiones que no conoce
+# (2: solo el perfil del usuario, con sus grupos y permisos por nombre)
+FORMATO = 2
+
+# Campos del usuario que se archivan: el perfil, sin contraseña, tokens ni banderas de staff
+CAMPOS_USUARIO = (
+    'email', 'username', 'first_name', 'last_name', 'nombre', 'apellido', 'telefono', 'role',
+    'email_verificado', 'aprobado', 'is_active', 'date_joined', 'fecha_registro',
+)
+
+# Campos que no se restauran: los IDs y las relaciones se asignan de nuevo
+EXCLUIDOS = {
+    Estudiantes: ('id', 'padres_id', 'version'),
+    Tutor_receptor: ('id', 'estudiante_id', 'version'),
+}
+
+
+class CodificadorArchivo(DjangoJSONEncoder):
+    """DjangoJSONEncoder que conserva los microsegundos de las fechas (él los recorta a milisegundos)"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def comprimir(datos):
+    """JSON compacto comprimido con zlib"""
+    texto = json.dumps(datos, cls=CodificadorArchivo, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(texto.encode('utf-8'), 6)
+
+
+def descomprimir(contenido):
+    """Inverso de comprimir"""
+    return json.loads(zlib.decompress(bytes(contenido)).decode('utf-8'))
+
+
+def familias(padre_ids):
+    """
+    Estado de varias familias (perfil del usuario, padre, estudiantes y
+    tutores) con seis consultas.
+
+    Returns:
+        dict: {padre_id: {..., 'usuario': {..., 'grupos': [...], 'permisos': [...]} | None,
+            'estudiantes': [{..., 'tutores': [...]}]}}
+    """
+    padres = {fila['id']: fila for fila in Padres.objects.filter(pk__in=padre_ids).values(
+        'id', 'cedula', 'celular', 'aprobado', 'fecha_aprobacion', 'created_at', 'usuario_id')}
+    usuario_ids = [fila['usuario_id'] for fila in padres.values() if fila['usuario_id']]
+    usuarios = {fila.pop('id'): {**fila, 'grupos': [], 'permisos': []} for fila in Usuario.objects.filter(
+        pk__in=usuario_ids).values('id', *CAMPOS_USUARIO)}
+    for usuario_id, nombre in Usuario.groups.through.objects.filter(usuario_id__in=usuario_ids).values_list(
+            'usuario_id', 'group__name'):
+        usuarios[usuario_id]['grupos'].append(nombre)
+    for usuario_id, app, codigo in Usuario.user_permissions.through.objects.filter(
+            usuario_id__in=usuario_ids).values_list(
+            'usuario_id', 'permission__content_type__app_label', 'permission__codename'):
+        usuarios[usuario_id]['permisos'].append(f'{app}.{codigo}')
+    estudiantes = list(Estudiantes.objects.filter(padres_id__in=padre_ids).order_by('id').values())
+    tutores = defaultdict(list)
+    for fila in Tutor_receptor.objects.filter(estudiante__padres_id__in=padre_ids).order_by('id').values():
+        tutores[fila['estudiante_id']].append(fila)
+
+    resultado = {}
+    for padre_id, fila in padres.items():
+        resultado[padre_id] = {**fila, 'usuario': usuarios.get(fila['usuario_id']), 'estudiantes': []}
+    for fila in estudiantes:
+        resultado[fila['padres_id']]['estudiantes'].append({**fila, 'tutores': tutores.get(fila['id'], [])})
+    return resultado
+
+
+# ============================================================================
+# ARCHIVO
+# ============================================================================
+
+def archivar_familias(padre_ids, motivo, actor=None):
+    """
+    Copia las familias al archivo con una inserción por lote y audita cada
+    una. No elimina nada: debe llamarse dentro de la transacción que las
+    elimina para que ambas cosas se confirmen o reviertan juntas.
+
+    Args:
+        padre_ids: IDs de Padres (a lo sumo TAMANO_LOTE de aprobacion_utils)
+        motivo: 'eliminada' o 'vencida'
+        actor: Usuario que elimina (None = sistema)
+
+    Returns:
+        int: Familias archivadas
+    """
+    archivadas, auditoria = [], []
+    for padre_id, familia in familias(padre_ids).items():
+        email = (familia['usuario'] or {}).get('email') or ''
+        archivadas.append(FamiliaArchivada(
+            padre_original=padre_id, cedula=familia['cedula'], email=email, motivo=motivo,
+            estudiantes=len(familia['estudiantes']), datos=comprimir({'formato': FORMATO, **familia})))
+        # El estado completo queda en el archivo; la auditoría guarda cómo encontrarlo
+        auditoria.append(entrada(actor, 'archivado', 'padre', padre_id, {
+            'cedula': familia['cedula'], 'email': email, 'estudiantes': len(familia['estudiantes']),
+            'motivo': motivo,
+        }))
+    FamiliaArchivada.objects.bulk_create(archivadas, batch_size=500)
+    registrar(auditoria)
+    return len(archivadas)
+
+
+def purgar_archivo():
+    """
+    Elimina las familias archivadas hace más de ARCHIVO_MESES_RETENCION meses
+    (None = conservar todo).
+
+    Returns:
+        int: Familias eliminadas del archivo
+    """
+    meses = getattr(settings, 'ARCHIVO_MESES_RETENCION', None)
+    if not meses:
+        return 0
+    limite = timezone.now() - timedelta(days=30 * meses)
+    eliminadas, _ = FamiliaArchivada.objects.filter(archivada_en__lt=limite).delete()
+    return eliminadas
+
+
+def _instancia(modelo, fila, **relaciones):
+    """Instancia sin guardar desde una fila archivada, con los valores convertidos al tipo de cada campo"""
+    excluidos = EXCLUIDOS.get(modelo, ())
+    campos = {
+        nombre: modelo._meta.get_field(nombre).to_python(valor)
+        for nombre, valor in fila.items() if nombre not in excluidos
+    }
+    return modelo(**campos, **relaciones)
+
+
+def _restaurar_usuario(datos):
+    """
+    Recrea un usuario archivado sin contraseña utilizable: debe definir una
+    nueva antes de iniciar sesión. Recupera la fecha de registro, los grupos
+    y los permisos que sigan existiendo.
+    """
+    usuario = _instancia(Usuario, {c: v for c, v in datos.items() if c in CAMPOS_USUARIO})
+    registro = usuario.fecha_registro
+    usuario.set_unusable_password()
+    usuario.save()
+    # fecha_registro es auto_now_add: se corrige después de insertar
+    if registro is not None:
+        Usuario.objects.filter(pk=usuario.pk).update(fecha_registro=registro)
+        usuario.fecha_registro = registro
+    usuario.groups.set(Group.objects.filter(name__in=datos['grupos']))
+    permisos = Q(pk__in=[])
+    for nombre in datos['permisos']:
+        app, codigo = nombre.split('.', 1)
+        permisos |= Q(content_type__app_label=app, codename=codigo)
+    usuario.user_permissions.set(Permission.objects.filter(permisos))
+    return usuario
+
+
+def restaurar(archivada, actor=None):
+    """
+    Devuelve una familia archivada a las tablas activas en una transacción.
+    Se guardan fila por fila para que las señales recalculen asientos,
+    índices y analítica como en un alta normal. Los IDs son nuevos; la
+    fecha del formulario y su aprobación se conservan.
+
+    Si el usuario sigue existiendo (se eliminó solo el formulario) se
+    vuelve a vincular; si no, se recrea sin contraseña (ver _restaurar_usuario).
+
+    Args:
+        archivada: FamiliaArchivada
+        actor: Usuario que restaura (None = sistema)
+
+    Returns:
+        Padres: Padre restaurado
+
+    Raises:
+        ValueError: Si ya fue restaurada o sus datos chocan con una familia activa
+    """
+    if archivada.restaurada_en is not None:
+        raise ValueError(f'La familia ya se restauró el {archivada.restaurada_en:%Y-%m-%d} '
+                         f'(padre {archivada.restaurada_como})')
+    datos = descomprimir(archivada.datos)
+    if datos.get('formato') != FORMATO:
+        raise ValueError(f'Formato de archivo desconocido: {datos.get("formato")}')
+
+    with cambios_versionados():
+        if Padres.objects.filter(cedula=datos['cedula']).exists():
+            raise ValueError(f'Ya existe un padre activo con la cédula {datos["cedula"]}')
+
+        usuario = None
+        if datos['usuario']:
+            usuario = Usuario.objects.filter(email=datos['usuario']['email']).first()
+            if usuario is None:
+                usuario = _restaurar_usuario(datos['usuario'])
+            elif Padres.objects.filter(usuario=usuario).exists():
+                raise ValueError(f'El usuario {usuario.email} ya tiene otro formulario')
+
+        padre = Padres.objects.create(
+            usuario=usuario, cedula=datos['cedula'], celular=datos['celular'],
+            aprobado=datos['aprobado'], fecha_aprobacion=Padres._meta.get_field('fecha_aprobacion').to_python(
+                datos['fecha_aprobacion']))
+        # created_at es auto_now_add: se corrige antes de guardar los estudiantes, que
+        # suman sus inscripciones en la semana del formulario
+        padre.created_at = Padres._meta.get_field('created_at').to_python(datos['created_at'])
+        Padres.objects.filter(pk=padre.pk).update(created_at=padre.created_at)
+        if padre.aprobado:
+            registrar_aprobacion(padre)
+
+        eventos = []
+        for fila in datos['estudiantes']:
+            tutores = fila.pop('tutores')
+            estudiante = _instancia(Estudiantes, fila, padres=padre)
+            estudiante.save()
+            eventos.append(evento('estudiante.creado', estudiante.pk, datos_entidad(estudiante)))
+            for fila_tutor in tutores:
+                tutor = _instancia(Tutor_receptor, fila_tutor, estudiante=estudiante)
+                tutor.save()
+                eventos.append(evento('tutor.creado', tutor.pk, datos_entidad(tutor)))
+        registrar_eventos(eventos)
+
+        archivada.restaurada_en = timezone.now()
+        archivada.restaurada_como = padre.pk
+        archivada.save(update_fields=['restaurada_en', 'restaurada_como'])
+        registrar([entrada(actor, 'restaurado', 'padre', padre.pk, despues={
+            'archivo': archivada.pk, 'padre_original': archivada.padre_original,
+            'cedula': padre.cedula, 'estudiantes': len(datos['estudiantes']),
+        })])
+    return padre
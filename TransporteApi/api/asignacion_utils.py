@@ -0,0 +1,396 @@
+# Utilidades para asignar asientos de vehículos a los estudiantes
+import logging
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Vehiculo, Estudiantes, AsignacionVehiculo
+from .manifiestos_utils import programar_actualizacion
+from .analitica_utils import consolidar_ocupacion
+from .sincronizacion_utils import TAMANO_LOTE, actualizar_conductores
+
+
+logger = logging.getLogger(__name__)
+
+# Cada tramo del día y el campo de Estudiantes que define su hora
+TRAMOS = (
+    ('entrada', 'H_entrada'),
+    ('salida', 'H_salida'),
+)
+
+# Vehículos que reservar_asiento verifica (con bloqueo) antes de dar la franja por llena
+INTENTOS_RESERVA = 10
+
+
+class OcupacionFranja:
+    """
+    Estado en memoria de una franja (tramo, hora).
+    Guarda cuántos asientos usa cada vehículo y a qué colegio atiende,
+    de modo que buscar un asiento no requiere recalcular toda la flota.
+    """
+
+    def __init__(self, capacidades):
+        """
+        Args:
+            capacidades: Diccionario {vehiculo_id: capacidad} de los vehículos activos
+        """
+        self.capacidades = dict(capacidades)
+        self.ocupados = defaultdict(int)  # vehiculo_id -> asientos ocupados
+        self.colegios = {}                # vehiculo_id -> colegio que atiende en la franja
+
+    def libres(self, vehiculo_id):
+        """Asientos libres de un vehículo en la franja"""
+        return self.capacidades[vehiculo_id] - self.ocupados[vehiculo_id]
+
+    def ocupar(self, vehiculo_id, colegio, cantidad=1):
+        """Registra `cantidad` asientos ocupados para un colegio en el vehículo"""
+        self.ocupados[vehiculo_id] += cantidad
+        self.colegios[vehiculo_id] = colegio
+
+    def buscar_asiento(self, colegio, cantidad=1):
+        """
+        Busca un vehículo para `cantidad` estudiantes de un colegio (best-fit).
+
+        Primero intenta con los vehículos que ya van a ese colegio, eligiendo el
+        que quede con menos asientos libres; si ninguno tiene espacio, toma el
+        vehículo libre más pequeño que alcance.
+
+        Args:
+            colegio: Nombre del colegio
+            cantidad: Número de asientos requeridos
+
+        Returns:
+            int | None: ID del vehículo elegido o None si la franja está llena
+        """
+        mejor = None
+        for vehiculo_id, destino in self.colegios.items():
+            if destino != colegio:
+                continue
+            libres = self.libres(vehiculo_id)
+            if libres >= cantidad and (mejor is None or libres < self.libres(mejor)):
+                mejor = vehiculo_id
+        if mejor is not None:
+            return mejor
+
+        # Vehículos sin colegio asignado en esta franja
+        disponibles = [
+            (capacidad, vehiculo_id)
+            for vehiculo_id, capacidad in self.capacidades.items()
+            if vehiculo_id not in self.colegios and capacidad >= cantidad
+        ]
+        return min(disponibles)[1] if disponibles else None
+
+
+def cargar_ocupacion(tramo, hora, capacidades, excluir_estudiante=None):
+    """
+    Construye la ocupación de una franja con una sola consulta agregada.
+
+    Args:
+        tramo: 'entrada' o 'salida'
+        hora: Hora de la franja
+        capacidades: Diccionario {vehiculo_id: capacidad} de los vehículos activos
+        excluir_estudiante: ID de un estudiante cuyo asiento no debe contarse
+
+    Returns:
+        OcupacionFranja: Estado actual de la franja
+    """
+    ocupacion = OcupacionFranja(capacidades)
+    filas = AsignacionVehiculo.objects.filter(
+        tramo=tramo, hora=hora, vehiculo_id__in=capacidades)
+    if excluir_estudiante is not None:
+        filas = filas.exclude(estudiante_id=excluir_estudiante)
+    for fila in filas.values('vehiculo_id', 'colegio').annotate(total=Count('id')):
+        ocupacion.ocupar(fila['vehiculo_id'], fila['colegio'], fila['total'])
+    return ocupacion
+
+
+def empaquetar_franja(grupos, capacidades):
+    """
+    Reparte los estudiantes de una franja entre los vehículos (heurística FFD).
+
+    Los colegios se procesan de mayor a menor número de estudiantes. Para cada
+    uno se toma el vehículo libre más pequeño que alcance para todos los que
+    faltan; si ninguno alcanza, se llena el más grande y se repite.
+
+    Args:
+        grupos: Diccionario {colegio: [estudiante_id, ...]}
+        capacidades: Diccionario {vehiculo_id: capacidad} de los vehículos activos
+
+    Returns:
+        tuple: ({estudiante_id: vehiculo_id}, [estudiante_id sin asiento])
+    """
+    libres = sorted((capacidad, vehiculo_id) for vehiculo_id, capacidad in capacidades.items() if capacidad > 0)
+    asignados = {}
+    sin_asiento = []
+
+    for colegio, estudiantes in sorted(grupos.items(), key=lambda item: -len(item[1])):
+        restantes = list(estudiantes)
+        while restantes:
+            if not libres:
+                sin_asiento.extend(restantes)
+                break
+            # Vehículo más pequeño con capacidad suficiente, o el más grande disponible
+            indice = bisect_left(libres, (len(restantes), -1))
+            capacidad, vehiculo_id = libres.pop(indice if indice < len(libres) else -1)
+            for estudiante_id in restantes[:capacidad]:
+                asignados[estudiante_id] = vehiculo_id
+            restantes = restantes[capacidad:]
+
+    return asignados, sin_asiento
+
+
+def capacidades_activas(bloquear=False):
+    """
+    Obtiene la capacidad de los vehículos en servicio.
+
+    Args:
+        bloquear: Si es True, bloquea las filas (select_for_update) para serializar
+                  asignaciones concurrentes; debe llamarse dentro de una transacción
+
+    Returns:
+        dict: {vehiculo_id: capacidad}
+    """
+    vehiculos = Vehiculo.objects.filter(activo=True)
+    if bloquear:
+        vehiculos = vehiculos.select_for_update()
+    return dict(vehiculos.values_list('id', 'capacidad'))
+
+
+def recalcular_asignaciones():
+    """
+    Recalcula desde cero los asientos de todos los estudiantes.
+
+    Returns:
+        dict: Resumen con asignados y estudiantes sin asiento por tramo
+    """
+    resumen = {'asignados': 0, 'sin_asiento': []}
+
+    with transaction.atomic():
+        capacidades = capacidades_activas(bloquear=True)
+        estudiantes = Estudiantes.objects.exclude(Colegio__isnull=True).exclude(Colegio='').values(
+            'id', 'Colegio', 'H_entrada', 'H_salida')
+
+        # Agrupar por franja (tramo, hora) y dentro de ella por colegio
+        franjas = defaultdict(lambda: defaultdict(list))
+        for est in estudiantes:
+            for tramo, campo in TRAMOS:
+                if est[campo] is not None:
+                    franjas[(tramo, est[campo])][est['Colegio']].append(est['id'])
+
+        nuevas = []
+        for (tramo, hora), grupos in franjas.items():
+            colegio_de = {est_id: colegio for colegio, ids in grupos.items() for est_id in ids}
+            asignados, sin_asiento = empaquetar_franja(grupos, capacidades)
+            for estudiante_id, vehiculo_id in asignados.items():
+                nuevas.append(AsignacionVehiculo(
+                    estudiante_id=estudiante_id, vehiculo_id=vehiculo_id, tramo=tramo,
+                    colegio=colegio_de[estudiante_id], hora=hora))
+            resumen['sin_asiento'].extend(
+                {'estudiante': estudiante_id, 'tramo': tramo, 'hora': hora} for estudiante_id in sin_asiento)
+
+        antes = set(AsignacionVehiculo.objects.values_list('vehiculo_id', 'estudiante_id'))
+        AsignacionVehiculo.objects.all().delete()
+        AsignacionVehiculo.objects.bulk_create(nuevas, batch_size=1000)
+        resumen['asignados'] = len(nuevas)
+        actualizar_conductores(antes, {(a.vehiculo_id, a.estudiante_id) for a in nuevas})
+
+        # bulk_create no dispara señales: actualizar los manifiestos de hoy de toda la flota
+        programar_actualizacion(capacidades)
+        # y la ocupación por franja de la analítica
+        consolidar_ocupacion()
+
+    return resumen
+
+
+def reservar_asiento(estudiante_id, tramo, hora, colegio, capacidades):
+    """
+    Busca un asiento en una franja y lo confirma bloqueando solo el vehículo
+    elegido (select_for_update), no toda la flota.
+
+    La búsqueda se hace sin bloqueos; con el vehículo bloqueado se verifica
+    que siga activo, con espacio y sin otro colegio en la franja. Si otra
+    transacción lo llenó entretanto, ese vehículo se descarta y se vuelve a
+    buscar con la ocupación actualizada, a lo sumo INTENTOS_RESERVA veces.
+    Debe llamarse dentro de una transacción.
+
+    Args:
+        estudiante_id: ID del estudiante (su asiento actual no se cuenta)
+        tramo: 'entrada' o 'salida'
+        hora: Hora de la franja
+        colegio: Colegio del estudiante
+        capacidades: Diccionario {vehiculo_id: capacidad}; se corrige si cambió
+
+    Returns:
+        int | None: ID del vehículo bloqueado con asiento libre, o None si la
+            franja está llena o se agotaron los intentos
+    """
+    descartados = set()  # Vehículos que fallaron la verificación con bloqueo
+    for _ in range(INTENTOS_RESERVA):
+        candidatos = {v: c for v, c in capacidades.items() if v not in descartados}
+        ocupacion = cargar_ocupacion(tramo, hora, candidatos, excluir_estudiante=estudiante_id)
+        vehiculo_id = ocupacion.buscar_asiento(colegio)
+        if vehiculo_id is None:
+            return None
+
+        capacidad = Vehiculo.objects.select_for_update().filter(
+            pk=vehiculo_id, activo=True).values_list('capacidad', flat=True).first()
+        if capacidad is None:
+            del capacidades[vehiculo_id]  # Salió de servicio mientras se buscaba
+            continue
+        if capacidad != capacidades[vehiculo_id]:
+            capacidades[vehiculo_id] = capacidad
+            continue
+
+        filas = AsignacionVehiculo.objects.filter(
+            tramo=tramo, hora=hora, vehiculo_id=vehiculo_id).exclude(estudiante_id=estudiante_id)
+        ocupados = {fila['colegio']: fila['total'] for fila in filas.values('colegio').annotate(total=Count('id'))}
+        if set(ocupados) <= {colegio} and sum(ocupados.values()) < capacidad:
+            return vehiculo_id
+        # Otra transacción lo ocupó u otro colegio lo tomó: no volver a elegirlo
+        descartados.add(vehiculo_id)
+
+    logger.warning('Sin asiento para el estudiante %s en %s %s tras %s intentos',
+                   estudiante_id, tramo, hora, INTENTOS_RESERVA)
+    return None
+
+
+def asignar_estudiante(estudiante):
+    """
+    Asigna (o reasigna) los asientos de un solo estudiante sin tocar a los demás.
+
+    Solo se consulta la ocupación de las franjas del estudiante, por lo que el
+    costo no depende del tamaño de la flota ni del número de estudiantes. Si
+    su colegio y horarios no cambiaron no se bloquea nada; si cambiaron, solo
+    se bloquea el vehículo elegido en cada franja.
+
+    Args:
+        estudiante: Instancia del modelo Estudiantes
+
+    Returns:
+        dict: {tramo: vehiculo_id o None si no hay asiento}
+    """
+    resultado = {}
+    actuales = {a.tramo: a for a in AsignacionVehiculo.objects.filter(estudiante=estudiante)}
+    activos = set(Vehiculo.objects.filter(
+        pk__in=[a.vehiculo_id for a in actuales.values()], activo=True).values_list('id', flat=True))
+
+    pendientes = []
+    for tramo, campo in TRAMOS:
+        hora = getattr(estudiante, campo)
+        colegio = estudiante.Colegio
+        actual = actuales.get(tramo)
+        if not hora or not colegio:
+            # Sin colegio u hora no hay viaje en este tramo
+            if actual:
+                pendientes.append((tramo, None, None, actual))
+        elif actual and actual.colegio == colegio and actual.hora == hora and actual.vehiculo_id in activos:
+            resultado[tramo] = actual.vehiculo_id  # Nada cambió
+        else:
+            pendientes.append((tramo, hora, colegio, actual))
+
+    if not pendientes:
+        return resultado
+
+    with transaction.atomic():
+        capacidades = capacidades_activas()
+        for tramo, hora, colegio, actual in pendientes:
+            if hora is None:
+                actual.delete()
+                continue
+
+            vehiculo_id = reservar_asiento(estudiante.pk, tramo, hora, colegio, capacidades)
+            resultado[tramo] = vehiculo_id
+
+            if vehiculo_id is None:
+                if actual:
+                    actual.delete()
+                continue
+
+            AsignacionVehiculo.objects.update_or_create(
+                estudiante=estudiante, tramo=tramo,
+                defaults={'vehiculo_id': vehiculo_id, 'colegio': colegio, 'hora': hora})
+
+        actualizar_conductores({(a.vehiculo_id, estudiante.pk) for a in actuales.values()},
+                               set(_vehiculos_por_estudiante([estudiante.pk])))
+
+    return resultado
+
+
+def _vehiculos_por_estudiante(estudiante_ids):
+    """Pares (vehiculo_id, estudiante_id) de las asignaciones de varios estudiantes"""
+    estudiante_ids = list(estudiante_ids)
+    for inicio in range(0, len(estudiante_ids), TAMANO_LOTE):
+        yield from AsignacionVehiculo.objects.filter(
+            estudiante_id__in=estudiante_ids[inicio:inicio + TAMANO_LOTE]).values_list('vehiculo_id', 'estudiante_id')
+
+
+def reubicar_sobrantes(vehiculo):
+    """
+    Reubica a los estudiantes que ya no caben en un vehículo después de bajar
+    su capacidad o sacarlo de servicio. Solo se tocan las franjas de ese
+    vehículo; en cada una conservan el asiento los asignados primero.
+
+    Args:
+        vehiculo: Instancia de Vehiculo ya guardada
+
+    Returns:
+        dict: {'vehiculos': IDs afectados, 'franjas': (tramo, hora) afectadas,
+               'sin_asiento': [{'estudiante', 'tramo', 'hora'}]}
+    """
+    resumen = {'vehiculos': {vehiculo.pk}, 'franjas': set(), 'sin_asiento': []}
+    limite = vehiculo.capacidad if vehiculo.activo else 0
+
+    with transaction.atomic():
+        por_franja = defaultdict(list)
+        for asignacion in AsignacionVehiculo.objects.filter(vehiculo=vehiculo).order_by('created_at', 'id'):
+            por_franja[(asignacion.tramo, asignacion.hora)].append(asignacion)
+        sobrantes = [asignacion for filas in por_franja.values() for asignacion in filas[limite:]]
+        if not sobrantes:
+            return resumen
+
+        estudiante_ids = {asignacion.estudiante_id for asignacion in sobrantes}
+        antes = set(_vehiculos_por_estudiante(estudiante_ids))
+        for asignacion in sobrantes:
+            asignacion.delete()
+        capacidades = capacidades_activas()
+        for asignacion in sobrantes:
+            resumen['franjas'].add((asignacion.tramo, asignacion.hora))
+            vehiculo_id = reservar_asiento(
+                asignacion.estudiante_id, asignacion.tramo, asignacion.hora, asignacion.colegio, capacidades)
+            if vehiculo_id is None:
+                resumen['sin_asiento'].append(
+                    {'estudiante': asignacion.estudiante_id, 'tramo': asignacion.tramo, 'hora': asignacion.hora})
+                continue
+            AsignacionVehiculo.objects.create(
+                estudiante_id=asignacion.estudiante_id, vehiculo_id=vehiculo_id, tramo=asignacion.tramo,
+                colegio=asignacion.colegio, hora=asignacion.hora)
+            resumen['vehiculos'].add(vehiculo_id)
+        actualizar_conductores(antes, set(_vehiculos_por_estudiante(estudiante_ids)))
+
+    return resumen
+
+
+def resumen_ocupacion():
+    """
+    Resume la ocupación de cada vehículo por franja.
+
+    Returns:
+        list: Filas con tramo, hora, colegio, vehículo, ocupados y capacidad
+    """
+    capacidades = dict(Vehiculo.objects.values_list('id', 'capacidad'))
+    filas = AsignacionVehiculo.objects.values('tramo', 'hora', 'colegio', 'vehiculo_id', 'vehiculo__placa').annotate(
+        ocupados=Count('id')).order_by('tramo', 'hora', 'colegio', 'vehiculo_id')
+    return [
+        {
+            'tramo': fila['tramo'],
+            'hora': fila['hora'],
+            'colegio': fila['colegio'],
+            'vehiculo': fila['vehiculo_id'],
+            'placa': fila['vehiculo__placa'],
+            'ocupados': fila['ocupados'],
+            'capacidad': capacidades.get(fila['vehiculo_id'], 0),
+        }
+        for fila in filas
+    ]
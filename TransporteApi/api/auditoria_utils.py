@@ -0,0 +1,192 @@
+# Registro de auditoría de los cambios en los datos de las familias
+#
+# Las entradas no se escriben en la petición: cuando la transacción del
+# cambio se confirma pasan a un búfer en memoria del proceso, y un hilo las
+# guarda con bulk_create cada AUDITORIA_INTERVALO segundos (o antes si el
+# búfer llega a AUDITORIA_LOTE). Así auditar solo agrega a la petición armar
+# un diccionario. Si el proceso muere se pierden a lo sumo las entradas del
+# último intervalo; al salir normalmente el búfer se vacía (atexit).
+import atexit
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import RegistroAuditoria
+from .eventos_utils import datos_entidad
+
+
+logger = logging.getLogger(__name__)
+
+# Campos internos que cambian en cada guardado y no son un cambio de datos
+CAMPOS_IGNORADOS = ('version',)
+
+
+def periodo_de(momento):
+    """Primer día del mes (hora local) de un momento"""
+    return timezone.localtime(momento).date().replace(day=1)
+
+
+def diferencias(antes, despues):
+    """
+    Solo los campos que cambiaron entre dos estados de una entidad
+    (sin los CAMPOS_IGNORADOS).
+
+    Returns:
+        tuple: ({campo: valor anterior}, {campo: valor nuevo})
+    """
+    campos = [campo for campo in despues if campo not in CAMPOS_IGNORADOS and antes.get(campo) != despues[campo]]
+    return {campo: antes.get(campo) for campo in campos}, {campo: despues[campo] for campo in campos}
+
+
+# ============================================================================
+# REGISTRO DE ENTRADAS
+# ============================================================================
+
+def entrada(actor, accion, objetivo_tipo, objetivo_id, antes=None, despues=None):
+    """
+    Crea (sin guardar) una entrada de auditoría con la hora actual.
+
+    Args:
+        actor: Usuario que hizo el cambio (None = sistema)
+        accion: Una de RegistroAuditoria.ACCION_CHOICES
+        objetivo_tipo: padre, estudiante o tutor
+        objetivo_id: ID de la entidad
+        antes, despues: Valores antes y después del cambio
+    """
+    momento = timezone.now()
+    return RegistroAuditoria(
+        periodo=periodo_de(momento), momento=momento,
+        actor=getattr(actor, 'pk', None), actor_email=getattr(actor, 'email', '') or '',
+        accion=accion, objetivo_tipo=objetivo_tipo, objetivo_id=objetivo_id, antes=antes, despues=despues)
+
+
+def registrar(entradas):
+    """
+    Pasa las entradas al búfer cuando se confirme la transacción en curso
+    (de inmediato si no hay una). Si la transacción se revierte, no se auditan.
+
+    Args:
+        entradas: Lista de RegistroAuditoria sin guardar
+    """
+    if entradas:
+        transaction.on_commit(lambda: buffer.agregar(entradas))
+
+
+def registrar_cambio(actor, accion, objetivo_tipo, instancia, antes=None):
+    """
+    Audita el cambio de una instancia de modelo: al crear guarda el estado
+    nuevo, al eliminar el anterior y al actualizar solo los campos que cambiaron.
+
+    Args:
+        antes: Estado (datos_entidad) anterior a la actualización
+    """
+    if accion == 'creado':
+        valores = (None, datos_entidad(instancia))
+    elif accion == 'eliminado':
+        valores = (datos_entidad(instancia), None)
+    else:
+        valores = diferencias(antes, datos_entidad(instancia))
+        if not valores[1]:
+            return  # Sin cambios reales
+    registrar([entrada(actor, accion, objetivo_tipo, instancia.pk, *valores)])
+
+
+# ============================================================================
+# BÚFER DEL PROCESO
+# ============================================================================
+
+class BufferAuditoria:
+    """
+    Entradas pendientes de guardar en este proceso y el hilo que las escribe en lote.
+    """
+
+    def __init__(self):
+        self.pendientes = []
+        self.lock = threading.Lock()
+        self.escribir = threading.Lock()  # Una sola escritura a la vez (hilo o atexit)
+        self.despertar = threading.Event()
+        self.hilo = None
+
+    def agregar(self, entradas):
+        """Agrega entradas al búfer; el hilo las guarda en su próxima pasada"""
+        maximo = getattr(settings, 'AUDITORIA_MAXIMO_BUFFER', 100000)
+        with self.lock:
+            self.pendientes.extend(entradas)
+            if len(self.pendientes) > maximo:
+                # La base de datos no responde hace rato: no crecer sin límite
+                descartadas = len(self.pendientes) - maximo
+                del self.pendientes[:descartadas]
+                logger.error('Búfer de auditoría lleno: %s entradas descartadas', descartadas)
+            lleno = len(self.pendientes) >= getattr(settings, 'AUDITORIA_LOTE', 500)
+            if self.hilo is None or not self.hilo.is_alive():
+                self.hilo = HiloAuditoria(self)
+                self.hilo.start()
+        if lleno:
+            self.despertar.set()
+
+    def vaciar(self):
+        """
+        Guarda todas las entradas pendientes con bulk_create. Si falla, las
+        devuelve al búfer para reintentar en la próxima pasada.
+
+        Returns:
+            int: Entradas guardadas
+        """
+        with self.escribir:
+            with self.lock:
+                lote, self.pendientes = self.pendientes, []
+            if not lote:
+                return 0
+            try:
+                RegistroAuditoria.objects.bulk_create(lote, batch_size=getattr(settings, 'AUDITORIA_LOTE', 500))
+            except Exception:
+                logger.exception('Error guardando %s entradas de auditoría', len(lote))
+                with self.lock:
+                    self.pendientes[:0] = lote
+                return 0
+            return len(lote)
+
+
+class HiloAuditoria(threading.Thread):
+    """Vacía el búfer cada AUDITORIA_INTERVALO segundos o cuando se llena"""
+
+    def __init__(self, buffer):
+        super().__init__(name='auditoria', daemon=True)
+        self.buffer = buffer
+
+    def run(self):
+        while True:
+            self.buffer.despertar.wait(getattr(settings, 'AUDITORIA_INTERVALO', 1))
+            self.buffer.despertar.clear()
+            try:
+                close_old_connections()
+                self.buffer.vaciar()
+            finally:
+                close_old_connections()
+
+
+# Búfer compartido del proceso
+buffer = BufferAuditoria()
+atexit.register(buffer.vaciar)
+
+
+def purgar_auditoria():
+    """
+    Elimina los meses completos más antiguos que AUDITORIA_MESES_RETENCION
+    (None = conservar todo). Borra por periodo, el inicio del índice.
+
+    Returns:
+        int: Entradas eliminadas
+    """
+    meses = getattr(settings, 'AUDITORIA_MESES_RETENCION', None)
+    if not meses:
+        return 0
+    limite = timezone.localdate().replace(day=1)
+    for _ in range(meses):
+        limite = (limite - timedelta(days=1)).replace(day=1)
+    eliminados, _ = RegistroAuditoria.objects.filter(periodo__lt=limite).delete()
+    return eliminados
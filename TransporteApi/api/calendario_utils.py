@@ -0,0 +1,295 @@
+# Expansión del calendario de cada colegio a los viajes concretos de un rango de fechas
+#
+# Los días de un rango se representan como bits de un entero de Python
+# (bit i = desde + i días). Los días de servicio de la semana, el periodo
+# lectivo y las excepciones son máscaras de intervalo que se combinan con
+# AND/OR/NOT, así todo un periodo se calcula en una pasada por colegio sin
+# recorrer los días uno a uno.
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import CalendarioColegio, ExcepcionCalendario
+from .analitica_utils import inicio_semana
+from .sincronizacion_utils import incrementar_contador, leer_contador
+
+
+# Los 7 bits de una semana (lunes = bit 0)
+SEMANA_COMPLETA = 0b1111111
+
+# Contador (ContadorVersion) con la generación de la caché de planes: al cambiar un calendario se
+# incrementa y las claves viejas dejan de usarse. Vive en la base de datos porque la caché es
+# local a cada proceso y la invalidación debe llegar a todos.
+CONTADOR_PLANES = 'planes_viaje'
+
+
+def clave_colegio(colegio):
+    """Nombre del colegio normalizado para comparar Estudiantes.Colegio con los calendarios"""
+    return ' '.join((colegio or '').split()).casefold()
+
+
+# ============================================================================
+# MÁSCARAS DE BITS
+# ============================================================================
+
+def mascara_intervalo(inicio, n, desde, hasta):
+    """
+    Bits de los días entre `desde` y `hasta` (inclusive) dentro de un rango
+    de `n` días que empieza en `inicio`. Fechas None = sin límite.
+
+    Returns:
+        int: Máscara del intervalo (0 si no se cruza con el rango)
+    """
+    primero = 0 if desde is None else max((desde - inicio).days, 0)
+    ultimo = n - 1 if hasta is None else min((hasta - inicio).days, n - 1)
+    if ultimo < primero:
+        return 0
+    return (1 << (ultimo + 1)) - (1 << primero)
+
+
+def mascara_semanal(dias_servicio, inicio, n):
+    """
+    Repite el patrón semanal de días de servicio sobre `n` días duplicando
+    el bloque (log n desplazamientos en lugar de n asignaciones).
+
+    Args:
+        dias_servicio: Bits de la semana (lunes = 1, martes = 2, ... domingo = 64)
+        inicio: Primer día del rango
+        n: Días del rango
+
+    Returns:
+        int: Máscara con los días de servicio del rango
+    """
+    # Rotar el patrón para que el bit 0 sea el día de la semana de `inicio`
+    giro = inicio.weekday()
+    patron = ((dias_servicio >> giro) | (dias_servicio << (7 - giro))) & SEMANA_COMPLETA
+    mascara, largo = patron, 7
+    while largo < n:
+        mascara |= mascara << largo
+        largo *= 2
+    return mascara & ((1 << n) - 1)
+
+
+def _desplazar(mascara, corrimiento):
+    return mascara << corrimiento if corrimiento >= 0 else mascara >> -corrimiento
+
+
+def dias_de(mascara):
+    """Posiciones de los bits encendidos, de menor a mayor"""
+    while mascara:
+        bit = mascara & -mascara
+        yield bit.bit_length() - 1
+        mascara ^= bit
+
+
+# ============================================================================
+# PLANES POR COLEGIO Y SEMANA (CACHEADOS)
+# ============================================================================
+
+def _generacion():
+    return leer_contador(CONTADOR_PLANES)
+
+
+def invalidar_planes():
+    """
+    Descarta los planes cacheados de todos los colegios en todos los procesos
+    (un calendario o excepción cambió). Dentro de la transacción del cambio,
+    la nueva generación se confirma junto con él.
+    """
+    incrementar_contador(CONTADOR_PLANES)
+
+
+def _clave_plan(generacion, colegio, lunes):
+    huella = hashlib.sha1(colegio.encode()).hexdigest()[:16]  # Claves válidas en cualquier backend
+    return f'viajes:plan:{generacion}:{huella}:{lunes.isoformat()}'
+
+
+def calcular_planes(colegios, desde, hasta):
+    """
+    Calcula en una pasada los días de servicio y los horarios especiales de
+    varios colegios en el rango (dos consultas en total).
+
+    La máscara de servicio es: patrón semanal AND periodo lectivo AND NOT
+    feriados. Cada medio día o semana de exámenes queda como (máscara,
+    hora_entrada, hora_salida); las excepciones del colegio se aplican
+    después de las generales, así que prevalecen sobre ellas.
+
+    Args:
+        colegios: Nombres normalizados (clave_colegio)
+        desde: Primer día del rango
+        hasta: Último día del rango
+
+    Returns:
+        dict: {colegio: (servicio, [(mascara, hora_entrada, hora_salida)])} con
+        máscaras disjuntas relativas a `desde`
+    """
+    n = (hasta - desde).days + 1
+    calendarios = {clave_colegio(c.colegio): c for c in CalendarioColegio.objects.all()}
+    por_calendario = defaultdict(list)
+    for excepcion in ExcepcionCalendario.objects.filter(desde__lte=hasta, hasta__gte=desde).order_by('desde', 'id'):
+        por_calendario[excepcion.calendario_id].append(excepcion)
+
+    planes = {}
+    for colegio in colegios:
+        calendario = calendarios.get(colegio)
+        if calendario is None:
+            servicio = mascara_semanal(CalendarioColegio.LUNES_A_VIERNES, desde, n)
+            excepciones = por_calendario[None]
+        else:
+            servicio = mascara_semanal(calendario.dias_servicio, desde, n) & mascara_intervalo(
+                desde, n, calendario.inicio_periodo, calendario.fin_periodo)
+            excepciones = por_calendario[None] + por_calendario[calendario.pk]
+
+        horarios = {}  # (entrada, salida) -> máscara
+        for excepcion in excepciones:
+            mascara = mascara_intervalo(desde, n, excepcion.desde, excepcion.hasta)
+            # Una excepción posterior reemplaza a las anteriores en sus días
+            for clave in list(horarios):
+                horarios[clave] &= ~mascara
+            if excepcion.tipo == 'feriado':
+                servicio &= ~mascara
+            elif excepcion.hora_entrada or excepcion.hora_salida:
+                clave = (excepcion.hora_entrada, excepcion.hora_salida)
+                horarios[clave] = horarios.get(clave, 0) | mascara
+        planes[colegio] = (servicio, [
+            (mascara & servicio, entrada, salida)
+            for (entrada, salida), mascara in horarios.items() if mascara & servicio
+        ])
+    return planes
+
+
+def planes_colegios(colegios, desde, hasta):
+    """
+    Planes de los colegios en el rango, armados desde la caché por colegio y
+    semana. Las semanas que faltan se calculan juntas con calcular_planes y
+    se guardan para las siguientes consultas.
+
+    Returns:
+        dict: Igual que calcular_planes
+    """
+    colegios = set(colegios)
+    generacion = _generacion()
+    lunes_inicio = inicio_semana(desde)
+    semanas = [lunes_inicio + timedelta(weeks=i) for i in range((hasta - lunes_inicio).days // 7 + 1)]
+    claves = {(c, lunes): _clave_plan(generacion, c, lunes) for c in colegios for lunes in semanas}
+    guardados = cache.get_many(claves.values())
+
+    faltantes = {clave for clave, texto in claves.items() if texto not in guardados}
+    if faltantes:
+        inicio = min(lunes for _, lunes in faltantes)
+        fin = max(lunes for _, lunes in faltantes) + timedelta(days=6)
+        calculados = calcular_planes({colegio for colegio, _ in faltantes}, inicio, fin)
+        nuevos = {}
+        for colegio, lunes in faltantes:
+            corrimiento = (lunes - inicio).days
+            servicio, horarios = calculados[colegio]
+            nuevos[claves[(colegio, lunes)]] = (
+                (servicio >> corrimiento) & SEMANA_COMPLETA,
+                tuple(((m >> corrimiento) & SEMANA_COMPLETA, e, s) for m, e, s in horarios
+                      if (m >> corrimiento) & SEMANA_COMPLETA),
+            )
+        cache.set_many(nuevos, getattr(settings, 'VIAJES_CACHE_TTL', 86400))
+        guardados.update(nuevos)
+
+    # Unir las semanas en máscaras del rango pedido (bit 0 = desde)
+    n = (hasta - desde).days + 1
+    rango = (1 << n) - 1
+    planes = {}
+    for colegio in colegios:
+        servicio, horarios = 0, defaultdict(int)
+        for lunes in semanas:
+            corrimiento = (lunes - desde).days  # Negativo en la primera semana si desde no es lunes
+            semana, especiales = guardados[claves[(colegio, lunes)]]
+            servicio |= _desplazar(semana, corrimiento)
+            for mascara, entrada, salida in especiales:
+                horarios[(entrada, salida)] |= _desplazar(mascara, corrimiento)
+        planes[colegio] = (servicio & rango, [
+            (mascara & rango, entrada, salida) for (entrada, salida), mascara in horarios.items() if mascara & rango
+        ])
+    return planes
+
+
+# ============================================================================
+# EXPANSIÓN A VIAJES
+# ============================================================================
+
+def mascaras_viaje(plan, entrada, salida):
+    """
+    Días de cada viaje de un grupo de estudiantes con el mismo colegio y horario.
+
+    Args:
+        plan: (servicio, horarios) del colegio
+        entrada: Hora de entrada habitual (None = no usa el tramo salvo horario especial)
+        salida: Hora de salida habitual
+
+    Returns:
+        dict: {(tramo, hora): máscara de días}
+    """
+    servicio, horarios = plan
+    normales = servicio
+    for mascara, _, _ in horarios:
+        normales &= ~mascara
+    viajes = defaultdict(int)
+    for tramo, hora_habitual, indice in (('entrada', entrada, 1), ('salida', salida, 2)):
+        if hora_habitual is not None and normales:
+            viajes[(tramo, hora_habitual)] |= normales
+        for especial in horarios:
+            hora = especial[indice] or hora_habitual
+            if hora is not None:
+                viajes[(tramo, hora)] |= especial[0]
+    return viajes
+
+
+def expandir_viajes(desde, hasta, estudiantes, por_estudiante=False):
+    """
+    Viajes concretos (fecha, tramo, hora) de un conjunto de estudiantes.
+
+    Sin `por_estudiante` los estudiantes se agrupan por colegio y horario con
+    un GROUP BY, así el costo depende de los grupos y no del total de estudiantes.
+
+    Args:
+        desde: Primer día
+        hasta: Último día
+        estudiantes: QuerySet de Estudiantes
+        por_estudiante: True para listar los viajes de cada estudiante
+
+    Returns:
+        dict: {'dias': [{fecha, viajes}], 'total_viajes', 'dias_con_servicio'};
+        cada viaje tiene colegio, tramo, hora y `estudiantes` (cantidad) o `estudiante` (ID)
+    """
+    if por_estudiante:
+        grupos = [{**fila, 'n': 1} for fila in estudiantes.values('id', 'Colegio', 'H_entrada', 'H_salida')]
+    else:
+        grupos = list(estudiantes.values('Colegio', 'H_entrada', 'H_salida').annotate(n=Count('id')))
+
+    planes = planes_colegios({clave_colegio(g['Colegio']) for g in grupos}, desde, hasta)
+    por_dia = defaultdict(list)
+    total = 0
+    for grupo in grupos:
+        plan = planes[clave_colegio(grupo['Colegio'])]
+        for (tramo, hora), mascara in mascaras_viaje(plan, grupo['H_entrada'], grupo['H_salida']).items():
+            total += mascara.bit_count() * grupo['n']
+            viaje = {'colegio': grupo['Colegio'] or '', 'tramo': tramo, 'hora': hora}
+            viaje.update({'estudiante': grupo['id']} if por_estudiante else {'estudiantes': grupo['n']})
+            for dia in dias_de(mascara):
+                por_dia[dia].append(viaje)
+
+    servicio = 0
+    for mascara, _ in planes.values():
+        servicio |= mascara
+    orden = ('estudiante',) if por_estudiante else ('colegio',)
+    return {
+        'dias': [
+            {
+                'fecha': desde + timedelta(days=dia),
+                'viajes': sorted(por_dia[dia], key=lambda v: (v['hora'], v['tramo'], *(v[c] for c in orden))),
+            }
+            for dia in sorted(por_dia)
+        ],
+        'total_viajes': total,
+        'dias_con_servicio': servicio.bit_count(),
+    }
@@ -0,0 +1,246 @@
+# Utilidades para detectar familias y estudiantes registrados dos veces
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.db import transaction
+
+from .models import Padres, Estudiantes, ClaveDuplicado
+
+
+# Similitud mínima entre nombres para considerar duplicado a dos estudiantes del mismo bloque
+SIMILITUD_MINIMA = 0.8
+
+# Dígitos finales de un teléfono que se comparan (ignora prefijos como +593 o 0)
+DIGITOS_TELEFONO = 9
+
+
+def normalizar_nombre(texto):
+    """
+    Normaliza un nombre: sin tildes, en minúsculas y solo letras y espacios.
+
+    Args:
+        texto: Nombre o apellido
+
+    Returns:
+        str: Nombre normalizado
+    """
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^a-z]+', ' ', texto.lower()).split())
+
+
+def clave_fonetica(palabra):
+    """
+    Clave fonética simple para español: une letras que suenan igual
+    (z/s/c suave, v/b, ll/y, h muda) y quita letras repetidas, así
+    'Vásquez' y 'Basques' producen la misma clave.
+
+    Args:
+        palabra: Palabra normalizada
+
+    Returns:
+        str: Clave fonética
+    """
+    palabra = re.sub(r'c([ei])', r's\1', palabra)
+    palabra = palabra.replace('z', 's').replace('v', 'b').replace('ll', 'y').replace('qu', 'k').replace('h', '')
+    return re.sub(r'(.)\1+', r'\1', palabra)
+
+
+def solo_digitos(texto):
+    """Retorna solo los dígitos de un texto"""
+    return re.sub(r'\D', '', texto or '')
+
+
+def claves_estudiante(nombre, apellido, fecha_nacimiento):
+    """
+    Claves de bloqueo de un estudiante: primer apellido fonético + fecha de nacimiento.
+
+    Returns:
+        set: Claves del estudiante (vacío si faltan datos)
+    """
+    apellidos = normalizar_nombre(apellido).split()
+    if not apellidos or not fecha_nacimiento:
+        return set()
+    return {f'{clave_fonetica(apellidos[0])}:{fecha_nacimiento.isoformat()}'}
+
+
+def claves_familia(cedula, celular, telefono_usuario=None):
+    """
+    Claves de bloqueo de una familia: dígitos de la cédula y de los teléfonos.
+
+    Returns:
+        set: Claves de la familia
+    """
+    claves = set()
+    digitos_cedula = solo_digitos(cedula)
+    if digitos_cedula:
+        claves.add(f'ced:{digitos_cedula}')
+    for telefono in (celular, telefono_usuario):
+        digitos = solo_digitos(telefono)
+        if len(digitos) >= 7:
+            claves.add(f'tel:{digitos[-DIGITOS_TELEFONO:]}')
+    return claves
+
+
+def nombre_comparable(nombre, apellido):
+    """
+    Nombre y primer apellido normalizados; el segundo apellido se omite porque
+    muchas veces solo se escribe en uno de los registros.
+    """
+    apellidos = normalizar_nombre(apellido).split()
+    return f"{normalizar_nombre(nombre)} {apellidos[0] if apellidos else ''}".strip()
+
+
+def similitud(a, b):
+    """Similitud entre 0 y 1 de dos nombres normalizados"""
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def indexar_estudiante(estudiante):
+    """
+    Actualiza las claves de bloqueo de un estudiante en la tabla índice.
+
+    Args:
+        estudiante: Instancia del modelo Estudiantes
+    """
+    claves = claves_estudiante(estudiante.nombre, estudiante.apellido, estudiante.fecha_nacimiento)
+    with transaction.atomic():
+        ClaveDuplicado.objects.filter(tipo='estudiante', estudiante=estudiante).delete()
+        ClaveDuplicado.objects.bulk_create([
+            ClaveDuplicado(tipo='estudiante', clave=clave, estudiante=estudiante) for clave in claves
+        ])
+
+
+def indexar_padre(padre):
+    """
+    Actualiza las claves de bloqueo de una familia en la tabla índice.
+
+    Args:
+        padre: Instancia del modelo Padres
+    """
+    telefono = padre.usuario.telefono if padre.usuario_id else None
+    claves = claves_familia(padre.cedula, padre.celular, telefono)
+    with transaction.atomic():
+        ClaveDuplicado.objects.filter(tipo='familia', padre=padre).delete()
+        ClaveDuplicado.objects.bulk_create([
+            ClaveDuplicado(tipo='familia', clave=clave, padre=padre) for clave in claves
+        ])
+
+
+def buscar_duplicados_estudiante(estudiante):
+    """
+    Busca estudiantes de otras familias que podrían ser el mismo.
+    Solo se consultan los registros que comparten clave (búsqueda por índice).
+
+    Args:
+        estudiante: Instancia del modelo Estudiantes
+
+    Returns:
+        list: Diccionarios con el estudiante candidato y la similitud del nombre
+    """
+    claves = claves_estudiante(estudiante.nombre, estudiante.apellido, estudiante.fecha_nacimiento)
+    candidatos = Estudiantes.objects.filter(
+        claves_duplicado__tipo='estudiante', claves_duplicado__clave__in=claves
+    ).exclude(padres_id=estudiante.padres_id).distinct()
+
+    nombre = nombre_comparable(estudiante.nombre, estudiante.apellido)
+    resultado = []
+    for candidato in candidatos:
+        puntaje = similitud(nombre, nombre_comparable(candidato.nombre, candidato.apellido))
+        if puntaje >= SIMILITUD_MINIMA:
+            resultado.append({'estudiante': candidato.id, 'padre': candidato.padres_id, 'similitud': round(puntaje, 2)})
+    return resultado
+
+
+def buscar_duplicados_padre(padre):
+    """
+    Busca familias duplicadas de un padre: por teléfono o cédula, y por sus estudiantes.
+
+    Args:
+        padre: Instancia del modelo Padres
+
+    Returns:
+        dict: Familias que comparten clave y estudiantes posiblemente duplicados
+    """
+    telefono = padre.usuario.telefono if padre.usuario_id else None
+    claves = claves_familia(padre.cedula, padre.celular, telefono)
+    familias = defaultdict(list)
+    for fila in ClaveDuplicado.objects.filter(tipo='familia', clave__in=claves).exclude(padre=padre).values(
+            'padre_id', 'clave'):
+        familias[fila['padre_id']].append(fila['clave'])
+
+    estudiantes = []
+    for estudiante in padre.estudiantes.all():
+        for candidato in buscar_duplicados_estudiante(estudiante):
+            estudiantes.append({'estudiante': estudiante.id, 'duplicado': candidato})
+
+    return {
+        'familias': [{'padre': padre_id, 'claves': sorted(c)} for padre_id, c in familias.items()],
+        'estudiantes': estudiantes,
+    }
+
+
+def reconstruir_indice(lote=2000):
+    """
+    Reconstruye desde cero la tabla de claves de bloqueo en una sola pasada.
+
+    Returns:
+        int: Número de claves creadas
+    """
+    nuevas = []
+    for est in Estudiantes.objects.values('id', 'nombre', 'apellido', 'fecha_nacimiento').iterator(chunk_size=lote):
+        for clave in claves_estudiante(est['nombre'], est['apellido'], est['fecha_nacimiento']):
+            nuevas.append(ClaveDuplicado(tipo='estudiante', clave=clave, estudiante_id=est['id']))
+    for padre in Padres.objects.values('id', 'cedula', 'celular', 'usuario__telefono').iterator(chunk_size=lote):
+        for clave in claves_familia(padre['cedula'], padre['celular'], padre['usuario__telefono']):
+            nuevas.append(ClaveDuplicado(tipo='familia', clave=clave, padre_id=padre['id']))
+
+    with transaction.atomic():
+        ClaveDuplicado.objects.all().delete()
+        ClaveDuplicado.objects.bulk_create(nuevas, batch_size=lote)
+    return len(nuevas)
+
+
+def escanear_duplicados():
+    """
+    Recorre todas las familias y estudiantes una sola vez y agrupa los duplicados.
+
+    Los registros se agrupan por clave de bloqueo en memoria; solo se comparan
+    los pares dentro de cada bloque, en lugar de todos contra todos.
+
+    Returns:
+        dict: Grupos de familias y pares de estudiantes posiblemente duplicados
+    """
+    bloques_familia = defaultdict(set)
+    for padre in Padres.objects.values('id', 'cedula', 'celular', 'usuario__telefono').iterator(chunk_size=2000):
+        for clave in claves_familia(padre['cedula'], padre['celular'], padre['usuario__telefono']):
+            bloques_familia[clave].add(padre['id'])
+
+    bloques_estudiante = defaultdict(list)
+    for est in Estudiantes.objects.values('id', 'nombre', 'apellido', 'fecha_nacimiento', 'padres_id').iterator(chunk_size=2000):
+        nombre = nombre_comparable(est['nombre'], est['apellido'])
+        for clave in claves_estudiante(est['nombre'], est['apellido'], est['fecha_nacimiento']):
+            bloques_estudiante[clave].append((est['id'], est['padres_id'], nombre))
+
+    familias = [
+        {'clave': clave, 'padres': sorted(ids)}
+        for clave, ids in bloques_familia.items() if len(ids) > 1
+    ]
+
+    estudiantes = []
+    for clave, miembros in bloques_estudiante.items():
+        for i, (id_a, padre_a, nombre_a) in enumerate(miembros):
+            for id_b, padre_b, nombre_b in miembros[i + 1:]:
+                if padre_a == padre_b:
+                    continue  # Hermanos (por ejemplo gemelos) de la misma familia
+                puntaje = similitud(nombre_a, nombre_b)
+                if puntaje >= SIMILITUD_MINIMA:
+                    estudiantes.append({
+                        'clave': clave, 'estudiantes': [id_a, id_b],
+                        'padres': [padre_a, padre_b], 'similitud': round(puntaje, 2)})
+
+    return {'familias': familias, 'estudiantes': estudiantes}
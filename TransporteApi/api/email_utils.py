@@ -1,10 +1,14 @@
 # Utilidades para el envío de emails
 import random
 import string
-from django.core.mail import send_mail
+from datetime import timedelta
+from django.core.mail import send_mail, get_connection, EmailMultiAlternatives
 from django.conf import settings
 from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.utils import timezone
+from django.utils.html import escape, strip_tags
+
+from .models import CorreoPendiente
 
 
 def generar_token_verificacion():
@@ -49,7 +53,7 @@ def enviar_email_verificacion(usuario):
         <html>
         <body>
             <h2>¡Bienvenido a Transporte Alegría!</h2>
-            <p>Hola {usuario.nombre or 'Usuario'},</p>
+            <p>Hola {escape(usuario.nombre or 'Usuario')},</p>
             <p>Gracias por registrarte en nuestro sistema. Para completar tu registro, 
             necesitas verificar tu dirección de email.</p>
             
@@ -107,7 +111,7 @@ def enviar_email_bienvenida(usuario):
         <html>
         <body>
             <h2>¡Cuenta verificada exitosamente!</h2>
-            <p>Hola {usuario.nombre or 'Usuario'},</p>
+            <p>Hola {escape(usuario.nombre or 'Usuario')},</p>
             <p>Tu cuenta ha sido verificada correctamente. Ya puedes acceder a todas las 
             funcionalidades de Transporte Alegría.</p>
             
@@ -141,3 +145,114 @@ def enviar_email_bienvenida(usuario):
     except Exception as e:
         print(f"Error enviando email de bienvenida: {e}")
         return False
+
+
+# ============================================================================
+# COLA DE EMAILS
+# ============================================================================
+
+def correo_aprobacion(usuario, aprobado):
+    """
+    Construye (sin guardar) el email que avisa al padre el estado de su formulario.
+
+    Args:
+        usuario: Instancia del modelo Usuario (o cualquier objeto con email y nombre)
+        aprobado: True si el formulario fue aprobado
+
+    Returns:
+        CorreoPendiente: Correo listo para encolar
+    """
+    if aprobado:
+        asunto = "Tu formulario fue aprobado - Transporte Alegría"
+        mensaje = ("<p>Tu formulario de transporte fue <strong>aprobado</strong>. "
+                   "Pronto recibirás los datos del vehículo asignado.</p>")
+    else:
+        asunto = "Actualización de tu formulario - Transporte Alegría"
+        mensaje = ("<p>Tu formulario de transporte quedó <strong>pendiente de revisión</strong>. "
+                   "Revisa tus datos en la plataforma o contáctanos si tienes dudas.</p>")
+
+    contenido_html = f"""
+        <html>
+        <body>
+            <p>Hola {escape(usuario.nombre or 'Usuario')},</p>
+            {mensaje}
+            <p>Saludos,<br>Equipo de Transporte Alegría</p>
+        </body>
+        </html>
+        """
+    return CorreoPendiente(destinatario=usuario.email, asunto=asunto, contenido_html=contenido_html,
+                           proximo_intento=timezone.now())
+
+
+def encolar_correos(correos):
+    """
+    Guarda varios correos en la cola con una sola inserción.
+
+    Args:
+        correos: Lista de CorreoPendiente sin guardar
+
+    Returns:
+        int: Número de correos encolados
+    """
+    CorreoPendiente.objects.bulk_create(correos, batch_size=500)
+    return len(correos)
+
+
+def enviar_pendientes(lote=100):
+    """
+    Envía los correos pendientes cuyo próximo intento ya llegó, usando una
+    sola conexión SMTP. Los que fallan se reintentan con espera creciente
+    (2, 4, 8... minutos) hasta CORREOS_MAX_INTENTOS.
+
+    Args:
+        lote: Máximo de correos a enviar en esta llamada
+
+    Returns:
+        dict: Correos enviados y fallidos
+    """
+    maximo_intentos = getattr(settings, 'CORREOS_MAX_INTENTOS', 5)
+    ahora = timezone.now()
+    pendientes = list(CorreoPendiente.objects.filter(
+        estado='pendiente', proximo_intento__lte=ahora).order_by('proximo_intento')[:lote])
+
+    enviados, fallidos = 0, 0
+    if not pendientes:
+        return {'enviados': enviados, 'fallidos': fallidos}
+
+    def registrar_fallo(correo, error):
+        correo.ultimo_error = str(error)
+        if correo.intentos >= maximo_intentos:
+            correo.estado = 'error'
+        else:
+            correo.proximo_intento = timezone.now() + timedelta(minutes=2 ** correo.intentos)
+
+    conexion = get_connection(fail_silently=False)
+    try:
+        conexion.open()
+    except Exception as e:
+        # Sin conexión al servidor SMTP: todo el lote cuenta como un intento fallido
+        for correo in pendientes:
+            correo.intentos += 1
+            registrar_fallo(correo, e)
+        fallidos = len(pendientes)
+    else:
+        try:
+            for correo in pendientes:
+                mensaje = EmailMultiAlternatives(
+                    subject=correo.asunto, body=strip_tags(correo.contenido_html),
+                    from_email=settings.DEFAULT_FROM_EMAIL, to=[correo.destinatario], connection=conexion)
+                mensaje.attach_alternative(correo.contenido_html, 'text/html')
+                correo.intentos += 1
+                try:
+                    mensaje.send()
+                    correo.estado, correo.enviado_en, correo.ultimo_error = 'enviado', timezone.now(), ''
+                    enviados += 1
+                except Exception as e:
+                    registrar_fallo(correo, e)
+                    fallidos += 1
+        finally:
+            conexion.close()
+
+    CorreoPendiente.objects.bulk_update(
+        pendientes, ['estado', 'intentos', 'proximo_intento', 'ultimo_error', 'enviado_en'])
+    return {'enviados': enviados, 'fallidos': fallidos}
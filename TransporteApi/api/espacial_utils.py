@@ -0,0 +1,280 @@
+# Índice espacial en memoria para búsquedas por cercanía
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .models import Tutor_receptor, Parada
+
+
+RADIO_TIERRA_METROS = 6371000
+METROS_POR_GRADO = 111320  # Metros por grado de latitud (aproximado)
+
+
+def distancia_metros(lat1, lon1, lat2, lon2):
+    """
+    Calcula la distancia entre dos coordenadas con la fórmula de haversine.
+
+    Returns:
+        float: Distancia en metros
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RADIO_TIERRA_METROS * math.asin(math.sqrt(a))
+
+
+class IndiceEspacial:
+    """
+    Índice de rejilla (grid) para puntos con latitud y longitud.
+
+    Cada punto se guarda en la celda que le corresponde según el tamaño de
+    celda en grados; las consultas solo revisan las celdas vecinas, así que
+    el costo depende de los puntos cercanos y no del total.
+    """
+
+    def __init__(self, celda_grados=0.005):
+        """
+        Args:
+            celda_grados: Tamaño de cada celda en grados (0.005 ≈ 550 m)
+        """
+        self.celda = celda_grados
+        self.celdas = defaultdict(dict)  # (fila, columna) -> {id: (lat, lon)}
+        self.puntos = {}                 # id -> (lat, lon)
+        # (fila mín, fila máx, columna mín, columna máx) de las celdas ocupadas;
+        # None = recalcular en la próxima consulta (se vació una celda del borde)
+        self.limites = None
+
+    def __len__(self):
+        return len(self.puntos)
+
+    def _clave(self, latitud, longitud):
+        """Celda de la rejilla que contiene la coordenada"""
+        return (math.floor(latitud / self.celda), math.floor(longitud / self.celda))
+
+    def insertar(self, identificador, latitud, longitud):
+        """Inserta o mueve un punto en el índice"""
+        self.eliminar(identificador)
+        self.puntos[identificador] = (latitud, longitud)
+        clave = self._clave(latitud, longitud)
+        self.celdas[clave][identificador] = (latitud, longitud)
+        if len(self.puntos) == 1:
+            self.limites = (clave[0], clave[0], clave[1], clave[1])
+        elif self.limites is not None:
+            fila_min, fila_max, columna_min, columna_max = self.limites
+            self.limites = (min(fila_min, clave[0]), max(fila_max, clave[0]),
+                            min(columna_min, clave[1]), max(columna_max, clave[1]))
+
+    def eliminar(self, identificador):
+        """Elimina un punto del índice si existe"""
+        anterior = self.puntos.pop(identificador, None)
+        if anterior is not None:
+            clave = self._clave(*anterior)
+            self.celdas[clave].pop(identificador, None)
+            if not self.celdas[clave]:
+                del self.celdas[clave]
+                if self.limites is not None and (clave[0] in self.limites[:2] or clave[1] in self.limites[2:]):
+                    self.limites = None
+
+    def _limites(self):
+        """Filas y columnas extremas de las celdas ocupadas (requiere al menos un punto)"""
+        if self.limites is None:
+            filas = [clave[0] for clave in self.celdas]
+            columnas = [clave[1] for clave in self.celdas]
+            self.limites = (min(filas), max(filas), min(columnas), max(columnas))
+        return self.limites
+
+    def _metros_por_celda(self, latitud):
+        """Lado más corto de una celda en metros a esa latitud"""
+        return self.celda * METROS_POR_GRADO * max(math.cos(math.radians(latitud)), 0.01)
+
+    def _anillo(self, centro, radio):
+        """Celdas que forman el anillo a distancia `radio` (en celdas) del centro"""
+        fila, columna = centro
+        if radio == 0:
+            yield centro
+            return
+        for d in range(-radio, radio + 1):
+            yield (fila - radio, columna + d)
+            yield (fila + radio, columna + d)
+        for d in range(-radio + 1, radio):
+            yield (fila + d, columna - radio)
+            yield (fila + d, columna + radio)
+
+    def en_radio(self, latitud, longitud, metros):
+        """
+        Busca los puntos a menos de `metros` de la coordenada.
+
+        Returns:
+            list: Tuplas (distancia, id) ordenadas por distancia
+        """
+        anillos = int(math.ceil(metros / self._metros_por_celda(latitud)))
+        centro = self._clave(latitud, longitud)
+        encontrados = []
+        for radio in range(anillos + 1):
+            for clave in self._anillo(centro, radio):
+                for identificador, (lat, lon) in self.celdas.get(clave, {}).items():
+                    distancia = distancia_metros(latitud, longitud, lat, lon)
+                    if distancia <= metros:
+                        encontrados.append((distancia, identificador))
+        return sorted(encontrados)
+
+    def mas_cercano(self, latitud, longitud, maximo_metros=None):
+        """
+        Busca el punto más cercano, ampliando la búsqueda anillo por anillo.
+
+        Args:
+            latitud, longitud: Coordenada de consulta
+            maximo_metros: Distancia máxima opcional
+
+        Returns:
+            tuple | None: (distancia, id) o None si no hay puntos
+        """
+        if not self.puntos:
+            return None
+        centro = self._clave(latitud, longitud)
+        lado = self._metros_por_celda(latitud)
+        fila_min, fila_max, columna_min, columna_max = self._limites()
+        # Anillo máximo necesario para cubrir todas las celdas ocupadas
+        limite = max(abs(centro[0] - fila_min), abs(centro[0] - fila_max),
+                     abs(centro[1] - columna_min), abs(centro[1] - columna_max))
+
+        mejor = None
+        for radio in range(limite + 1):
+            # Ningún punto de este anillo puede estar más cerca que (radio - 1) celdas
+            if mejor is not None and (radio - 1) * lado > mejor[0]:
+                break
+            if maximo_metros is not None and (radio - 1) * lado > maximo_metros:
+                break
+            for clave in self._anillo(centro, radio):
+                for identificador, (lat, lon) in self.celdas.get(clave, {}).items():
+                    distancia = distancia_metros(latitud, longitud, lat, lon)
+                    if mejor is None or distancia < mejor[0]:
+                        mejor = (distancia, identificador)
+
+        if mejor is not None and maximo_metros is not None and mejor[0] > maximo_metros:
+            return None
+        return mejor
+
+
+def agrupar_en_paradas(puntos, radio_metros, celda_grados=0.005):
+    """
+    Agrupa puntos cercanos en paradas compartidas (agrupamiento por líder).
+
+    Se recorren los puntos en orden; cada punto sin grupo abre una parada y se
+    le unen los puntos sin grupo a menos de `radio_metros`. La parada queda en
+    el centroide de sus miembros.
+
+    Args:
+        puntos: Diccionario {id: (lat, lon)}
+        radio_metros: Radio máximo entre el líder y los miembros
+        celda_grados: Tamaño de celda del índice temporal
+
+    Returns:
+        list: Diccionarios con latitud, longitud y miembros de cada parada
+    """
+    indice = IndiceEspacial(celda_grados)
+    for identificador, (lat, lon) in puntos.items():
+        indice.insertar(identificador, lat, lon)
+
+    grupos = []
+    for identificador in sorted(puntos):
+        if identificador not in indice.puntos:
+            continue  # Ya pertenece a una parada
+        lat, lon = puntos[identificador]
+        miembros = [miembro for _, miembro in indice.en_radio(lat, lon, radio_metros)]
+        for miembro in miembros:
+            indice.eliminar(miembro)
+        grupos.append({
+            'latitud': sum(puntos[m][0] for m in miembros) / len(miembros),
+            'longitud': sum(puntos[m][1] for m in miembros) / len(miembros),
+            'miembros': miembros,
+        })
+    return grupos
+
+
+class IndiceCacheado:
+    """
+    Índice espacial compartido por el proceso que se construye bajo demanda
+    desde la base de datos y se actualiza de forma incremental.
+
+    Pasado `INDICE_ESPACIAL_TTL` segundos se reconstruye completo para
+    recoger los cambios hechos por otros nodos.
+    """
+
+    def __init__(self, cargar):
+        """
+        Args:
+            cargar: Función que retorna un iterable de (id, lat, lon)
+        """
+        self.cargar = cargar
+        self.indice = None
+        self.construido_en = 0
+        self.lock = threading.Lock()
+
+    def obtener(self):
+        """Retorna el índice, reconstruyéndolo si no existe o expiró"""
+        ttl = getattr(settings, 'INDICE_ESPACIAL_TTL', 3600)
+        with self.lock:
+            if self.indice is None or time.monotonic() - self.construido_en > ttl:
+                indice = IndiceEspacial(getattr(settings, 'INDICE_ESPACIAL_CELDA_GRADOS', 0.005))
+                for identificador, lat, lon in self.cargar():
+                    indice.insertar(identificador, lat, lon)
+                self.indice = indice
+                self.construido_en = time.monotonic()
+            return self.indice
+
+    def actualizar(self, identificador, latitud, longitud):
+        """Actualiza un punto si el índice ya está construido"""
+        with self.lock:
+            if self.indice is None:
+                return
+            if latitud is None or longitud is None:
+                self.indice.eliminar(identificador)
+            else:
+                self.indice.insertar(identificador, latitud, longitud)
+
+    def invalidar(self):
+        """Descarta el índice para reconstruirlo en la próxima consulta"""
+        with self.lock:
+            self.indice = None
+
+
+def _cargar_tutores():
+    return Tutor_receptor.objects.filter(latitud__isnull=False, longitud__isnull=False).values_list(
+        'id', 'latitud', 'longitud').iterator()
+
+
+def _cargar_paradas():
+    return Parada.objects.values_list('id', 'latitud', 'longitud').iterator()
+
+
+# Índices compartidos del proceso
+indice_tutores = IndiceCacheado(_cargar_tutores)
+indice_paradas = IndiceCacheado(_cargar_paradas)
+
+
+def puntos_por_familia(padre_ids=None):
+    """
+    Calcula un punto por familia (Padres) promediando las coordenadas de sus tutores.
+
+    Args:
+        padre_ids: IDs de las familias a calcular (None = todas)
+
+    Returns:
+        dict: {padre_id: (lat, lon)}
+    """
+    sumas = defaultdict(lambda: [0.0, 0.0, 0])
+    filas = Tutor_receptor.objects.filter(latitud__isnull=False, longitud__isnull=False)
+    if padre_ids is not None:
+        filas = filas.filter(estudiante__padres_id__in=padre_ids)
+    filas = filas.values_list('estudiante__padres_id', 'latitud', 'longitud')
+    for padre_id, lat, lon in filas.iterator():
+        suma = sumas[padre_id]
+        suma[0] += lat
+        suma[1] += lon
+        suma[2] += 1
+    return {padre_id: (s[0] / s[2], s[1] / s[2]) for padre_id, s in sumas.items()}
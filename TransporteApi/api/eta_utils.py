@@ -0,0 +1,314 @@
+# Tiempos de llegada estimados aprendidos de los recorridos registrados
+#
+# Cada ruta (vehículo, tramo y franja) guarda en un arreglo float32 las
+# estadísticas móviles de cada parada por día de la semana. Cada evento las
+# actualiza en tiempo constante (media y varianza con peso exponencial), sin
+# volver a recorrer el historial. Las predicciones de todas las paradas de una
+# ruta se recalculan al registrar sus eventos y se guardan en caché, así la
+# consulta de un padre es una lectura por estudiante.
+import math
+from array import array
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AsignacionVehiculo, EventoRecorrido, ModeloRecorrido
+
+
+# Valores por parada y día: muestras, media y varianza del segmento, media desde el inicio
+CAMPOS = 4
+MUESTRAS, MEDIA_SEGMENTO, VARIANZA_SEGMENTO, MEDIA_DESDE_INICIO = range(CAMPOS)
+DIAS = 7
+
+# Parada que representa el inicio del recorrido
+INICIO = 0
+
+
+def _clave_cache(estudiante_id, tramo, fecha):
+    return f'eta:{estudiante_id}:{tramo}:{fecha.isoformat()}'
+
+
+# ============================================================================
+# ESTADÍSTICAS MÓVILES
+# ============================================================================
+
+class Estadisticas:
+    """Vista sobre el arreglo compacto de un ModeloRecorrido"""
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.paradas = {parada: fila for fila, parada in enumerate(modelo.paradas)}
+        self.valores = array('f')
+        self.valores.frombytes(bytes(modelo.datos or b''))
+
+    def _base(self, parada, dia, crear=False):
+        fila = self.paradas.get(parada)
+        if fila is None:
+            if not crear:
+                return None
+            fila = self.paradas[parada] = len(self.modelo.paradas)
+            self.modelo.paradas.append(parada)
+            self.valores.extend([0.0] * (DIAS * CAMPOS))
+        return (fila * DIAS + dia) * CAMPOS
+
+    def registrar(self, parada, dia, segmento, desde_inicio):
+        """
+        Agrega una observación. Las primeras muestras pesan como un promedio
+        simple; después cada una pesa ETA_ALFA (media móvil exponencial).
+
+        Args:
+            parada: ID del estudiante (0 = inicio)
+            dia: Día de la semana (lunes = 0)
+            segmento: Segundos desde la parada anterior
+            desde_inicio: Segundos desde el inicio del recorrido
+        """
+        base = self._base(parada, dia, crear=True)
+        v = self.valores
+        v[base + MUESTRAS] += 1
+        peso = max(1 / v[base + MUESTRAS], getattr(settings, 'ETA_ALFA', 0.2))
+        delta = segmento - v[base + MEDIA_SEGMENTO]
+        v[base + MEDIA_SEGMENTO] += peso * delta
+        v[base + VARIANZA_SEGMENTO] = (1 - peso) * (v[base + VARIANZA_SEGMENTO] + peso * delta * delta)
+        v[base + MEDIA_DESDE_INICIO] += peso * (desde_inicio - v[base + MEDIA_DESDE_INICIO])
+
+    def leer(self, parada, dia):
+        """
+        Estadísticas de una parada para un día. Si ese día no tiene muestras
+        se usa el promedio de los días que sí tienen.
+
+        Returns:
+            tuple | None: (muestras, media segmento, varianza segmento, media desde el inicio)
+        """
+        base = self._base(parada, dia)
+        if base is None:
+            return None
+        v = self.valores
+        if v[base + MUESTRAS]:
+            return tuple(v[base:base + CAMPOS])
+        inicio_fila = base - dia * CAMPOS
+        dias = [tuple(v[b:b + CAMPOS]) for b in range(inicio_fila, inicio_fila + DIAS * CAMPOS, CAMPOS)
+                if v[b + MUESTRAS]]
+        if not dias:
+            return None
+        n = sum(d[MUESTRAS] for d in dias)
+        return (n, *(sum(d[i] * d[MUESTRAS] for d in dias) / n for i in range(1, CAMPOS)))
+
+    def guardar(self):
+        self.modelo.datos = self.valores.tobytes()
+
+
+# ============================================================================
+# REGISTRO DE EVENTOS
+# ============================================================================
+
+def _segundos_del_dia(momento):
+    local = timezone.localtime(momento)
+    return local.hour * 3600 + local.minute * 60 + local.second
+
+
+def aplicar_evento(modelo, estadisticas, tipo, estudiante_id, momento):
+    """
+    Actualiza el estado del recorrido en curso y las estadísticas con un
+    evento. Los eventos fuera de orden (anteriores al último) solo se
+    guardan en el historial.
+    """
+    dia = timezone.localtime(momento).weekday()
+    if tipo == 'inicio':
+        estadisticas.registrar(INICIO, dia, 0, _segundos_del_dia(momento))
+        modelo.inicio_en_curso, modelo.ultima_parada, modelo.ultimo_momento = momento, INICIO, momento
+        modelo.visitadas = []
+        return
+    if modelo.inicio_en_curso is None or momento < modelo.ultimo_momento:
+        return
+    if tipo == 'fin':
+        modelo.inicio_en_curso = modelo.ultima_parada = modelo.ultimo_momento = None
+        modelo.visitadas = []
+        return
+    if estudiante_id in modelo.visitadas:
+        return
+    estadisticas.registrar(estudiante_id, dia, (momento - modelo.ultimo_momento).total_seconds(),
+                           (momento - modelo.inicio_en_curso).total_seconds())
+    modelo.ultima_parada, modelo.ultimo_momento = estudiante_id, momento
+    modelo.visitadas.append(estudiante_id)
+
+
+def registrar_eventos_recorrido(vehiculo_id, tramo, hora, eventos):
+    """
+    Guarda los eventos de un recorrido, actualiza el modelo de la ruta y
+    publica las nuevas predicciones de sus paradas.
+
+    Args:
+        vehiculo_id: Vehículo del recorrido
+        tramo: 'entrada' o 'salida'
+        hora: Franja del recorrido
+        eventos: Lista de dicts con tipo, estudiante_id y momento
+
+    Returns:
+        int: Eventos guardados
+    """
+    eventos = sorted(eventos, key=lambda e: e['momento'])
+    with transaction.atomic():
+        EventoRecorrido.objects.bulk_create([
+            EventoRecorrido(vehiculo_id=vehiculo_id, tramo=tramo, hora=hora, **evento) for evento in eventos
+        ])
+        ModeloRecorrido.objects.get_or_create(vehiculo_id=vehiculo_id, tramo=tramo, hora=hora)
+        modelo = ModeloRecorrido.objects.select_for_update().get(vehiculo_id=vehiculo_id, tramo=tramo, hora=hora)
+        estadisticas = Estadisticas(modelo)
+        for evento in eventos:
+            aplicar_evento(modelo, estadisticas, evento['tipo'], evento.get('estudiante_id'), evento['momento'])
+        estadisticas.guardar()
+        modelo.save()
+    publicar_predicciones(modelo)
+    return len(eventos)
+
+
+def reconstruir_modelos():
+    """
+    Recalcula todos los modelos desde el historial de eventos (por ejemplo
+    después de cambiar ETA_ALFA). Quita las paradas de estudiantes que ya no
+    aparecen en el historial.
+
+    Returns:
+        int: Rutas reconstruidas
+    """
+    modelos = {}
+    eventos = EventoRecorrido.objects.order_by('vehiculo_id', 'tramo', 'hora', 'momento', 'id').values_list(
+        'vehiculo_id', 'tramo', 'hora', 'tipo', 'estudiante_id', 'momento')
+    for vehiculo_id, tramo, hora, tipo, estudiante_id, momento in eventos.iterator(chunk_size=5000):
+        clave = (vehiculo_id, tramo, hora)
+        if clave not in modelos:
+            modelo = ModeloRecorrido(vehiculo_id=vehiculo_id, tramo=tramo, hora=hora)
+            modelos[clave] = (modelo, Estadisticas(modelo))
+        aplicar_evento(*modelos[clave], tipo, estudiante_id, momento)
+
+    with transaction.atomic():
+        ModeloRecorrido.objects.all().delete()
+        for modelo, estadisticas in modelos.values():
+            estadisticas.guardar()
+        ModeloRecorrido.objects.bulk_create([modelo for modelo, _ in modelos.values()], batch_size=500)
+    return len(modelos)
+
+
+def limpiar_eventos_recorrido():
+    """
+    Elimina los eventos con más de ETA_DIAS_HISTORIAL días. Los modelos no
+    cambian: ya contienen lo aprendido de esos eventos.
+
+    Returns:
+        int: Eventos eliminados
+    """
+    limite = timezone.now() - timedelta(days=getattr(settings, 'ETA_DIAS_HISTORIAL', 180))
+    eliminados, _ = EventoRecorrido.objects.filter(created_at__lt=limite).delete()
+    return eliminados
+
+
+# ============================================================================
+# PREDICCIONES
+# ============================================================================
+
+def predecir(modelo, estudiantes, ahora=None):
+    """
+    Hora estimada de la parada de cada estudiante de la ruta hoy.
+
+    Con un recorrido en curso se suman las medias de los segmentos desde la
+    última parada, en el orden aprendido (tiempo medio desde el inicio). Sin
+    recorrido en curso se parte de la hora de salida habitual de ese día.
+    El margen es la desviación estándar acumulada de los segmentos.
+
+    Args:
+        modelo: ModeloRecorrido de la ruta
+        estudiantes: IDs de los estudiantes asignados a la ruta
+        ahora: Momento de referencia (por defecto ahora)
+
+    Returns:
+        dict: {estudiante_id: predicción}
+    """
+    ahora = ahora or timezone.now()
+    hoy = timezone.localdate(ahora)
+    dia = hoy.weekday()
+    estadisticas = Estadisticas(modelo)
+    en_curso = modelo.inicio_en_curso is not None and timezone.localdate(modelo.inicio_en_curso) == hoy
+
+    conocidas, resultado = [], {}
+    for estudiante_id in estudiantes:
+        datos = estadisticas.leer(estudiante_id, dia)
+        if datos is None:
+            resultado[estudiante_id] = {'estado': 'sin_datos', 'hora_estimada': None, 'margen_minutos': None,
+                                        'muestras': 0}
+        else:
+            conocidas.append((datos[MEDIA_DESDE_INICIO], estudiante_id, datos))
+
+    if en_curso:
+        partida, visitadas = modelo.ultimo_momento, set(modelo.visitadas)
+    else:
+        salida = estadisticas.leer(INICIO, dia)
+        if salida is None:
+            partida = None
+        else:
+            medianoche = timezone.make_aware(datetime.combine(hoy, datetime.min.time()))
+            partida = medianoche + timedelta(seconds=salida[MEDIA_DESDE_INICIO])
+        visitadas = set()
+
+    transcurrido = varianza = 0.0
+    for _, estudiante_id, datos in sorted(conocidas):
+        if estudiante_id in visitadas:
+            resultado[estudiante_id] = {'estado': 'realizada', 'hora_estimada': None, 'margen_minutos': None,
+                                        'muestras': int(datos[MUESTRAS])}
+            continue
+        transcurrido += datos[MEDIA_SEGMENTO]
+        varianza += datos[VARIANZA_SEGMENTO]
+        resultado[estudiante_id] = {
+            'estado': 'en_curso' if en_curso else 'programada',
+            'hora_estimada': None if partida is None else partida + timedelta(seconds=transcurrido),
+            'margen_minutos': round(math.sqrt(varianza) / 60),
+            'muestras': int(datos[MUESTRAS]),
+        }
+    return resultado
+
+
+def _estudiantes_de_ruta(modelo):
+    return list(AsignacionVehiculo.objects.filter(
+        vehiculo_id=modelo.vehiculo_id, tramo=modelo.tramo, hora=modelo.hora).values_list('estudiante_id', flat=True))
+
+
+def publicar_predicciones(modelo):
+    """Guarda en caché las predicciones de hoy de todas las paradas de una ruta"""
+    hoy = timezone.localdate()
+    predicciones = predecir(modelo, _estudiantes_de_ruta(modelo))
+    cache.set_many({
+        _clave_cache(estudiante_id, modelo.tramo, hoy): {'tramo': modelo.tramo, **prediccion}
+        for estudiante_id, prediccion in predicciones.items()
+    }, getattr(settings, 'ETA_CACHE_TTL', 900))
+
+
+def eta_estudiantes(estudiante_ids):
+    """
+    Predicciones de hoy de varios estudiantes. Normalmente es una lectura de
+    caché por estudiante y tramo; si falta alguna se calculan las de su ruta
+    y quedan en caché para las siguientes consultas.
+
+    Returns:
+        dict: {estudiante_id: [predicción por tramo]}
+    """
+    hoy = timezone.localdate()
+    asignaciones = list(AsignacionVehiculo.objects.filter(estudiante_id__in=estudiante_ids).values_list(
+        'estudiante_id', 'vehiculo_id', 'tramo', 'hora'))
+    claves = {_clave_cache(e, tramo, hoy): (e, v, tramo, hora) for e, v, tramo, hora in asignaciones}
+    guardadas = cache.get_many(claves.keys())
+
+    faltantes = {(v, tramo, hora) for clave, (_, v, tramo, hora) in claves.items() if clave not in guardadas}
+    for vehiculo_id, tramo, hora in faltantes:
+        modelo = ModeloRecorrido.objects.filter(vehiculo_id=vehiculo_id, tramo=tramo, hora=hora).first()
+        publicar_predicciones(modelo or ModeloRecorrido(vehiculo_id=vehiculo_id, tramo=tramo, hora=hora))
+    if faltantes:
+        guardadas.update(cache.get_many([c for c in claves if c not in guardadas]))
+
+    resultado = {estudiante_id: [] for estudiante_id in estudiante_ids}
+    for clave, (estudiante_id, _, tramo, hora) in sorted(claves.items(), key=lambda c: (c[1][0], c[1][3])):
+        prediccion = guardadas.get(clave)
+        if prediccion is not None:
+            resultado[estudiante_id].append({**prediccion, 'hora_programada': hora})
+    return resultado
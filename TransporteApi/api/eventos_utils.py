@@ -0,0 +1,308 @@
+# Bandeja de salida de eventos y su entrega a webhooks o archivos
+import hashlib
+import hmac
+import json
+import os
+import urllib.parse
+import urllib.request
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Min, Q
+from django.forms.models import model_to_dict
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import EventoDominio, DestinoEventos
+
+
+# Lotes que se entregan a un destino en cada ejecución de la tarea
+MAXIMO_LOTES_POR_EJECUCION = 20
+
+# Rangos de IDs pendientes que recuerda cada destino (2 parámetros por rango
+# en la consulta, bajo el límite de 2100 de SQL Server)
+MAXIMO_HUECOS = 500
+
+
+# ============================================================================
+# REGISTRO DE EVENTOS (EN LA TRANSACCIÓN DEL CAMBIO)
+# ============================================================================
+
+def datos_entidad(instancia):
+    """
+    Estado de una entidad para el cuerpo del evento. Las relaciones quedan
+    como IDs (por ejemplo 'padres' o 'estudiante').
+
+    Returns:
+        dict: Campos de la entidad
+    """
+    return {'id': instancia.pk, **model_to_dict(instancia)}
+
+
+def evento(tipo, entidad_id, datos=None):
+    """Crea (sin guardar) un evento de dominio"""
+    return EventoDominio(tipo=tipo, entidad_id=entidad_id, datos=datos or {})
+
+
+def registrar_eventos(eventos):
+    """
+    Guarda varios eventos con una sola inserción. Debe llamarse dentro de la
+    transacción del cambio para que ambos se confirmen o reviertan juntos.
+
+    Args:
+        eventos: Lista de EventoDominio sin guardar
+    """
+    if eventos:
+        EventoDominio.objects.bulk_create(eventos, batch_size=500)
+
+
+def registrar_evento(tipo, entidad_id, datos=None):
+    """Guarda un evento de dominio"""
+    registrar_eventos([evento(tipo, entidad_id, datos)])
+
+
+# ============================================================================
+# ENTREGA A LOS DESTINOS
+# ============================================================================
+
+def evento_a_dict(evento_dominio):
+    """Forma en que los destinos reciben cada evento"""
+    return {
+        'id': evento_dominio.id,  # Los receptores lo usan para descartar repetidos
+        'tipo': evento_dominio.tipo,
+        'entidad_id': evento_dominio.entidad_id,
+        'fecha': evento_dominio.created_at,
+        'datos': evento_dominio.datos,
+    }
+
+
+def url_webhook(destino):
+    """
+    Verifica que el destino de un webhook sea una URL http(s) con servidor
+    (urllib también abriría file:// u otros esquemas).
+
+    Raises:
+        ValueError: Si la URL no es válida
+    """
+    url = urllib.parse.urlsplit(destino)
+    if url.scheme not in ('http', 'https') or not url.hostname:
+        raise ValueError('El webhook debe ser una URL http:// o https://')
+    return destino
+
+
+def ruta_archivo(destino):
+    """
+    Ruta real del archivo de un destino, que debe quedar dentro de
+    EVENTOS_DIRECTORIO. Se aceptan rutas relativas a ese directorio.
+
+    Raises:
+        ValueError: Si no hay directorio configurado o la ruta sale de él
+    """
+    directorio = getattr(settings, 'EVENTOS_DIRECTORIO', None)
+    if not directorio:
+        raise ValueError('Los destinos de archivo están deshabilitados (EVENTOS_DIRECTORIO)')
+    directorio = os.path.realpath(directorio)
+    ruta = os.path.realpath(os.path.join(directorio, destino))
+    if ruta == directorio or os.path.commonpath([directorio, ruta]) != directorio:
+        raise ValueError(f'El archivo debe estar dentro de {directorio}')
+    return ruta
+
+
+def validar_destino(tipo, destino):
+    """
+    Verifica la URL o la ruta de un destino según su tipo.
+
+    Raises:
+        ValueError: Si el destino no es válido para el tipo
+    """
+    if tipo == 'webhook':
+        return url_webhook(destino)
+    return ruta_archivo(destino)
+
+
+def enviar_webhook(destino, cuerpo):
+    """
+    Envía un lote por POST. Si el destino tiene secreto, el cuerpo se firma
+    con HMAC-SHA256 en la cabecera X-Firma.
+
+    Raises:
+        Exception: Si la conexión falla o la respuesta no es 2xx
+    """
+    cabeceras = {'Content-Type': 'application/json'}
+    if destino.secreto:
+        firma = hmac.new(destino.secreto.encode(), cuerpo, hashlib.sha256).hexdigest()
+        cabeceras['X-Firma'] = f'sha256={firma}'
+    peticion = urllib.request.Request(url_webhook(destino.destino), data=cuerpo, headers=cabeceras, method='POST')
+    timeout = getattr(settings, 'EVENTOS_TIMEOUT', 10)
+    with urllib.request.urlopen(peticion, timeout=timeout) as respuesta:
+        if not 200 <= respuesta.status < 300:
+            raise ValueError(f'Respuesta HTTP {respuesta.status}')
+
+
+def escribir_archivo(destino, eventos):
+    """Agrega los eventos al archivo del destino, uno por línea (JSON Lines)"""
+    ruta = ruta_archivo(destino.destino)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'a', encoding='utf-8') as archivo:
+        for datos in eventos:
+            archivo.write(json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+        archivo.flush()
+        os.fsync(archivo.fileno())
+
+
+def huecos_entre(cursor, ids, visto):
+    """
+    Rangos de IDs que faltan entre el cursor y los IDs leídos (ordenados).
+
+    Returns:
+        list: [[desde, hasta, visto], ...]
+    """
+    huecos, anterior = [], cursor
+    for identificador in ids:
+        if identificador > anterior + 1:
+            huecos.append([anterior + 1, identificador - 1, visto])
+        anterior = identificador
+    return huecos
+
+
+def quitar_de_huecos(huecos, ids):
+    """
+    Parte los rangos para sacar los IDs que ya aparecieron.
+
+    Returns:
+        list: Rangos restantes
+    """
+    ids = sorted(ids)
+    restantes = []
+    for desde, hasta, visto in huecos:
+        inicio = desde
+        for identificador in ids[bisect_left(ids, desde):bisect_right(ids, hasta)]:
+            if identificador > inicio:
+                restantes.append([inicio, identificador - 1, visto])
+            inicio = identificador + 1
+        if inicio <= hasta:
+            restantes.append([inicio, hasta, visto])
+    return restantes
+
+
+def _enviar(destino, eventos, tipos):
+    """
+    Entrega un lote al destino (los tipos no suscritos se omiten).
+
+    Returns:
+        int: Eventos enviados
+
+    Raises:
+        Exception: Si la entrega falla
+    """
+    datos = [evento_a_dict(e) for e in eventos if not tipos or e.tipo in tipos]
+    if datos and destino.tipo == 'webhook':
+        cuerpo = json.dumps({'destino': destino.nombre, 'eventos': datos}, cls=DjangoJSONEncoder).encode()
+        enviar_webhook(destino, cuerpo)
+    elif datos:
+        escribir_archivo(destino, datos)
+    return len(datos)
+
+
+def _confirmar(destino):
+    """Guarda el avance del cursor y los huecos tras una entrega exitosa"""
+    destino.fallos, destino.proximo_intento, destino.ultimo_error = 0, None, ''
+    destino.save(update_fields=['ultimo_evento', 'huecos', 'fallos', 'proximo_intento', 'ultimo_error'])
+
+
+def entregar_destino(destino, lote=None):
+    """
+    Entrega al destino los eventos posteriores a su cursor, en lotes en orden
+    de ID. El cursor solo avanza cuando el lote se entregó, así que un fallo
+    (o una caída entre la entrega y el avance) repite el lote: entrega al menos
+    una vez. Tras un fallo el destino espera 1, 2, 4... minutos (máximo 1 hora).
+
+    Un ID menor puede confirmarse después que uno mayor (transacción más
+    larga). Los IDs que el cursor salta quedan en `huecos` y se entregan
+    cuando aparecen, fuera de orden, hasta EVENTOS_ESPERA_HUECOS segundos
+    después; luego se asume que su transacción se revirtió. Una transacción
+    que tarde más que eso en confirmar pierde sus eventos. Además solo se
+    toman eventos con EVENTOS_MARGEN_SEGUNDOS de antigüedad, para que casi
+    todos lleguen en orden.
+
+    Returns:
+        int: Eventos entregados
+    """
+    lote = lote or getattr(settings, 'EVENTOS_LOTE', 200)
+    ahora = timezone.now()
+    limite = ahora - timedelta(seconds=getattr(settings, 'EVENTOS_MARGEN_SEGUNDOS', 5))
+    vencen = ahora - timedelta(seconds=getattr(settings, 'EVENTOS_ESPERA_HUECOS', 600))
+    tipos = {t.strip() for t in destino.tipos_evento.split(',') if t.strip()}
+    entregados = 0
+
+    # Los huecos vencidos eran transacciones revertidas (o saltos del contador)
+    vigentes = [h for h in destino.huecos if parse_datetime(h[2]) > vencen]
+    if len(vigentes) != len(destino.huecos):
+        destino.huecos = vigentes
+        destino.save(update_fields=['huecos'])
+    try:
+        if destino.huecos:
+            en_huecos = Q()
+            for desde, hasta, _ in destino.huecos:
+                en_huecos |= Q(id__gte=desde, id__lte=hasta)
+            tardios = list(EventoDominio.objects.filter(en_huecos).order_by('id')[:lote])
+            if tardios:
+                entregados += _enviar(destino, tardios, tipos)
+                destino.huecos = quitar_de_huecos(destino.huecos, [e.id for e in tardios])
+                _confirmar(destino)
+
+        for _ in range(MAXIMO_LOTES_POR_EJECUCION):
+            eventos = list(EventoDominio.objects.filter(
+                id__gt=destino.ultimo_evento, created_at__lte=limite).order_by('id')[:lote])
+            if not eventos:
+                break
+            entregados += _enviar(destino, eventos, tipos)
+            huecos = destino.huecos + huecos_entre(destino.ultimo_evento, [e.id for e in eventos], ahora.isoformat())
+            destino.huecos = huecos[-MAXIMO_HUECOS:]  # Si hay demasiados se olvidan los más viejos
+            destino.ultimo_evento = eventos[-1].id
+            _confirmar(destino)
+            if len(eventos) < lote:
+                break
+    except Exception as e:
+        destino.fallos += 1
+        destino.proximo_intento = timezone.now() + timedelta(minutes=min(2 ** (destino.fallos - 1), 60))
+        destino.ultimo_error = str(e)
+        destino.save(update_fields=['fallos', 'proximo_intento', 'ultimo_error'])
+
+    return entregados
+
+
+def entregar_eventos():
+    """
+    Entrega los eventos pendientes a todos los destinos activos cuya espera
+    tras un fallo ya terminó.
+
+    Returns:
+        dict: Eventos entregados por destino
+    """
+    ahora = timezone.now()
+    resultado = {}
+    for destino in DestinoEventos.objects.filter(activo=True).order_by('id'):
+        if destino.proximo_intento and destino.proximo_intento > ahora:
+            continue
+        resultado[destino.nombre] = entregar_destino(destino)
+    return resultado
+
+
+def limpiar_eventos():
+    """
+    Elimina los eventos ya entregados a todos los destinos activos y con más
+    de EVENTOS_DIAS_RETENCION días.
+
+    Returns:
+        int: Eventos eliminados
+    """
+    limite = timezone.now() - timedelta(days=getattr(settings, 'EVENTOS_DIAS_RETENCION', 7))
+    eventos = EventoDominio.objects.filter(created_at__lt=limite)
+    cursor = DestinoEventos.objects.filter(activo=True).aggregate(minimo=Min('ultimo_evento'))['minimo']
+    if cursor is not None:
+        eventos = eventos.filter(id__lte=cursor)
+    eliminados, _ = eventos.delete()
+    return eliminados
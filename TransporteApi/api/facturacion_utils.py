@@ -0,0 +1,252 @@
+# Facturación mensual del transporte por lotes de familias
+#
+# Cada lote trae las columnas de los estudiantes (padre, colegio, horas) con
+# una consulta y calcula los montos columna por columna: la tarifa se resuelve
+# una vez por combinación distinta de colegio, tramo y hora, y los descuentos
+# por hermanos salen de ordenar las columnas por familia. Los montos se
+# manejan en centavos (enteros) y se convierten a Decimal al guardar.
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Padres, Estudiantes, TarifaTransporte, CorridaFacturacion, Factura
+from .calendario_utils import clave_colegio
+
+
+# Padres por lote (cada lote es una transacción; SQL Server admite 2100 parámetros por consulta)
+TAMANO_LOTE = 1000
+
+
+def inicio_mes(fecha):
+    """Primer día del mes de una fecha (periodo de facturación)"""
+    return fecha.replace(day=1)
+
+
+def a_decimal(centavos):
+    """Convierte centavos enteros a Decimal con dos decimales"""
+    return Decimal(centavos).scaleb(-2)
+
+
+# ============================================================================
+# TARIFAS
+# ============================================================================
+
+def cargar_tarifas():
+    """
+    Tarifas agrupadas por (colegio normalizado, tramo). En cada grupo van
+    primero las que tienen franja horaria, que son más específicas.
+
+    Returns:
+        dict: {(colegio, tramo): [(hora_desde, hora_hasta, centavos)]}
+    """
+    tarifas = defaultdict(list)
+    for tarifa in TarifaTransporte.objects.order_by('id'):
+        tarifas[(clave_colegio(tarifa.colegio), tarifa.tramo)].append(
+            (tarifa.hora_desde, tarifa.hora_hasta, int(tarifa.monto * 100)))
+    for lista in tarifas.values():
+        lista.sort(key=lambda t: t[0] is None and t[1] is None)
+    return dict(tarifas)
+
+
+def resolver_tarifa(tarifas, colegio, tramo, hora):
+    """
+    Tarifa de un tramo: la del colegio y, si no hay, la general.
+
+    Returns:
+        int | None: Centavos, o None si ninguna tarifa coincide
+    """
+    for clave in (clave_colegio(colegio), ''):
+        for desde, hasta, centavos in tarifas.get((clave, tramo), ()):
+            if (desde is None or hora >= desde) and (hasta is None or hora <= hasta):
+                return centavos
+    return None
+
+
+def columna_tarifas(tarifas, tramo, colegios, horas):
+    """
+    Tarifa de un tramo para cada estudiante (None si no usa el tramo o no
+    hay tarifa). Se resuelve una vez por combinación distinta de colegio y
+    hora, que son pocas comparadas con los estudiantes.
+
+    Returns:
+        list: Centavos por estudiante
+    """
+    resueltas = {}
+    for clave in set(zip(colegios, horas)):
+        resueltas[clave] = None if clave[1] is None else resolver_tarifa(tarifas, clave[0], tramo, clave[1])
+    return [resueltas[clave] for clave in zip(colegios, horas)]
+
+
+# ============================================================================
+# CÁLCULO DE UN LOTE
+# ============================================================================
+
+def calcular_facturas(padres, estudiantes, tarifas, periodo):
+    """
+    Calcula las facturas de un lote de familias.
+
+    Args:
+        padres: Lista de (id, nombre, apellido, email)
+        estudiantes: Lista de (padres_id, id, nombre, apellido, Colegio, H_entrada, H_salida)
+        tarifas: Resultado de cargar_tarifas
+        periodo: Primer día del mes
+
+    Returns:
+        tuple: (facturas sin guardar, tramos usados sin tarifa)
+    """
+    if not estudiantes:
+        return [], 0
+    familia, ids, nombres, apellidos, colegios, entradas, salidas = zip(*estudiantes)
+
+    tarifa_entrada = columna_tarifas(tarifas, 'entrada', colegios, entradas)
+    tarifa_salida = columna_tarifas(tarifas, 'salida', colegios, salidas)
+    montos = [(e or 0) + (s or 0) for e, s in zip(tarifa_entrada, tarifa_salida)]
+    usa_tramo = [e is not None or s is not None for e, s in zip(entradas, salidas)]
+    sin_tarifa = (sum(h is not None and t is None for h, t in zip(entradas, tarifa_entrada))
+                  + sum(h is not None and t is None for h, t in zip(salidas, tarifa_salida)))
+
+    # Descuento por hermanos: el hijo con el monto más alto paga completo y
+    # cada hermano siguiente recibe el porcentaje de su posición
+    porcentajes = getattr(settings, 'FACTURACION_DESCUENTO_HERMANOS', [0, 10, 15])
+    descuentos = [0] * len(ids)
+    orden = sorted((i for i in range(len(ids)) if usa_tramo[i]), key=lambda i: (familia[i], -montos[i], ids[i]))
+    posicion, anterior = 0, None
+    for i in orden:
+        posicion = posicion + 1 if familia[i] == anterior else 0
+        anterior = familia[i]
+        porcentaje = porcentajes[min(posicion, len(porcentajes) - 1)]
+        descuentos[i] = (montos[i] * porcentaje + 50) // 100
+
+    lineas = defaultdict(list)
+    for i in orden:
+        lineas[familia[i]].append({
+            'estudiante': ids[i],
+            'nombre': f'{nombres[i]} {apellidos[i]}',
+            'colegio': colegios[i] or '',
+            'entrada': None if tarifa_entrada[i] is None else str(a_decimal(tarifa_entrada[i])),
+            'salida': None if tarifa_salida[i] is None else str(a_decimal(tarifa_salida[i])),
+            'descuento': str(a_decimal(descuentos[i])),
+            'monto': str(a_decimal(montos[i] - descuentos[i])),
+            '_subtotal': montos[i],
+            '_descuento': descuentos[i],
+        })
+
+    facturas = []
+    for padre_id, nombre, apellido, email in padres:
+        detalle = lineas.get(padre_id)
+        if not detalle:
+            continue  # Familia sin estudiantes que usen el transporte
+        subtotal = sum(linea.pop('_subtotal') for linea in detalle)
+        descuento = sum(linea.pop('_descuento') for linea in detalle)
+        facturas.append(Factura(
+            padre_id=padre_id, periodo=periodo,
+            nombre=' '.join(p for p in (nombre, apellido) if p) or f'Padre {padre_id}',
+            email=email or '', estudiantes=len(detalle),
+            subtotal=a_decimal(subtotal), descuento=a_decimal(descuento),
+            total=a_decimal(subtotal - descuento), detalle=detalle,
+        ))
+    return facturas, sin_tarifa
+
+
+# ============================================================================
+# CORRIDAS (REANUDABLES)
+# ============================================================================
+
+def iniciar_corrida(periodo, reabrir=False):
+    """
+    Crea la corrida de un mes o la devuelve si ya existe. Con `reabrir`,
+    una corrida completa vuelve a recorrer todos los padres: solo se facturan
+    los que todavía no tienen factura del mes (por ejemplo, aprobados después).
+
+    Returns:
+        CorridaFacturacion: Corrida del periodo
+    """
+    corrida, _ = CorridaFacturacion.objects.get_or_create(periodo=inicio_mes(periodo))
+    if reabrir and corrida.estado == 'completa':
+        corrida.estado, corrida.ultimo_padre, corrida.fin = 'pendiente', 0, None
+        corrida.save(update_fields=['estado', 'ultimo_padre', 'fin'])
+    return corrida
+
+
+def facturar_lote(corrida_id, tarifas, lote=None):
+    """
+    Factura el siguiente lote de padres aprobados de una corrida. El lote,
+    sus facturas y el avance del cursor se confirman en una transacción, y
+    la fila de la corrida queda bloqueada: dos procesos no facturan el mismo
+    lote y una corrida interrumpida sigue desde el último lote confirmado.
+
+    Returns:
+        int | None: Facturas creadas, o None si no quedan padres
+    """
+    lote = lote or getattr(settings, 'FACTURACION_LOTE', TAMANO_LOTE)
+    with transaction.atomic():
+        corrida = CorridaFacturacion.objects.select_for_update().get(pk=corrida_id)
+        if corrida.estado == 'completa':
+            return None
+        padres = list(Padres.objects.filter(aprobado=True, pk__gt=corrida.ultimo_padre).order_by('pk').values_list(
+            'pk', 'usuario__nombre', 'usuario__apellido', 'usuario__email')[:lote])
+        if not padres:
+            return None
+        ids = [p[0] for p in padres]
+        facturados = set(Factura.objects.filter(periodo=corrida.periodo, padre_id__in=ids).values_list(
+            'padre_id', flat=True))
+        pendientes = [p for p in padres if p[0] not in facturados]
+        estudiantes = list(Estudiantes.objects.filter(padres_id__in=[p[0] for p in pendientes]).values_list(
+            'padres_id', 'id', 'nombre', 'apellido', 'Colegio', 'H_entrada', 'H_salida')) if pendientes else []
+
+        facturas, sin_tarifa = calcular_facturas(pendientes, estudiantes, tarifas, corrida.periodo)
+        Factura.objects.bulk_create(facturas, batch_size=500)
+        CorridaFacturacion.objects.filter(pk=corrida_id).update(
+            ultimo_padre=ids[-1],
+            facturas=F('facturas') + len(facturas),
+            total=F('total') + sum((f.total for f in facturas), Decimal(0)),
+            sin_tarifa=F('sin_tarifa') + sin_tarifa,
+        )
+    return len(facturas)
+
+
+def ejecutar_corrida(corrida, lote=None, progreso=None):
+    """
+    Procesa una corrida lote por lote hasta terminar.
+
+    Args:
+        corrida: CorridaFacturacion
+        lote: Padres por lote (por defecto FACTURACION_LOTE)
+        progreso: Función opcional que recibe las facturas creadas en cada lote
+
+    Returns:
+        CorridaFacturacion: Corrida completa (recargada)
+    """
+    if corrida.inicio is None:
+        CorridaFacturacion.objects.filter(pk=corrida.pk, inicio__isnull=True).update(inicio=timezone.now())
+    tarifas = cargar_tarifas()
+    while True:
+        creadas = facturar_lote(corrida.pk, tarifas, lote)
+        if creadas is None:
+            break
+        if progreso:
+            progreso(creadas)
+    CorridaFacturacion.objects.filter(pk=corrida.pk, estado='pendiente').update(
+        estado='completa', fin=timezone.now())
+    corrida.refresh_from_db()
+    return corrida
+
+
+def facturar_pendientes():
+    """
+    Tarea periódica: abre la corrida del mes en curso a partir del día
+    FACTURACION_DIA y termina todas las corridas pendientes (nuevas,
+    reabiertas o interrumpidas).
+
+    Returns:
+        list: Corridas procesadas
+    """
+    hoy = timezone.localdate()
+    if hoy.day >= getattr(settings, 'FACTURACION_DIA', 1):
+        iniciar_corrida(hoy)
+    return [ejecutar_corrida(corrida) for corrida in CorridaFacturacion.objects.filter(
+        estado='pendiente').order_by('periodo')]
@@ -0,0 +1,115 @@
+# Filtros por parámetros de consulta para los listados de la API
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+# Lookups que no cambian el tipo de valor esperado por el campo
+LOOKUPS = ('exact', 'iexact', 'gte', 'lte', 'gt', 'lt', 'icontains', 'istartswith')
+
+
+def resolver_lookup(modelo, lookup):
+    """
+    Recorre un lookup como 'estudiantes__Colegio__iexact' y retorna el campo final.
+
+    Args:
+        modelo: Modelo de la vista
+        lookup: Lookup de Django
+
+    Returns:
+        tuple: (campo final, True si atraviesa una relación de muchos)
+    """
+    partes = lookup.split(LOOKUP_SEP)
+    if partes[-1] in LOOKUPS:
+        partes = partes[:-1]
+    campo, multiple = None, False
+    for parte in partes:
+        campo = modelo._meta.get_field(parte)
+        if campo.is_relation:
+            multiple = multiple or campo.one_to_many or campo.many_to_many
+            modelo = campo.related_model
+    if campo.is_relation:
+        campo = modelo._meta.pk
+    return campo, multiple
+
+
+def convertir_valor(campo, valor, parametro):
+    """
+    Convierte el texto del parámetro al tipo del campo del modelo.
+
+    Raises:
+        ValidationError: Si el valor no es válido para el campo (respuesta 400)
+    """
+    # Django solo acepta 'True'/'False'/'1'/'0'; desde la URL también llega 'true'/'false'
+    if isinstance(campo, models.BooleanField) and isinstance(valor, str) and valor.lower() in ('true', 'false'):
+        valor = valor.lower() == 'true'
+    try:
+        convertido = campo.to_python(valor)
+    except DjangoValidationError as e:
+        raise ValidationError({parametro: e.messages})
+    # Fechas sin hora se interpretan en la zona horaria local
+    if isinstance(convertido, datetime) and settings.USE_TZ and timezone.is_naive(convertido):
+        convertido = timezone.make_aware(convertido)
+    return convertido
+
+
+def filtrar_por_campos(queryset, campos, parametros):
+    """
+    Aplica filtros declarados como {parametro: lookup} con los valores recibidos.
+    Los filtros sobre relaciones de muchos se aplican como subconsulta
+    (pk IN ...) para no duplicar filas ni romper el orden del cursor.
+
+    Args:
+        queryset: QuerySet a filtrar
+        campos: Diccionario {parametro: lookup de Django}
+        parametros: Valores recibidos (query params o un diccionario del cuerpo)
+
+    Returns:
+        QuerySet: QuerySet filtrado
+    """
+    directos, relacionados = {}, {}
+    for parametro, lookup in campos.items():
+        valor = parametros.get(parametro)
+        if valor in (None, ''):
+            continue
+        campo, multiple = resolver_lookup(queryset.model, lookup)
+        (relacionados if multiple else directos)[lookup] = convertir_valor(campo, valor, parametro)
+
+    if directos:
+        queryset = queryset.filter(**directos)
+    if relacionados:
+        ids = queryset.model._default_manager.filter(**relacionados).values('pk')
+        queryset = queryset.filter(pk__in=ids)
+    return queryset
+
+
+class FiltroCamposBackend(BaseFilterBackend):
+    """
+    Filtra los listados con los parámetros declarados en `campos_filtro` de la vista:
+
+        campos_filtro = {
+            'aprobado': 'aprobado',
+            'desde': 'created_at__gte',
+            'colegio': 'estudiantes__Colegio',
+        }
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return filtrar_por_campos(queryset, getattr(view, 'campos_filtro', None) or {}, request.query_params)
+
+
+class OrdenamientoIndexado(OrderingFilter):
+    """
+    Orden por ?ordering=campo o ?ordering=-campo. Solo se permiten los
+    `ordering_fields` declarados en la vista (columnas con índice); si la
+    vista no declara ninguno se usa siempre su orden por defecto.
+    """
+
+    def get_default_valid_fields(self, queryset, view, context={}):
+        return []
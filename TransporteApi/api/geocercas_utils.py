@@ -0,0 +1,342 @@
+# Pings GPS de los vehículos y geocercas de llegada a paradas y colegios
+#
+# Cada parada y cada colegio con ubicación es una geocerca circular. Al
+# construir el índice, cada geocerca se anota en todas las celdas de la
+# rejilla que cubre su radio de aviso; así un ping solo lee su propia celda y
+# compara con las pocas geocercas de esa zona: el costo por ping no depende
+# del tamaño de la flota ni del total de paradas. El estado de cada recorrido
+# (en qué geocercas está el vehículo) es una fila de EstadoRecorrido que se lee
+# y escribe una vez por lote de pings con la fila bloqueada, así los lotes de
+# un mismo recorrido se aplican en orden aunque lleguen a procesos distintos.
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Parada, UbicacionColegio, AsignacionVehiculo, AvisoPadre, EstadoRecorrido
+from .espacial_utils import distancia_metros, indice_paradas, puntos_por_familia, METROS_POR_GRADO
+from .calendario_utils import clave_colegio
+from .eventos_utils import evento, registrar_eventos
+
+
+# Estados de un recorrido respecto a una geocerca: lejos, a unos minutos,
+# dentro del radio de llegada, o ya atendida (no vuelve a avisar en el recorrido)
+FUERA, CERCA, DENTRO, VISITADA = 'fuera', 'cerca', 'dentro', 'visitada'
+
+
+def _radios():
+    """(radio de llegada por defecto, radio de aviso, factor de histéresis)"""
+    return (getattr(settings, 'GEOCERCA_RADIO_LLEGADA', 100),
+            getattr(settings, 'GEOCERCA_RADIO_AVISO', 2000),
+            getattr(settings, 'GEOCERCA_HISTERESIS', 1.5))
+
+
+# ============================================================================
+# ÍNDICE DE GEOCERCAS
+# ============================================================================
+
+class IndiceGeocercas:
+    """
+    Rejilla con la misma convención de celdas que IndiceEspacial, pero cada
+    celda guarda las geocercas cuyo radio de aviso la alcanza.
+    """
+
+    def __init__(self, celda_grados=0.005):
+        """
+        Args:
+            celda_grados: Tamaño de cada celda en grados (0.005 ≈ 550 m)
+        """
+        self.celda = celda_grados
+        self.celdas = defaultdict(list)  # (fila, columna) -> [clave de geocerca]
+        self.geocercas = {}              # clave -> (lat, lon, radio de llegada, nombre)
+
+    def __len__(self):
+        return len(self.geocercas)
+
+    def _clave(self, latitud, longitud):
+        """Celda de la rejilla que contiene la coordenada"""
+        return (math.floor(latitud / self.celda), math.floor(longitud / self.celda))
+
+    def agregar(self, clave, latitud, longitud, radio_llegada, radio_aviso, nombre):
+        """Registra una geocerca en todas las celdas que toca su radio de aviso"""
+        self.geocercas[clave] = (latitud, longitud, radio_llegada, nombre)
+        alto = radio_aviso / METROS_POR_GRADO
+        ancho = radio_aviso / (METROS_POR_GRADO * max(math.cos(math.radians(latitud)), 0.01))
+        fila_min, columna_min = self._clave(latitud - alto, longitud - ancho)
+        fila_max, columna_max = self._clave(latitud + alto, longitud + ancho)
+        for fila in range(fila_min, fila_max + 1):
+            for columna in range(columna_min, columna_max + 1):
+                self.celdas[(fila, columna)].append(clave)
+
+    def candidatas(self, latitud, longitud):
+        """Geocercas que pueden contener la coordenada (una búsqueda en la rejilla)"""
+        return self.celdas.get(self._clave(latitud, longitud), ())
+
+
+def clave_parada(parada_id):
+    return f'parada:{parada_id}'
+
+
+def clave_geocerca_colegio(colegio):
+    return f'colegio:{clave_colegio(colegio)}'
+
+
+class GeocercasCacheadas:
+    """
+    Índice de geocercas y rutas compartido por el proceso. El índice se
+    reconstruye si vence INDICE_ESPACIAL_TTL o cambia una parada o ubicación;
+    el mapa de cada ruta (geocerca -> padres) dura GEOCERCA_RUTA_TTL segundos.
+    """
+
+    def __init__(self):
+        self.indice = None
+        self.construido_en = 0
+        self.rutas = {}  # (vehiculo, tramo, hora) -> (vence, {geocerca: [padre_ids]})
+        self.lock = threading.Lock()
+
+    def obtener(self):
+        """Retorna el índice, reconstruyéndolo si no existe o expiró"""
+        ttl = getattr(settings, 'INDICE_ESPACIAL_TTL', 3600)
+        with self.lock:
+            if self.indice is None or time.monotonic() - self.construido_en > ttl:
+                self.indice = construir_indice()
+                self.construido_en = time.monotonic()
+            return self.indice
+
+    def ruta(self, vehiculo_id, tramo, hora):
+        """Padres afectados por cada geocerca de una ruta"""
+        clave = (vehiculo_id, tramo, hora)
+        ahora = time.monotonic()
+        with self.lock:
+            guardada = self.rutas.get(clave)
+        if guardada is not None and guardada[0] > ahora:
+            return guardada[1]
+        mapa = mapa_ruta(vehiculo_id, tramo, hora)
+        with self.lock:
+            self.rutas[clave] = (ahora + getattr(settings, 'GEOCERCA_RUTA_TTL', 300), mapa)
+        return mapa
+
+    def invalidar(self):
+        """Descarta el índice y las rutas (cambió una parada o la ubicación de un colegio)"""
+        with self.lock:
+            self.indice = None
+            self.rutas = {}
+
+
+def construir_indice():
+    """
+    Índice con las paradas y las ubicaciones de los colegios (dos consultas).
+
+    Returns:
+        IndiceGeocercas: Índice nuevo
+    """
+    llegada, aviso, _ = _radios()
+    indice = IndiceGeocercas(getattr(settings, 'INDICE_ESPACIAL_CELDA_GRADOS', 0.005))
+    for parada_id, nombre, lat, lon in Parada.objects.values_list('id', 'nombre', 'latitud', 'longitud'):
+        indice.agregar(clave_parada(parada_id), lat, lon, llegada, aviso, nombre)
+    for colegio, lat, lon, radio in UbicacionColegio.objects.values_list(
+            'colegio', 'latitud', 'longitud', 'radio_metros'):
+        indice.agregar(clave_geocerca_colegio(colegio), lat, lon, radio or llegada, max(aviso, radio or 0), colegio)
+    return indice
+
+
+def mapa_ruta(vehiculo_id, tramo, hora):
+    """
+    Padres que reciben los avisos de cada geocerca de una ruta: los del
+    colegio de cada estudiante asignado y, en las paradas, las familias cuya
+    parada más cercana (a menos de GEOCERCA_DISTANCIA_PARADA) es esa.
+
+    Returns:
+        dict: {clave de geocerca: [padre_ids]}
+    """
+    mapa = defaultdict(set)
+    filas = AsignacionVehiculo.objects.filter(vehiculo_id=vehiculo_id, tramo=tramo, hora=hora).values_list(
+        'estudiante__padres_id', 'colegio')
+    padres = set()
+    for padre_id, colegio in filas:
+        padres.add(padre_id)
+        mapa[clave_geocerca_colegio(colegio)].add(padre_id)
+
+    paradas = indice_paradas.obtener()
+    maximo = getattr(settings, 'GEOCERCA_DISTANCIA_PARADA', 500)
+    for padre_id, (lat, lon) in puntos_por_familia(padres).items():
+        cercana = paradas.mas_cercano(lat, lon, maximo)
+        if cercana is not None:
+            mapa[clave_parada(cercana[1])].add(padre_id)
+    return {clave: sorted(ids) for clave, ids in mapa.items()}
+
+
+# Geocercas compartidas del proceso
+geocercas = GeocercasCacheadas()
+
+
+# ============================================================================
+# PROCESAMIENTO DE PINGS
+# ============================================================================
+
+def leer_pings(datos):
+    """
+    Valida un lote de pings sin pasar por un serializer por ping (los
+    dispositivos envían lotes grandes con frecuencia).
+
+    Args:
+        datos: Lista de {latitud, longitud, momento (ISO 8601, opcional)}
+
+    Returns:
+        list: (momento, latitud, longitud) ordenados por momento
+
+    Raises:
+        ValueError: Si el lote o algún ping no es válido
+    """
+    maximo = getattr(settings, 'GPS_MAXIMO_LOTE', 500)
+    if not isinstance(datos, list) or not datos or len(datos) > maximo:
+        raise ValueError(f'Envíe "pings" como una lista de 1 a {maximo} elementos')
+    ahora = timezone.now()
+    pings = []
+    for posicion, ping in enumerate(datos):
+        try:
+            latitud, longitud = float(ping['latitud']), float(ping['longitud'])
+            momento = parse_datetime(ping['momento']) if ping.get('momento') else ahora
+        except (KeyError, TypeError, ValueError, AttributeError):
+            momento = None
+        if momento is None or not (-90 <= latitud <= 90 and -180 <= longitud <= 180):
+            raise ValueError(f'Ping {posicion} inválido: se espera latitud, longitud y momento ISO 8601')
+        if timezone.is_naive(momento):
+            momento = timezone.make_aware(momento)
+        pings.append((momento, latitud, longitud))
+    pings.sort(key=lambda ping: ping[0])
+    return pings
+
+
+def siguiente_estado(anterior, distancia, radio_llegada, radio_aviso, histeresis):
+    """
+    Transición de un recorrido respecto a una geocerca. Para salir de un
+    radio hay que alejarse `histeresis` veces ese radio, así el ruido del GPS
+    en el borde no genera avisos repetidos.
+
+    Returns:
+        tuple: (nuevo estado, tipo de aviso o None)
+    """
+    if anterior == DENTRO:
+        return (VISITADA, 'salida') if distancia > radio_llegada * histeresis else (DENTRO, None)
+    if distancia <= radio_llegada:
+        return DENTRO, 'llegada'
+    if anterior == CERCA:
+        return (FUERA, None) if distancia > radio_aviso * histeresis else (CERCA, None)
+    return (CERCA, 'cerca') if distancia <= radio_aviso else (FUERA, None)
+
+
+def procesar_pings(vehiculo_id, tramo, hora, pings):
+    """
+    Aplica un lote de pings de un recorrido: detecta las entradas y salidas
+    de las geocercas de la ruta, crea los avisos de los padres afectados y un
+    evento de dominio por cambio (para notificaciones push externas). Los
+    pings anteriores al último ya procesado se ignoran (reintentos del lote).
+
+    El estado del recorrido se bloquea durante el lote (select_for_update),
+    así dos lotes concurrentes del mismo recorrido se aplican uno después del
+    otro; el cálculo es en memoria y el bloqueo dura poco.
+
+    Args:
+        vehiculo_id: ID del vehículo
+        tramo: 'entrada' o 'salida'
+        hora: Franja del recorrido
+        pings: Resultado de leer_pings
+
+    Returns:
+        dict: {'procesados', 'ignorados', 'avisos', 'cambios': [{geocerca, tipo, momento, distancia}]}
+    """
+    indice = geocercas.obtener()
+    ruta = geocercas.ruta(vehiculo_id, tramo, hora)
+    llegada, aviso, histeresis = _radios()
+
+    recorrido = {'vehiculo_id': vehiculo_id, 'tramo': tramo, 'hora': hora,
+                 'fecha': timezone.localdate(pings[0][0])}
+    cambios, ignorados = [], 0
+
+    with transaction.atomic():
+        EstadoRecorrido.objects.get_or_create(**recorrido)
+        estado = EstadoRecorrido.objects.select_for_update().get(**recorrido)
+        estados = estado.geocercas
+
+        for momento, latitud, longitud in pings:
+            if estado.ultimo_ping is not None and momento <= estado.ultimo_ping:
+                ignorados += 1
+                continue
+            estado.ultimo_ping = momento
+            # Geocercas en las que ya está el recorrido y las de la celda del ping que son de la ruta
+            revisar = [g for g, e in estados.items() if e != VISITADA]
+            revisar.extend(g for g in indice.candidatas(latitud, longitud) if g in ruta and g not in estados)
+            for geocerca in revisar:
+                datos = indice.geocercas.get(geocerca)
+                if datos is None:  # La parada se eliminó
+                    estados.pop(geocerca, None)
+                    continue
+                distancia = distancia_metros(latitud, longitud, datos[0], datos[1])
+                nuevo, tipo = siguiente_estado(estados.get(geocerca, FUERA), distancia, datos[2],
+                                               max(aviso, datos[2]), histeresis)
+                if nuevo == FUERA:
+                    estados.pop(geocerca, None)
+                else:
+                    estados[geocerca] = nuevo
+                if tipo:
+                    cambios.append({'geocerca': geocerca, 'tipo': tipo, 'momento': momento,
+                                    'distancia': round(distancia)})
+
+        avisos = _registrar_cambios(vehiculo_id, tramo, hora, cambios, ruta, indice) if cambios else 0
+        if ignorados < len(pings):
+            estado.save(update_fields=['ultimo_ping', 'geocercas', 'updated_at'])
+    return {'procesados': len(pings) - ignorados, 'ignorados': ignorados, 'avisos': avisos, 'cambios': cambios}
+
+
+def _registrar_cambios(vehiculo_id, tramo, hora, cambios, ruta, indice):
+    """Avisos de los padres y eventos de dominio de los cambios (en la transacción del lote)"""
+    avisos, eventos = [], []
+    for cambio in cambios:
+        lugar = cambio['geocerca'].split(':', 1)[0]
+        nombre = indice.geocercas[cambio['geocerca']][3]
+        padres = ruta.get(cambio['geocerca'], [])
+        avisos.extend(
+            AvisoPadre(padre_id=padre_id, vehiculo_id=vehiculo_id, tramo=tramo, tipo=cambio['tipo'], lugar=lugar,
+                       nombre_lugar=nombre, distancia_metros=cambio['distancia'], momento=cambio['momento'])
+            for padre_id in padres
+        )
+        eventos.append(evento('vehiculo.geocerca', vehiculo_id, {
+            'tipo': cambio['tipo'], 'lugar': lugar, 'nombre_lugar': nombre, 'geocerca': cambio['geocerca'],
+            'tramo': tramo, 'hora': hora, 'momento': cambio['momento'], 'distancia_metros': cambio['distancia'],
+            'padres': padres,
+        }))
+    AvisoPadre.objects.bulk_create(avisos, batch_size=500)
+    registrar_eventos(eventos)
+    return len(avisos)
+
+
+def limpiar_avisos():
+    """
+    Elimina los avisos más antiguos que AVISOS_DIAS_RETENCION días.
+
+    Returns:
+        int: Avisos eliminados
+    """
+    limite = timezone.now() - timedelta(days=getattr(settings, 'AVISOS_DIAS_RETENCION', 30))
+    eliminados, _ = AvisoPadre.objects.filter(created_at__lt=limite).delete()
+    return eliminados
+
+
+def limpiar_estados():
+    """
+    Elimina los estados de recorridos de hace más de GEOCERCA_ESTADO_DIAS
+    días (los de hoy siguen en uso).
+
+    Returns:
+        int: Estados eliminados
+    """
+    limite = timezone.localdate() - timedelta(days=getattr(settings, 'GEOCERCA_ESTADO_DIAS', 2))
+    eliminados, _ = EstadoRecorrido.objects.filter(fecha__lt=limite).delete()
+    return eliminados
@@ -0,0 +1,193 @@
+# Utilidades para convertir direcciones en coordenadas sin conexión a internet
+import csv
+import os
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import Tutor_receptor
+from .sincronizacion_utils import siguiente_version, versionar
+
+
+def normalizar_direccion(texto):
+    """
+    Normaliza una dirección para poder compararla con el gazetteer.
+    Quita tildes, signos de puntuación, mayúsculas y espacios repetidos.
+
+    Args:
+        texto: Dirección en texto libre
+
+    Returns:
+        str: Dirección normalizada (puede ser vacía)
+    """
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r'[^a-z0-9]+', ' ', texto.lower())
+    return ' '.join(texto.split())
+
+
+class Gazetteer:
+    """
+    Gazetteer local cargado desde un archivo CSV con columnas
+    `nombre,latitud,longitud` (barrios, calles, sectores, colegios...).
+
+    Las búsquedas usan un diccionario por nombre exacto y un índice
+    invertido por palabra, así que no se recorre todo el archivo.
+    """
+
+    def __init__(self, filas):
+        """
+        Args:
+            filas: Iterable de tuplas (nombre, latitud, longitud)
+        """
+        self.exactos = {}                     # nombre normalizado -> (lat, lon)
+        self.por_palabra = defaultdict(list)  # palabra -> [(palabras del nombre, lat, lon)]
+
+        for nombre, latitud, longitud in filas:
+            clave = normalizar_direccion(nombre)
+            if not clave:
+                continue
+            coordenadas = (float(latitud), float(longitud))
+            self.exactos[clave] = coordenadas
+            palabras = frozenset(clave.split())
+            # Se indexa por su palabra más larga (la más selectiva) para reducir candidatos
+            self.por_palabra[max(palabras, key=len)].append((palabras, coordenadas))
+
+    @classmethod
+    def desde_archivo(cls, ruta):
+        """
+        Carga el gazetteer desde un archivo CSV. Si no existe, queda vacío.
+
+        Args:
+            ruta: Ruta del archivo CSV
+
+        Returns:
+            Gazetteer: Instancia cargada
+        """
+        if not ruta or not os.path.exists(ruta):
+            return cls([])
+        with open(ruta, newline='', encoding='utf-8') as archivo:
+            lector = csv.DictReader(archivo)
+            return cls((fila['nombre'], fila['latitud'], fila['longitud']) for fila in lector)
+
+    def geocodificar(self, direccion):
+        """
+        Busca las coordenadas de una dirección.
+
+        Primero intenta una coincidencia exacta; si no la hay, elige la entrada
+        del gazetteer con más palabras contenidas por completo en la dirección.
+
+        Args:
+            direccion: Dirección en texto libre
+
+        Returns:
+            tuple | None: (latitud, longitud) o None si no se encontró
+        """
+        clave = normalizar_direccion(direccion)
+        if not clave:
+            return None
+        if clave in self.exactos:
+            return self.exactos[clave]
+
+        palabras = set(clave.split())
+        mejor, mejor_largo = None, 0
+        for palabra in palabras:
+            for palabras_entrada, coordenadas in self.por_palabra.get(palabra, ()):
+                if len(palabras_entrada) > mejor_largo and palabras_entrada <= palabras:
+                    mejor, mejor_largo = coordenadas, len(palabras_entrada)
+        return mejor
+
+
+# Gazetteer en memoria y fecha de modificación del archivo cargado
+_gazetteer = None
+_gazetteer_mtime = None
+
+
+def obtener_gazetteer():
+    """
+    Retorna el gazetteer configurado en settings.GAZETTEER_PATH.
+    Se vuelve a leer solo si el archivo cambió en disco.
+
+    Returns:
+        Gazetteer: Gazetteer cargado
+    """
+    global _gazetteer, _gazetteer_mtime
+    ruta = getattr(settings, 'GAZETTEER_PATH', None)
+    mtime = os.path.getmtime(ruta) if ruta and os.path.exists(ruta) else None
+    if _gazetteer is None or mtime != _gazetteer_mtime:
+        _gazetteer = Gazetteer.desde_archivo(ruta)
+        _gazetteer_mtime = mtime
+    return _gazetteer
+
+
+def geocodificar_tutor(tutor):
+    """
+    Calcula y guarda las coordenadas de un tutor si su dirección cambió.
+
+    Usa queryset.update() para no volver a disparar las señales post_save.
+
+    Args:
+        tutor: Instancia del modelo Tutor_receptor
+
+    Returns:
+        bool: True si se actualizaron las coordenadas
+    """
+    if tutor.direccion == tutor.direccion_geocodificada:
+        return False
+
+    coordenadas = obtener_gazetteer().geocodificar(tutor.direccion)
+    tutor.latitud, tutor.longitud = coordenadas if coordenadas else (None, None)
+    tutor.direccion_geocodificada = tutor.direccion
+    versionar(tutor)  # Los clientes sincronizados reciben las coordenadas
+    Tutor_receptor.objects.filter(pk=tutor.pk).update(
+        latitud=tutor.latitud, longitud=tutor.longitud,
+        direccion_geocodificada=tutor.direccion_geocodificada, version=tutor.version)
+    return True
+
+
+def geocodificar_pendientes(todas=False, lote=1000):
+    """
+    Geocodifica en lote los tutores cuya dirección cambió desde la última vez.
+
+    Args:
+        todas: Si es True, vuelve a geocodificar todas las direcciones
+        lote: Tamaño de los lotes para bulk_update
+
+    Returns:
+        dict: Totales de direcciones procesadas y resueltas
+    """
+    gazetteer = obtener_gazetteer()
+    tutores = Tutor_receptor.objects.exclude(direccion__isnull=True).exclude(direccion='')
+    if not todas:
+        tutores = tutores.exclude(direccion_geocodificada=F('direccion'))
+
+    def guardar(pendientes):
+        # Una versión por lote, en la misma transacción que el lote
+        with transaction.atomic():
+            version = siguiente_version()
+            for tutor in pendientes:
+                tutor.version = version
+            Tutor_receptor.objects.bulk_update(
+                pendientes, ['latitud', 'longitud', 'direccion_geocodificada', 'version'])
+
+    procesados, resueltos, pendientes = 0, 0, []
+    for tutor in tutores.only('id', 'direccion').iterator(chunk_size=lote):
+        coordenadas = gazetteer.geocodificar(tutor.direccion)
+        tutor.latitud, tutor.longitud = coordenadas if coordenadas else (None, None)
+        tutor.direccion_geocodificada = tutor.direccion
+        pendientes.append(tutor)
+        procesados += 1
+        resueltos += 1 if coordenadas else 0
+        if len(pendientes) >= lote:
+            guardar(pendientes)
+            pendientes = []
+    if pendientes:
+        guardar(pendientes)
+
+    return {'procesados': procesados, 'resueltos': resueltos}
@@ -0,0 +1,126 @@
+# Soporte de la cabecera Idempotency-Key para endpoints que no deben repetirse
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import RespuestaIdempotente
+
+
+# Cabecera que envía el cliente (Idempotency-Key: <uuid>)
+CABECERA = 'HTTP_IDEMPOTENCY_KEY'
+LARGO_MAXIMO_CLAVE = 200
+
+
+def huella_peticion(request):
+    """
+    Huella del cuerpo de la petición: detecta una clave reutilizada con otros datos.
+
+    Returns:
+        str: SHA-256 hexadecimal de los datos en JSON canónico
+    """
+    contenido = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def reservar_clave(clave, huella):
+    """
+    Registra la clave como 'en_proceso' por IDEMPOTENCIA_RESERVA segundos. La
+    restricción unique hace que solo una de varias peticiones simultáneas con
+    la misma clave pueda ejecutarse. Si el proceso que la reservó muere, la
+    reserva vence pronto y un reintento la toma; solo las respuestas
+    terminadas se guardan por IDEMPOTENCIA_TTL.
+
+    Returns:
+        tuple: (True, reserva creada) o (False, registro existente o None)
+    """
+    ahora = timezone.now()
+    # Una clave vencida (respuesta vieja o reserva abandonada) se puede volver a usar
+    RespuestaIdempotente.objects.filter(clave=clave, expira__lt=ahora).delete()
+    try:
+        with transaction.atomic():
+            reserva = RespuestaIdempotente.objects.create(
+                clave=clave, huella=huella,
+                expira=ahora + timedelta(seconds=getattr(settings, 'IDEMPOTENCIA_RESERVA', 60)))
+        return True, reserva
+    except IntegrityError:
+        return False, RespuestaIdempotente.objects.filter(clave=clave).first()
+
+
+def idempotente(vista):
+    """
+    Decorador para vistas @api_view: si la petición trae Idempotency-Key,
+    la primera respuesta (2xx o 4xx) se guarda y los reintentos con la misma
+    clave la reciben tal cual, con la cabecera Idempotent-Replayed: true.
+
+    - Clave en uso por otra petición que no ha terminado: 409 (reintentar luego);
+      si esa petición murió, su reserva vence a los IDEMPOTENCIA_RESERVA segundos
+    - Clave reutilizada con otros datos: 422
+    - Respuestas 5xx o excepciones no se guardan: el reintento vuelve a ejecutar
+
+    Debe ir debajo de @api_view y @permission_classes para que la clave se
+    asocie al usuario ya autenticado.
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        valor = request.META.get(CABECERA, '').strip()
+        if not valor:
+            return vista(request, *args, **kwargs)
+        if len(valor) > LARGO_MAXIMO_CLAVE:
+            return Response({'error': 'Idempotency-Key demasiado larga'}, status=status.HTTP_400_BAD_REQUEST)
+
+        usuario = request.user.pk if request.user.is_authenticated else 'anonimo'
+        clave = f'{request.path}:{usuario}:{valor}'
+        huella = huella_peticion(request)
+
+        reservada, existente = reservar_clave(clave, huella)
+        if not reservada:
+            if existente is not None and existente.huella != huella:
+                return Response({'error': 'La Idempotency-Key ya se usó con otros datos'},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            # None: la otra petición liberó la clave entre el intento y la lectura
+            if existente is None or existente.estado == 'en_proceso':
+                respuesta = Response({'error': 'La petición original todavía se está procesando'},
+                                     status=status.HTTP_409_CONFLICT)
+                respuesta['Retry-After'] = '1'
+                return respuesta
+            respuesta = Response(existente.datos, status=existente.codigo)
+            respuesta['Idempotent-Replayed'] = 'true'
+            return respuesta
+
+        # Solo se toca la reserva propia: si venció y otro reintento tomó la
+        # clave, su registro no se sobrescribe
+        propia = RespuestaIdempotente.objects.filter(pk=existente.pk)
+        try:
+            respuesta = vista(request, *args, **kwargs)
+        except Exception:
+            propia.delete()
+            raise
+
+        if isinstance(respuesta, Response) and respuesta.status_code < 500:
+            propia.update(
+                estado='completa', codigo=respuesta.status_code, datos=respuesta.data,
+                expira=timezone.now() + timedelta(seconds=getattr(settings, 'IDEMPOTENCIA_TTL', 86400)))
+        else:
+            propia.delete()
+        return respuesta
+
+    return envoltura
+
+
+def limpiar_vencidas():
+    """
+    Elimina las respuestas guardadas cuyo plazo venció.
+
+    Returns:
+        int: Número de claves eliminadas
+    """
+    eliminadas, _ = RespuestaIdempotente.objects.filter(expira__lt=timezone.now()).delete()
+    return eliminadas
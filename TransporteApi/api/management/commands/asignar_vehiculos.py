@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from api.asignacion_utils import recalcular_asignaciones
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los asientos de todos los estudiantes en los vehículos de la flota'
+
+    def handle(self, *args, **options):
+        resumen = recalcular_asignaciones()
+        for fila in resumen['sin_asiento']:
+            self.stdout.write(self.style.WARNING(
+                f"Estudiante {fila['estudiante']} sin asiento ({fila['tramo']} {fila['hora']})"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Asignados {resumen['asignados']} asientos, {len(resumen['sin_asiento'])} sin asiento."))
@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import brotli, comprimir_contenido
+from api.renderers import JSONRapidoRenderer, MessagePackRenderer, msgpack, orjson
+from api.views import (
+    FormulariosAdminView, PadresListCreateView, EstudiantesListCreateView, TutorReceptorListCreateView
+)
+
+
+# Endpoints de listado reales que se miden (nombre, vista)
+ENDPOINTS = (
+    ('/api/admin/formularios/', FormulariosAdminView),
+    ('/api/padres/', PadresListCreateView),
+    ('/api/estudiantes/', EstudiantesListCreateView),
+    ('/api/tutores/', TutorReceptorListCreateView),
+)
+
+
+def medir(funcion, repeticiones):
+    """Ejecuta la función varias veces y retorna (resultado, milisegundos por ejecución)"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion()
+    return resultado, (time.perf_counter() - inicio) * 1000 / repeticiones
+
+
+class Command(BaseCommand):
+    help = 'Compara tiempo de codificación y bytes enviados por renderizador y compresión en los listados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5,
+                            help='Veces que se repite cada medición')
+        parser.add_argument('--limite', type=int, default=None,
+                            help='Número máximo de filas por endpoint')
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+
+        renderizadores = [('JSONRenderer (DRF)', JSONRenderer())]
+        if orjson is not None:
+            renderizadores.append(('JSONRapidoRenderer', JSONRapidoRenderer()))
+        if msgpack is not None:
+            renderizadores.append(('MessagePackRenderer', MessagePackRenderer()))
+        codificaciones = ['gzip'] + (['br'] if brotli is not None else [])
+
+        encabezado = f"{'endpoint':<26}{'renderizador':<22}{'filas':>7}{'serializar ms':>15}{'codificar ms':>14}{'bytes':>11}"
+        for codificacion in codificaciones:
+            encabezado += f"{codificacion + ' bytes':>12}{codificacion + ' ms':>10}"
+        self.stdout.write(encabezado)
+
+        for url, vista in ENDPOINTS:
+            # Mismo queryset y serializer que usa la vista en producción
+            queryset = vista.queryset.all()
+            if options['limite']:
+                queryset = queryset[:options['limite']]
+            datos, ms_serializar = medir(
+                lambda: vista.serializer_class(list(queryset), many=True).data, repeticiones)
+
+            for nombre, renderizador in renderizadores:
+                contenido, ms_codificar = medir(lambda: renderizador.render(datos), repeticiones)
+                linea = f"{url:<26}{nombre:<22}{len(datos):>7}{ms_serializar:>15.2f}{ms_codificar:>14.2f}{len(contenido):>11}"
+                for codificacion in codificaciones:
+                    comprimido, ms_comprimir = medir(
+                        lambda: comprimir_contenido(contenido, codificacion), repeticiones)
+                    linea += f"{len(comprimido):>12}{ms_comprimir:>10.2f}"
+                self.stdout.write(linea)
+
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson no está instalado: JSONRapidoRenderer usa el JSONRenderer de DRF.'))
+        if msgpack is None:
+            self.stdout.write(self.style.WARNING('msgpack no está instalado: no se mide MessagePackRenderer.'))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import JSONRapidoRenderer
+from api.management.commands.benchmark_respuestas import ENDPOINTS, medir
+
+
+class Command(BaseCommand):
+    help = ('Verifica que la lectura rápida de los listados produzca el mismo JSON byte a byte '
+            'que el serializer de DRF y compara sus tiempos')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=10000,
+                            help='Número máximo de filas por endpoint')
+        parser.add_argument('--repeticiones', type=int, default=3,
+                            help='Veces que se repite cada medición')
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+        renderizadores = (JSONRenderer(), JSONRapidoRenderer())
+        diferentes = []
+
+        self.stdout.write(f"{'endpoint':<26}{'filas':>7}{'DRF ms':>11}{'rápido ms':>11}{'aceleración':>13}{'bytes':>11}")
+        for url, vista in ENDPOINTS:
+            # Mismo queryset y orden que la primera página de la vista
+            queryset = vista.queryset.order_by('-created_at' if 'created_at' in vista.ordering_fields else '-id')
+            queryset = queryset[:options['filas']]
+            lectura = vista.lectura
+
+            drf, ms_drf = medir(lambda: vista.serializer_class(list(queryset), many=True).data, repeticiones)
+            rapido, ms_rapido = medir(
+                lambda: lectura.representar(list(queryset.prefetch_related(None).values(*lectura.columnas()))),
+                repeticiones)
+
+            # Paridad: el JSON de ambos caminos debe coincidir con los dos renderizadores
+            iguales = all(r.render(drf) == r.render(rapido) for r in renderizadores)
+            if not iguales:
+                diferentes.append(url)
+            contenido = renderizadores[1].render(rapido)
+            estado = '' if iguales else '  ' + self.style.ERROR('DIFERENTE')
+            self.stdout.write(f"{url:<26}{len(rapido):>7}{ms_drf:>11.2f}{ms_rapido:>11.2f}"
+                              f"{ms_drf / max(ms_rapido, 1e-9):>12.1f}x{len(contenido):>11}{estado}")
+
+        if diferentes:
+            raise CommandError(f'La lectura rápida no coincide con el serializer en: {", ".join(diferentes)}')
+        self.stdout.write(self.style.SUCCESS('Salida idéntica byte a byte en todos los listados.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from api.analitica_utils import consolidar_todo
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes de analítica (inscripciones, aprobaciones y ocupación) desde las tablas de origen'
+
+    def handle(self, *args, **options):
+        resultado = consolidar_todo()
+        for metrica, filas in resultado.items():
+            self.stdout.write(f'{metrica}: {filas} filas de resumen')
+        self.stdout.write(self.style.SUCCESS('Resúmenes de analítica consolidados.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from api.duplicados_utils import escanear_duplicados, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Busca familias y estudiantes duplicados en una sola pasada por claves de bloqueo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reindexar', action='store_true',
+                            help='Reconstruye también la tabla de claves de bloqueo')
+
+    def handle(self, *args, **options):
+        if options['reindexar']:
+            total = reconstruir_indice()
+            self.stdout.write(f'Índice reconstruido con {total} claves.')
+
+        resultado = escanear_duplicados()
+        for grupo in resultado['familias']:
+            self.stdout.write(f"Familias {grupo['padres']} comparten {grupo['clave']}")
+        for par in resultado['estudiantes']:
+            self.stdout.write(
+                f"Estudiantes {par['estudiantes']} (padres {par['padres']}) similitud {par['similitud']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(resultado['familias'])} grupos de familias y {len(resultado['estudiantes'])} pares de estudiantes posiblemente duplicados."))
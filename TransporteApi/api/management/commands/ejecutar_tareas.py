@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from api import planificador
+from api.planificador import ejecutar_pendientes
+
+
+class Command(BaseCommand):
+    help = ('Ejecuta las tareas periódicas vencidas (una vez o en bucle), incluidas las pesadas '
+            'que el hilo de los servidores web omite')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bucle', action='store_true',
+                            help='Sigue revisando las tareas cada --intervalo segundos')
+        parser.add_argument('--intervalo', type=int, default=30,
+                            help='Segundos entre revisiones en modo bucle')
+
+    def handle(self, *args, **options):
+        planificador.EN_TRABAJADOR = True  # Las tareas pesadas pueden usar todos los CPU del nodo
+        while True:
+            for ejecucion in ejecutar_pendientes():
+                estilo = self.style.SUCCESS if ejecucion.estado == 'exito' else self.style.ERROR
+                self.stdout.write(estilo(
+                    f'{ejecucion.tarea.nombre}: {ejecucion.estado} en {ejecucion.duracion_ms} ms'))
+            if not options['bucle']:
+                break
+            time.sleep(options['intervalo'])
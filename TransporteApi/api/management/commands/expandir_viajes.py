@@ -0,0 +1,42 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.models import Estudiantes
+from api.calendario_utils import expandir_viajes, invalidar_planes
+
+
+class Command(BaseCommand):
+    help = 'Expande los calendarios de los colegios a los viajes de un rango de fechas y mide el tiempo (frío y con caché)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=str, help='Primer día YYYY-MM-DD (por defecto hoy)')
+        parser.add_argument('--hasta', type=str, help='Último día YYYY-MM-DD (por defecto 120 días después)')
+        parser.add_argument('--colegio', type=str, help='Solo los estudiantes de un colegio')
+        parser.add_argument('--por-estudiante', action='store_true',
+                            help='Expandir estudiante por estudiante en lugar de por grupo de horario')
+
+    def handle(self, *args, **options):
+        desde = parse_date(options['desde']) if options['desde'] else timezone.localdate()
+        hasta = parse_date(options['hasta']) if options['hasta'] else desde + timedelta(days=119)
+        if desde is None or hasta is None or hasta < desde:
+            raise CommandError('Rango de fechas inválido, use YYYY-MM-DD con desde <= hasta')
+
+        estudiantes = Estudiantes.objects.all()
+        if options['colegio']:
+            estudiantes = estudiantes.filter(Colegio__iexact=options['colegio'])
+
+        invalidar_planes()  # La primera pasada calcula todos los planes
+        for pasada in ('sin caché', 'con caché'):
+            inicio = time.perf_counter()
+            resultado = expandir_viajes(desde, hasta, estudiantes, options['por_estudiante'])
+            ms = (time.perf_counter() - inicio) * 1000
+            self.stdout.write(f'{pasada}: {ms:.1f} ms')
+
+        self.stdout.write(
+            f"{desde} a {hasta}: {resultado['dias_con_servicio']} días con servicio, "
+            f"{resultado['total_viajes']} viajes de estudiantes")
+        self.stdout.write(self.style.SUCCESS('Viajes expandidos.'))
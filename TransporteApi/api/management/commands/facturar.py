@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.facturacion_utils import iniciar_corrida, ejecutar_corrida
+
+
+class Command(BaseCommand):
+    help = 'Genera las facturas mensuales de transporte de todos los padres aprobados (reanuda una corrida interrumpida)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', type=str, help='Mes a facturar YYYY-MM (por defecto el mes en curso)')
+        parser.add_argument('--reabrir', action='store_true',
+                            help='Volver a recorrer una corrida completa y facturar a quienes no tengan factura')
+        parser.add_argument('--lote', type=int, default=None, help='Padres por lote (por defecto FACTURACION_LOTE)')
+
+    def handle(self, *args, **options):
+        if options['periodo']:
+            periodo = parse_date(f"{options['periodo']}-01") if len(options['periodo']) == 7 else None
+            if periodo is None:
+                raise CommandError('Periodo inválido, use YYYY-MM')
+        else:
+            periodo = timezone.localdate()
+
+        corrida = iniciar_corrida(periodo, reabrir=options['reabrir'])
+        if corrida.estado == 'completa':
+            self.stdout.write(f'La corrida de {corrida.periodo:%Y-%m} ya está completa (use --reabrir).')
+            return
+        if corrida.ultimo_padre:
+            self.stdout.write(f'Reanudando desde el padre {corrida.ultimo_padre}...')
+
+        inicio = time.perf_counter()
+        lotes = []
+        corrida = ejecutar_corrida(corrida, options['lote'], progreso=lotes.append)
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f'{corrida.periodo:%Y-%m}: {sum(lotes)} facturas nuevas en {len(lotes)} lotes '
+            f'({segundos:.1f} s), {corrida.facturas} en total por {corrida.total}')
+        if corrida.sin_tarifa:
+            self.stdout.write(self.style.WARNING(f'{corrida.sin_tarifa} tramos sin tarifa se cobraron en 0'))
+        self.stdout.write(self.style.SUCCESS('Facturación completa.'))
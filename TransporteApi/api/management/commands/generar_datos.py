@@ -0,0 +1,273 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Usuario, Padres, Estudiantes, Tutor_receptor
+from api.geocodificacion_utils import obtener_gazetteer
+from api.sincronizacion_utils import siguiente_version
+
+
+# Dominio de los correos sintéticos (permite encontrarlos y borrarlos)
+DOMINIO = 'sintetico.test'
+
+NOMBRES = (
+    'María', 'José', 'Juan', 'Ana', 'Luis', 'Carmen', 'Carlos', 'Rosa', 'Jorge', 'Martha',
+    'Diego', 'Gabriela', 'Andrés', 'Daniela', 'Miguel', 'Sofía', 'David', 'Valentina',
+    'Mateo', 'Camila', 'Sebastián', 'Isabella', 'Santiago', 'Emilia', 'Nicolás', 'Paula',
+)
+APELLIDOS = (
+    'Vásquez', 'Rodríguez', 'González', 'Pérez', 'Sánchez', 'Zambrano', 'López', 'Mora',
+    'Chávez', 'Torres', 'Herrera', 'Castillo', 'Morales', 'Guerrero', 'Jiménez', 'Cedeño',
+    'Ramírez', 'Romero', 'Flores', 'Andrade', 'Vera', 'Suárez', 'Castro', 'Paredes',
+)
+
+# Colegios con peso relativo (pocos colegios concentran a la mayoría de estudiantes)
+COLEGIOS = (
+    ('Unidad Educativa San José', 30), ('Colegio La Salle', 20), ('Unidad Educativa Alegría', 15),
+    ('Colegio Americano', 10), ('Unidad Educativa Santa Mariana', 8), ('Colegio Nacional Mejía', 6),
+    ('Unidad Educativa Los Andes', 5), ('Colegio Spellman', 3), ('Unidad Educativa Tomás Moro', 2),
+    ('Colegio Menor', 1),
+)
+
+# Grados con la edad típica de sus estudiantes
+GRADOS = (
+    ('Inicial 2', 4), ('1ro EGB', 5), ('2do EGB', 6), ('3ro EGB', 7), ('4to EGB', 8), ('5to EGB', 9),
+    ('6to EGB', 10), ('7mo EGB', 11), ('8vo EGB', 12), ('9no EGB', 13), ('10mo EGB', 14),
+    ('1ro BGU', 15), ('2do BGU', 16), ('3ro BGU', 17),
+)
+
+# Horarios de entrada y salida con su peso
+ENTRADAS = (('07:00', 60), ('07:15', 15), ('07:30', 15), ('08:00', 10))
+SALIDAS_PEQUENOS = (('12:30', 50), ('13:00', 40), ('13:30', 10))   # Hasta 7mo EGB
+SALIDAS_GRANDES = (('13:30', 40), ('14:00', 30), ('14:30', 30))    # 8vo EGB en adelante
+
+HIJOS_POR_FAMILIA = ((1, 45), (2, 35), (3, 15), (4, 5))
+TUTORES_POR_ESTUDIANTE = ((1, 30), (2, 50), (3, 20))
+PARENTESCOS = (('Madre', 35), ('Padre', 25), ('Abuela', 15), ('Abuelo', 8), ('Tía', 7), ('Tío', 5), ('Niñera', 5))
+
+CALLES = ('Av. 10 de Agosto', 'Av. Amazonas', 'Av. 6 de Diciembre', 'Calle Guayaquil', 'Av. América',
+          'Calle García Moreno', 'Av. Naciones Unidas', 'Av. Eloy Alfaro', 'Calle Venezuela', 'Av. Colón')
+
+
+def elegir(rng, opciones):
+    """Elige un valor de una tupla de (valor, peso)"""
+    valores, pesos = zip(*opciones)
+    return rng.choices(valores, weights=pesos)[0]
+
+
+def hora(texto):
+    """Convierte 'HH:MM' a time"""
+    return datetime.strptime(texto, '%H:%M').time()
+
+
+@contextmanager
+def sin_fecha_automatica(*campos):
+    """
+    Desactiva temporalmente auto_now_add en los campos indicados para poder
+    repartir las fechas de registro en el tiempo (bulk_create las sobrescribiría).
+    """
+    anteriores = [campo.auto_now_add for campo in campos]
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, anterior in zip(campos, anteriores):
+            campo.auto_now_add = anterior
+
+
+class Command(BaseCommand):
+    help = ('Genera familias sintéticas (usuarios, padres, estudiantes y tutores) con inserciones '
+            'en lote y semilla fija, para pruebas de escala y benchmarks reproducibles')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--familias', type=int, default=1000,
+                            help='Número de familias a generar')
+        parser.add_argument('--semilla', type=int, default=42,
+                            help='Semilla del generador aleatorio (mismos datos con la misma semilla)')
+        # SQL Server admite hasta 2100 parámetros por consulta (las búsquedas por IN usan uno por familia)
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Familias por lote (una transacción por lote, máximo 2000)')
+        parser.add_argument('--dias', type=int, default=90,
+                            help='Días hacia atrás en los que se reparten los registros')
+        parser.add_argument('--aprobados', type=float, default=0.7,
+                            help='Fracción de familias aprobadas')
+        parser.add_argument('--password', default='sintetico123',
+                            help='Contraseña de todos los usuarios generados')
+        parser.add_argument('--borrar', action='store_true',
+                            help=f'Borra antes los datos sintéticos existentes (@{DOMINIO})')
+        parser.add_argument('--sin-derivados', action='store_true',
+                            help='No reconstruye duplicados, analítica ni asientos al terminar')
+
+    def handle(self, *args, **options):
+        familias = options['familias']
+        if familias < 1:
+            raise CommandError('--familias debe ser mayor que 0')
+        if not 1 <= options['lote'] <= 2000:
+            raise CommandError('--lote debe estar entre 1 y 2000')
+
+        if options['borrar']:
+            borrados, _ = Usuario.objects.filter(email__endswith=f'@{DOMINIO}').delete()
+            self.stdout.write(f'{borrados} registros sintéticos borrados.')
+        elif Usuario.objects.filter(email__endswith=f'@{DOMINIO}').exists():
+            raise CommandError(f'Ya existen datos sintéticos (@{DOMINIO}); use --borrar para reemplazarlos.')
+
+        rng = random.Random(options['semilla'])
+        # Un solo hash para todos: calcular PBKDF2 por usuario tomaría horas a gran escala
+        password = make_password(options['password'])
+        ahora = timezone.now()
+        direcciones = self._direcciones()
+
+        inicio = time.perf_counter()
+        totales = {'usuarios': 0, 'padres': 0, 'estudiantes': 0, 'tutores': 0}
+        campos_fecha = (Usuario._meta.get_field('fecha_registro'), Padres._meta.get_field('created_at'))
+        with sin_fecha_automatica(*campos_fecha):
+            for desde in range(0, familias, options['lote']):
+                hasta = min(desde + options['lote'], familias)
+                lote = [self._familia(rng, n, ahora, options, direcciones) for n in range(desde, hasta)]
+                for clave, cantidad in self._insertar(lote, password).items():
+                    totales[clave] += cantidad
+                self.stdout.write(f'{hasta}/{familias} familias ({time.perf_counter() - inicio:.1f} s)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{totales['usuarios']} usuarios, {totales['padres']} padres, {totales['estudiantes']} estudiantes y "
+            f"{totales['tutores']} tutores en {time.perf_counter() - inicio:.1f} s."))
+
+        if not options['sin_derivados']:
+            self._reconstruir_derivados()
+
+    def _direcciones(self):
+        """
+        Direcciones con coordenadas conocidas (del gazetteer local si existe),
+        así los tutores quedan geocodificados sin otra pasada.
+
+        Returns:
+            list: Tuplas (dirección, latitud, longitud)
+        """
+        gazetteer = obtener_gazetteer()
+        if gazetteer.exactos:
+            return sorted((nombre.title(), lat, lon) for nombre, (lat, lon) in gazetteer.exactos.items())
+        return [(calle, None, None) for calle in CALLES]
+
+    def _familia(self, rng, n, ahora, options, direcciones):
+        """
+        Genera en memoria una familia completa (sin tocar la base de datos).
+
+        Returns:
+            dict: Usuario, padre, estudiantes y tutores de cada estudiante
+        """
+        apellido = rng.choice(APELLIDOS)
+        apellido_materno = rng.choice(APELLIDOS)
+        creado = ahora - timedelta(seconds=rng.randint(0, options['dias'] * 86400))
+        aprobado = rng.random() < options['aprobados']
+        celular = f'09{rng.randint(0, 99999999):08d}'
+
+        usuario = Usuario(
+            email=f'familia{n}@{DOMINIO}', nombre=rng.choice(NOMBRES), apellido=apellido,
+            telefono=celular, role='padre', email_verificado=True, aprobado=aprobado,
+            fecha_registro=creado)
+        padre = Padres(
+            cedula=f'9{n:09d}', celular=celular, aprobado=aprobado, created_at=creado,
+            fecha_aprobacion=creado + timedelta(hours=rng.expovariate(1 / 36)) if aprobado else None)
+
+        colegio = elegir(rng, COLEGIOS)  # Los hermanos suelen ir al mismo colegio
+        hijos = []
+        for _ in range(elegir(rng, HIJOS_POR_FAMILIA)):
+            grado, edad = rng.choice(GRADOS)
+            nacimiento = date(creado.year - edad, 1, 1) + timedelta(days=rng.randint(0, 364))
+            salidas = SALIDAS_PEQUENOS if edad <= 11 else SALIDAS_GRANDES
+            estudiante = Estudiantes(
+                nombre=rng.choice(NOMBRES), apellido=f'{apellido} {apellido_materno}',
+                fecha_nacimiento=nacimiento, grado=grado, edad=edad,
+                Colegio=colegio if rng.random() < 0.9 else elegir(rng, COLEGIOS),
+                H_entrada=hora(elegir(rng, ENTRADAS)), H_salida=hora(elegir(rng, salidas)))
+
+            direccion, latitud, longitud = rng.choice(direcciones)
+            if latitud is None:
+                direccion = f'{direccion} N{rng.randint(10, 99)}-{rng.randint(1, 300)}'
+            tutores = [
+                Tutor_receptor(
+                    nombre=rng.choice(NOMBRES), apellido=rng.choice(APELLIDOS),
+                    direccion=direccion, telefono=f'09{rng.randint(0, 99999999):08d}',
+                    parentesco=elegir(rng, PARENTESCOS), latitud=latitud, longitud=longitud,
+                    direccion_geocodificada=direccion if latitud is not None else None)
+                for _ in range(elegir(rng, TUTORES_POR_ESTUDIANTE))
+            ]
+            hijos.append((estudiante, tutores))
+
+        return {'usuario': usuario, 'padre': padre, 'hijos': hijos}
+
+    def _insertar(self, lote, password):
+        """
+        Inserta un lote de familias con bulk_create (sin señales por fila).
+        Los IDs se recuperan por claves naturales para no depender de que el
+        motor devuelva las claves primarias de un INSERT masivo.
+
+        Returns:
+            dict: Filas insertadas por tabla
+        """
+        with transaction.atomic():
+            # bulk_create no dispara pre_save: una versión para todo el lote (sincronización)
+            version = siguiente_version()
+            for familia in lote:
+                familia['usuario'].password = password
+                familia['padre'].version = version
+                for estudiante, tutores_hijo in familia['hijos']:
+                    estudiante.version = version
+                    for tutor in tutores_hijo:
+                        tutor.version = version
+            Usuario.objects.bulk_create([f['usuario'] for f in lote])
+            ids_usuario = dict(Usuario.objects.filter(
+                email__in=[f['usuario'].email for f in lote]).values_list('email', 'id'))
+
+            for familia in lote:
+                familia['padre'].usuario_id = ids_usuario[familia['usuario'].email]
+            Padres.objects.bulk_create([f['padre'] for f in lote])
+            ids_padre = dict(Padres.objects.filter(
+                cedula__in=[f['padre'].cedula for f in lote]).values_list('cedula', 'id'))
+
+            estudiantes = []
+            for familia in lote:
+                for estudiante, _ in familia['hijos']:
+                    estudiante.padres_id = ids_padre[familia['padre'].cedula]
+                    estudiantes.append(estudiante)
+            Estudiantes.objects.bulk_create(estudiantes)
+
+            # Los estudiantes de cada padre se leen en orden de inserción (id creciente)
+            ids_por_padre = {}
+            for estudiante_id, padre_id in Estudiantes.objects.filter(
+                    padres_id__in=ids_padre.values()).order_by('id').values_list('id', 'padres_id'):
+                ids_por_padre.setdefault(padre_id, []).append(estudiante_id)
+
+            tutores = []
+            for familia in lote:
+                ids = ids_por_padre[ids_padre[familia['padre'].cedula]]
+                for estudiante_id, (_, tutores_hijo) in zip(ids, familia['hijos']):
+                    for tutor in tutores_hijo:
+                        tutor.estudiante_id = estudiante_id
+                        tutores.append(tutor)
+            Tutor_receptor.objects.bulk_create(tutores, batch_size=5000)
+
+        return {'usuarios': len(lote), 'padres': len(lote), 'estudiantes': len(estudiantes), 'tutores': len(tutores)}
+
+    def _reconstruir_derivados(self):
+        """
+        bulk_create no dispara señales: se reconstruyen en una pasada los datos
+        que normalmente se mantienen al escribir.
+        """
+        from api.analitica_utils import consolidar_todo
+        from api.asignacion_utils import recalcular_asignaciones
+        from api.duplicados_utils import reconstruir_indice
+        from api.models import Vehiculo
+
+        self.stdout.write(f'Índice de duplicados: {reconstruir_indice()} claves.')
+        if Vehiculo.objects.filter(activo=True).exists():
+            resumen = recalcular_asignaciones()
+            self.stdout.write(f"Asientos: {resumen['asignados']} asignados, {len(resumen['sin_asiento'])} sin asiento.")
+        self.stdout.write(f'Analítica: {consolidar_todo()}')
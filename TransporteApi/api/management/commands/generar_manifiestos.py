@@ -0,0 +1,24 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from api.manifiestos_utils import generar_manifiestos
+
+
+class Command(BaseCommand):
+    help = 'Genera los manifiestos diarios de cada vehículo (por defecto para mañana)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', type=str, default=None,
+                            help='Día de servicio en formato YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        if options['fecha']:
+            fecha = parse_date(options['fecha'])
+            if fecha is None:
+                raise CommandError('Fecha inválida, use el formato YYYY-MM-DD')
+        else:
+            fecha = timezone.localdate() + timedelta(days=1)
+        total = generar_manifiestos(fecha)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generados {total} manifiestos para {fecha.isoformat()}.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from api.geocodificacion_utils import geocodificar_pendientes
+from api.espacial_utils import indice_tutores
+
+
+class Command(BaseCommand):
+    help = 'Geocodifica con el gazetteer local las direcciones de tutores nuevas o modificadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true',
+                            help='Vuelve a geocodificar todas las direcciones, no solo las modificadas')
+
+    def handle(self, *args, **options):
+        resumen = geocodificar_pendientes(todas=options['todas'])
+        indice_tutores.invalidar()  # bulk_update no dispara señales
+        self.stdout.write(self.style.SUCCESS(
+            f"Procesadas {resumen['procesados']} direcciones, {resumen['resueltos']} con coordenadas."))
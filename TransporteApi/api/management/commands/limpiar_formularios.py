@@ -2,10 +2,11 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from api.models import Padres
+from api.aprobacion_utils import eliminar_familias
 
 
 class Command(BaseCommand):
-    help = 'Elimina padres (y usuarios) no aprobados con más de N días de antigüedad'
+    help = 'Archiva y elimina padres (y usuarios) no aprobados con más de N días de antigüedad'
 
     def add_arguments(self, parser):
         parser.add_argument('--days', type=int, default=7,
@@ -15,12 +16,8 @@ class Command(BaseCommand):
         days = options['days']
         cutoff = timezone.now() - timedelta(days=days)
         to_delete = Padres.objects.filter(
-            aprobado=False, created_at__lt=cutoff)
-        count = to_delete.count()
-        for padre in to_delete:
-            user = padre.Usuario
-            padre.delete()
-            if user:
-                user.delete()
+            aprobado=False, created_at__lt=cutoff).values_list('id', flat=True)
+        # Archivo y eliminación por conjunto (con eventos de usuario eliminado)
+        count = len(eliminar_familias(list(to_delete), motivo='vencida'))
         self.stdout.write(self.style.SUCCESS(
-            f'Eliminados {count} padres/usuarios no aprobados con más de {days} días.'))
+            f'Archivados {count} padres/usuarios no aprobados con más de {days} días.'))
@@ -0,0 +1,59 @@
+import hashlib
+import hmac
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Receptor HTTP local que imita a un sistema externo: muestra los lotes de eventos '
+            'recibidos por webhook (para probar la entrega sin el sistema real)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--puerto', type=int, default=8099, help='Puerto donde escuchar')
+        parser.add_argument('--secreto', default='', help='Secreto del destino para verificar X-Firma')
+        parser.add_argument('--fallar', type=int, default=0,
+                            help='Responder 503 a las primeras N peticiones (prueba de reintentos)')
+
+    def handle(self, *args, **options):
+        comando = self
+        secreto = options['secreto']
+        pendientes_fallo = [options['fallar']]
+        vistos = set()
+
+        class Receptor(BaseHTTPRequestHandler):
+            def do_POST(self):
+                cuerpo = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if pendientes_fallo[0] > 0:
+                    pendientes_fallo[0] -= 1
+                    self.send_response(503)
+                    self.end_headers()
+                    comando.stdout.write(comando.style.WARNING('Lote rechazado (fallo simulado)'))
+                    return
+                if secreto:
+                    esperado = 'sha256=' + hmac.new(secreto.encode(), cuerpo, hashlib.sha256).hexdigest()
+                    if not hmac.compare_digest(esperado, self.headers.get('X-Firma', '')):
+                        self.send_response(401)
+                        self.end_headers()
+                        comando.stdout.write(comando.style.ERROR('Firma inválida'))
+                        return
+                eventos = json.loads(cuerpo)['eventos']
+                repetidos = sum(1 for e in eventos if e['id'] in vistos)
+                vistos.update(e['id'] for e in eventos)
+                comando.stdout.write(f'Lote de {len(eventos)} eventos ({repetidos} repetidos)')
+                for evento in eventos:
+                    comando.stdout.write(f"  {evento['id']} {evento['tipo']} {evento['entidad_id']}")
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass  # Solo se muestran los lotes
+
+        servidor = ThreadingHTTPServer(('127.0.0.1', options['puerto']), Receptor)
+        self.stdout.write(self.style.SUCCESS(
+            f"Receptor de eventos en http://127.0.0.1:{options['puerto']}/ (Ctrl+C para salir)"))
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            servidor.server_close()
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from api.eta_utils import reconstruir_modelos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los modelos de tiempos de llegada desde el historial de eventos de recorrido'
+
+    def handle(self, *args, **options):
+        rutas = reconstruir_modelos()
+        self.stdout.write(self.style.SUCCESS(f'{rutas} rutas reconstruidas.'))
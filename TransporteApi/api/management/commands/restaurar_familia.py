@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import FamiliaArchivada
+from api.archivo_utils import restaurar
+
+
+class Command(BaseCommand):
+    help = ('Restaura una familia archivada (usuario, formulario, estudiantes y tutores) '
+            'en una sola transacción')
+
+    def add_arguments(self, parser):
+        grupo = parser.add_mutually_exclusive_group(required=True)
+        grupo.add_argument('--archivo', type=int, help='ID del registro de FamiliaArchivada')
+        grupo.add_argument('--cedula', type=str, help='Cédula del padre (la familia archivada más reciente)')
+        grupo.add_argument('--email', type=str, help='Email del usuario (la familia archivada más reciente)')
+        parser.add_argument('--listar', action='store_true',
+                            help='Solo lista las familias archivadas que coinciden, sin restaurar')
+
+    def handle(self, *args, **options):
+        if options['archivo'] is not None:
+            archivadas = FamiliaArchivada.objects.filter(pk=options['archivo'])
+        elif options['cedula']:
+            archivadas = FamiliaArchivada.objects.filter(cedula=options['cedula'])
+        else:
+            archivadas = FamiliaArchivada.objects.filter(email__iexact=options['email'])
+        archivadas = archivadas.order_by('-archivada_en', '-id')
+
+        if options['listar']:
+            for a in archivadas:
+                estado = f'restaurada como padre {a.restaurada_como}' if a.restaurada_en else 'archivada'
+                self.stdout.write(f'{a.pk:>8}  {a.archivada_en:%Y-%m-%d %H:%M}  {a.cedula:<13}  '
+                                  f'{a.email:<32}  {a.motivo:<9}  {a.estudiantes} est.  {estado}')
+            return
+
+        if options['archivo'] is None:
+            archivadas = archivadas.filter(restaurada_en__isnull=True)
+        archivada = archivadas.first()
+        if archivada is None:
+            raise CommandError('No hay una familia archivada que coincida')
+        try:
+            padre = restaurar(archivada)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Familia {archivada.cedula} restaurada como padre {padre.pk} '
+            f'con {archivada.estudiantes} estudiantes.'))
+        if padre.usuario and not padre.usuario.has_usable_password():
+            self.stdout.write(self.style.WARNING(
+                f'El usuario {padre.usuario.email} no tiene contraseña: defina una nueva con '
+                f'`manage.py changepassword {padre.usuario.email}`.'))
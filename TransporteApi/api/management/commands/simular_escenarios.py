@@ -0,0 +1,64 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.simulacion_utils import validar_escenarios, simular, procesos_dedicados
+
+
+class Command(BaseCommand):
+    help = ('Simula un día de viajes con la situación actual y los escenarios de un archivo JSON '
+            '(lista de {nombre, cambios}) y compara atrasos, tiempos de viaje y uso de la flota')
+
+    def add_arguments(self, parser):
+        parser.add_argument('escenarios', type=str,
+                            help='Archivo JSON con la lista de escenarios')
+        parser.add_argument('--fecha', type=str, default=None,
+                            help='Día simulado en formato YYYY-MM-DD (por defecto hoy)')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos en paralelo (por defecto SIMULACION_PROCESOS o uno por CPU)')
+        parser.add_argument('--json', action='store_true',
+                            help='Imprime los resultados completos en JSON en lugar de la tabla')
+
+    def handle(self, *args, **options):
+        fecha = timezone.localdate()
+        if options['fecha']:
+            fecha = parse_date(options['fecha'])
+            if fecha is None:
+                raise CommandError('Fecha inválida, use el formato YYYY-MM-DD')
+        try:
+            with open(options['escenarios'], encoding='utf-8') as archivo:
+                escenarios = validar_escenarios(json.load(archivo))
+        except (OSError, json.JSONDecodeError, ValueError) as e:
+            raise CommandError(f'Escenarios inválidos: {e}')
+
+        inicio = time.perf_counter()
+        resultados = simular(fecha, escenarios, options['procesos'] or procesos_dedicados())
+        segundos = time.perf_counter() - inicio
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f"{'escenario':<32}{'viajes':>8}{'% tarde':>9}{'atraso máx':>12}{'espera sal.':>13}"
+                          f"{'viaje prom':>12}{'viaje p95':>11}{'vehículos':>11}{'km':>9}{'sin asiento':>13}")
+        for r in resultados:
+            viaje = r['tiempo_viaje_min']
+            self.stdout.write(
+                f"{r['nombre'][:31]:<32}{r['viajes']:>8}{r['llegada']['porcentaje_tarde']:>9}"
+                f"{r['llegada']['retraso_maximo_min']:>12}{r['salida']['espera_promedio_min']:>13}"
+                f"{viaje['promedio'] if viaje['promedio'] is not None else '-':>12}"
+                f"{viaje['p95'] if viaje['p95'] is not None else '-':>11}"
+                f"{r['vehiculos']['usados']:>11}{r['vehiculos']['km']:>9}{r['sin_asiento']:>13}")
+
+        for r in resultados:
+            for advertencia in r['advertencias']:
+                self.stdout.write(self.style.WARNING(f"{r['nombre']}: {advertencia}"))
+        sin_ubicacion = resultados[0]['colegios_sin_ubicacion']
+        if sin_ubicacion:
+            self.stdout.write(self.style.WARNING(
+                f'{len(sin_ubicacion)} colegios sin ubicación registrada se ubicaron en el centro de sus familias.'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(resultados)} escenarios de {fecha.isoformat()} simulados en {segundos:.1f} s.'))
@@ -0,0 +1,313 @@
+# Utilidades para generar y descargar los manifiestos diarios de cada vehículo
+import gzip
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Vehiculo, Estudiantes, Tutor_receptor, AsignacionVehiculo, ManifiestoDiario, CambioManifiesto
+
+
+# Versión del formato de los manifiestos (cambia si cambia la estructura)
+FORMATO_MANIFIESTO = 1
+
+
+def comprimir(datos):
+    """
+    Convierte un objeto a JSON compacto y lo comprime con gzip.
+    Usa mtime=0 para que el mismo contenido produzca siempre los mismos bytes.
+
+    Args:
+        datos: Objeto serializable a JSON
+
+    Returns:
+        bytes: JSON comprimido
+    """
+    texto = json.dumps(datos, separators=(',', ':'), sort_keys=True, ensure_ascii=False)
+    return gzip.compress(texto.encode('utf-8'), mtime=0)
+
+
+def descomprimir(contenido):
+    """
+    Descomprime y decodifica un contenido generado con comprimir().
+
+    Args:
+        contenido: bytes o memoryview con JSON comprimido
+
+    Returns:
+        Objeto decodificado
+    """
+    return json.loads(gzip.decompress(bytes(contenido)).decode('utf-8'))
+
+
+def _huella(entradas):
+    """SHA-256 de las entradas del manifiesto para detectar cambios"""
+    texto = json.dumps(entradas, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def construir_entradas(vehiculo_ids):
+    """
+    Construye las entradas de los manifiestos de varios vehículos.
+
+    Usa tres consultas en total (asignaciones, estudiantes y tutores), sin
+    importar cuántos vehículos o estudiantes haya.
+
+    Args:
+        vehiculo_ids: IDs de los vehículos
+
+    Returns:
+        dict: {vehiculo_id: {estudiante_id (str): entrada}}
+    """
+    asignaciones = AsignacionVehiculo.objects.filter(vehiculo_id__in=vehiculo_ids).values(
+        'vehiculo_id', 'estudiante_id', 'tramo', 'hora', 'colegio')
+
+    por_vehiculo = defaultdict(lambda: defaultdict(dict))  # vehiculo -> estudiante -> {tramo: datos}
+    estudiante_ids = set()
+    for fila in asignaciones:
+        por_vehiculo[fila['vehiculo_id']][fila['estudiante_id']][fila['tramo']] = {
+            'hora': fila['hora'].strftime('%H:%M'),
+            'colegio': fila['colegio'],
+        }
+        estudiante_ids.add(fila['estudiante_id'])
+
+    estudiantes = {
+        est['id']: est for est in Estudiantes.objects.filter(id__in=estudiante_ids).values(
+            'id', 'nombre', 'apellido', 'grado')
+    }
+    tutores = defaultdict(list)
+    for tutor in Tutor_receptor.objects.filter(estudiante_id__in=estudiante_ids).order_by('id').values(
+            'id', 'estudiante_id', 'nombre', 'apellido', 'telefono', 'parentesco'):
+        tutores[tutor.pop('estudiante_id')].append(tutor)
+
+    resultado = {}
+    for vehiculo_id in vehiculo_ids:
+        entradas = {}
+        for estudiante_id, tramos in por_vehiculo.get(vehiculo_id, {}).items():
+            est = estudiantes[estudiante_id]
+            entradas[str(estudiante_id)] = {
+                'id': estudiante_id,
+                'nombre': est['nombre'],
+                'apellido': est['apellido'],
+                'grado': est['grado'],
+                'tramos': tramos,
+                'tutores': tutores.get(estudiante_id, []),
+            }
+        resultado[vehiculo_id] = entradas
+    return resultado
+
+
+def _documento(vehiculo_id, fecha, version, entradas):
+    """Documento completo del manifiesto listo para comprimir"""
+    return {
+        'formato': FORMATO_MANIFIESTO,
+        'tipo': 'completo',
+        'vehiculo': vehiculo_id,
+        'fecha': fecha.isoformat(),
+        'version': version,
+        'estudiantes': entradas,
+    }
+
+
+def _clave_cache(vehiculo_id, fecha, desde_version=None):
+    """Clave de caché del manifiesto (o del delta desde una versión)"""
+    clave = f'manifiesto:{vehiculo_id}:{fecha.isoformat()}'
+    return clave if desde_version is None else f'{clave}:desde:{desde_version}'
+
+
+def generar_manifiestos(fecha):
+    """
+    Genera (o regenera) el manifiesto de cada vehículo activo para una fecha.
+    Pensado para ejecutarse cada noche antes del día de servicio.
+
+    Args:
+        fecha: Día de servicio
+
+    Returns:
+        int: Número de manifiestos generados
+    """
+    vehiculo_ids = list(Vehiculo.objects.filter(activo=True).values_list('id', flat=True))
+    entradas_por_vehiculo = construir_entradas(vehiculo_ids)
+
+    with transaction.atomic():
+        # Los cambios del día anterior ya no sirven: se parte de la versión 1
+        ManifiestoDiario.objects.filter(fecha=fecha).delete()
+        ManifiestoDiario.objects.bulk_create([
+            ManifiestoDiario(
+                vehiculo_id=vehiculo_id, fecha=fecha, version=1,
+                contenido=comprimir(_documento(vehiculo_id, fecha, 1, entradas)),
+                huella=_huella(entradas))
+            for vehiculo_id, entradas in entradas_por_vehiculo.items()
+        ])
+
+        # Borrar manifiestos viejos para mantener la tabla pequeña
+        dias = getattr(settings, 'MANIFIESTOS_DIAS_RETENCION', 7)
+        ManifiestoDiario.objects.filter(fecha__lt=fecha - timedelta(days=dias)).delete()
+
+    for vehiculo_id in vehiculo_ids:
+        cache.delete(_clave_cache(vehiculo_id, fecha))
+    return len(vehiculo_ids)
+
+
+def actualizar_manifiestos(vehiculo_ids, fecha=None):
+    """
+    Actualiza los manifiestos ya generados cuando algo cambia durante el día.
+
+    Si las entradas de un vehículo cambiaron, se guarda una nueva versión con
+    el delta (estudiantes actualizados y eliminados) respecto a la anterior.
+
+    Args:
+        vehiculo_ids: IDs de los vehículos afectados
+        fecha: Día de servicio (por defecto hoy)
+
+    Returns:
+        int: Número de manifiestos que cambiaron de versión
+    """
+    fecha = fecha or timezone.localdate()
+    vehiculo_ids = set(ManifiestoDiario.objects.filter(
+        fecha=fecha, vehiculo_id__in=vehiculo_ids).values_list('vehiculo_id', flat=True))
+    if not vehiculo_ids:
+        return 0  # No hay manifiestos generados para ese día
+
+    entradas_por_vehiculo = construir_entradas(vehiculo_ids)
+    cambiados = 0
+
+    for vehiculo_id in vehiculo_ids:
+        entradas = entradas_por_vehiculo[vehiculo_id]
+        huella = _huella(entradas)
+        with transaction.atomic():
+            manifiesto = ManifiestoDiario.objects.select_for_update().get(vehiculo_id=vehiculo_id, fecha=fecha)
+            if manifiesto.huella == huella:
+                continue
+
+            anteriores = descomprimir(manifiesto.contenido)['estudiantes']
+            delta = {
+                'actualizados': {
+                    clave: entrada for clave, entrada in entradas.items()
+                    if anteriores.get(clave) != entrada
+                },
+                'eliminados': sorted(clave for clave in anteriores if clave not in entradas),
+            }
+
+            manifiesto.version += 1
+            manifiesto.contenido = comprimir(_documento(vehiculo_id, fecha, manifiesto.version, entradas))
+            manifiesto.huella = huella
+            manifiesto.save()
+            CambioManifiesto.objects.create(
+                manifiesto=manifiesto, version=manifiesto.version, contenido=comprimir(delta))
+
+        cache.delete(_clave_cache(vehiculo_id, fecha))
+        cambiados += 1
+
+    return cambiados
+
+
+# Lote de vehículos pendientes de la transacción en curso (por hilo)
+_pendientes = threading.local()
+
+
+def programar_actualizacion(vehiculo_ids):
+    """
+    Programa la actualización de los manifiestos de hoy al confirmar la transacción.
+
+    Los vehículos de una misma transacción se juntan en un solo lote, así un
+    formulario que cambia varios estudiantes regenera cada manifiesto una vez.
+
+    Args:
+        vehiculo_ids: IDs de los vehículos afectados
+    """
+    vehiculo_ids = set(vehiculo_ids)
+    if not vehiculo_ids:
+        return
+
+    conexion = transaction.get_connection()
+    lote = getattr(_pendientes, 'lote', None)
+    # El lote sigue vivo solo si su callback aún está registrado (no hubo rollback)
+    if lote is not None and conexion.in_atomic_block and any(
+            entrada[1] is lote['callback'] for entrada in conexion.run_on_commit):
+        lote['ids'] |= vehiculo_ids
+        return
+
+    lote = {'ids': vehiculo_ids}
+
+    def aplicar():
+        if getattr(_pendientes, 'lote', None) is lote:
+            _pendientes.lote = None
+        actualizar_manifiestos(lote['ids'])
+
+    lote['callback'] = aplicar
+    _pendientes.lote = lote
+    transaction.on_commit(aplicar)
+
+
+def obtener_manifiesto(vehiculo_id, fecha, desde_version=None):
+    """
+    Obtiene el manifiesto para descarga, desde la caché cuando es posible.
+
+    Si el cliente ya tiene una versión y existen todos los cambios desde ella,
+    se retorna solo el delta combinado; si no, el manifiesto completo.
+
+    Args:
+        vehiculo_id: ID del vehículo
+        fecha: Día de servicio
+        desde_version: Versión que ya tiene el cliente (opcional)
+
+    Returns:
+        tuple | None: (contenido gzip, versión, tipo) con tipo 'completo',
+                      'delta' o 'sin_cambios'; None si no hay manifiesto
+    """
+    clave = _clave_cache(vehiculo_id, fecha)
+    actual = cache.get(clave)
+    if actual is None:
+        fila = ManifiestoDiario.objects.filter(vehiculo_id=vehiculo_id, fecha=fecha).values(
+            'id', 'version', 'contenido').first()
+        if fila is None:
+            return None
+        actual = (fila['id'], fila['version'], bytes(fila['contenido']))
+        cache.set(clave, actual)
+
+    manifiesto_id, version, contenido = actual
+    if desde_version is None or desde_version > version or desde_version < 1:
+        return contenido, version, 'completo'
+    if desde_version == version:
+        return None, version, 'sin_cambios'
+
+    clave_delta = _clave_cache(vehiculo_id, fecha, desde_version)
+    delta = cache.get(clave_delta)
+    if delta is None or delta[0] != version:
+        cambios = list(CambioManifiesto.objects.filter(
+            manifiesto_id=manifiesto_id, version__gt=desde_version, version__lte=version).order_by('version').values_list(
+            'contenido', flat=True))
+        if len(cambios) != version - desde_version:
+            return contenido, version, 'completo'  # Faltan cambios: enviar todo
+
+        # Combinar los cambios en orden
+        actualizados, eliminados = {}, set()
+        for cambio in cambios:
+            datos = descomprimir(cambio)
+            for clave_est, entrada in datos['actualizados'].items():
+                actualizados[clave_est] = entrada
+                eliminados.discard(clave_est)
+            for clave_est in datos['eliminados']:
+                actualizados.pop(clave_est, None)
+                eliminados.add(clave_est)
+
+        delta = (version, comprimir({
+            'formato': FORMATO_MANIFIESTO,
+            'tipo': 'delta',
+            'vehiculo': vehiculo_id,
+            'fecha': fecha.isoformat(),
+            'desde_version': desde_version,
+            'version': version,
+            'actualizados': actualizados,
+            'eliminados': sorted(eliminados),
+        }))
+        cache.set(clave_delta, delta)
+
+    return delta[1], version, 'delta'
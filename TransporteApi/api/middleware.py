@@ -0,0 +1,336 @@
+# Middlewares propios de la API
+import gzip
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from . import perfilado_utils
+
+# brotli es opcional: sin él solo se ofrece gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Tipos de contenido que vale la pena comprimir
+TIPOS_COMPRIMIBLES = ('application/json', 'application/msgpack', 'application/javascript', 'text/')
+
+
+def codificaciones_aceptadas(cabecera):
+    """
+    Lee la cabecera Accept-Encoding y retorna las codificaciones con su peso (q).
+
+    Args:
+        cabecera: Valor de Accept-Encoding, por ejemplo 'gzip, br;q=0.9'
+
+    Returns:
+        dict: {codificacion: q} solo con las de q > 0
+    """
+    aceptadas = {}
+    for parte in cabecera.split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            aceptadas[nombre] = q
+    return aceptadas
+
+
+def elegir_codificacion(cabecera):
+    """
+    Elige la mejor compresión disponible según la cabecera Accept-Encoding.
+    Con el mismo peso se prefiere brotli (comprime más) sobre gzip.
+
+    Returns:
+        str | None: 'br', 'gzip' o None si no se acepta ninguna
+    """
+    aceptadas = codificaciones_aceptadas(cabecera)
+    comodin = aceptadas.get('*', 0)
+    candidatas = []
+    if brotli is not None:
+        candidatas.append((aceptadas.get('br', comodin), 1, 'br'))
+    candidatas.append((aceptadas.get('gzip', comodin), 0, 'gzip'))
+    q, _, codificacion = max(candidatas)
+    return codificacion if q > 0 else None
+
+
+def comprimir_contenido(contenido, codificacion):
+    """
+    Comprime el contenido con la codificación dada usando los niveles de settings.
+
+    Args:
+        contenido: bytes a comprimir
+        codificacion: 'br' o 'gzip'
+
+    Returns:
+        bytes: Contenido comprimido
+    """
+    if codificacion == 'br':
+        return brotli.compress(contenido, quality=getattr(settings, 'COMPRESION_CALIDAD_BROTLI', 5))
+    return gzip.compress(contenido, compresslevel=getattr(settings, 'COMPRESION_NIVEL_GZIP', 6), mtime=0)
+
+
+class CompresionMiddleware:
+    """
+    Comprime las respuestas con brotli o gzip según Accept-Encoding.
+
+    Solo comprime respuestas de tipos comprimibles a partir de
+    COMPRESION_TAMANO_MINIMO bytes: en respuestas pequeñas el costo de
+    comprimir no compensa los bytes ahorrados.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        # Aunque no se comprima, la respuesta depende de Accept-Encoding
+        if not response.streaming and not response.has_header('Content-Encoding'):
+            patch_vary_headers(response, ('Accept-Encoding',))
+        if not self._comprimible(response):
+            return response
+
+        codificacion = elegir_codificacion(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codificacion is None:
+            return response
+
+        comprimido = comprimir_contenido(response.content, codificacion)
+        if len(comprimido) >= len(response.content):
+            return response  # No se ganó nada
+
+        response.content = comprimido
+        response['Content-Length'] = str(len(comprimido))
+        response['Content-Encoding'] = codificacion
+
+        # El ETag fuerte deja de ser válido para el contenido comprimido
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    def _comprimible(self, response):
+        """Indica si la respuesta se puede y conviene comprimir"""
+        if response.streaming or response.has_header('Content-Encoding'):
+            return False
+        if response.status_code < 200 or response.status_code in (204, 304):
+            return False
+        tipo = response.get('Content-Type', '').lower()
+        if not tipo.startswith(TIPOS_COMPRIMIBLES):
+            return False
+        return len(response.content) >= getattr(settings, 'COMPRESION_TAMANO_MINIMO', 1024)
+
+
+# ============================================================================
+# CONTROL DE ADMISIÓN (DESCARTE DE CARGA POR PRIORIDAD)
+# ============================================================================
+
+# Métodos que solo leen datos
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+
+def clasificar_peticion(request):
+    """
+    Clase de ruta de una petición para el control de admisión.
+
+    Returns:
+        str | None: 'admin', 'auth', 'padre_escritura', 'padre_lectura'
+                    o None si la ruta no pasa por el control (fuera de /api/)
+    """
+    ruta = request.path_info
+    if not ruta.startswith('/api/'):
+        return None
+    if ruta.startswith('/api/admin/'):
+        return 'admin'
+    if request.method in METODOS_LECTURA:
+        return 'padre_lectura'
+    if ruta.startswith('/api/auth/'):
+        return 'auth'  # Registro, login y logout
+    return 'padre_escritura'
+
+
+class ControlAdmision:
+    """
+    Cuenta las peticiones en curso del proceso y decide si una nueva entra.
+
+    Cada clase de ruta puede ocupar hasta `limite` × capacidad peticiones en
+    curso; así las clases de baja prioridad dejan libre una reserva para las
+    de alta prioridad. Si no hay cupo, la petición espera hasta `espera`
+    segundos (con a lo sumo `cola` peticiones esperando); si aun así no
+    entra, se descarta.
+    """
+
+    def __init__(self, capacidad, clases):
+        """
+        Args:
+            capacidad: Peticiones simultáneas que atiende el proceso
+            clases: {clase: {'limite', 'espera', 'cola', 'reintentar'}}
+        """
+        self.capacidad = capacidad
+        self.clases = clases
+        self.condicion = threading.Condition()
+        self.en_curso = 0
+        self.metricas = {clase: self._metricas_vacias() for clase in clases}
+
+    @staticmethod
+    def _metricas_vacias():
+        return {'en_curso': 0, 'en_espera': 0, 'admitidas': 0, 'rechazadas': 0,
+                'espera_ms_total': 0.0, 'espera_ms_maxima': 0.0}
+
+    def cupo(self, clase):
+        """Peticiones en curso a partir de las cuales la clase ya no entra"""
+        return max(1, int(self.capacidad * self.clases[clase]['limite']))
+
+    def entrar(self, clase):
+        """
+        Intenta admitir una petición; bloquea mientras espera cupo.
+
+        Returns:
+            bool: True si se admitió (hay que llamar a salir() al terminar)
+        """
+        configuracion = self.clases[clase]
+        cupo = self.cupo(clase)
+        inicio = time.monotonic()
+        with self.condicion:
+            metricas = self.metricas[clase]
+            if self.en_curso >= cupo:
+                if metricas['en_espera'] >= configuracion['cola'] or configuracion['espera'] <= 0:
+                    metricas['rechazadas'] += 1
+                    return False
+
+                metricas['en_espera'] += 1
+                vence = inicio + configuracion['espera']
+                while self.en_curso >= cupo:
+                    restante = vence - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self.condicion.wait(restante)
+                metricas['en_espera'] -= 1
+
+                if self.en_curso >= cupo:
+                    metricas['rechazadas'] += 1
+                    return False
+
+            espera_ms = (time.monotonic() - inicio) * 1000
+            self.en_curso += 1
+            metricas['en_curso'] += 1
+            metricas['admitidas'] += 1
+            metricas['espera_ms_total'] += espera_ms
+            metricas['espera_ms_maxima'] = max(metricas['espera_ms_maxima'], espera_ms)
+            return True
+
+    def salir(self, clase):
+        """Libera el lugar de una petición admitida y despierta a las que esperan"""
+        with self.condicion:
+            self.en_curso -= 1
+            self.metricas[clase]['en_curso'] -= 1
+            self.condicion.notify_all()
+
+    def resumen(self):
+        """
+        Estado actual y contadores acumulados del proceso.
+
+        Returns:
+            dict: Capacidad, peticiones en curso y métricas por clase
+        """
+        with self.condicion:
+            clases = {}
+            for clase, metricas in self.metricas.items():
+                atendidas = metricas['admitidas'] + metricas['rechazadas']
+                clases[clase] = {
+                    **metricas,
+                    'cupo': self.cupo(clase),
+                    'espera_ms_promedio': round(metricas['espera_ms_total'] / metricas['admitidas'], 2)
+                    if metricas['admitidas'] else 0.0,
+                    'tasa_rechazo': round(metricas['rechazadas'] / atendidas, 4) if atendidas else 0.0,
+                }
+                clases[clase]['espera_ms_total'] = round(metricas['espera_ms_total'], 2)
+                clases[clase]['espera_ms_maxima'] = round(metricas['espera_ms_maxima'], 2)
+            return {'capacidad': self.capacidad, 'en_curso': self.en_curso, 'clases': clases}
+
+
+# Control del proceso (lo crea AdmisionMiddleware; None si está desactivado)
+control_admision = None
+
+
+class AdmisionMiddleware:
+    """
+    Control de admisión para picos de carga (por ejemplo en el periodo de
+    inscripciones). Con el proceso saturado, las clases de baja prioridad
+    (registro, envío de formularios) esperan o reciben 503 con Retry-After,
+    y el panel de administración y las lecturas de los padres siguen respondiendo.
+    """
+
+    def __init__(self, get_response):
+        global control_admision
+        if not getattr(settings, 'ADMISION_ACTIVA', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if control_admision is None:
+            control_admision = ControlAdmision(settings.ADMISION_MAX_EN_CURSO, settings.ADMISION_CLASES)
+        self.control = control_admision
+
+    def __call__(self, request):
+        clase = clasificar_peticion(request)
+        if clase is None:
+            return self.get_response(request)
+
+        if not self.control.entrar(clase):
+            response = JsonResponse(
+                {'error': 'El servidor está ocupado, intente de nuevo en unos segundos'}, status=503)
+            response['Retry-After'] = str(self.control.clases[clase]['reintentar'])
+            return response
+
+        try:
+            return self.get_response(request)
+        finally:
+            self.control.salir(clase)
+
+
+# ============================================================================
+# PERFILADOR BAJO DEMANDA
+# ============================================================================
+
+class PerfiladoMiddleware:
+    """
+    Registra las peticiones a las vistas de api/views.py mientras hay una
+    sesión de perfilado activa (ver perfilado_utils). Va al final de
+    MIDDLEWARE: las pilas empiezan aquí y terminan en la vista. Con el
+    perfilador apagado, process_view solo compara un reloj.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERFILADO_ACTIVO', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        perfilado_utils.perfilador.raiz = type(self).__call__.__code__
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            if getattr(request, '_perfilada', False):
+                perfilado_utils.perfilador.salir()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        perfilador = perfilado_utils.perfilador
+        if perfilador.sesion_activa() is None:
+            return None
+        # Las vistas de clase y las de @api_view guardan la clase en view_class
+        vista = getattr(view_func, 'view_class', view_func)
+        if vista.__module__ == 'api.views' and perfilador.entrar(vista.__name__):
+            request._perfilada = True
+        return None
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_rename_fecha_formulario_padres_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usuario',
+            name='role',
+            field=models.CharField(choices=[('admin', 'Administrador'), ('padre', 'Padre'), ('conductor', 'Conductor')], default='padre', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='Conductor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('apellido', models.CharField(max_length=100)),
+                ('cedula', models.CharField(max_length=13, unique=True)),
+                ('telefono', models.CharField(blank=True, max_length=13, null=True)),
+                ('licencia', models.CharField(blank=True, max_length=30, null=True)),
+                ('activo', models.BooleanField(default=True)),
+                ('usuario', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='conductor', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Vehiculo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('placa', models.CharField(max_length=10, unique=True)),
+                ('descripcion', models.CharField(blank=True, max_length=100, null=True)),
+                ('capacidad', models.PositiveIntegerField()),
+                ('activo', models.BooleanField(default=True)),
+                ('conductor', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vehiculo', to='api.conductor')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AsignacionVehiculo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tramo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida')], max_length=10)),
+                ('colegio', models.CharField(max_length=100)),
+                ('hora', models.TimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='asignaciones', to='api.estudiantes')),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='asignaciones', to='api.vehiculo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tramo', 'hora', 'vehiculo'], name='api_asignac_tramo_7b2c6a_idx')],
+                'constraints': [models.UniqueConstraint(fields=('estudiante', 'tramo'), name='asignacion_unica_por_tramo')],
+            },
+        ),
+    ]
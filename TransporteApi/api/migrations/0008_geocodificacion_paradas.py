@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_flota_vehiculos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Parada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('latitud', models.FloatField()),
+                ('longitud', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tutor_receptor',
+            name='direccion_geocodificada',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='tutor_receptor',
+            name='latitud',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tutor_receptor',
+            name='longitud',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_geocodificacion_paradas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ManifiestoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('contenido', models.BinaryField()),
+                ('huella', models.CharField(max_length=64)),
+                ('generado_en', models.DateTimeField(auto_now=True)),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='manifiestos', to='api.vehiculo')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CambioManifiesto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('contenido', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('manifiesto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cambios', to='api.manifiestodiario')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='manifiestodiario',
+            constraint=models.UniqueConstraint(fields=('vehiculo', 'fecha'), name='manifiesto_unico_por_dia'),
+        ),
+        migrations.AddConstraint(
+            model_name='cambiomanifiesto',
+            constraint=models.UniqueConstraint(fields=('manifiesto', 'version'), name='cambio_unico_por_version'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_manifiestos_diarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TareaProgramada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('proxima_ejecucion', models.DateTimeField()),
+                ('bloqueado_por', models.CharField(blank=True, max_length=150, null=True)),
+                ('bloqueado_hasta', models.DateTimeField(blank=True, null=True)),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EjecucionTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nodo', models.CharField(max_length=150)),
+                ('inicio', models.DateTimeField()),
+                ('fin', models.DateTimeField()),
+                ('duracion_ms', models.PositiveIntegerField()),
+                ('estado', models.CharField(choices=[('exito', 'Éxito'), ('error', 'Error')], max_length=10)),
+                ('mensaje', models.TextField(blank=True, default='')),
+                ('tarea', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ejecuciones', to='api.tareaprogramada')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tarea', '-inicio'], name='api_ejecuci_tarea_i_8b8d5d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_planificador_tareas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveDuplicado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('familia', 'Familia'), ('estudiante', 'Estudiante')], max_length=10)),
+                ('clave', models.CharField(max_length=150)),
+                ('estudiante', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='claves_duplicado', to='api.estudiantes')),
+                ('padre', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='claves_duplicado', to='api.padres')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo', 'clave'], name='api_clavedu_tipo_878475_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_claves_duplicado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='estudiantes',
+            index=models.Index(fields=['Colegio'], name='api_estudia_Colegio_4e275e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estudiantes',
+            index=models.Index(fields=['grado'], name='api_estudia_grado_d3e51f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='padres',
+            index=models.Index(fields=['aprobado', 'created_at'], name='api_padres_aprobad_cb9352_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='padres',
+            index=models.Index(fields=['created_at'], name='api_padres_created_b265df_idx'),
+        ),
+    ]
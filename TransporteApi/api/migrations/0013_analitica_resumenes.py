@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_indices_listados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='padres',
+            name='fecha_aprobacion',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ResumenAnalitico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metrica', models.CharField(choices=[('inscripciones', 'Inscripciones por colegio y semana'), ('aprobaciones', 'Aprobaciones por semana'), ('ocupacion_franja', 'Estudiantes por franja y día')], max_length=20)),
+                ('periodo', models.DateField()),
+                ('dimension', models.CharField(blank=True, default='', max_length=100)),
+                ('valor', models.IntegerField(default=0)),
+                ('suma', models.BigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metrica', 'periodo', 'dimension'), name='resumen_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:25
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_analitica_resumenes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespuestaIdempotente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=255, unique=True)),
+                ('huella', models.CharField(max_length=64)),
+                ('estado', models.CharField(choices=[('en_proceso', 'En proceso'), ('completa', 'Completa')], default='en_proceso', max_length=10)),
+                ('codigo', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('datos', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expira', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expira'], name='api_respues_expira_c0d783_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:29
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_cola_correos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DestinoEventos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('tipo', models.CharField(choices=[('webhook', 'Webhook'), ('archivo', 'Archivo')], max_length=10)),
+                ('destino', models.CharField(max_length=500)),
+                ('secreto', models.CharField(blank=True, default='', max_length=100)),
+                ('tipos_evento', models.CharField(blank=True, default='', max_length=300)),
+                ('activo', models.BooleanField(default=True)),
+                ('ultimo_evento', models.BigIntegerField(default=0)),
+                ('fallos', models.PositiveSmallIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EventoDominio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('padre.aprobado', 'Padre aprobado'), ('padre.desaprobado', 'Padre desaprobado'), ('estudiante.creado', 'Estudiante creado'), ('estudiante.actualizado', 'Estudiante actualizado'), ('estudiante.eliminado', 'Estudiante eliminado'), ('tutor.creado', 'Tutor creado'), ('tutor.actualizado', 'Tutor actualizado'), ('tutor.eliminado', 'Tutor eliminado'), ('usuario.eliminado', 'Usuario eliminado')], max_length=30)),
+                ('entidad_id', models.IntegerField()),
+                ('datos', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='api_eventod_created_4e3e2f_idx')],
+            },
+        ),
+    ]
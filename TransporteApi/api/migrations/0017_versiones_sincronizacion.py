@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_eventos_salida'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Lapida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('padres', 'Padres'), ('estudiantes', 'Estudiantes'), ('tutores', 'Tutores')], max_length=20)),
+                ('objeto_id', models.IntegerField()),
+                ('usuario_id', models.IntegerField(blank=True, null=True)),
+                ('version', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='estudiantes',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='padres',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tutor_receptor',
+            name='version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='estudiantes',
+            index=models.Index(fields=['version'], name='api_estudia_version_81a60a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='padres',
+            index=models.Index(fields=['version'], name='api_padres_version_d6a4a8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutor_receptor',
+            index=models.Index(fields=['version'], name='api_tutor_r_version_dd99e0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lapida',
+            index=models.Index(fields=['version'], name='api_lapida_version_0399bd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lapida',
+            index=models.Index(fields=['usuario_id', 'version'], name='api_lapida_usuario_9e24dc_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_versiones_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarioColegio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('colegio', models.CharField(max_length=100, unique=True)),
+                ('dias_servicio', models.PositiveSmallIntegerField(default=31)),
+                ('inicio_periodo', models.DateField(blank=True, null=True)),
+                ('fin_periodo', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExcepcionCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('feriado', 'Feriado'), ('medio_dia', 'Medio día'), ('examenes', 'Exámenes')], max_length=10)),
+                ('desde', models.DateField()),
+                ('hasta', models.DateField()),
+                ('hora_entrada', models.TimeField(blank=True, null=True)),
+                ('hora_salida', models.TimeField(blank=True, null=True)),
+                ('descripcion', models.CharField(blank=True, default='', max_length=200)),
+                ('calendario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='excepciones', to='api.calendariocolegio')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['calendario', 'hasta'], name='api_excepci_calenda_48035d_idx')],
+            },
+        ),
+    ]
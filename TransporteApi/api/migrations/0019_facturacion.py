@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:41
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_calendario_colegios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorridaFacturacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField(unique=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('completa', 'Completa')], default='pendiente', max_length=10)),
+                ('ultimo_padre', models.IntegerField(default=0)),
+                ('facturas', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sin_tarifa', models.PositiveIntegerField(default=0)),
+                ('inicio', models.DateTimeField(blank=True, null=True)),
+                ('fin', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TarifaTransporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('colegio', models.CharField(blank=True, default='', max_length=100)),
+                ('tramo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida')], max_length=10)),
+                ('hora_desde', models.TimeField(blank=True, null=True)),
+                ('hora_hasta', models.TimeField(blank=True, null=True)),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Factura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField()),
+                ('nombre', models.CharField(max_length=200)),
+                ('email', models.EmailField(blank=True, default='', max_length=254)),
+                ('estudiantes', models.PositiveSmallIntegerField()),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('descuento', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('detalle', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('pagada', 'Pagada'), ('anulada', 'Anulada')], default='pendiente', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('padre', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='facturas', to='api.padres')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['periodo', 'estado'], name='api_factura_periodo_4977c0_idx')],
+                'constraints': [models.UniqueConstraint(fields=('padre', 'periodo'), name='factura_unica_por_mes')],
+            },
+        ),
+    ]
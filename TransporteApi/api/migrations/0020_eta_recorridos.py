@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_facturacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoRecorrido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tramo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida')], max_length=10)),
+                ('hora', models.TimeField()),
+                ('tipo', models.CharField(choices=[('inicio', 'Inicio del recorrido'), ('parada', 'Parada de un estudiante'), ('fin', 'Fin del recorrido')], max_length=10)),
+                ('estudiante_id', models.IntegerField(blank=True, null=True)),
+                ('momento', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_recorrido', to='api.vehiculo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vehiculo', 'tramo', 'hora', 'momento'], name='api_eventor_vehicul_c57c55_idx'), models.Index(fields=['created_at'], name='api_eventor_created_734b1c_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ModeloRecorrido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tramo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida')], max_length=10)),
+                ('hora', models.TimeField()),
+                ('paradas', models.JSONField(default=list)),
+                ('datos', models.BinaryField(default=bytes)),
+                ('inicio_en_curso', models.DateTimeField(blank=True, null=True)),
+                ('ultima_parada', models.IntegerField(blank=True, null=True)),
+                ('ultimo_momento', models.DateTimeField(blank=True, null=True)),
+                ('visitadas', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='modelos_recorrido', to='api.vehiculo')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('vehiculo', 'tramo', 'hora'), name='modelo_unico_por_ruta')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_eta_recorridos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UbicacionColegio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('colegio', models.CharField(max_length=100, unique=True)),
+                ('latitud', models.FloatField()),
+                ('longitud', models.FloatField()),
+                ('radio_metros', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='eventodominio',
+            name='tipo',
+            field=models.CharField(choices=[('padre.aprobado', 'Padre aprobado'), ('padre.desaprobado', 'Padre desaprobado'), ('estudiante.creado', 'Estudiante creado'), ('estudiante.actualizado', 'Estudiante actualizado'), ('estudiante.eliminado', 'Estudiante eliminado'), ('tutor.creado', 'Tutor creado'), ('tutor.actualizado', 'Tutor actualizado'), ('tutor.eliminado', 'Tutor eliminado'), ('usuario.eliminado', 'Usuario eliminado'), ('vehiculo.geocerca', 'Vehículo entró o salió de una geocerca')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='AvisoPadre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tramo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida')], max_length=10)),
+                ('tipo', models.CharField(choices=[('cerca', 'Vehículo cerca'), ('llegada', 'Vehículo llegó'), ('salida', 'Vehículo salió')], max_length=10)),
+                ('lugar', models.CharField(choices=[('parada', 'Parada'), ('colegio', 'Colegio')], max_length=10)),
+                ('nombre_lugar', models.CharField(max_length=100)),
+                ('distancia_metros', models.PositiveIntegerField()),
+                ('momento', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('padre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avisos', to='api.padres')),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avisos', to='api.vehiculo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['padre', 'id'], name='api_avisopa_padre_i_bd9975_idx'), models.Index(fields=['created_at'], name='api_avisopa_created_817b50_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:11
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_simulaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroAuditoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField()),
+                ('momento', models.DateTimeField()),
+                ('actor', models.IntegerField(blank=True, null=True)),
+                ('actor_email', models.CharField(blank=True, default='', max_length=254)),
+                ('accion', models.CharField(choices=[('creado', 'Creado'), ('actualizado', 'Actualizado'), ('eliminado', 'Eliminado'), ('aprobado', 'Aprobado'), ('desaprobado', 'Desaprobado')], max_length=12)),
+                ('objetivo_tipo', models.CharField(max_length=20)),
+                ('objetivo_id', models.IntegerField()),
+                ('antes', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('despues', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['periodo', 'id'], name='api_registr_periodo_bbae14_idx'), models.Index(fields=['actor', 'id'], name='api_registr_actor_c4f8ef_idx'), models.Index(fields=['objetivo_tipo', 'objetivo_id', 'id'], name='api_registr_objetiv_8563da_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_auditoria'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registroauditoria',
+            name='accion',
+            field=models.CharField(choices=[('creado', 'Creado'), ('actualizado', 'Actualizado'), ('eliminado', 'Eliminado'), ('aprobado', 'Aprobado'), ('desaprobado', 'Desaprobado'), ('archivado', 'Archivado'), ('restaurado', 'Restaurado')], max_length=12),
+        ),
+        migrations.CreateModel(
+            name='FamiliaArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('padre_original', models.IntegerField()),
+                ('cedula', models.CharField(max_length=13)),
+                ('email', models.CharField(blank=True, default='', max_length=254)),
+                ('motivo', models.CharField(choices=[('eliminada', 'Eliminada por un administrador'), ('vencida', 'Formulario vencido sin aprobar')], max_length=10)),
+                ('estudiantes', models.PositiveIntegerField(default=0)),
+                ('datos', models.BinaryField()),
+                ('archivada_en', models.DateTimeField(auto_now_add=True)),
+                ('restaurada_en', models.DateTimeField(blank=True, null=True)),
+                ('restaurada_como', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cedula'], name='api_familia_cedula_0d824c_idx'), models.Index(fields=['email'], name='api_familia_email_e08d09_idx'), models.Index(fields=['archivada_en'], name='api_familia_archiva_89d0aa_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_archivo_familias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='destinoeventos',
+            name='huecos',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_huecos_destinos_eventos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lapida',
+            name='vehiculo_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lapida',
+            index=models.Index(fields=['vehiculo_id', 'version'], name='api_lapida_vehicul_5a8d6a_idx'),
+        ),
+    ]
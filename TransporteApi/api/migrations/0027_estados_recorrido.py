@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_lapidas_por_vehiculo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoRecorrido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tramo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida')], max_length=10)),
+                ('hora', models.TimeField()),
+                ('fecha', models.DateField()),
+                ('ultimo_ping', models.DateTimeField(blank=True, null=True)),
+                ('geocercas', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vehiculo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estados_recorrido', to='api.vehiculo')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha'], name='api_estador_fecha_6ba70f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vehiculo', 'tramo', 'hora', 'fecha'), name='estado_unico_por_recorrido')],
+            },
+        ),
+    ]
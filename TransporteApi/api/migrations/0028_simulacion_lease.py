@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_estados_recorrido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulacionplan',
+            name='bloqueado_hasta',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+import json
+import zlib
+
+from django.db import migrations
+
+
+# Copia de archivo_utils.CAMPOS_USUARIO al momento de la migración
+CAMPOS_USUARIO = (
+    'email', 'username', 'first_name', 'last_name', 'nombre', 'apellido', 'telefono', 'role',
+    'email_verificado', 'aprobado', 'is_active', 'date_joined', 'fecha_registro',
+)
+
+
+def solo_perfil(apps, schema_editor):
+    """Quita la contraseña y los tokens de las familias archivadas en el formato 1"""
+    FamiliaArchivada = apps.get_model('api', 'FamiliaArchivada')
+    for archivada in FamiliaArchivada.objects.only('id', 'datos').iterator(chunk_size=500):
+        datos = json.loads(zlib.decompress(bytes(archivada.datos)).decode('utf-8'))
+        if datos.get('formato') != 1:
+            continue
+        if datos['usuario']:
+            perfil = {c: v for c, v in datos['usuario'].items() if c in CAMPOS_USUARIO}
+            datos['usuario'] = {**perfil, 'grupos': [], 'permisos': []}
+        datos['formato'] = 2
+        texto = json.dumps(datos, ensure_ascii=False, separators=(',', ':'))
+        FamiliaArchivada.objects.filter(pk=archivada.pk).update(datos=zlib.compress(texto.encode('utf-8'), 6))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_simulacion_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(solo_perfil, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_archivo_solo_perfil'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SesionPerfilado',
+            fields=[
+                ('id', models.CharField(max_length=12, primary_key=True, serialize=False)),
+                ('vista', models.CharField(blank=True, max_length=100, null=True)),
+                ('peticiones', models.PositiveIntegerField(blank=True, null=True)),
+                ('restantes', models.IntegerField(blank=True, null=True)),
+                ('intervalo_ms', models.PositiveIntegerField()),
+                ('inicio', models.DateTimeField()),
+                ('hasta', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['inicio'], name='api_sesionp_inicio_09bf80_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VolcadoPerfilado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nodo', models.CharField(max_length=150)),
+                ('pilas', models.JSONField(default=dict)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('sesion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='volcados', to='api.sesionperfilado')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sesion', 'nodo'), name='volcado_unico_por_nodo')],
+            },
+        ),
+    ]
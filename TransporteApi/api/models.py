@@ -1,5 +1,6 @@
 # Importaciones necesarias para Django
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder  # Para guardar respuestas con fechas en JSONField
 from django.contrib.auth.models import AbstractUser  # Modelo base de usuario de Django
 from django.contrib.auth.base_user import BaseUserManager  # Manager personalizado para usuarios
 
@@ -67,6 +68,7 @@ class Usuario(AbstractUser):
     ROLE_CHOICES = (
         ('admin', 'Administrador'),
         ('padre', 'Padre'),
+        ('conductor', 'Conductor'),
     )
 
     # Campo de email único (no puede repetirse)
@@ -80,7 +82,7 @@ class Usuario(AbstractUser):
     apellido = models.CharField(max_length=100, blank=True, null=True)
     telefono = models.CharField(max_length=13, blank=True, null=True)
 
-    # Campo para el rol del usuario (admin o padre)
+    # Campo para el rol del usuario (admin, padre o conductor)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='padre')
 
     # Fecha de registro automática (se establece al crear el usuario)
@@ -120,9 +122,19 @@ class Padres(models.Model):
     
     # Campo para aprobar el formulario del padre
     aprobado = models.BooleanField(default=False)
+    fecha_aprobacion = models.DateTimeField(blank=True, null=True)  # Cuándo se aprobó (latencia de aprobación)
     
     created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
-   
+    version = models.BigIntegerField(default=0)  # Versión del último cambio (sincronización)
+
+    class Meta:
+        indexes = [
+            # Filtros y orden del listado de formularios (aprobado y fecha)
+            models.Index(fields=['aprobado', 'created_at']),
+            models.Index(fields=['created_at']),
+            # Cambios desde una versión (sincronización incremental)
+            models.Index(fields=['version']),
+        ]
 
     def __str__(self):
         """Representación en string del padre"""
@@ -156,6 +168,16 @@ class Estudiantes(models.Model):
     Colegio = models.CharField(max_length=100, blank=True, null=True)  # Opcional
     H_entrada = models.TimeField(blank=True, null=True)  # Hora de entrada, opcional
     H_salida = models.TimeField(blank=True, null=True)   # Hora de salida, opcional
+    version = models.BigIntegerField(default=0)  # Versión del último cambio (sincronización)
+
+    class Meta:
+        indexes = [
+            # Filtros del listado de estudiantes y formularios
+            models.Index(fields=['Colegio']),
+            models.Index(fields=['grado']),
+            # Cambios desde una versión (sincronización incremental)
+            models.Index(fields=['version']),
+        ]
 
     def __str__(self):
         """Representación en string del estudiante"""
@@ -179,13 +201,951 @@ class Tutor_receptor(models.Model):
     telefono = models.CharField(max_length=13, blank=True, null=True)    # Opcional
     parentesco = models.CharField(max_length=50, blank=True, null=True)  # Opcional
 
+    # Coordenadas de la dirección (se calculan con el gazetteer local)
+    latitud = models.FloatField(blank=True, null=True)
+    longitud = models.FloatField(blank=True, null=True)
+    # Dirección usada para calcular las coordenadas (detecta cambios de dirección)
+    direccion_geocodificada = models.CharField(max_length=255, blank=True, null=True)
+
     # Relación con el modelo Estudiantes (muchos tutores pueden recibir al mismo estudiante)
     estudiante = models.ForeignKey(
         Estudiantes,
         on_delete=models.CASCADE,  # Si se elimina el estudiante, se elimina el tutor
         related_name='tutores_receptores'  # Permite acceder a los tutores desde el estudiante
     )
+    version = models.BigIntegerField(default=0)  # Versión del último cambio (sincronización)
+
+    class Meta:
+        indexes = [
+            # Cambios desde una versión (sincronización incremental)
+            models.Index(fields=['version']),
+        ]
 
     def __str__(self):
         """Representación en string del tutor receptor"""
-        return f"{self.nombre} {self.apellido} - {self.parentesco} de {self.estudiante.nombre} {self.estudiante.apellido}"
\ No newline at end of file
+        return f"{self.nombre} {self.apellido} - {self.parentesco} de {self.estudiante.nombre} {self.estudiante.apellido}"
+
+
+class Conductor(models.Model):
+    """
+    Modelo para almacenar información de los conductores de la flota.
+    Puede estar vinculado a un usuario con rol conductor para acceder a la API.
+    """
+
+    usuario = models.OneToOneField(Usuario, on_delete=models.SET_NULL, related_name='conductor', null=True, blank=True)
+
+    # Información personal del conductor
+    nombre = models.CharField(max_length=100)
+    apellido = models.CharField(max_length=100)
+    cedula = models.CharField(max_length=13, unique=True)  # Cédula única
+    telefono = models.CharField(max_length=13, blank=True, null=True)  # Opcional
+    licencia = models.CharField(max_length=30, blank=True, null=True)  # Número de licencia, opcional
+
+    activo = models.BooleanField(default=True)  # Si el conductor está disponible
+
+    def __str__(self):
+        """Representación en string del conductor"""
+        return f"{self.nombre} {self.apellido}"
+
+
+class Vehiculo(models.Model):
+    """
+    Modelo para almacenar los vehículos (furgonetas/buses) de la flota.
+    La capacidad indica cuántos asientos hay disponibles para estudiantes.
+    """
+
+    placa = models.CharField(max_length=10, unique=True)  # Placa única del vehículo
+    descripcion = models.CharField(max_length=100, blank=True, null=True)  # Marca/modelo, opcional
+    capacidad = models.PositiveIntegerField()  # Número de asientos para estudiantes
+
+    # Conductor asignado (un conductor maneja un vehículo)
+    conductor = models.OneToOneField(
+        Conductor,
+        on_delete=models.SET_NULL,  # Si se elimina el conductor, el vehículo queda sin conductor
+        related_name='vehiculo',
+        null=True,
+        blank=True
+    )
+
+    activo = models.BooleanField(default=True)  # Si el vehículo está en servicio
+
+    def __str__(self):
+        """Representación en string del vehículo"""
+        return f"{self.placa} ({self.capacidad} asientos)"
+
+
+class AsignacionVehiculo(models.Model):
+    """
+    Modelo que asigna el asiento de un estudiante en un vehículo para un tramo.
+    Cada combinación (tramo, hora) es una franja: un vehículo solo puede servir
+    a un colegio por franja y nunca más estudiantes que su capacidad.
+    """
+
+    TRAMO_CHOICES = (
+        ('entrada', 'Entrada'),  # Viaje de la casa al colegio (H_entrada)
+        ('salida', 'Salida'),    # Viaje del colegio a la casa (H_salida)
+    )
+
+    estudiante = models.ForeignKey(
+        Estudiantes,
+        on_delete=models.CASCADE,  # Si se elimina el estudiante, se libera el asiento
+        related_name='asignaciones'
+    )
+    vehiculo = models.ForeignKey(
+        Vehiculo,
+        on_delete=models.CASCADE,  # Si se elimina el vehículo, se eliminan sus asignaciones
+        related_name='asignaciones'
+    )
+
+    tramo = models.CharField(max_length=10, choices=TRAMO_CHOICES)
+    colegio = models.CharField(max_length=100)  # Copia de Estudiantes.Colegio al asignar
+    hora = models.TimeField()  # Copia de H_entrada o H_salida según el tramo
+
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    class Meta:
+        constraints = [
+            # Un estudiante tiene un solo asiento por tramo
+            models.UniqueConstraint(fields=['estudiante', 'tramo'], name='asignacion_unica_por_tramo'),
+        ]
+        indexes = [
+            # Ocupación de una franja (tramo, hora) por vehículo
+            models.Index(fields=['tramo', 'hora', 'vehiculo']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la asignación"""
+        return f"{self.estudiante_id} -> {self.vehiculo_id} ({self.tramo} {self.hora})"
+
+
+class Parada(models.Model):
+    """
+    Modelo para las paradas compartidas donde se recoge a varias familias.
+    """
+
+    nombre = models.CharField(max_length=100)
+    latitud = models.FloatField()
+    longitud = models.FloatField()
+
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    def __str__(self):
+        """Representación en string de la parada"""
+        return f"{self.nombre} ({self.latitud:.5f}, {self.longitud:.5f})"
+
+
+class ManifiestoDiario(models.Model):
+    """
+    Modelo para el manifiesto precalculado de un vehículo en un día.
+    Contiene los estudiantes, colegios, horarios y tutores autorizados del recorrido,
+    guardado como JSON comprimido con gzip listo para descargar.
+    """
+
+    vehiculo = models.ForeignKey(
+        Vehiculo,
+        on_delete=models.CASCADE,  # Si se elimina el vehículo, se eliminan sus manifiestos
+        related_name='manifiestos'
+    )
+    fecha = models.DateField()  # Día de servicio del manifiesto
+
+    version = models.PositiveIntegerField(default=1)  # Aumenta con cada cambio durante el día
+    contenido = models.BinaryField()  # Manifiesto completo (JSON + gzip)
+    huella = models.CharField(max_length=64)  # SHA-256 de las entradas, para detectar cambios
+
+    generado_en = models.DateTimeField(auto_now=True)  # Última vez que se generó
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vehiculo', 'fecha'], name='manifiesto_unico_por_dia'),
+        ]
+
+    def __str__(self):
+        """Representación en string del manifiesto"""
+        return f"Manifiesto {self.vehiculo_id} {self.fecha} v{self.version}"
+
+
+class CambioManifiesto(models.Model):
+    """
+    Modelo para los cambios (deltas) de un manifiesto durante el día.
+    Cada versión guarda solo los estudiantes actualizados y los eliminados.
+    """
+
+    manifiesto = models.ForeignKey(
+        ManifiestoDiario,
+        on_delete=models.CASCADE,  # Si se elimina el manifiesto, se eliminan sus cambios
+        related_name='cambios'
+    )
+    version = models.PositiveIntegerField()  # Versión a la que lleva este cambio
+    contenido = models.BinaryField()  # Delta (JSON + gzip)
+
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['manifiesto', 'version'], name='cambio_unico_por_version'),
+        ]
+
+    def __str__(self):
+        """Representación en string del cambio"""
+        return f"Cambio {self.manifiesto_id} v{self.version}"
+
+
+class TareaProgramada(models.Model):
+    """
+    Modelo para las tareas periódicas registradas en el planificador.
+    También funciona como bloqueo (lease): solo el nodo que logra marcar
+    `bloqueado_hasta` ejecuta la tarea, aunque haya varios nodos corriendo.
+    """
+
+    nombre = models.CharField(max_length=100, unique=True)  # Nombre con el que se registró la tarea
+    proxima_ejecucion = models.DateTimeField()  # Cuándo debe correr la próxima vez
+
+    # Lease: nodo que está ejecutando la tarea y hasta cuándo es válido el bloqueo
+    bloqueado_por = models.CharField(max_length=150, blank=True, null=True)
+    bloqueado_hasta = models.DateTimeField(blank=True, null=True)
+
+    ultima_ejecucion = models.DateTimeField(blank=True, null=True)  # Inicio de la última ejecución
+
+    def __str__(self):
+        """Representación en string de la tarea"""
+        return self.nombre
+
+
+class EjecucionTarea(models.Model):
+    """
+    Modelo para el historial de ejecuciones de las tareas programadas.
+    """
+
+    ESTADO_CHOICES = (
+        ('exito', 'Éxito'),
+        ('error', 'Error'),
+    )
+
+    tarea = models.ForeignKey(
+        TareaProgramada,
+        on_delete=models.CASCADE,  # Si se elimina la tarea, se elimina su historial
+        related_name='ejecuciones'
+    )
+    nodo = models.CharField(max_length=150)  # Nodo que ejecutó la tarea (host:pid)
+    inicio = models.DateTimeField()
+    fin = models.DateTimeField()
+    duracion_ms = models.PositiveIntegerField()  # Duración en milisegundos
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES)
+    mensaje = models.TextField(blank=True, default='')  # Salida o error de la tarea
+
+    class Meta:
+        indexes = [
+            # Historial de una tarea, del más reciente al más antiguo
+            models.Index(fields=['tarea', '-inicio']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la ejecución"""
+        return f"{self.tarea_id} {self.inicio} ({self.estado})"
+
+
+class ClaveDuplicado(models.Model):
+    """
+    Índice de claves de bloqueo para detectar familias y estudiantes duplicados.
+    Dos registros con la misma clave son candidatos a duplicado; así solo se
+    comparan registros del mismo bloque y no todos contra todos.
+    """
+
+    TIPO_CHOICES = (
+        ('familia', 'Familia'),        # Claves de Padres (teléfono, cédula)
+        ('estudiante', 'Estudiante'),  # Claves de Estudiantes (apellido + fecha de nacimiento)
+    )
+
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    clave = models.CharField(max_length=150)  # Clave de bloqueo normalizada
+
+    # Registro al que pertenece la clave (solo uno según el tipo)
+    padre = models.ForeignKey(Padres, on_delete=models.CASCADE, related_name='claves_duplicado', null=True, blank=True)
+    estudiante = models.ForeignKey(Estudiantes, on_delete=models.CASCADE, related_name='claves_duplicado', null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Búsqueda de candidatos por clave
+            models.Index(fields=['tipo', 'clave']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la clave"""
+        return f"{self.tipo}:{self.clave}"
+
+
+class ResumenAnalitico(models.Model):
+    """
+    Tabla de resúmenes (rollups) para las gráficas del panel de administración.
+    Se actualiza al escribir (sumando o restando) y se recalcula cada noche,
+    así las consultas de tendencias no recorren las tablas completas.
+    """
+
+    METRICA_CHOICES = (
+        ('inscripciones', 'Inscripciones por colegio y semana'),  # valor: estudiantes
+        ('aprobaciones', 'Aprobaciones por semana'),              # valor: aprobados, suma: segundos de espera
+        ('ocupacion_franja', 'Estudiantes por franja y día'),     # valor: estudiantes con asiento
+    )
+
+    metrica = models.CharField(max_length=20, choices=METRICA_CHOICES)
+    periodo = models.DateField()  # Lunes de la semana o día del resumen
+    dimension = models.CharField(max_length=100, blank=True, default='')  # Colegio o franja ('entrada 07:00')
+    valor = models.IntegerField(default=0)  # Conteo
+    suma = models.BigIntegerField(default=0)  # Suma auxiliar (por ejemplo segundos para promedios)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['metrica', 'periodo', 'dimension'], name='resumen_unico'),
+        ]
+
+    def __str__(self):
+        """Representación en string del resumen"""
+        return f"{self.metrica} {self.periodo} {self.dimension}: {self.valor}"
+
+
+class RespuestaIdempotente(models.Model):
+    """
+    Respuesta guardada de una petición con cabecera Idempotency-Key.
+    Un reintento con la misma clave recibe esta respuesta sin repetir el
+    trabajo (escrituras en la base de datos ni envío de emails).
+    """
+
+    ESTADO_CHOICES = (
+        ('en_proceso', 'En proceso'),  # La petición original aún no termina
+        ('completa', 'Completa'),      # Respuesta lista para repetir
+    )
+
+    clave = models.CharField(max_length=255, unique=True)  # Ruta + usuario + Idempotency-Key
+    huella = models.CharField(max_length=64)  # SHA-256 del cuerpo de la petición original
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='en_proceso')
+    codigo = models.PositiveSmallIntegerField(null=True, blank=True)  # Código HTTP de la respuesta
+    datos = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)  # Datos de la respuesta
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+    expira = models.DateTimeField()  # Después de esta fecha la clave se puede reutilizar
+
+    class Meta:
+        indexes = [
+            # Limpieza de claves vencidas
+            models.Index(fields=['expira']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la respuesta guardada"""
+        return f"{self.clave} ({self.estado})"
+
+
+class CorreoPendiente(models.Model):
+    """
+    Cola de emails por enviar. Las vistas solo encolan (una inserción) y el
+    planificador los envía en segundo plano, reintentando los que fallan.
+    """
+
+    ESTADO_CHOICES = (
+        ('pendiente', 'Pendiente'),
+        ('enviado', 'Enviado'),
+        ('error', 'Error'),  # Se agotaron los reintentos
+    )
+
+    destinatario = models.EmailField()
+    asunto = models.CharField(max_length=255)
+    contenido_html = models.TextField()
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    proximo_intento = models.DateTimeField()  # No se intenta antes de esta fecha
+    ultimo_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+    enviado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Búsqueda de los correos listos para enviar
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+
+    def __str__(self):
+        """Representación en string del correo"""
+        return f"{self.destinatario}: {self.asunto} ({self.estado})"
+
+
+class EventoDominio(models.Model):
+    """
+    Bandeja de salida (outbox) de eventos para sistemas externos. Cada evento
+    se guarda en la misma transacción que el cambio que lo produjo, así no se
+    pierde un evento de un cambio confirmado ni se publica uno revertido.
+    """
+
+    TIPO_CHOICES = (
+        ('padre.aprobado', 'Padre aprobado'),
+        ('padre.desaprobado', 'Padre desaprobado'),
+        ('estudiante.creado', 'Estudiante creado'),
+        ('estudiante.actualizado', 'Estudiante actualizado'),
+        ('estudiante.eliminado', 'Estudiante eliminado'),
+        ('tutor.creado', 'Tutor creado'),
+        ('tutor.actualizado', 'Tutor actualizado'),
+        ('tutor.eliminado', 'Tutor eliminado'),
+        ('usuario.eliminado', 'Usuario eliminado'),
+        ('vehiculo.geocerca', 'Vehículo entró o salió de una geocerca'),
+    )
+
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    entidad_id = models.IntegerField()  # ID del padre, estudiante, tutor o usuario
+    datos = models.JSONField(default=dict, encoder=DjangoJSONEncoder)  # Estado de la entidad tras el cambio
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    class Meta:
+        indexes = [
+            # Limpieza de eventos ya entregados
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        """Representación en string del evento"""
+        return f"{self.id} {self.tipo} ({self.entidad_id})"
+
+
+class DestinoEventos(models.Model):
+    """
+    Destino registrado que recibe los eventos en lotes: un webhook (POST JSON)
+    o un archivo JSON Lines. Cada destino avanza su propio cursor
+    (ultimo_evento) solo cuando el lote se entregó, y recuerda los IDs que
+    saltó (huecos) hasta que aparecen o vencen: entrega al menos una vez.
+    """
+
+    TIPO_CHOICES = (
+        ('webhook', 'Webhook'),
+        ('archivo', 'Archivo'),
+    )
+
+    nombre = models.CharField(max_length=100, unique=True)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    destino = models.CharField(max_length=500)  # URL del webhook o ruta del archivo
+    secreto = models.CharField(max_length=100, blank=True, default='')  # Clave de la firma HMAC del webhook
+    tipos_evento = models.CharField(max_length=300, blank=True, default='')  # Separados por coma; vacío = todos
+    activo = models.BooleanField(default=True)
+    ultimo_evento = models.BigIntegerField(default=0)  # ID del último evento entregado
+    # IDs menores que el cursor aún sin evento ([desde, hasta, visto_en]): transacciones
+    # que no habían confirmado cuando el cursor pasó; se entregan si aparecen
+    huecos = models.JSONField(default=list, blank=True)
+    fallos = models.PositiveSmallIntegerField(default=0)  # Fallos consecutivos
+    proximo_intento = models.DateTimeField(null=True, blank=True)  # Espera tras un fallo
+    ultimo_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    def __str__(self):
+        """Representación en string del destino"""
+        return f"{self.nombre} ({self.tipo})"
+
+
+class ContadorVersion(models.Model):
+    """
+    Contador global de versiones de la sincronización. Cada cambio en Padres,
+    Estudiantes o Tutor_receptor toma el siguiente valor dentro de su
+    transacción; el bloqueo de la fila hasta el commit hace que las versiones
+    se confirmen en orden y un cliente no salte cambios. También guarda la
+    generación de los planes de viaje cacheados (ver calendario_utils).
+    """
+
+    nombre = models.CharField(max_length=50, unique=True)  # 'filas', 'lapidas_purgadas' o 'planes_viaje'
+    valor = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        """Representación en string del contador"""
+        return f"{self.nombre}: {self.valor}"
+
+
+class Lapida(models.Model):
+    """
+    Registro de una fila eliminada (tombstone) para que los clientes que
+    sincronizan por versión también reciban los borrados.
+    """
+
+    MODELO_CHOICES = (
+        ('padres', 'Padres'),
+        ('estudiantes', 'Estudiantes'),
+        ('tutores', 'Tutores'),
+    )
+
+    modelo = models.CharField(max_length=20, choices=MODELO_CHOICES)
+    objeto_id = models.IntegerField()  # ID de la fila eliminada
+    usuario_id = models.IntegerField(null=True, blank=True)  # Usuario dueño de la familia (alcance del padre)
+    # Vehículo cuyo conductor debe borrar la fila (estudiante que dejó de viajar en él
+    # o tutor eliminado); estas lápidas solo las reciben los conductores
+    vehiculo_id = models.IntegerField(null=True, blank=True)
+    version = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['version']),
+            # Borrados de una familia desde una versión
+            models.Index(fields=['usuario_id', 'version']),
+            # Borrados del vehículo de un conductor desde una versión
+            models.Index(fields=['vehiculo_id', 'version']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la lápida"""
+        return f"{self.modelo} {self.objeto_id} (v{self.version})"
+
+
+class CalendarioColegio(models.Model):
+    """
+    Calendario de servicio de un colegio: días de la semana con clases y
+    periodo lectivo. Un colegio sin calendario tiene servicio de lunes a viernes.
+    """
+
+    # Bits de los días con servicio: lunes = 1, martes = 2, ... domingo = 64
+    LUNES_A_VIERNES = 0b0011111
+
+    colegio = models.CharField(max_length=100, unique=True)  # Igual a Estudiantes.Colegio
+    dias_servicio = models.PositiveSmallIntegerField(default=LUNES_A_VIERNES)
+    inicio_periodo = models.DateField(null=True, blank=True)  # Sin fecha = sin límite
+    fin_periodo = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    def __str__(self):
+        """Representación en string del calendario"""
+        return self.colegio
+
+
+class ExcepcionCalendario(models.Model):
+    """
+    Intervalo de fechas (inclusivo) que cambia el servicio normal: feriados
+    (sin servicio), medios días o semanas de exámenes (otras horas de entrada
+    o salida). Sin calendario asociado aplica a todos los colegios.
+    """
+
+    TIPO_CHOICES = (
+        ('feriado', 'Feriado'),         # Sin servicio
+        ('medio_dia', 'Medio día'),     # Salida más temprano
+        ('examenes', 'Exámenes'),       # Horario especial
+    )
+
+    calendario = models.ForeignKey(
+        CalendarioColegio, on_delete=models.CASCADE, related_name='excepciones', null=True, blank=True)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    desde = models.DateField()
+    hasta = models.DateField()
+    hora_entrada = models.TimeField(null=True, blank=True)  # Reemplaza H_entrada (opcional)
+    hora_salida = models.TimeField(null=True, blank=True)   # Reemplaza H_salida (opcional)
+    descripcion = models.CharField(max_length=200, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Excepciones que se cruzan con un rango de fechas
+            models.Index(fields=['calendario', 'hasta']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la excepción"""
+        return f"{self.tipo} {self.desde} - {self.hasta}"
+
+
+class TarifaTransporte(models.Model):
+    """
+    Tarifa mensual por estudiante y tramo. Se usa la más específica que
+    coincida: la del colegio antes que la general (colegio vacío) y una con
+    franja horaria antes que una sin franja.
+    """
+
+    TRAMO_CHOICES = (
+        ('entrada', 'Entrada'),
+        ('salida', 'Salida'),
+    )
+
+    colegio = models.CharField(max_length=100, blank=True, default='')  # Vacío = todos los colegios
+    tramo = models.CharField(max_length=10, choices=TRAMO_CHOICES)
+    hora_desde = models.TimeField(null=True, blank=True)  # Franja horaria (inclusive), opcional
+    hora_hasta = models.TimeField(null=True, blank=True)
+    monto = models.DecimalField(max_digits=8, decimal_places=2)  # Monto mensual por estudiante
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    def __str__(self):
+        """Representación en string de la tarifa"""
+        return f"{self.colegio or 'Todos'} {self.tramo}: {self.monto}"
+
+
+class CorridaFacturacion(models.Model):
+    """
+    Corrida de facturación de un mes. Avanza por lotes de padres en orden de
+    ID y guarda el último procesado, así una corrida interrumpida continúa
+    donde quedó.
+    """
+
+    ESTADO_CHOICES = (
+        ('pendiente', 'Pendiente'),   # Creada o interrumpida, falta procesar padres
+        ('completa', 'Completa'),
+    )
+
+    periodo = models.DateField(unique=True)  # Primer día del mes facturado
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='pendiente')
+    ultimo_padre = models.IntegerField(default=0)  # Cursor: ID del último padre procesado
+    facturas = models.PositiveIntegerField(default=0)  # Facturas creadas
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # Suma de las facturas
+    sin_tarifa = models.PositiveIntegerField(default=0)  # Tramos usados sin tarifa (cobrados en 0)
+    inicio = models.DateTimeField(null=True, blank=True)
+    fin = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    def __str__(self):
+        """Representación en string de la corrida"""
+        return f"Facturación {self.periodo:%Y-%m} ({self.estado})"
+
+
+class Factura(models.Model):
+    """
+    Factura mensual de transporte de una familia. Guarda el nombre y el
+    email del padre para que siga siendo legible si la familia se elimina.
+    """
+
+    ESTADO_CHOICES = (
+        ('pendiente', 'Pendiente'),
+        ('pagada', 'Pagada'),
+        ('anulada', 'Anulada'),
+    )
+
+    padre = models.ForeignKey(Padres, on_delete=models.SET_NULL, related_name='facturas', null=True, blank=True)
+    periodo = models.DateField()  # Primer día del mes facturado
+    nombre = models.CharField(max_length=200)
+    email = models.EmailField(blank=True, default='')
+    estudiantes = models.PositiveSmallIntegerField()  # Estudiantes con al menos un tramo
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    descuento = models.DecimalField(max_digits=10, decimal_places=2)  # Descuento por hermanos
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    detalle = models.JSONField(default=list, encoder=DjangoJSONEncoder)  # Una línea por estudiante
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='pendiente')
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    class Meta:
+        constraints = [
+            # Una factura por familia y mes (una corrida repetida no duplica)
+            models.UniqueConstraint(fields=['padre', 'periodo'], name='factura_unica_por_mes'),
+        ]
+        indexes = [
+            # Listado de facturas de un mes por estado
+            models.Index(fields=['periodo', 'estado']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la factura"""
+        return f"{self.nombre} {self.periodo:%Y-%m}: {self.total}"
+
+
+class EventoRecorrido(models.Model):
+    """
+    Evento que el conductor registra durante un recorrido: salida, parada de
+    un estudiante (recogida o entrega en su casa) o llegada. Es el historial
+    del que aprenden los tiempos de llegada estimados.
+    """
+
+    TIPO_CHOICES = (
+        ('inicio', 'Inicio del recorrido'),
+        ('parada', 'Parada de un estudiante'),
+        ('fin', 'Fin del recorrido'),
+    )
+
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='eventos_recorrido')
+    tramo = models.CharField(max_length=10, choices=AsignacionVehiculo.TRAMO_CHOICES)
+    hora = models.TimeField()  # Franja del recorrido (AsignacionVehiculo.hora)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    estudiante_id = models.IntegerField(null=True, blank=True)  # Solo paradas; sin FK para conservar el historial
+    momento = models.DateTimeField()  # Cuándo ocurrió (reportado por el conductor)
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de registro
+
+    class Meta:
+        indexes = [
+            # Recorridos de un vehículo en orden (reconstrucción de modelos)
+            models.Index(fields=['vehiculo', 'tramo', 'hora', 'momento']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        """Representación en string del evento"""
+        return f"{self.vehiculo_id} {self.tramo} {self.tipo} {self.momento}"
+
+
+class ModeloRecorrido(models.Model):
+    """
+    Estadísticas móviles de los tiempos de una ruta (vehículo, tramo y franja)
+    y el estado de su recorrido en curso.
+
+    `datos` es un arreglo float32 compacto con, por cada parada y día de la
+    semana: muestras, media y varianza del tiempo desde la parada anterior y
+    media del tiempo desde el inicio. La parada 0 es el inicio (su "tiempo
+    desde el inicio" es la hora de salida en segundos desde la medianoche).
+    """
+
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='modelos_recorrido')
+    tramo = models.CharField(max_length=10, choices=AsignacionVehiculo.TRAMO_CHOICES)
+    hora = models.TimeField()  # Franja del recorrido
+    paradas = models.JSONField(default=list)  # IDs de estudiante (0 = inicio); la posición es la fila en `datos`
+    datos = models.BinaryField(default=bytes)  # array('f') de paradas x 7 días x 4 valores
+
+    # Recorrido en curso (solo cuenta si `inicio_en_curso` es de hoy)
+    inicio_en_curso = models.DateTimeField(null=True, blank=True)
+    ultima_parada = models.IntegerField(null=True, blank=True)  # ID del estudiante (0 = inicio)
+    ultimo_momento = models.DateTimeField(null=True, blank=True)
+    visitadas = models.JSONField(default=list)  # Estudiantes ya atendidos en el recorrido en curso
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vehiculo', 'tramo', 'hora'], name='modelo_unico_por_ruta'),
+        ]
+
+    def __str__(self):
+        """Representación en string del modelo"""
+        return f"{self.vehiculo_id} {self.tramo} {self.hora}"
+
+
+class UbicacionColegio(models.Model):
+    """
+    Ubicación de un colegio para las geocercas de llegada del transporte.
+    Sin `radio_metros` se usa GEOCERCA_RADIO_LLEGADA.
+    """
+
+    colegio = models.CharField(max_length=100, unique=True)  # Igual a Estudiantes.Colegio
+    latitud = models.FloatField()
+    longitud = models.FloatField()
+    radio_metros = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    def __str__(self):
+        """Representación en string de la ubicación"""
+        return f"{self.colegio} ({self.latitud:.5f}, {self.longitud:.5f})"
+
+
+class AvisoPadre(models.Model):
+    """
+    Aviso para un padre generado por una geocerca: el vehículo de su hijo
+    está por llegar (a unos minutos), llegó o salió de su parada o del colegio.
+    El panel del padre los lee por ID creciente.
+    """
+
+    TIPO_CHOICES = (
+        ('cerca', 'Vehículo cerca'),
+        ('llegada', 'Vehículo llegó'),
+        ('salida', 'Vehículo salió'),
+    )
+    LUGAR_CHOICES = (
+        ('parada', 'Parada'),
+        ('colegio', 'Colegio'),
+    )
+
+    padre = models.ForeignKey(Padres, on_delete=models.CASCADE, related_name='avisos')
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='avisos')
+    tramo = models.CharField(max_length=10, choices=AsignacionVehiculo.TRAMO_CHOICES)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    lugar = models.CharField(max_length=10, choices=LUGAR_CHOICES)
+    nombre_lugar = models.CharField(max_length=100)  # Nombre de la parada o del colegio
+    distancia_metros = models.PositiveIntegerField()
+    momento = models.DateTimeField()  # Hora del ping que produjo el aviso
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    class Meta:
+        indexes = [
+            # Avisos nuevos de un padre (?desde=<id>)
+            models.Index(fields=['padre', 'id']),
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        """Representación en string del aviso"""
+        return f"{self.padre_id} {self.tipo} {self.nombre_lugar}"
+
+
+class EstadoRecorrido(models.Model):
+    """
+    Estado de un recorrido (vehículo, tramo y franja en una fecha) respecto a
+    las geocercas de su ruta. Cada lote de pings lo lee y lo escribe con la
+    fila bloqueada, así dos lotes del mismo recorrido en procesos distintos
+    no pierden transiciones ni repiten avisos.
+    """
+
+    vehiculo = models.ForeignKey(Vehiculo, on_delete=models.CASCADE, related_name='estados_recorrido')
+    tramo = models.CharField(max_length=10, choices=AsignacionVehiculo.TRAMO_CHOICES)
+    hora = models.TimeField()  # Franja del recorrido
+    fecha = models.DateField()  # Día del recorrido (fecha local del primer ping)
+    ultimo_ping = models.DateTimeField(null=True, blank=True)  # Los pings anteriores se ignoran (reintentos)
+    geocercas = models.JSONField(default=dict)  # {clave de geocerca: estado}; las que están fuera no se guardan
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vehiculo', 'tramo', 'hora', 'fecha'], name='estado_unico_por_recorrido'),
+        ]
+        indexes = [
+            # Limpieza de recorridos de días anteriores
+            models.Index(fields=['fecha']),
+        ]
+
+    def __str__(self):
+        """Representación en string del estado"""
+        return f"{self.vehiculo_id} {self.tramo} {self.hora} {self.fecha}"
+
+
+class SimulacionPlan(models.Model):
+    """
+    Simulación de un día de viajes para comparar escenarios (por ejemplo un
+    colegio nuevo o un cambio de horario) contra la matrícula actual. La
+    procesa la tarea `simular`; los resultados quedan por escenario.
+    """
+
+    ESTADO_CHOICES = (
+        ('pendiente', 'Pendiente'),
+        ('en_curso', 'En curso'),
+        ('completa', 'Completa'),
+        ('error', 'Error'),
+    )
+
+    fecha = models.DateField()  # Día simulado (calendario y horarios especiales de ese día)
+    escenarios = models.JSONField(default=list)  # [{nombre, cambios: [...]}]
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='pendiente')
+    resultados = models.JSONField(default=list)  # Métricas por escenario, la situación actual primero
+    error = models.TextField(blank=True, default='')
+    creado_por = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='simulaciones')
+    inicio = models.DateTimeField(null=True, blank=True)
+    fin = models.DateTimeField(null=True, blank=True)
+    bloqueado_hasta = models.DateTimeField(null=True, blank=True)  # Lease del nodo que la está corriendo
+    created_at = models.DateTimeField(auto_now_add=True)  # Fecha de creación automática
+
+    class Meta:
+        indexes = [
+            # Simulaciones pendientes para la tarea
+            models.Index(fields=['estado', 'id']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la simulación"""
+        return f"Simulación {self.id} {self.fecha} ({self.estado})"
+
+
+class RegistroAuditoria(models.Model):
+    """
+    Entrada del registro de auditoría: quién cambió qué, con los valores
+    antes y después. Solo se agregan filas; se escriben en lote desde el
+    búfer de auditoria_utils. Las filas llevan el mes (`periodo`) al inicio
+    de los índices de tiempo, así cada consulta y cada purga de un mes
+    recorre un rango contiguo, como una partición mensual.
+    """
+
+    ACCION_CHOICES = (
+        ('creado', 'Creado'),
+        ('actualizado', 'Actualizado'),
+        ('eliminado', 'Eliminado'),
+        ('aprobado', 'Aprobado'),
+        ('desaprobado', 'Desaprobado'),
+        ('archivado', 'Archivado'),
+        ('restaurado', 'Restaurado'),
+    )
+
+    periodo = models.DateField()  # Primer día del mes del cambio
+    momento = models.DateTimeField()  # Hora del cambio (no la de escritura del lote)
+    # ID y email del usuario que hizo el cambio (sin FK: el registro sobrevive al usuario); None = sistema
+    actor = models.IntegerField(null=True, blank=True)
+    actor_email = models.CharField(max_length=254, blank=True, default='')
+    accion = models.CharField(max_length=12, choices=ACCION_CHOICES)
+    objetivo_tipo = models.CharField(max_length=20)  # padre, estudiante o tutor
+    objetivo_id = models.IntegerField()
+    antes = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)  # Campos que cambiaron, antes
+    despues = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)  # y después del cambio
+
+    class Meta:
+        indexes = [
+            # Consultas por mes y purga de los meses vencidos
+            models.Index(fields=['periodo', 'id']),
+            # Cambios hechos por un usuario
+            models.Index(fields=['actor', 'id']),
+            # Historial de una entidad
+            models.Index(fields=['objetivo_tipo', 'objetivo_id', 'id']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la entrada"""
+        return f"{self.momento:%Y-%m-%d %H:%M} {self.actor_email or 'sistema'} {self.accion} {self.objetivo_tipo} {self.objetivo_id}"
+
+
+class FamiliaArchivada(models.Model):
+    """
+    Familia que salió de las tablas activas: eliminada por un administrador
+    o con el formulario vencido sin aprobar. Usuario, padre, estudiantes y
+    tutores quedan en `datos` (JSON comprimido con zlib); solo los campos de
+    búsqueda van en columnas. Se puede restaurar con `restaurar_familia`.
+    """
+
+    MOTIVO_CHOICES = (
+        ('eliminada', 'Eliminada por un administrador'),
+        ('vencida', 'Formulario vencido sin aprobar'),
+    )
+
+    padre_original = models.IntegerField()  # ID que tenía en Padres
+    cedula = models.CharField(max_length=13)
+    email = models.CharField(max_length=254, blank=True, default='')
+    motivo = models.CharField(max_length=10, choices=MOTIVO_CHOICES)
+    estudiantes = models.PositiveIntegerField(default=0)  # Cantidad de estudiantes archivados
+    datos = models.BinaryField()  # Ver archivo_utils.comprimir
+    archivada_en = models.DateTimeField(auto_now_add=True)
+    restaurada_en = models.DateTimeField(null=True, blank=True)
+    restaurada_como = models.IntegerField(null=True, blank=True)  # ID del padre restaurado
+
+    class Meta:
+        indexes = [
+            # Búsqueda para reinscripciones y auditorías
+            models.Index(fields=['cedula']),
+            models.Index(fields=['email']),
+            models.Index(fields=['archivada_en']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la familia archivada"""
+        return f"{self.cedula} ({self.motivo}, {self.archivada_en:%Y-%m-%d})"
+
+
+class SesionPerfilado(models.Model):
+    """
+    Sesión del perfilador bajo demanda (ver perfilado_utils). Vive en la base
+    de datos para que todos los procesos y nodos la vean sin depender de una
+    caché compartida; la vigente es la de `inicio` más reciente.
+    """
+
+    id = models.CharField(max_length=12, primary_key=True)
+    vista = models.CharField(max_length=100, blank=True, null=True)  # None = todas las vistas
+    peticiones = models.PositiveIntegerField(blank=True, null=True)  # Peticiones pedidas (None = sin límite)
+    restantes = models.IntegerField(blank=True, null=True)  # Peticiones que quedan por perfilar
+    intervalo_ms = models.PositiveIntegerField()  # Milisegundos entre muestras
+    inicio = models.DateTimeField()
+    hasta = models.DateTimeField()  # Fin de la ventana (se adelanta al detenerla)
+
+    class Meta:
+        indexes = [
+            # Sesión vigente (la más reciente) y purga de las vencidas
+            models.Index(fields=['inicio']),
+        ]
+
+    def __str__(self):
+        """Representación en string de la sesión"""
+        return f"Perfilado {self.id} ({self.vista or 'todas'})"
+
+
+class VolcadoPerfilado(models.Model):
+    """
+    Pilas que acumuló un proceso (nodo host:pid) durante una sesión de
+    perfilado; cada proceso reemplaza su fila en cada volcado.
+    """
+
+    sesion = models.ForeignKey(SesionPerfilado, on_delete=models.CASCADE, related_name='volcados')
+    nodo = models.CharField(max_length=150)  # Proceso que tomó las muestras (host:pid)
+    pilas = models.JSONField(default=dict)  # {vista: {pila: muestras}}
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sesion', 'nodo'], name='volcado_unico_por_nodo'),
+        ]
+
+    def __str__(self):
+        """Representación en string del volcado"""
+        return f"{self.sesion_id} {self.nodo}"
@@ -0,0 +1,103 @@
+# Paginación por cursor (keyset) para los listados de la API
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+# Parámetros que no cambian el conjunto de filas (no forman parte de la clave del total)
+PARAMETROS_SIN_FILTRO = ('cursor', 'page_size', 'ordering', 'total')
+
+
+def estimar_filas_tabla(modelo):
+    """
+    Estimación del número de filas de una tabla a partir de las estadísticas
+    del motor, sin recorrerla. Solo se usa cuando el listado no tiene filtros.
+
+    Args:
+        modelo: Clase del modelo
+
+    Returns:
+        int | None: Filas estimadas o None si el motor no ofrece estadísticas
+    """
+    tabla = modelo._meta.db_table
+    if connection.vendor == 'microsoft':
+        sql = ('SELECT SUM(row_count) FROM sys.dm_db_partition_stats '
+               'WHERE object_id = OBJECT_ID(%s) AND index_id IN (0, 1)')
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tabla])
+        fila = cursor.fetchone()
+    if not fila or fila[0] is None or fila[0] < 0:
+        return None
+    return int(fila[0])
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Paginación por cursor: cada página continúa desde la última fila de la
+    anterior con un WHERE sobre la columna de orden (índice), así las páginas
+    profundas cuestan lo mismo que la primera, a diferencia de OFFSET.
+
+    Parámetros:
+        ?cursor=<valor>   Cursor opaco devuelto en `next`/`previous`
+        ?page_size=<n>    Filas por página (máximo max_page_size)
+        ?total=1          Agrega `total_estimado` (conteo cacheado, no un COUNT por página)
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-id'  # Orden estable por defecto (clave primaria)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total_estimado = None
+        if request.query_params.get('total') in ('1', 'true', 'True'):
+            self.total_estimado = self.obtener_total(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def obtener_total(self, queryset, request, view):
+        """
+        Total de filas del listado, cacheado PAGINACION_TTL_TOTAL segundos por
+        vista, filtros y usuario. Sin filtros se usa la estimación del motor.
+
+        Returns:
+            int: Número de filas (aproximado)
+        """
+        filtros = sorted(
+            (clave, valor) for clave, valor in request.query_params.lists()
+            if clave not in PARAMETROS_SIN_FILTRO
+        )
+        # Los listados pueden depender del usuario; se separan los totales por usuario
+        usuario = request.user.pk if request.user.is_authenticated and not request.user.is_staff else 'staff'
+        huella = hashlib.md5(repr((type(view).__name__, filtros, usuario)).encode()).hexdigest()
+        clave_cache = f'paginacion:total:{huella}'
+
+        def contar():
+            if not filtros and queryset.query.where.children == []:
+                estimado = estimar_filas_tabla(queryset.model)
+                if estimado is not None:
+                    return estimado
+            return queryset.count()
+
+        return cache.get_or_set(clave_cache, contar, getattr(settings, 'PAGINACION_TTL_TOTAL', 300))
+
+    def get_paginated_response(self, data):
+        respuesta = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.total_estimado is not None:
+            respuesta['total_estimado'] = self.total_estimado
+        return Response(respuesta)
+
+    def get_paginated_response_schema(self, schema):
+        esquema = super().get_paginated_response_schema(schema)
+        esquema['properties']['total_estimado'] = {'type': 'integer', 'example': 123}
+        return esquema
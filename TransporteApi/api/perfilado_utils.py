@@ -0,0 +1,341 @@
+# Perfilador estadístico por muestreo que se activa bajo demanda desde el panel
+#
+# Mientras hay una sesión activa, un hilo del proceso toma cada
+# PERFILADO_INTERVALO_MS la pila de los hilos que están atendiendo una vista
+# perfilada (sys._current_frames) y cuenta cuántas veces aparece cada pila.
+# No instrumenta llamadas, así que el costo no depende del código de la vista.
+# Sin sesión, cada petición solo compara un reloj: un hilo de cada proceso
+# servidor (iniciado en wsgi.py/asgi.py) vuelve a leer la sesión de la base
+# de datos cada PERFILADO_REFRESCO segundos, fuera de las peticiones.
+#
+# La sesión, el contador de peticiones y las pilas de cada proceso viven en
+# la base de datos (SesionPerfilado, VolcadoPerfilado) y no en la caché: la
+# caché configurada es local a cada proceso, y así todos los procesos y
+# nodos comparten la misma sesión.
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SesionPerfilado, VolcadoPerfilado
+from .planificador import NODO
+
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre cada volcado de las pilas del proceso a la base de datos
+INTERVALO_VOLCADO = 1.0
+
+
+def _ttl():
+    return getattr(settings, 'PERFILADO_TTL', 3600)
+
+
+def _como_dict(fila):
+    """Sesión como dict con `inicio` y `hasta` en segundos (time.time()), como la usa el muestreo"""
+    return {
+        'id': fila.id,
+        'vista': fila.vista,
+        'peticiones': fila.peticiones,
+        'intervalo_ms': fila.intervalo_ms,
+        'inicio': fila.inicio.timestamp(),
+        'hasta': fila.hasta.timestamp(),
+    }
+
+
+def _fecha(segundos):
+    return datetime.fromtimestamp(segundos, tz=dt_timezone.utc)
+
+
+# ============================================================================
+# SESIONES
+# ============================================================================
+
+def iniciar_sesion(vista=None, segundos=None, peticiones=None, intervalo_ms=None):
+    """
+    Activa el perfilador en todos los procesos durante una ventana de tiempo
+    o hasta perfilar N peticiones (lo que ocurra primero). Reemplaza a la
+    sesión anterior y purga las más antiguas que PERFILADO_TTL.
+
+    Args:
+        vista: Nombre de la vista de api/views.py (None = todas)
+        segundos: Duración máxima (por defecto y como tope, PERFILADO_SEGUNDOS_MAXIMO)
+        peticiones: Peticiones a perfilar entre todos los procesos (None = sin límite)
+        intervalo_ms: Milisegundos entre muestras (por defecto PERFILADO_INTERVALO_MS)
+
+    Returns:
+        dict: Sesión creada
+    """
+    maximo = getattr(settings, 'PERFILADO_SEGUNDOS_MAXIMO', 600)
+    ahora = time.time()
+    sesion = {
+        'id': uuid.uuid4().hex[:12],
+        'vista': vista,
+        'peticiones': peticiones,
+        'intervalo_ms': intervalo_ms or getattr(settings, 'PERFILADO_INTERVALO_MS', 5),
+        'inicio': ahora,
+        'hasta': ahora + min(segundos or maximo, maximo),
+    }
+    SesionPerfilado.objects.filter(inicio__lt=timezone.now() - timedelta(seconds=_ttl())).delete()
+    sesion = _como_dict(SesionPerfilado.objects.create(
+        id=sesion['id'], vista=vista, peticiones=peticiones, restantes=peticiones,
+        intervalo_ms=sesion['intervalo_ms'], inicio=_fecha(sesion['inicio']), hasta=_fecha(sesion['hasta'])))
+    perfilador.sesion = sesion  # Este proceso no espera al hilo de refresco
+    return sesion
+
+
+def sesion_actual():
+    """
+    Sesión en curso o la última (la de inicio más reciente).
+
+    Returns:
+        dict | None: Sesión o None si no hay ninguna
+    """
+    fila = SesionPerfilado.objects.order_by('-inicio').first()
+    return _como_dict(fila) if fila is not None else None
+
+
+def detener_sesion():
+    """
+    Termina la sesión en curso; sus pilas siguen disponibles hasta que la
+    purgue una sesión iniciada pasados PERFILADO_TTL segundos.
+
+    Returns:
+        dict | None: Sesión detenida o None si no había ninguna
+    """
+    sesion = sesion_actual()
+    if sesion is None:
+        return None
+    sesion['hasta'] = min(sesion['hasta'], time.time())
+    SesionPerfilado.objects.filter(pk=sesion['id']).update(hasta=_fecha(sesion['hasta']))
+    perfilador.sesion = sesion
+    return sesion
+
+
+def sesion_vigente(sesion):
+    """True si la sesión todavía toma muestras (no venció ni agotó sus peticiones)"""
+    if sesion is None or time.time() >= sesion['hasta']:
+        return False
+    if sesion['peticiones']:
+        return SesionPerfilado.objects.filter(pk=sesion['id'], restantes__gt=0).exists()
+    return True
+
+
+def pilas_sesion(sesion):
+    """
+    Suma las pilas que volcó cada proceso en la sesión.
+
+    Returns:
+        dict: {vista: Counter({pila: muestras})}
+    """
+    total = defaultdict(Counter)
+    for por_vista in VolcadoPerfilado.objects.filter(sesion_id=sesion['id']).values_list('pilas', flat=True):
+        for vista, pilas in por_vista.items():
+            total[vista].update(pilas)
+    return total
+
+
+def formato_colapsado(pilas, vista=None):
+    """
+    Pilas en el formato "colapsado" de flamegraph.pl / speedscope / inferno:
+    una línea por pila con los marcos de la raíz a la hoja separados por ';'
+    y el número de muestras. El primer marco es el nombre de la vista.
+
+    Returns:
+        str: Texto con una pila por línea, de más a menos muestras
+    """
+    lineas = []
+    for nombre, conteo in pilas.items():
+        if vista is None or nombre == vista:
+            lineas.extend((n, f'{nombre};{pila}' if pila else nombre) for pila, n in conteo.items())
+    lineas.sort(key=lambda linea: (-linea[0], linea[1]))
+    return ''.join(f'{pila} {n}\n' for n, pila in lineas)
+
+
+# ============================================================================
+# MUESTREO EN CADA PROCESO
+# ============================================================================
+
+class Perfilador:
+    """
+    Estado del perfilador en este proceso: la sesión leída de la base de
+    datos, los hilos que están atendiendo una vista perfilada y el hilo que muestrea.
+    """
+
+    def __init__(self):
+        self.sesion = None          # Última sesión leída de la base de datos (HiloRefrescoPerfilado)
+        self.hilos = {}             # ident del hilo -> (sesion_id, vista)
+        self.muestreador = None     # Hilo de la sesión actual
+        self.raiz = None            # Código donde se cortan las pilas (lo fija el middleware)
+        self.etiquetas = {}         # code -> "modulo.funcion"
+        self.lock = threading.Lock()
+
+    def sesion_activa(self):
+        """
+        Sesión vigente para este proceso o None. Es lo único que se ejecuta en
+        cada petición cuando el perfilador está apagado: no consulta la base
+        de datos, lee la sesión que dejó el hilo de refresco.
+        """
+        sesion = self.sesion
+        if sesion is None or time.time() >= sesion['hasta']:
+            return None
+        return sesion
+
+    def entrar(self, vista):
+        """
+        Registra el hilo actual si la sesión perfila esta vista (process_view).
+
+        Returns:
+            bool: True si la petición se perfila (hay que llamar a salir())
+        """
+        sesion = self.sesion_activa()
+        if sesion is None or (sesion['vista'] and sesion['vista'] != vista):
+            return False
+        if sesion['peticiones']:
+            # UPDATE condicional: entre todos los procesos se perfilan a lo sumo `peticiones`
+            tomada = SesionPerfilado.objects.filter(pk=sesion['id'], restantes__gt=0).update(
+                restantes=F('restantes') - 1)
+            if not tomada:
+                self.sesion = None  # Agotada: no intentar de nuevo hasta el próximo refresco
+                return False
+        with self.lock:
+            self.hilos[threading.get_ident()] = (sesion['id'], vista)
+            if self.muestreador is None or not self.muestreador.is_alive() \
+                    or self.muestreador.sesion['id'] != sesion['id']:
+                self.muestreador = HiloMuestreo(self, sesion)
+                self.muestreador.start()
+        return True
+
+    def salir(self):
+        """Quita el hilo actual de los perfilados (al terminar la petición)"""
+        with self.lock:
+            self.hilos.pop(threading.get_ident(), None)
+
+    def pila(self, marco):
+        """
+        Pila de un hilo desde el middleware hasta el marco actual.
+
+        Returns:
+            str: Marcos de la raíz a la hoja separados por ';'
+        """
+        partes = []
+        while marco is not None and marco.f_code is not self.raiz:
+            codigo = marco.f_code
+            etiqueta = self.etiquetas.get(codigo)
+            if etiqueta is None:
+                etiqueta = f"{marco.f_globals.get('__name__', '?')}.{codigo.co_qualname}"
+                self.etiquetas[codigo] = etiqueta
+            partes.append(etiqueta)
+            marco = marco.f_back
+        partes.reverse()
+        return ';'.join(partes)
+
+
+class HiloMuestreo(threading.Thread):
+    """
+    Toma muestras de los hilos registrados en una sesión y vuelca las pilas
+    del proceso a la base de datos cada INTERVALO_VOLCADO segundos. Termina
+    cuando la sesión vence, se detiene o se reemplaza y no quedan peticiones
+    perfiladas.
+    """
+
+    def __init__(self, perfilador, sesion):
+        super().__init__(name='perfilador', daemon=True)
+        self.perfilador = perfilador
+        self.sesion = sesion
+        self.pilas = defaultdict(Counter)  # vista -> Counter(pila)
+
+    def run(self):
+        intervalo = self.sesion['intervalo_ms'] / 1000
+        volcar = time.monotonic() + INTERVALO_VOLCADO
+        propio = threading.get_ident()
+        try:
+            while True:
+                time.sleep(intervalo)
+                with self.perfilador.lock:
+                    hilos = {ident: vista for ident, (sesion_id, vista) in self.perfilador.hilos.items()
+                             if sesion_id == self.sesion['id'] and ident != propio}
+                if hilos:
+                    marcos = sys._current_frames()
+                    for ident, vista in hilos.items():
+                        marco = marcos.get(ident)
+                        if marco is not None:
+                            self.pilas[vista][self.perfilador.pila(marco)] += 1
+                    del marcos  # No retener los marcos de otros hilos
+
+                if time.monotonic() >= volcar:
+                    self.volcar()
+                    volcar = time.monotonic() + INTERVALO_VOLCADO
+                    if not hilos and not self.vigente():
+                        break
+        except Exception:
+            logger.exception('Error en el muestreo del perfilador')
+        finally:
+            try:
+                self.volcar()
+            except Exception:
+                logger.exception('Error al volcar las pilas del perfilador')
+            connection.close()  # El hilo usa su propia conexión
+
+    def vigente(self):
+        actual = sesion_actual()
+        return actual is not None and actual['id'] == self.sesion['id'] and sesion_vigente(actual)
+
+    def volcar(self):
+        """Guarda en la base de datos las pilas acumuladas por este proceso en la sesión"""
+        if not self.pilas:
+            return
+        VolcadoPerfilado.objects.update_or_create(
+            sesion_id=self.sesion['id'], nodo=NODO,
+            defaults={'pilas': {vista: dict(pilas) for vista, pilas in self.pilas.items()}})
+
+
+# Perfilador compartido del proceso
+perfilador = Perfilador()
+
+
+class HiloRefrescoPerfilado(threading.Thread):
+    """
+    Hilo en segundo plano que lee la sesión de perfilado cada
+    PERFILADO_REFRESCO segundos (una consulta por índice), para que las
+    peticiones no consulten la base de datos.
+    """
+
+    def __init__(self, intervalo):
+        super().__init__(name='refresco-perfilado', daemon=True)
+        self.intervalo = intervalo
+        self.detener = threading.Event()
+
+    def run(self):
+        while not self.detener.is_set():
+            try:
+                close_old_connections()
+                perfilador.sesion = sesion_actual()
+            except Exception:
+                logger.exception('Error leyendo la sesión de perfilado')
+            finally:
+                close_old_connections()
+            self.detener.wait(self.intervalo)
+
+
+_hilo_refresco = None
+
+
+def iniciar_refresco_perfilado():
+    """
+    Inicia el hilo que lee la sesión de perfilado si PERFILADO_ACTIVO está
+    habilitado. Se llama desde wsgi.py/asgi.py, junto al planificador.
+    """
+    global _hilo_refresco
+    if not getattr(settings, 'PERFILADO_ACTIVO', True) or _hilo_refresco is not None:
+        return
+    _hilo_refresco = HiloRefrescoPerfilado(getattr(settings, 'PERFILADO_REFRESCO', 1))
+    _hilo_refresco.start()
@@ -0,0 +1,250 @@
+# Planificador de tareas periódicas que corre dentro de la aplicación
+import io
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import TareaProgramada, EjecucionTarea
+
+
+logger = logging.getLogger(__name__)
+
+# Identificador de este nodo (host:pid) para los bloqueos
+NODO = f'{socket.gethostname()}:{os.getpid()}'
+
+# Tareas registradas: nombre -> Tarea
+TAREAS = {}
+
+# True en el trabajador dedicado (`manage.py ejecutar_tareas`), que no atiende peticiones web
+EN_TRABAJADOR = False
+
+
+class Tarea:
+    """
+    Tarea periódica registrada en el planificador.
+    Se programa cada `intervalo` o todos los días a una `hora` fija.
+    """
+
+    def __init__(self, nombre, funcion, intervalo=None, hora=None, duracion_maxima=timedelta(minutes=30),
+                 pesada=False):
+        """
+        Args:
+            nombre: Nombre único de la tarea
+            funcion: Función sin argumentos; si retorna texto se guarda en el historial
+            intervalo: timedelta entre ejecuciones (opcional)
+            hora: Hora local diaria 'HH:MM' (opcional)
+            duracion_maxima: Tiempo del lease; se renueva mientras la tarea corre, así
+                otro nodo solo la toma si este murió
+            pesada: Solo la ejecuta el comando ejecutar_tareas, no el hilo de los
+                servidores web (salvo PLANIFICADOR_TAREAS_PESADAS)
+        """
+        if (intervalo is None) == (hora is None):
+            raise ValueError('Debe indicar intervalo o hora, pero no ambos')
+        self.nombre = nombre
+        self.funcion = funcion
+        self.intervalo = intervalo
+        self.hora = datetime.strptime(hora, '%H:%M').time() if hora else None
+        self.duracion_maxima = duracion_maxima
+        self.pesada = pesada
+
+    def siguiente(self, desde):
+        """
+        Calcula la próxima ejecución después de `desde`.
+
+        Args:
+            desde: datetime con zona horaria
+
+        Returns:
+            datetime: Próxima ejecución
+        """
+        if self.intervalo is not None:
+            return desde + self.intervalo
+        local = timezone.localtime(desde)
+        candidata = local.replace(hour=self.hora.hour, minute=self.hora.minute, second=0, microsecond=0)
+        if candidata <= local:
+            candidata += timedelta(days=1)
+        return candidata
+
+
+def registrar_tarea(nombre, intervalo=None, hora=None, duracion_maxima=timedelta(minutes=30), pesada=False):
+    """
+    Decorador para registrar una función como tarea periódica.
+
+    Ejemplo:
+        @registrar_tarea('limpiar_formularios', hora='03:00')
+        def limpiar():
+            ...
+    """
+    def decorador(funcion):
+        TAREAS[nombre] = Tarea(nombre, funcion, intervalo=intervalo, hora=hora, duracion_maxima=duracion_maxima,
+                               pesada=pesada)
+        return funcion
+    return decorador
+
+
+def tomar_lease(tarea, ahora):
+    """
+    Intenta tomar el bloqueo de una tarea vencida con un UPDATE condicional.
+    Solo un nodo puede lograr que el UPDATE afecte la fila, así que la tarea
+    corre una sola vez aunque todos los nodos lo intenten a la vez.
+
+    Returns:
+        bool: True si este nodo obtuvo el bloqueo
+    """
+    return TareaProgramada.objects.filter(
+        nombre=tarea.nombre, proxima_ejecucion__lte=ahora
+    ).filter(
+        Q(bloqueado_hasta__isnull=True) | Q(bloqueado_hasta__lt=ahora)
+    ).update(bloqueado_por=NODO, bloqueado_hasta=ahora + tarea.duracion_maxima) == 1
+
+
+def renovar_lease(tarea):
+    """
+    Extiende el bloqueo de una tarea que este nodo está ejecutando.
+
+    Returns:
+        bool: False si el bloqueo ya no es de este nodo
+    """
+    return TareaProgramada.objects.filter(nombre=tarea.nombre, bloqueado_por=NODO).update(
+        bloqueado_hasta=timezone.now() + tarea.duracion_maxima) == 1
+
+
+class RenovacionLease(threading.Thread):
+    """
+    Hilo que renueva el bloqueo de una tarea cada tercio de su
+    duracion_maxima mientras corre: una ejecución larga no deja que otro
+    nodo tome la misma tarea, y si el nodo muere el bloqueo vence igual.
+    """
+
+    def __init__(self, tarea):
+        super().__init__(name=f'lease-{tarea.nombre}', daemon=True)
+        self.tarea = tarea
+        self.detener = threading.Event()
+
+    def run(self):
+        intervalo = self.tarea.duracion_maxima.total_seconds() / 3
+        try:
+            while not self.detener.wait(intervalo):
+                if not renovar_lease(self.tarea):
+                    logger.warning('La tarea %s perdió su bloqueo mientras corría', self.tarea.nombre)
+                    return
+        except Exception:
+            logger.exception('Error renovando el bloqueo de la tarea %s', self.tarea.nombre)
+        finally:
+            connection.close()  # Conexión propia de este hilo
+
+
+def ejecutar_tarea(tarea):
+    """
+    Ejecuta una tarea cuyo bloqueo ya se obtuvo y registra el resultado.
+    El bloqueo se renueva mientras la tarea corre.
+
+    Returns:
+        EjecucionTarea: Registro de la ejecución
+    """
+    inicio = timezone.now()
+    renovacion = RenovacionLease(tarea)
+    renovacion.start()
+    try:
+        salida = tarea.funcion()
+        estado, mensaje = 'exito', salida if isinstance(salida, str) else ''
+    except Exception:
+        estado, mensaje = 'error', traceback.format_exc()
+        logger.exception('Error ejecutando la tarea %s', tarea.nombre)
+    finally:
+        renovacion.detener.set()
+        renovacion.join()
+    fin = timezone.now()
+
+    registro = TareaProgramada.objects.get(nombre=tarea.nombre)
+    ejecucion = EjecucionTarea.objects.create(
+        tarea=registro, nodo=NODO, inicio=inicio, fin=fin,
+        duracion_ms=int((fin - inicio).total_seconds() * 1000), estado=estado, mensaje=mensaje)
+
+    # Liberar el bloqueo y programar la siguiente ejecución
+    TareaProgramada.objects.filter(nombre=tarea.nombre, bloqueado_por=NODO).update(
+        bloqueado_por=None, bloqueado_hasta=None, ultima_ejecucion=inicio,
+        proxima_ejecucion=tarea.siguiente(fin))
+    return ejecucion
+
+
+def ejecutar_pendientes(pesadas=True):
+    """
+    Revisa todas las tareas registradas y ejecuta las vencidas cuyo bloqueo se obtenga.
+
+    Args:
+        pesadas: False para omitir las tareas pesadas (hilo de los servidores web)
+
+    Returns:
+        list: Ejecuciones realizadas por este nodo
+    """
+    ahora = timezone.now()
+    ejecuciones = []
+    for tarea in TAREAS.values():
+        if tarea.pesada and not pesadas:
+            continue
+        TareaProgramada.objects.get_or_create(
+            nombre=tarea.nombre, defaults={'proxima_ejecucion': tarea.siguiente(ahora)})
+        if tomar_lease(tarea, ahora):
+            ejecuciones.append(ejecutar_tarea(tarea))
+    return ejecuciones
+
+
+def salida_de_comando(nombre, *args, **options):
+    """
+    Ejecuta un comando de manage.py y retorna lo que escribió en stdout.
+    Útil para registrar comandos existentes como tareas.
+    """
+    from django.core.management import call_command
+
+    salida = io.StringIO()
+    call_command(nombre, *args, stdout=salida, **options)
+    return salida.getvalue()
+
+
+class Planificador(threading.Thread):
+    """
+    Hilo en segundo plano que revisa las tareas cada PLANIFICADOR_INTERVALO segundos.
+    Cada nodo corre su propio hilo; los bloqueos en la base de datos evitan
+    ejecuciones duplicadas. Las tareas pesadas (facturación, simulaciones...)
+    quedan para el comando ejecutar_tareas, salvo PLANIFICADOR_TAREAS_PESADAS.
+    """
+
+    def __init__(self, intervalo):
+        super().__init__(name='planificador-tareas', daemon=True)
+        self.intervalo = intervalo
+        self.detener = threading.Event()
+
+    def run(self):
+        while not self.detener.is_set():
+            try:
+                close_old_connections()
+                ejecutar_pendientes(getattr(settings, 'PLANIFICADOR_TAREAS_PESADAS', False))
+            except Exception:
+                logger.exception('Error en el planificador de tareas')
+            finally:
+                close_old_connections()
+            self.detener.wait(self.intervalo)
+
+
+_planificador = None
+
+
+def iniciar_planificador():
+    """
+    Inicia el hilo del planificador si PLANIFICADOR_ACTIVO está habilitado.
+    Se llama desde wsgi.py/asgi.py para que solo corra en los servidores de la app.
+    """
+    global _planificador
+    if not getattr(settings, 'PLANIFICADOR_ACTIVO', False) or _planificador is not None:
+        return
+    _planificador = Planificador(getattr(settings, 'PLANIFICADOR_INTERVALO', 30))
+    _planificador.start()
@@ -0,0 +1,342 @@
+# Verificación de tutores autorizados en la recogida, servida desde memoria
+import logging
+import threading
+
+from django.conf import settings
+from django.core import signing
+from django.db import close_old_connections
+from django.db.models import F, Q
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import Usuario, Tutor_receptor, Lapida
+from .sincronizacion_utils import leer_contador, CONTADOR_FILAS
+from .duplicados_utils import solo_digitos, DIGITOS_TELEFONO
+
+
+logger = logging.getLogger(__name__)
+
+# Sal de la firma de las credenciales QR (las separa de otras firmas con SECRET_KEY)
+SAL_CREDENCIAL = 'recogida.credencial'
+
+
+def normalizar_telefono(telefono):
+    """
+    Deja solo los últimos dígitos de un teléfono para compararlo sin
+    importar el formato (espacios, guiones, prefijo de país o cero inicial).
+
+    Returns:
+        str: Dígitos finales o '' si no hay teléfono
+    """
+    digitos = solo_digitos(telefono)
+    return digitos[-DIGITOS_TELEFONO:] if len(digitos) >= 7 else ''
+
+
+class IndiceRecogida:
+    """
+    Tutores autorizados por estudiante y por teléfono, en memoria.
+
+    Se construye una vez desde la base de datos y después se mantiene con
+    cambios incrementales: al instante en este nodo (señales) y cada
+    RECOGIDA_REFRESCO segundos desde las versiones de sincronización
+    (cambios de otros nodos). Las consultas de verificación solo leen memoria.
+
+    También guarda los tokens de los usuarios que pueden verificar
+    (conductores y administradores activos) con su rol y estado, para
+    autenticarlos sin consultas; esa lista se recarga completa en cada refresco.
+    """
+
+    def __init__(self):
+        self.tutores = {}                # tutor_id -> datos del tutor
+        self.por_estudiante = {}         # estudiante_id -> {tutor_id}
+        self.por_telefono = {}           # teléfono normalizado -> {tutor_id}
+        self.estudiantes_por_padre = {}  # padre_id -> {estudiante_id}
+        self.verificadores = {}          # clave del token -> campos del usuario
+        self.version = None              # Versión hasta la que se aplicaron cambios (None = sin construir)
+        self.lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Mantenimiento
+    # ------------------------------------------------------------------
+
+    def _poner(self, fila):
+        """Inserta o reemplaza un tutor (fila con id, estudiante_id, padre_id, nombre...)"""
+        self._quitar(fila['id'])
+        telefono = normalizar_telefono(fila['telefono'])
+        self.tutores[fila['id']] = {**fila, 'telefono_normalizado': telefono}
+        self.por_estudiante.setdefault(fila['estudiante_id'], set()).add(fila['id'])
+        self.estudiantes_por_padre.setdefault(fila['padre_id'], set()).add(fila['estudiante_id'])
+        if telefono:
+            self.por_telefono.setdefault(telefono, set()).add(fila['id'])
+
+    def _quitar(self, tutor_id):
+        """Quita un tutor de todos los mapas"""
+        tutor = self.tutores.pop(tutor_id, None)
+        if tutor is None:
+            return
+        for mapa, clave in ((self.por_estudiante, tutor['estudiante_id']),
+                            (self.por_telefono, tutor['telefono_normalizado'])):
+            ids = mapa.get(clave)
+            if ids is not None:
+                ids.discard(tutor_id)
+                if not ids:
+                    del mapa[clave]
+
+    def _quitar_estudiante(self, estudiante_id):
+        for tutor_id in list(self.por_estudiante.get(estudiante_id, ())):
+            self._quitar(tutor_id)
+
+    def _quitar_familia(self, padre_id):
+        for estudiante_id in self.estudiantes_por_padre.pop(padre_id, ()):
+            self._quitar_estudiante(estudiante_id)
+
+    @staticmethod
+    def _filas(consulta):
+        return consulta.values('id', 'estudiante_id', 'nombre', 'apellido', 'parentesco', 'telefono',
+                               padre_id=F('estudiante__padres_id'))
+
+    @staticmethod
+    def _verificadores(consulta=None):
+        """
+        Tokens de los usuarios activos que pueden verificar recogidas.
+
+        Returns:
+            dict: {clave del token: {id, email, role, is_staff, is_superuser, is_active}}
+        """
+        tokens = (consulta or Token.objects.all()).filter(
+            Q(user__role__in=('conductor', 'admin')) | Q(user__is_staff=True), user__is_active=True)
+        return {
+            fila['key']: {
+                'id': fila['user_id'], 'email': fila['user__email'], 'role': fila['user__role'],
+                'is_staff': fila['user__is_staff'], 'is_superuser': fila['user__is_superuser'], 'is_active': True,
+            }
+            for fila in tokens.values('key', 'user_id', 'user__email', 'user__role', 'user__is_staff',
+                                      'user__is_superuser')
+        }
+
+    def construir(self):
+        """Carga todos los tutores (una consulta) y los tokens de los verificadores"""
+        version = leer_contador(CONTADOR_FILAS)
+        nuevo = IndiceRecogida()
+        for fila in self._filas(Tutor_receptor.objects.all()).iterator(chunk_size=2000):
+            nuevo._poner(fila)
+        verificadores = self._verificadores()
+        with self.lock:
+            self.tutores, self.por_estudiante = nuevo.tutores, nuevo.por_estudiante
+            self.por_telefono, self.estudiantes_por_padre = nuevo.por_telefono, nuevo.estudiantes_por_padre
+            self.verificadores = verificadores
+            self.version = version
+
+    def refrescar(self):
+        """
+        Aplica los tutores cambiados y las lápidas posteriores a la última
+        versión aplicada. Se lee primero el contador: todas las versiones
+        hasta ese valor ya están confirmadas, así no se salta ningún cambio.
+        Los tokens de los verificadores se recargan completos (son pocos):
+        así llegan las bajas, cambios de rol y cierres de sesión de otros nodos.
+        """
+        if self.version is None:
+            self.construir()
+            return
+        verificadores = self._verificadores()
+        with self.lock:
+            self.verificadores = verificadores
+        tope = leer_contador(CONTADOR_FILAS)
+        if tope <= self.version:
+            return
+        rango = {'version__gt': self.version, 'version__lte': tope}
+        cambiados = list(self._filas(Tutor_receptor.objects.filter(**rango)))
+        # Solo las lápidas de filas eliminadas; las de un vehículo (vehiculo_id) marcan
+        # que un estudiante dejó ese vehículo y sus tutores siguen autorizados
+        borrados = list(Lapida.objects.filter(vehiculo_id__isnull=True, **rango).values_list('modelo', 'objeto_id'))
+        with self.lock:
+            for fila in cambiados:
+                self._poner(fila)
+            for modelo, objeto_id in borrados:
+                if modelo == 'tutores':
+                    self._quitar(objeto_id)
+                elif modelo == 'estudiantes':
+                    self._quitar_estudiante(objeto_id)
+                elif modelo == 'padres':
+                    self._quitar_familia(objeto_id)
+            self.version = tope
+
+    def actualizar_tutor(self, tutor, padre_id):
+        """Aplica en este nodo el cambio de un tutor recién guardado (señal post_save)"""
+        with self.lock:
+            if self.version is None:
+                return
+            self._poner({
+                'id': tutor.pk, 'estudiante_id': tutor.estudiante_id, 'padre_id': padre_id,
+                'nombre': tutor.nombre, 'apellido': tutor.apellido,
+                'parentesco': tutor.parentesco, 'telefono': tutor.telefono,
+            })
+
+    def eliminar_tutor(self, tutor_id):
+        """Quita en este nodo un tutor recién eliminado (señal post_delete)"""
+        with self.lock:
+            if self.version is not None:
+                self._quitar(tutor_id)
+
+    def actualizar_usuario(self, usuario_id):
+        """Vuelve a leer los tokens de un usuario recién guardado (señales de Usuario y Token)"""
+        if self.version is None:
+            return
+        verificadores = self._verificadores(Token.objects.filter(user_id=usuario_id))
+        with self.lock:
+            for clave in [c for c, datos in self.verificadores.items() if datos['id'] == usuario_id]:
+                del self.verificadores[clave]
+            self.verificadores.update(verificadores)
+
+    def eliminar_token(self, clave):
+        """Quita en este nodo un token recién eliminado (cierre de sesión)"""
+        with self.lock:
+            self.verificadores.pop(clave, None)
+
+    # ------------------------------------------------------------------
+    # Consultas (solo memoria)
+    # ------------------------------------------------------------------
+
+    def listo(self):
+        """Construye el índice si todavía no existe (solo la primera vez)"""
+        if self.version is None:
+            self.construir()
+        return self
+
+    def verificador(self, clave):
+        """
+        Returns:
+            dict | None: Campos del usuario del token o None si no es de un verificador activo
+        """
+        with self.lock:
+            return self.verificadores.get(clave)
+
+    def tutores_de(self, estudiante_id):
+        """
+        Returns:
+            list: Tutores autorizados del estudiante, ordenados por ID
+        """
+        with self.lock:
+            return [publico(self.tutores[t]) for t in sorted(self.por_estudiante.get(estudiante_id, ()))]
+
+    def autorizado(self, estudiante_id, tutor_id=None, telefono=None):
+        """
+        Busca al tutor autorizado del estudiante por ID o por teléfono.
+
+        Returns:
+            dict | None: Datos públicos del tutor o None si no está autorizado
+        """
+        with self.lock:
+            autorizados = self.por_estudiante.get(estudiante_id, set())
+            if tutor_id is not None:
+                candidatos = {tutor_id} & autorizados
+            else:
+                candidatos = self.por_telefono.get(normalizar_telefono(telefono), set()) & autorizados
+            return publico(self.tutores[min(candidatos)]) if candidatos else None
+
+
+def publico(tutor):
+    """Datos del tutor que se muestran al conductor"""
+    return {
+        'id': tutor['id'],
+        'nombre': tutor['nombre'],
+        'apellido': tutor['apellido'],
+        'parentesco': tutor['parentesco'],
+    }
+
+
+# Índice compartido del proceso
+indice_recogida = IndiceRecogida()
+
+
+class HiloRefrescoRecogida(threading.Thread):
+    """
+    Hilo en segundo plano que aplica cada RECOGIDA_REFRESCO segundos los
+    cambios de tutores hechos en otros nodos.
+    """
+
+    def __init__(self, intervalo):
+        super().__init__(name='refresco-recogida', daemon=True)
+        self.intervalo = intervalo
+        self.detener = threading.Event()
+
+    def run(self):
+        while not self.detener.is_set():
+            try:
+                close_old_connections()
+                indice_recogida.refrescar()
+            except Exception:
+                logger.exception('Error refrescando el índice de recogida')
+            finally:
+                close_old_connections()
+            self.detener.wait(self.intervalo)
+
+
+_hilo_refresco = None
+
+
+def iniciar_refresco_recogida():
+    """
+    Construye el índice e inicia su hilo de refresco. Se llama desde
+    wsgi.py/asgi.py para que las verificaciones nunca esperen la carga.
+    """
+    global _hilo_refresco
+    if _hilo_refresco is not None:
+        return
+    _hilo_refresco = HiloRefrescoRecogida(getattr(settings, 'RECOGIDA_REFRESCO', 15))
+    _hilo_refresco.start()
+
+
+# ============================================================================
+# CREDENCIALES QR FIRMADAS
+# ============================================================================
+
+def emitir_credencial(tutor_id, estudiante_id):
+    """
+    Credencial firmada (HMAC con SECRET_KEY) para el QR de un tutor.
+    Se verifica sin la base de datos; si el tutor deja de estar autorizado,
+    el índice la rechaza aunque la firma siga siendo válida.
+
+    Returns:
+        str: Texto firmado para codificar en el QR
+    """
+    return signing.dumps({'t': tutor_id, 'e': estudiante_id}, salt=SAL_CREDENCIAL, compress=True)
+
+
+def leer_credencial(credencial):
+    """
+    Verifica la firma y la antigüedad de una credencial.
+
+    Returns:
+        tuple | None: (tutor_id, estudiante_id) o None si es inválida o venció
+    """
+    dias = getattr(settings, 'RECOGIDA_CREDENCIAL_DIAS', 365)
+    try:
+        datos = signing.loads(credencial, salt=SAL_CREDENCIAL, max_age=dias * 86400)
+    except signing.BadSignature:  # Incluye SignatureExpired
+        return None
+    return datos['t'], datos['e']
+
+
+# ============================================================================
+# AUTENTICACIÓN SIN CONSULTAS
+# ============================================================================
+
+class TokenCacheadoAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication que resuelve los tokens de conductores y
+    administradores activos desde el índice de recogida, sin consultar la
+    base de datos. Solo se guarda token -> id, rol y estado del usuario: el
+    usuario se arma en cada petición con esos campos (no es una fila
+    completa). Un usuario desactivado, con otro rol o que cerró sesión deja
+    de valer al instante en este nodo y en los demás al siguiente refresco
+    (RECOGIDA_REFRESCO segundos). Los demás tokens se validan como en
+    TokenAuthentication.
+    """
+
+    def authenticate_credentials(self, key):
+        datos = indice_recogida.listo().verificador(key)
+        if datos is None:
+            return super().authenticate_credentials(key)
+        usuario = Usuario(**datos)
+        return usuario, Token(key=key, user=usuario)
@@ -0,0 +1,77 @@
+# Renderizadores rápidos para las respuestas de la API
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# orjson y msgpack son opcionales: si no están instalados se usa el
+# JSONRenderer estándar y el formato MessagePack no se ofrece
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Codificador de DRF para los tipos que orjson/msgpack no convierten igual
+# (fechas, Decimal, UUID, textos traducibles...), así la salida no cambia
+_codificador_drf = JSONEncoder()
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """
+    Renderizador JSON basado en orjson (varias veces más rápido que json).
+    Produce el mismo JSON compacto que JSONRenderer, incluido el escape de
+    U+2028/U+2029; si orjson no está instalado o se pide indentación, usa
+    el JSONRenderer de DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Convierte los datos de la respuesta a bytes JSON.
+
+        Args:
+            data: Datos serializados de la respuesta
+            accepted_media_type: Tipo de contenido aceptado por el cliente
+            renderer_context: Contexto de DRF (vista, petición, respuesta)
+
+        Returns:
+            bytes: JSON codificado en UTF-8
+        """
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        contenido = orjson.dumps(
+            data,
+            default=_codificador_drf.default,
+            # Fechas y horas se pasan al codificador de DRF para conservar su formato
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Como JSONRenderer: U+2028/U+2029 escapados, válidos dentro de <script> en JavaScript
+        return contenido.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderizador MessagePack (binario, más compacto que JSON).
+    Se elige cuando el cliente envía `Accept: application/msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Convierte los datos de la respuesta a bytes MessagePack.
+
+        Returns:
+            bytes: Datos codificados en MessagePack
+        """
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_codificador_drf.default, use_bin_type=True)
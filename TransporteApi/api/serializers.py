@@ -1,7 +1,16 @@
 # Importaciones necesarias para Django REST Framework
 from rest_framework import serializers
 from django.contrib.auth import authenticate  # Para autenticar usuarios
-from .models import Usuario, Padres, Estudiantes, Tutor_receptor  # Nuestros modelos
+from .models import (  # Nuestros modelos
+    Usuario, Padres, Estudiantes, Tutor_receptor,
+    Conductor, Vehiculo, AsignacionVehiculo, Parada,
+    TareaProgramada, EjecucionTarea, DestinoEventos, EventoDominio, Lapida,
+    CalendarioColegio, ExcepcionCalendario, TarifaTransporte, CorridaFacturacion, Factura,
+    EventoRecorrido, UbicacionColegio, AvisoPadre, SimulacionPlan, RegistroAuditoria
+)
+from .eventos_utils import evento, registrar_eventos, datos_entidad, validar_destino  # Bandeja de salida de eventos
+from .sincronizacion_utils import cambios_versionados  # Versión de las filas guardadas
+from .simulacion_utils import validar_escenarios  # Validación de los escenarios del simulador
 
 
 class UsuarioSerializer(serializers.ModelSerializer):
@@ -116,8 +125,7 @@ class PadresSerializer(serializers.ModelSerializer):
     class Meta:
         model = Padres  # Modelo que serializa
         fields = '__all__'  # Incluye todos los campos del modelo
-        read_only_fields = ['aprobado', 'fecha_formulario',
-                            'fecha_expiracion']  # Campos de solo lectura
+        read_only_fields = ['aprobado', 'created_at', 'version']  # Campos de solo lectura
 
 
 class EstudiantesSerializer(serializers.ModelSerializer):
@@ -128,7 +136,7 @@ class EstudiantesSerializer(serializers.ModelSerializer):
     class Meta:
         model = Estudiantes  # Modelo que serializa
         fields = ['id', 'nombre', 'apellido', 'fecha_nacimiento', 'grado', 'edad',
-                  'colegio', 'H_entrada', 'H_salida']  # Campos que necesito del modelo
+                  'Colegio', 'H_entrada', 'H_salida']  # Campos que necesito del modelo
 
 
 class TutorReceptorSerializer(serializers.ModelSerializer):
@@ -138,26 +146,67 @@ class TutorReceptorSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Tutor_receptor  # Modelo que serializa
-        fields = ['id', 'nomnbre', 'apelido', 'direccion', 'telefono',
+        fields = ['id', 'nombre', 'apellido', 'direccion', 'telefono',
                   'parentesco', 'estudiante']  # Campos que necesito del modelo
 
 
+class EstudiantesSincronizacionSerializer(EstudiantesSerializer):
+    """
+    Estudiante para la sincronización incremental: incluye el padre (para
+    borrar en cascada en el cliente) y la versión.
+    """
+    class Meta(EstudiantesSerializer.Meta):
+        fields = EstudiantesSerializer.Meta.fields + ['padres', 'version']
+
+
+class TutoresSincronizacionSerializer(TutorReceptorSerializer):
+    """
+    Tutor para la sincronización incremental, con coordenadas y versión.
+    """
+    class Meta(TutorReceptorSerializer.Meta):
+        fields = TutorReceptorSerializer.Meta.fields + ['latitud', 'longitud', 'version']
+
+
+class LapidaSerializer(serializers.ModelSerializer):
+    """
+    Fila eliminada que los clientes deben borrar de su copia local.
+    """
+    id = serializers.IntegerField(source='objeto_id')
+
+    class Meta:
+        model = Lapida  # Modelo que serializa
+        fields = ['modelo', 'id', 'version']
+
+
 class FormularioSerializer(serializers.ModelSerializer):
     """
     Serializer para mostrar formularios completos con estudiantes y tutores.
+    Al escribir solo se guardan `cedula` y `celular` (ver update).
     """
     estudiantes = EstudiantesSerializer(many=True, read_only=True)
-    tutores_receptores = TutorReceptorSerializer(many=True, read_only=True)
+    # Los tutores pertenecen a cada estudiante; aquí se listan todos los del padre
+    tutores_receptores = serializers.SerializerMethodField()
+    fecha_formulario = serializers.DateTimeField(source='created_at', read_only=True)
 
     class Meta:
         model = Padres
         fields = ['id', 'cedula', 'celular', 'aprobado', 'fecha_formulario',
-                  'fecha_expiracion', 'estudiantes', 'tutores_receptores']
+                  'estudiantes', 'tutores_receptores']
         read_only_fields = ['aprobado']
 
+    def get_tutores_receptores(self, obj):
+        """
+        Lista los tutores de todos los estudiantes del padre.
+        Usa estudiantes.all() para aprovechar prefetch_related cuando la vista lo aplica.
+        """
+        tutores = [tutor for est in obj.estudiantes.all() for tutor in est.tutores_receptores.all()]
+        return TutorReceptorSerializer(tutores, many=True).data
+
+    @cambios_versionados  # Los cambios y sus eventos se confirman juntos; versión al confirmar
     def create(self, validated_data):
         estudiantes_data = validated_data.pop('estudiantes', [])
         tutores_data = validated_data.pop('tutores_receptores', [])
+        eventos = []
 
         padre = self.context.get(
             'padre') or self.initial_data.get('padre_instance')
@@ -173,6 +222,7 @@ class FormularioSerializer(serializers.ModelSerializer):
         for est in estudiantes_data:  # Crear estudiantes y guardarlos en una lista
             estudiante = Estudiantes.objects.create(padres=padre, **est)
             crear_estudiantes.append(estudiante)
+            eventos.append(evento('estudiante.creado', estudiante.pk, datos_entidad(estudiante)))
         # Si el tutor viene sin el id del estudiante, asignarlo
 
         for tutor in tutores_data:
@@ -187,44 +237,24 @@ class FormularioSerializer(serializers.ModelSerializer):
                 estudiante_obj = crear_estudiantes[0] if crear_estudiantes else None
 
             if estudiante_obj:  # Asignar el estudiante creado
-                Tutor_receptor.objects.create(
+                tutor_obj = Tutor_receptor.objects.create(
                     estudiante=estudiante_obj, **tutor)
+                eventos.append(evento('tutor.creado', tutor_obj.pk, datos_entidad(tutor_obj)))
 
+        registrar_eventos(eventos)
         # retornar el padre con los datos actualizados
         return padre
 
+    @cambios_versionados  # Versión al confirmar
     def update(self, instance, validated_data):
-        estudiantes_data = validated_data.pop('estudiantes', [])
-        tutores_data = validated_data.pop('tutores_receptores', [])
-
+        """
+        Actualiza solo la cédula y el celular del padre. `estudiantes` y
+        `tutores_receptores` son de solo lectura: los estudiantes y tutores
+        se cambian en sus propios endpoints, que validan y versionan cada fila.
+        """
         instance.cedula = validated_data.get('cedula', instance.cedula)
         instance.celular = validated_data.get('celular', instance.celular)
         instance.save()
-
-        # Actualizar estudiantes
-
-        for est_data in estudiantes_data:
-            est_id = est_data.get('id', None)
-            if est_id:
-                Estudiantes.objects.filter(id=est_id, padres=instance).update(
-                    **{k: v for k, v in est_data.items() if k != 'id'})
-            else:
-                Estudiantes.objects.create(padres=instance, **est_data)
-        
-        # Actualizar tutores o cra tutores
-        for tutor_data in tutores_data: 
-            tutor_id = tutor_data.get('id', None)
-            if tutor_id:
-                Tutor_receptor.objects.filter(id=tutor_id, estudiante__padres=instance).update(
-                    **{k: v for k, v in tutor_data.items() if k != 'id'})
-            else: # Si no tiene ID, crear un nuevo tutor
-                estudiante_id = tutor_data.pop('estudiante_id', None)
-                if estudiante_id: # Si se proporciona el ID del estudiante
-                    try: # Buscar el estudiante por ID y padre
-                        estudiante_obj = Estudiantes.objects.get(id=estudiante_id, padres=instance)
-                        Tutor_receptor.objects.create(estudiante=estudiante_obj, **tutor_data)
-                    except Estudiantes.DoesNotExist:
-                        pass
         return instance
 
 
@@ -277,3 +307,309 @@ class EnvioFormularioSerializer(serializers.Serializer):
                         estudiante=estudiante, **tutor_data)
 
         return padre
+
+
+class ConductorSerializer(serializers.ModelSerializer):
+    """
+    Serializer para el modelo Conductor.
+    Permite crear, leer, actualizar y eliminar conductores.
+    """
+    class Meta:
+        model = Conductor  # Modelo que serializa
+        fields = '__all__'  # Incluye todos los campos del modelo
+
+
+class VehiculoSerializer(serializers.ModelSerializer):
+    """
+    Serializer para el modelo Vehiculo.
+    Permite crear, leer, actualizar y eliminar vehículos de la flota.
+    """
+    class Meta:
+        model = Vehiculo  # Modelo que serializa
+        fields = '__all__'  # Incluye todos los campos del modelo
+
+
+class AsignacionVehiculoSerializer(serializers.ModelSerializer):
+    """
+    Serializer para mostrar los asientos asignados a un estudiante.
+    """
+    placa = serializers.CharField(source='vehiculo.placa', read_only=True)
+
+    class Meta:
+        model = AsignacionVehiculo  # Modelo que serializa
+        fields = ['id', 'estudiante', 'vehiculo', 'placa', 'tramo', 'colegio', 'hora']
+        read_only_fields = fields  # Las asignaciones las calcula el motor
+
+
+class ParadaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para el modelo Parada.
+    Permite crear, leer, actualizar y eliminar paradas compartidas.
+    """
+    class Meta:
+        model = Parada  # Modelo que serializa
+        fields = ['id', 'nombre', 'latitud', 'longitud', 'created_at']
+        read_only_fields = ['created_at']
+
+
+class TareaProgramadaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para mostrar las tareas periódicas y su estado de bloqueo.
+    """
+    class Meta:
+        model = TareaProgramada  # Modelo que serializa
+        fields = ['id', 'nombre', 'proxima_ejecucion', 'ultima_ejecucion', 'bloqueado_por', 'bloqueado_hasta']
+
+
+class EjecucionTareaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para mostrar el historial de ejecuciones de las tareas.
+    """
+    tarea = serializers.CharField(source='tarea.nombre', read_only=True)
+
+    class Meta:
+        model = EjecucionTarea  # Modelo que serializa
+        fields = ['id', 'tarea', 'nodo', 'inicio', 'fin', 'duracion_ms', 'estado', 'mensaje']
+
+
+class DestinoEventosSerializer(serializers.ModelSerializer):
+    """
+    Serializer para registrar destinos de eventos (webhook o archivo).
+    El cursor y el estado de entrega los mantiene la tarea de entrega.
+    """
+    tipos_evento = serializers.CharField(required=False, allow_blank=True)
+
+    class Meta:
+        model = DestinoEventos  # Modelo que serializa
+        fields = ['id', 'nombre', 'tipo', 'destino', 'secreto', 'tipos_evento', 'activo',
+                  'ultimo_evento', 'huecos', 'fallos', 'proximo_intento', 'ultimo_error', 'created_at']
+        read_only_fields = ['huecos', 'fallos', 'proximo_intento', 'ultimo_error', 'created_at']
+        extra_kwargs = {'secreto': {'write_only': True}}
+
+    def validate_tipos_evento(self, value):
+        """Verifica que los tipos separados por coma existan"""
+        validos = {tipo for tipo, _ in EventoDominio.TIPO_CHOICES}
+        tipos = [t.strip() for t in value.split(',') if t.strip()]
+        desconocidos = [t for t in tipos if t not in validos]
+        if desconocidos:
+            raise serializers.ValidationError(f"Tipos desconocidos: {', '.join(desconocidos)}")
+        return ','.join(tipos)
+
+    def validate(self, attrs):
+        """Solo webhooks http(s) y archivos dentro de EVENTOS_DIRECTORIO"""
+        tipo = attrs.get('tipo', getattr(self.instance, 'tipo', None))
+        destino = attrs.get('destino', getattr(self.instance, 'destino', None))
+        try:
+            validar_destino(tipo, destino)
+        except ValueError as e:
+            raise serializers.ValidationError({'destino': str(e)})
+        return attrs
+
+
+class CalendarioColegioSerializer(serializers.ModelSerializer):
+    """
+    Serializer para el calendario de servicio de un colegio.
+    `dias_servicio` son bits de la semana: lunes = 1, martes = 2, ... domingo = 64.
+    """
+    class Meta:
+        model = CalendarioColegio  # Modelo que serializa
+        fields = ['id', 'colegio', 'dias_servicio', 'inicio_periodo', 'fin_periodo', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate_dias_servicio(self, value):
+        """Solo los 7 bits de la semana"""
+        if not 0 <= value <= 0b1111111:
+            raise serializers.ValidationError('Debe estar entre 0 y 127 (un bit por día de la semana)')
+        return value
+
+    def validate(self, data):
+        """Verifica que el periodo lectivo termine después de empezar"""
+        inicio = data.get('inicio_periodo', getattr(self.instance, 'inicio_periodo', None))
+        fin = data.get('fin_periodo', getattr(self.instance, 'fin_periodo', None))
+        if inicio and fin and fin < inicio:
+            raise serializers.ValidationError({'fin_periodo': 'Debe ser posterior a inicio_periodo'})
+        return data
+
+
+class ExcepcionCalendarioSerializer(serializers.ModelSerializer):
+    """
+    Serializer para feriados, medios días y semanas de exámenes.
+    Sin `calendario` la excepción aplica a todos los colegios.
+    """
+    class Meta:
+        model = ExcepcionCalendario  # Modelo que serializa
+        fields = ['id', 'calendario', 'tipo', 'desde', 'hasta', 'hora_entrada', 'hora_salida', 'descripcion']
+
+    def validate(self, data):
+        """Verifica el intervalo y que los feriados no tengan horario"""
+        def valor(campo):
+            return data.get(campo, getattr(self.instance, campo, None))
+
+        if valor('hasta') < valor('desde'):
+            raise serializers.ValidationError({'hasta': 'Debe ser igual o posterior a desde'})
+        if valor('tipo') == 'feriado' and (valor('hora_entrada') or valor('hora_salida')):
+            raise serializers.ValidationError({'tipo': 'Un feriado no tiene horario (no hay servicio)'})
+        return data
+
+
+class TarifaTransporteSerializer(serializers.ModelSerializer):
+    """
+    Serializer para las tarifas mensuales por colegio, tramo y franja horaria.
+    """
+    class Meta:
+        model = TarifaTransporte  # Modelo que serializa
+        fields = ['id', 'colegio', 'tramo', 'hora_desde', 'hora_hasta', 'monto', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate_monto(self, value):
+        """El monto no puede ser negativo"""
+        if value < 0:
+            raise serializers.ValidationError('El monto no puede ser negativo')
+        return value
+
+    def validate(self, data):
+        """Verifica que la franja horaria termine después de empezar"""
+        desde = data.get('hora_desde', getattr(self.instance, 'hora_desde', None))
+        hasta = data.get('hora_hasta', getattr(self.instance, 'hora_hasta', None))
+        if desde and hasta and hasta < desde:
+            raise serializers.ValidationError({'hora_hasta': 'Debe ser posterior a hora_desde'})
+        return data
+
+
+class CorridaFacturacionSerializer(serializers.ModelSerializer):
+    """
+    Serializer para mostrar el avance de las corridas de facturación.
+    """
+    class Meta:
+        model = CorridaFacturacion  # Modelo que serializa
+        fields = ['id', 'periodo', 'estado', 'ultimo_padre', 'facturas', 'total', 'sin_tarifa',
+                  'inicio', 'fin', 'created_at']
+        read_only_fields = fields  # Las corridas las avanza la tarea de facturación
+
+
+class FacturaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para las facturas mensuales. Solo el estado se puede cambiar
+    (pagada o anulada); los montos los calcula la corrida.
+    """
+    class Meta:
+        model = Factura  # Modelo que serializa
+        fields = ['id', 'padre', 'periodo', 'nombre', 'email', 'estudiantes', 'subtotal', 'descuento',
+                  'total', 'detalle', 'estado', 'created_at']
+        read_only_fields = ['padre', 'periodo', 'nombre', 'email', 'estudiantes', 'subtotal', 'descuento',
+                            'total', 'detalle', 'created_at']
+
+
+class EventoRecorridoSerializer(serializers.ModelSerializer):
+    """
+    Serializer para los eventos que el conductor registra en un recorrido.
+    Sin `momento` se usa la hora de llegada al servidor.
+    """
+    estudiante = serializers.IntegerField(source='estudiante_id', required=False, allow_null=True)
+    momento = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = EventoRecorrido  # Modelo que serializa
+        fields = ['tipo', 'estudiante', 'momento']
+
+    def validate(self, data):
+        """Las paradas llevan estudiante; el inicio y el fin no"""
+        if (data['tipo'] == 'parada') != (data.get('estudiante_id') is not None):
+            raise serializers.ValidationError({'estudiante': 'Obligatorio en las paradas y solo en ellas'})
+        return data
+
+
+class UbicacionColegioSerializer(serializers.ModelSerializer):
+    """
+    Serializer para la ubicación (geocerca de llegada) de un colegio.
+    """
+    class Meta:
+        model = UbicacionColegio  # Modelo que serializa
+        fields = ['id', 'colegio', 'latitud', 'longitud', 'radio_metros', 'created_at']
+        read_only_fields = ['created_at']
+
+    def validate(self, data):
+        """Coordenadas dentro de los rangos válidos"""
+        latitud = data.get('latitud', getattr(self.instance, 'latitud', None))
+        longitud = data.get('longitud', getattr(self.instance, 'longitud', None))
+        if latitud is not None and not -90 <= latitud <= 90:
+            raise serializers.ValidationError({'latitud': 'Debe estar entre -90 y 90'})
+        if longitud is not None and not -180 <= longitud <= 180:
+            raise serializers.ValidationError({'longitud': 'Debe estar entre -180 y 180'})
+        return data
+
+
+class AvisoPadreSerializer(serializers.ModelSerializer):
+    """
+    Serializer para mostrar los avisos de llegada del transporte a los padres.
+    """
+    placa = serializers.CharField(source='vehiculo.placa', read_only=True)
+
+    class Meta:
+        model = AvisoPadre  # Modelo que serializa
+        fields = ['id', 'tipo', 'lugar', 'nombre_lugar', 'tramo', 'placa', 'distancia_metros', 'momento']
+        read_only_fields = fields  # Los crea el procesamiento de pings GPS
+
+
+class SesionPerfiladoSerializer(serializers.Serializer):
+    """
+    Serializer para iniciar una sesión del perfilador: una vista (o todas),
+    por una ventana de segundos o para las próximas N peticiones.
+    """
+    vista = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    segundos = serializers.IntegerField(required=False, min_value=1)
+    peticiones = serializers.IntegerField(required=False, min_value=1)
+    intervalo_ms = serializers.IntegerField(required=False, min_value=1, max_value=1000)
+
+    def validate_vista(self, value):
+        """La vista debe ser una de api/views.py (la lista la pasa la vista en el contexto)"""
+        if value and value not in self.context['vistas']:
+            raise serializers.ValidationError(f'No existe la vista {value} en api/views.py')
+        return value or None
+
+
+class SimulacionPlanSerializer(serializers.ModelSerializer):
+    """
+    Serializer para pedir y consultar simulaciones de escenarios. Sin `fecha`
+    se simula el día de hoy; los resultados los completa la tarea `simular`.
+    """
+    fecha = serializers.DateField(required=False)
+
+    class Meta:
+        model = SimulacionPlan  # Modelo que serializa
+        fields = ['id', 'fecha', 'escenarios', 'estado', 'resultados', 'error', 'creado_por',
+                  'inicio', 'fin', 'created_at']
+        read_only_fields = ['estado', 'resultados', 'error', 'creado_por', 'inicio', 'fin', 'created_at']
+
+    def validate_escenarios(self, value):
+        """Cada escenario con nombre y cambios válidos"""
+        try:
+            return validar_escenarios(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+
+class SimulacionPlanResumenSerializer(SimulacionPlanSerializer):
+    """
+    Serializer del listado de simulaciones: sin los escenarios ni los
+    resultados, que pueden ser cientos por simulación.
+    """
+    escenarios = serializers.SerializerMethodField()
+
+    class Meta(SimulacionPlanSerializer.Meta):
+        fields = ['id', 'fecha', 'escenarios', 'estado', 'creado_por', 'inicio', 'fin', 'created_at']
+
+    def get_escenarios(self, obj):
+        """Cantidad de escenarios"""
+        return len(obj.escenarios)
+
+
+class RegistroAuditoriaSerializer(serializers.ModelSerializer):
+    """
+    Serializer para consultar el registro de auditoría (solo lectura).
+    """
+    class Meta:
+        model = RegistroAuditoria  # Modelo que serializa
+        fields = ['id', 'momento', 'actor', 'actor_email', 'accion', 'objetivo_tipo', 'objetivo_id',
+                  'antes', 'despues']
+        read_only_fields = fields  # Las entradas solo las agrega el búfer de auditoría
@@ -0,0 +1,215 @@
+# Serialización rápida de solo lectura para los listados grandes
+#
+# Un ModelSerializer recorre sus campos con introspección y llama a
+# to_representation de cada campo en cada fila. Aquí el plan de campos se
+# compila una vez desde el serializer original (mismos nombres, orden y
+# formato) y cada fila se arma desde un diccionario de .values(), así la
+# salida es idéntica byte a byte pero sin instanciar modelos ni serializers.
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .models import Estudiantes, Tutor_receptor
+from .serializers import PadresSerializer, EstudiantesSerializer, TutorReceptorSerializer, FormularioSerializer
+
+
+# Campos cuyo to_representation devuelve el mismo valor que trae .values()
+REPRESENTACION_IDENTICA = (
+    serializers.IntegerField.to_representation,
+    serializers.CharField.to_representation,
+    serializers.BooleanField.to_representation,
+    serializers.PrimaryKeyRelatedField.to_representation,
+)
+
+
+def _convertidor(fuente, representar):
+    """Accesor de un campo que necesita conversión (fechas, decimales...); None queda como None"""
+    obtener = itemgetter(fuente)
+
+    def convertir(fila):
+        valor = obtener(fila)
+        return None if valor is None else representar(valor)
+    return convertir
+
+
+def _isoformat(fuente):
+    """Accesor de un DateField/TimeField en ISO 8601 (lo mismo que hace DRF con fechas de la base de datos)"""
+    obtener = itemgetter(fuente)
+
+    def convertir(fila):
+        valor = obtener(fila)
+        return None if valor is None else valor.isoformat()
+    return convertir
+
+
+def _fecha_hora(fuente, campo):
+    """
+    Fábrica del accesor de un DateTimeField en ISO 8601. DRF busca la zona
+    horaria actual en cada valor; aquí se resuelve una vez por página.
+
+    Returns:
+        function: Recibe la zona horaria y retorna el accesor de la fila
+    """
+    obtener = itemgetter(fuente)
+    representar = campo.to_representation
+    fija = getattr(campo, 'timezone', None)  # default_timezone del campo, si se declaró
+
+    def con_zona(zona):
+        zona = fija or zona
+        if zona is None:
+            return _convertidor(fuente, representar)
+
+        def convertir(fila):
+            valor = obtener(fila)
+            if not valor:
+                return None
+            if valor.tzinfo is None:  # Fecha ingenua: DRF decide cómo tratarla
+                return representar(valor)
+            texto = valor.astimezone(zona).isoformat()
+            return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+        return convertir
+    return con_zona
+
+
+# Formato por defecto de cada campo de fecha en la configuración de DRF
+FORMATOS_FECHA = {
+    serializers.DateTimeField: 'DATETIME_FORMAT',
+    serializers.DateField: 'DATE_FORMAT',
+    serializers.TimeField: 'TIME_FORMAT',
+}
+
+
+def _es_iso(campo):
+    """True si un campo de fecha (de la clase exacta de DRF) se representa en ISO 8601"""
+    clave = FORMATOS_FECHA.get(type(campo))
+    formato = getattr(campo, 'format', clave and getattr(api_settings, clave))
+    return isinstance(formato, str) and formato.lower() == ISO_8601
+
+
+class LecturaRapida:
+    """
+    Equivalente de solo lectura de un ModelSerializer.
+
+    Los campos simples se copian de la fila; los que tienen formato (fechas,
+    horas, decimales) usan el to_representation del campo original ya
+    configurado. Los campos anidados (otros serializers o métodos) los arma
+    la función `relaciones`, que recibe todas las filas de la página y
+    retorna {campo: {id de la fila: valor}} con consultas en lote.
+    """
+
+    def __init__(self, serializer_class, relaciones=None, campos_relacion=()):
+        """
+        Args:
+            serializer_class: ModelSerializer cuya salida se reproduce
+            relaciones: Función opcional para los campos anidados
+            campos_relacion: Nombres de los campos que arma `relaciones`
+        """
+        self.serializer_class = serializer_class
+        self.relaciones = relaciones
+        self.campos_relacion = set(campos_relacion)
+        self._plan = None
+        self._columnas = None
+
+    def compilar(self):
+        """
+        Plan de campos (se calcula una vez, en la primera petición).
+
+        Returns:
+            list: [(nombre, accesor o None si es anidado, True si el accesor depende de la zona horaria)]
+
+        Raises:
+            ValueError: Si un campo no se puede leer de .values() y no es anidado
+        """
+        if self._plan is None:
+            plan = []
+            for nombre, campo in self.serializer_class().fields.items():
+                if campo.write_only:
+                    continue
+                if nombre in self.campos_relacion:
+                    plan.append((nombre, None, False))
+                    continue
+                if isinstance(campo, (serializers.BaseSerializer, serializers.SerializerMethodField)) \
+                        or campo.source == '*' or '.' in campo.source:
+                    raise ValueError(f'El campo {nombre} debe declararse en campos_relacion')
+                if type(campo).to_representation in REPRESENTACION_IDENTICA:
+                    plan.append((nombre, itemgetter(campo.source), False))
+                elif type(campo) is serializers.DateTimeField and _es_iso(campo):
+                    plan.append((nombre, _fecha_hora(campo.source, campo), True))
+                elif _es_iso(campo):  # DateField o TimeField
+                    plan.append((nombre, _isoformat(campo.source), False))
+                else:
+                    plan.append((nombre, _convertidor(campo.source, campo.to_representation), False))
+            self._plan = plan
+        return self._plan
+
+    def columnas(self):
+        """Columnas de .values() que necesita el plan"""
+        if self._columnas is None:
+            fuentes = [campo.source for nombre, campo in self.serializer_class().fields.items()
+                       if not campo.write_only and nombre not in self.campos_relacion]
+            self._columnas = list(dict.fromkeys(['id', *fuentes]))
+        return self._columnas
+
+    def representar(self, filas):
+        """
+        Args:
+            filas: Diccionarios de .values() con al menos columnas()
+
+        Returns:
+            list: Lo mismo que serializer_class(instancias, many=True).data
+        """
+        zona = None
+        plan = []
+        for nombre, obtener, por_zona in self.compilar():
+            if por_zona:
+                if zona is None:
+                    zona = timezone.get_current_timezone() if settings.USE_TZ else False
+                obtener = obtener(zona or None)
+            plan.append((nombre, obtener))
+        anidados = self.relaciones(filas) if self.relaciones else {}
+        return [
+            {nombre: obtener(fila) if obtener else anidados[nombre].get(fila['id'], []) for nombre, obtener in plan}
+            for fila in filas
+        ]
+
+
+# ============================================================================
+# LECTURAS DE LOS LISTADOS
+# ============================================================================
+
+lectura_padres = LecturaRapida(PadresSerializer)
+lectura_estudiantes = LecturaRapida(EstudiantesSerializer)
+lectura_tutores = LecturaRapida(TutorReceptorSerializer)
+
+
+def relaciones_formulario(filas):
+    """
+    Estudiantes y tutores de una página de formularios con dos consultas.
+    Se ordenan por ID, igual que el prefetch de FormulariosAdminView.
+
+    Returns:
+        dict: {'estudiantes': {padre_id: [...]}, 'tutores_receptores': {padre_id: [...]}}
+    """
+    padre_ids = [fila['id'] for fila in filas]
+    estudiantes = list(Estudiantes.objects.filter(padres_id__in=padre_ids).order_by('id').values(
+        'padres_id', *lectura_estudiantes.columnas()))
+    tutores = list(Tutor_receptor.objects.filter(estudiante__padres_id__in=padre_ids).order_by('id').values(
+        *lectura_tutores.columnas()))
+
+    tutores_por_estudiante = defaultdict(list)
+    for fila, datos in zip(tutores, lectura_tutores.representar(tutores)):
+        tutores_por_estudiante[fila['estudiante']].append(datos)
+
+    por_padre, tutores_por_padre = defaultdict(list), defaultdict(list)
+    for fila, datos in zip(estudiantes, lectura_estudiantes.representar(estudiantes)):
+        por_padre[fila['padres_id']].append(datos)
+        tutores_por_padre[fila['padres_id']].extend(tutores_por_estudiante.get(fila['id'], ()))
+    return {'estudiantes': por_padre, 'tutores_receptores': tutores_por_padre}
+
+
+lectura_formularios = LecturaRapida(FormularioSerializer, relaciones_formulario,
+                                    campos_relacion=('estudiantes', 'tutores_receptores'))
@@ -0,0 +1,198 @@
+# Señales para mantener datos derivados al día cuando cambian los modelos
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.db import transaction
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .models import (
+    Usuario, Padres, Estudiantes, Tutor_receptor, Parada, AsignacionVehiculo, CalendarioColegio, ExcepcionCalendario,
+    UbicacionColegio, Vehiculo
+)
+from .asignacion_utils import TRAMOS, asignar_estudiante, reubicar_sobrantes
+from .analitica_utils import registrar_inscripcion, actualizar_ocupacion
+from .manifiestos_utils import programar_actualizacion
+from .duplicados_utils import indexar_estudiante, indexar_padre
+from .geocodificacion_utils import geocodificar_tutor
+from .espacial_utils import indice_tutores, indice_paradas
+from .sincronizacion_utils import versionar, registrar_lapida, actualizar_conductores
+from .recogida_utils import indice_recogida
+from .calendario_utils import invalidar_planes
+from .geocercas_utils import geocercas
+
+
+@receiver(post_save, sender=Estudiantes)
+def reasignar_asiento(sender, instance, **kwargs):
+    """
+    Reasigna el asiento del estudiante cuando se crea o cambia su colegio u horario.
+    Solo se recalculan las franjas de ese estudiante (asignación incremental).
+    También actualiza los manifiestos de hoy de los vehículos anteriores y nuevos
+    y la ocupación por franja de la analítica.
+    """
+    previas = list(AsignacionVehiculo.objects.filter(estudiante=instance).values_list('vehiculo_id', 'tramo', 'hora'))
+    resultado = asignar_estudiante(instance)
+    programar_actualizacion({v for v, _, _ in previas} | {v for v in resultado.values() if v is not None})
+    # Ocupación de hoy en las franjas anteriores y nuevas del estudiante
+    actualizar_ocupacion({(t, h) for _, t, h in previas} | {(t, getattr(instance, c)) for t, c in TRAMOS})
+
+
+@receiver(pre_save, sender=Vehiculo)
+def recordar_capacidad(sender, instance, raw=False, **kwargs):
+    """Guarda la capacidad y el estado anteriores para saber si hay que reubicar"""
+    if not raw and instance.pk:
+        instance._anterior = Vehiculo.objects.filter(pk=instance.pk).values('capacidad', 'activo').first()
+
+
+@receiver(post_save, sender=Vehiculo)
+def reubicar_por_capacidad(sender, instance, created, raw=False, **kwargs):
+    """
+    Reubica a los estudiantes que sobran cuando un vehículo baja su capacidad
+    o sale de servicio. Solo se recalculan las franjas de ese vehículo.
+    """
+    anterior = getattr(instance, '_anterior', None)
+    if created or raw or anterior is None:
+        return
+    if instance.capacidad >= anterior['capacidad'] and (instance.activo or not anterior['activo']):
+        return
+    resumen = reubicar_sobrantes(instance)
+    programar_actualizacion(resumen['vehiculos'])
+    actualizar_ocupacion(resumen['franjas'])
+
+
+def _vehiculos_del_estudiante(estudiante_id):
+    """IDs de los vehículos donde viaja un estudiante"""
+    return AsignacionVehiculo.objects.filter(estudiante_id=estudiante_id).values_list('vehiculo_id', flat=True)
+
+
+@receiver(pre_delete, sender=Estudiantes)
+def quitar_estudiante_de_manifiestos(sender, instance, **kwargs):
+    """
+    Actualiza los manifiestos de hoy de los vehículos del estudiante eliminado.
+    Se usa pre_delete porque sus asignaciones se borran en cascada.
+    """
+    programar_actualizacion(_vehiculos_del_estudiante(instance.pk))
+
+
+@receiver(pre_delete, sender=Estudiantes)
+def quitar_estudiante_de_conductores(sender, instance, **kwargs):
+    """Lápidas para los conductores de los vehículos del estudiante eliminado"""
+    actualizar_conductores({(v, instance.pk) for v in _vehiculos_del_estudiante(instance.pk)}, set())
+
+
+@receiver(post_save, sender=Tutor_receptor)
+def geocodificar_direccion(sender, instance, **kwargs):
+    """
+    Geocodifica la dirección del tutor solo si cambió y actualiza el índice espacial.
+    """
+    if geocodificar_tutor(instance):
+        indice_tutores.actualizar(instance.pk, instance.latitud, instance.longitud)
+    programar_actualizacion(_vehiculos_del_estudiante(instance.estudiante_id))
+
+
+@receiver(post_delete, sender=Tutor_receptor)
+def quitar_tutor_del_indice(sender, instance, **kwargs):
+    """Quita al tutor eliminado del índice espacial y de los manifiestos de hoy"""
+    indice_tutores.actualizar(instance.pk, None, None)
+    programar_actualizacion(_vehiculos_del_estudiante(instance.estudiante_id))
+
+
+@receiver(post_save, sender=Parada)
+def actualizar_parada_en_indice(sender, instance, **kwargs):
+    """Agrega o mueve la parada en el índice espacial"""
+    indice_paradas.actualizar(instance.pk, instance.latitud, instance.longitud)
+
+
+@receiver(post_delete, sender=Parada)
+def quitar_parada_del_indice(sender, instance, **kwargs):
+    """Quita la parada eliminada del índice espacial"""
+    indice_paradas.actualizar(instance.pk, None, None)
+
+
+@receiver(post_save, sender=Estudiantes)
+def indexar_estudiante_duplicados(sender, instance, **kwargs):
+    """Actualiza las claves de bloqueo del estudiante para detectar duplicados"""
+    indexar_estudiante(instance)
+
+
+@receiver(post_save, sender=Padres)
+def indexar_padre_duplicados(sender, instance, **kwargs):
+    """Actualiza las claves de bloqueo de la familia para detectar duplicados"""
+    indexar_padre(instance)
+
+
+@receiver(post_save, sender=Estudiantes)
+def sumar_inscripcion(sender, instance, created, **kwargs):
+    """Suma el estudiante nuevo a las inscripciones de su colegio (analítica)"""
+    if created:
+        registrar_inscripcion(instance)
+
+
+@receiver(post_delete, sender=Estudiantes)
+def restar_inscripcion(sender, instance, **kwargs):
+    """Resta el estudiante eliminado de las inscripciones y de la ocupación de sus franjas"""
+    registrar_inscripcion(instance, -1)
+    actualizar_ocupacion((t, getattr(instance, c)) for t, c in TRAMOS)
+
+
+@receiver(pre_save, sender=Padres)
+@receiver(pre_save, sender=Estudiantes)
+@receiver(pre_save, sender=Tutor_receptor)
+def asignar_version(sender, instance, raw=False, **kwargs):
+    """Marca la fila con la siguiente versión global (al confirmar, dentro de cambios_versionados)"""
+    if not raw:
+        versionar(instance)
+
+
+@receiver(post_delete, sender=Padres)
+@receiver(post_delete, sender=Estudiantes)
+@receiver(post_delete, sender=Tutor_receptor)
+def registrar_borrado(sender, instance, origin=None, **kwargs):
+    """Guarda la lápida de la fila eliminada para los clientes que sincronizan"""
+    registrar_lapida(instance, origin)
+
+
+@receiver(post_save, sender=Tutor_receptor)
+def actualizar_tutor_en_recogida(sender, instance, **kwargs):
+    """Actualiza al tutor en el índice de verificación de recogida de este nodo"""
+    padre_id = Estudiantes.objects.filter(pk=instance.estudiante_id).values_list('padres_id', flat=True).first()
+    # Solo tras el commit: un cambio revertido no debe autorizar a nadie
+    transaction.on_commit(lambda: indice_recogida.actualizar_tutor(instance, padre_id))
+
+
+@receiver(post_delete, sender=Tutor_receptor)
+def quitar_tutor_de_recogida(sender, instance, **kwargs):
+    """Quita al tutor eliminado del índice de verificación de recogida de este nodo"""
+    tutor_id = instance.pk
+    transaction.on_commit(lambda: indice_recogida.eliminar_tutor(tutor_id))
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_save, sender=Token)
+def actualizar_verificador(sender, instance, **kwargs):
+    """Actualiza en este nodo los tokens de un usuario que cambió (estado, rol) o inició sesión"""
+    usuario_id = instance.pk if sender is Usuario else instance.user_id
+    transaction.on_commit(lambda: indice_recogida.actualizar_usuario(usuario_id))
+
+
+@receiver(post_delete, sender=Token)
+def quitar_verificador(sender, instance, **kwargs):
+    """Quita en este nodo el token eliminado (cierre de sesión o usuario eliminado)"""
+    clave = instance.key
+    transaction.on_commit(lambda: indice_recogida.eliminar_token(clave))
+
+
+@receiver(post_save, sender=CalendarioColegio)
+@receiver(post_delete, sender=CalendarioColegio)
+@receiver(post_save, sender=ExcepcionCalendario)
+@receiver(post_delete, sender=ExcepcionCalendario)
+def invalidar_planes_de_viaje(sender, **kwargs):
+    """Descarta los planes de viaje cacheados cuando cambia un calendario o excepción"""
+    invalidar_planes()  # En la misma transacción: la nueva generación se confirma con el cambio
+
+
+@receiver(post_save, sender=Parada)
+@receiver(post_delete, sender=Parada)
+@receiver(post_save, sender=UbicacionColegio)
+@receiver(post_delete, sender=UbicacionColegio)
+def invalidar_geocercas(sender, **kwargs):
+    """Reconstruye las geocercas y rutas en la próxima consulta cuando cambia una parada o un colegio"""
+    transaction.on_commit(geocercas.invalidar)
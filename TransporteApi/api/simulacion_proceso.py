@@ -0,0 +1,20 @@
+# Punto de entrada de los procesos del pool del simulador
+#
+# Los procesos se crean con 'spawn' y arrancan sin Django configurado, así
+# que este módulo no importa modelos al cargarse: el inicializador configura
+# Django y guarda la instantánea del día, y cada escenario se simula con ella.
+_instantanea = None
+
+
+def iniciar(instantanea):
+    """Inicializador de cada proceso del pool"""
+    global _instantanea
+    import django
+    django.setup()
+    _instantanea = instantanea
+
+
+def simular(escenario):
+    """Simula un escenario con la instantánea que recibió el proceso"""
+    from .simulacion_utils import simular_escenario
+    return simular_escenario(_instantanea, escenario)
@@ -0,0 +1,697 @@
+# Simulación de un día de viajes para planificar cambios antes de hacerlos
+#
+# Se toma una sola vez una instantánea de la matrícula, la flota, las paradas
+# y el calendario del día. Cada escenario la copia, aplica sus cambios (un
+# colegio nuevo, un horario corrido, más o menos vehículos...), reparte los
+# asientos con la misma heurística que la asignación real y recorre las rutas
+# con una cola de eventos para medir atrasos, tiempos de viaje y uso de la
+# flota. Los escenarios son independientes y se reparten en un pool de procesos.
+import heapq
+import math
+import multiprocessing
+import os
+import random
+import traceback
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Estudiantes, UbicacionColegio, SimulacionPlan
+from .asignacion_utils import capacidades_activas, empaquetar_franja
+from .calendario_utils import clave_colegio, planes_colegios, mascaras_viaje
+from .espacial_utils import distancia_metros, indice_paradas, puntos_por_familia
+from . import planificador, simulacion_proceso
+
+
+# Nombre del escenario base contra el que se comparan los demás
+ESCENARIO_ACTUAL = 'Situación actual'
+
+# Métricas que se comparan contra la situación actual: nombre -> (sección, métrica)
+METRICAS_COMPARADAS = {
+    'porcentaje_tarde': ('llegada', 'porcentaje_tarde'),
+    'retraso_maximo_min': ('llegada', 'retraso_maximo_min'),
+    'espera_salida_promedio_min': ('salida', 'espera_promedio_min'),
+    'tiempo_viaje_promedio_min': ('tiempo_viaje_min', 'promedio'),
+    'tiempo_viaje_p95_min': ('tiempo_viaje_min', 'p95'),
+    'vehiculos_usados': ('vehiculos', 'usados'),
+    'km': ('vehiculos', 'km'),
+    'sin_asiento': (None, 'sin_asiento'),
+}
+
+
+def minutos(hora):
+    """Hora del día (time) en minutos desde la medianoche; None queda como None"""
+    if hora is None:
+        return None
+    return hora.hour * 60 + hora.minute + hora.second / 60
+
+
+def hora_texto(valor):
+    """Minutos desde la medianoche como 'HH:MM'"""
+    valor = round(valor) % (24 * 60)
+    return f'{valor // 60:02d}:{valor % 60:02d}'
+
+
+# ============================================================================
+# ESCENARIOS
+# ============================================================================
+
+# Tipos de cambio que acepta un escenario
+CAMBIOS = ('desplazar_horario', 'agregar_colegio', 'agregar_vehiculos', 'quitar_vehiculos', 'velocidad')
+
+
+def _numero(cambio, campo, minimo, maximo, entero=True, requerido=True):
+    valor = cambio.get(campo)
+    if valor is None and not requerido:
+        return None
+    tipos = (int,) if entero else (int, float)
+    if isinstance(valor, bool) or not isinstance(valor, tipos) or not minimo <= valor <= maximo:
+        raise ValueError(f'{cambio["tipo"]}: "{campo}" debe ser un número entre {minimo} y {maximo}')
+    return valor
+
+
+def _hora(cambio, campo):
+    valor = cambio.get(campo)
+    if valor is None:
+        return None
+    try:
+        return datetime.strptime(str(valor), '%H:%M').strftime('%H:%M')
+    except ValueError:
+        raise ValueError(f'{cambio["tipo"]}: "{campo}" debe tener el formato HH:MM')
+
+
+def _texto(cambio, campo, requerido=True):
+    valor = cambio.get(campo)
+    if valor is None and not requerido:
+        return None
+    if not isinstance(valor, str) or not valor.strip():
+        raise ValueError(f'{cambio["tipo"]}: "{campo}" es obligatorio')
+    return valor.strip()
+
+
+def _validar_cambio(cambio):
+    """Normaliza un cambio de un escenario o lanza ValueError"""
+    if not isinstance(cambio, dict) or cambio.get('tipo') not in CAMBIOS:
+        raise ValueError(f'Cada cambio debe tener "tipo": {", ".join(CAMBIOS)}')
+    tipo = cambio['tipo']
+
+    if tipo == 'desplazar_horario':
+        if cambio.get('tramo') not in ('entrada', 'salida'):
+            raise ValueError('desplazar_horario: "tramo" debe ser entrada o salida')
+        return {'tipo': tipo, 'tramo': cambio['tramo'], 'minutos': _numero(cambio, 'minutos', -240, 240),
+                'colegio': _texto(cambio, 'colegio', requerido=False)}
+
+    if tipo == 'agregar_colegio':
+        normal = {
+            'tipo': tipo,
+            'colegio': _texto(cambio, 'colegio'),
+            'latitud': _numero(cambio, 'latitud', -90, 90, entero=False),
+            'longitud': _numero(cambio, 'longitud', -180, 180, entero=False),
+            'estudiantes': _numero(cambio, 'estudiantes', 1, 5000),
+            'h_entrada': _hora(cambio, 'h_entrada'),
+            'h_salida': _hora(cambio, 'h_salida'),
+            'semilla': _numero(cambio, 'semilla', 0, 2 ** 31, requerido=False) or 0,
+        }
+        if normal['h_entrada'] is None and normal['h_salida'] is None:
+            raise ValueError('agregar_colegio: falta "h_entrada" o "h_salida"')
+        return normal
+
+    if tipo == 'agregar_vehiculos':
+        return {'tipo': tipo, 'cantidad': _numero(cambio, 'cantidad', 1, 500),
+                'capacidad': _numero(cambio, 'capacidad', 1, 100)}
+
+    if tipo == 'quitar_vehiculos':
+        vehiculos = cambio.get('vehiculos')
+        if not isinstance(vehiculos, list) or not all(isinstance(v, int) and not isinstance(v, bool)
+                                                      for v in vehiculos):
+            raise ValueError('quitar_vehiculos: "vehiculos" debe ser una lista de IDs')
+        return {'tipo': tipo, 'vehiculos': vehiculos}
+
+    return {'tipo': tipo, 'kmh': _numero(cambio, 'kmh', 5, 120, entero=False)}
+
+
+def validar_escenarios(escenarios):
+    """
+    Valida y normaliza los escenarios de una simulación.
+
+    Args:
+        escenarios: Lista de {'nombre': str, 'cambios': [{'tipo': ..., ...}]}
+
+    Returns:
+        list: Escenarios normalizados
+
+    Raises:
+        ValueError: Si algún escenario o cambio es inválido
+    """
+    maximo = getattr(settings, 'SIMULACION_MAXIMO_ESCENARIOS', 500)
+    if not isinstance(escenarios, list) or not escenarios:
+        raise ValueError('Se requiere una lista de escenarios')
+    if len(escenarios) > maximo:
+        raise ValueError(f'Máximo {maximo} escenarios por simulación')
+
+    normalizados = []
+    for numero, escenario in enumerate(escenarios, start=1):
+        if not isinstance(escenario, dict) or not isinstance(escenario.get('cambios'), list):
+            raise ValueError(f'Escenario {numero}: se requiere "cambios" (lista)')
+        try:
+            cambios = [_validar_cambio(cambio) for cambio in escenario['cambios']]
+        except ValueError as e:
+            raise ValueError(f'Escenario {numero}: {e}')
+        nombre = escenario.get('nombre')
+        normalizados.append({
+            'nombre': nombre.strip() if isinstance(nombre, str) and nombre.strip() else f'Escenario {numero}',
+            'cambios': cambios,
+        })
+    return normalizados
+
+
+# ============================================================================
+# INSTANTÁNEA DEL DÍA
+# ============================================================================
+
+def cargar_instantanea(fecha):
+    """
+    Datos del día que necesitan los escenarios, en estructuras simples que se
+    pueden enviar a otros procesos.
+
+    Cada familia sube y baja en la parada más cercana (a menos de
+    GEOCERCA_DISTANCIA_PARADA) o en su casa. Los colegios sin ubicación
+    registrada se ubican en el centro de sus familias.
+
+    Args:
+        fecha: Día que se simula
+
+    Returns:
+        dict: estudiantes, embarques, colegios, vehículos y parámetros
+    """
+    filas = list(Estudiantes.objects.exclude(Colegio__isnull=True).exclude(Colegio='').order_by('id').values_list(
+        'id', 'padres_id', 'Colegio', 'H_entrada', 'H_salida'))
+    nombres = {}
+    estudiantes = []
+    for estudiante_id, padre_id, colegio, entrada, salida in filas:
+        clave = clave_colegio(colegio)
+        nombres.setdefault(clave, colegio)
+        estudiantes.append((estudiante_id, padre_id, clave, minutos(entrada), minutos(salida)))
+
+    # Punto de subida de cada familia
+    paradas = indice_paradas.obtener()
+    maximo = getattr(settings, 'GEOCERCA_DISTANCIA_PARADA', 500)
+    embarques = {}
+    for padre_id, (lat, lon) in sorted(puntos_por_familia({e[1] for e in estudiantes}).items()):
+        cercana = paradas.mas_cercano(lat, lon, maximo)
+        if cercana is not None:
+            embarques[padre_id] = (f'p{cercana[1]}', *paradas.puntos[cercana[1]])
+        else:
+            embarques[padre_id] = (f'f{padre_id}', lat, lon)
+
+    # Ubicación de los colegios
+    ubicaciones = {clave_colegio(colegio): (lat, lon) for colegio, lat, lon in
+                   UbicacionColegio.objects.values_list('colegio', 'latitud', 'longitud')}
+    sumas = defaultdict(lambda: [0.0, 0.0, 0])
+    for _, padre_id, clave, _, _ in estudiantes:
+        if padre_id in embarques:
+            suma = sumas[clave]
+            suma[0] += embarques[padre_id][1]
+            suma[1] += embarques[padre_id][2]
+            suma[2] += 1
+
+    planes = planes_colegios(nombres, fecha, fecha)
+    colegios = {}
+    for clave, nombre in nombres.items():
+        suma = sumas.get(clave)
+        ubicacion = ubicaciones.get(clave) or (suma and (suma[0] / suma[2], suma[1] / suma[2]))
+        servicio, horarios = planes[clave]
+        colegios[clave] = {
+            'nombre': nombre,
+            'ubicacion': ubicacion,  # None si no hay cómo ubicarlo
+            'estimada': clave not in ubicaciones,
+            'plan': (servicio, [(mascara, minutos(e), minutos(s)) for mascara, e, s in horarios]),
+        }
+
+    return {
+        'fecha': fecha,
+        'estudiantes': estudiantes,
+        'embarques': embarques,
+        'colegios': colegios,
+        'vehiculos': capacidades_activas(),
+        'parametros': {
+            'velocidad_kmh': getattr(settings, 'SIMULACION_VELOCIDAD_KMH', 25),
+            'factor_ruta': getattr(settings, 'SIMULACION_FACTOR_RUTA', 1.3),
+            'parada_minutos': getattr(settings, 'SIMULACION_PARADA_SEGUNDOS', 60) / 60,
+            'margen_minutos': getattr(settings, 'SIMULACION_MARGEN_MINUTOS', 5),
+        },
+    }
+
+
+# ============================================================================
+# SIMULACIÓN DE UN ESCENARIO
+# ============================================================================
+
+def aplicar_cambios(instantanea, cambios):
+    """
+    Copia de los datos de la instantánea que cambian con el escenario.
+
+    Returns:
+        tuple: (estudiantes, colegios, vehiculos, parametros, advertencias)
+    """
+    estudiantes = instantanea['estudiantes']
+    colegios = dict(instantanea['colegios'])
+    vehiculos = dict(instantanea['vehiculos'])
+    parametros = dict(instantanea['parametros'])
+    advertencias = []  # Cambios que no se pudieron aplicar completos
+    nuevo_id = -1  # Los estudiantes y vehículos agregados usan IDs negativos
+
+    for cambio in cambios:
+        tipo = cambio['tipo']
+        if tipo == 'desplazar_horario':
+            indice = 3 if cambio['tramo'] == 'entrada' else 4
+            clave = clave_colegio(cambio['colegio']) if cambio['colegio'] else None
+            desplazados = []
+            for estudiante in estudiantes:
+                if estudiante[indice] is not None and (clave is None or estudiante[2] == clave):
+                    estudiante = list(estudiante)
+                    estudiante[indice] += cambio['minutos']
+                    estudiante = tuple(estudiante)
+                desplazados.append(estudiante)
+            estudiantes = desplazados
+
+        elif tipo == 'agregar_colegio':
+            clave = clave_colegio(cambio['colegio'])
+            colegios[clave] = {
+                'nombre': cambio['colegio'],
+                'ubicacion': (cambio['latitud'], cambio['longitud']),
+                'estimada': False,
+                # Sin calendario propio: servicio de lunes a viernes
+                'plan': (1 if instantanea['fecha'].weekday() < 5 else 0, []),
+            }
+            # Las familias nuevas viven donde ya viven las actuales (muestreo con semilla fija)
+            familias = list(instantanea['embarques'])
+            if familias:
+                entrada = minutos(datetime.strptime(cambio['h_entrada'], '%H:%M')) if cambio['h_entrada'] else None
+                salida = minutos(datetime.strptime(cambio['h_salida'], '%H:%M')) if cambio['h_salida'] else None
+                nuevos = []
+                for padre_id in random.Random(cambio['semilla']).choices(familias, k=cambio['estudiantes']):
+                    nuevos.append((nuevo_id, padre_id, clave, entrada, salida))
+                    nuevo_id -= 1
+                estudiantes = estudiantes + nuevos
+            else:
+                # Sin familias con coordenadas (tutores sin geocodificar; generar_datos solo
+                # las asigna si hay gazetteer) no hay dónde ubicar a los estudiantes nuevos
+                advertencias.append(
+                    f'agregar_colegio {cambio["colegio"]}: no se agregaron los {cambio["estudiantes"]} '
+                    f'estudiantes porque ninguna familia tiene coordenadas (geocodifique las direcciones '
+                    f'de los tutores)')
+
+        elif tipo == 'agregar_vehiculos':
+            for _ in range(cambio['cantidad']):
+                vehiculos[nuevo_id] = cambio['capacidad']
+                nuevo_id -= 1
+
+        elif tipo == 'quitar_vehiculos':
+            for vehiculo_id in cambio['vehiculos']:
+                vehiculos.pop(vehiculo_id, None)
+
+        else:  # velocidad
+            parametros['velocidad_kmh'] = cambio['kmh']
+
+    return estudiantes, colegios, vehiculos, parametros, advertencias
+
+
+def ordenar_puntos(puntos, colegio, tramo):
+    """
+    Orden de visita de los puntos de una ruta con la heurística del vecino
+    más cercano. La entrada empieza por el punto más lejano al colegio; la
+    salida parte del colegio.
+
+    Args:
+        puntos: {clave: [lat, lon, [estudiante_id, ...]]}
+        colegio: (lat, lon) del colegio
+
+    Returns:
+        list: [(lat, lon, [estudiante_id, ...])] en orden de visita
+    """
+    # Solo se comparan distancias: basta el cuadrado de la distancia en el plano local
+    escala = math.cos(math.radians(colegio[0])) ** 2
+
+    def cercania(a, b):
+        return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 * escala
+
+    pendientes = list(puntos.values())
+    if tramo == 'entrada':
+        actual = max(pendientes, key=lambda p: cercania(p, colegio))
+    else:
+        actual = min(pendientes, key=lambda p: cercania(p, colegio))
+    orden = []
+    while True:
+        pendientes.remove(actual)
+        orden.append(actual)
+        if not pendientes:
+            return orden
+        actual = min(pendientes, key=lambda p, a=actual: cercania(p, a))
+
+
+class Ruta:
+    """Una franja de un vehículo: puntos en orden de visita y hora objetivo"""
+
+    def __init__(self, tramo, hora, colegio, puntos, capacidad, estudiantes, parametros):
+        self.tramo = tramo
+        self.hora = hora
+        self.colegio = colegio
+        self.capacidad = capacidad
+        self.estudiantes = estudiantes
+        ubicacion = colegio['ubicacion']
+        # Paradas de la ruta: (lat, lon, estudiantes); el colegio lleva None
+        self.paradas = [(lat, lon, ids) for lat, lon, ids in puntos]
+        if tramo == 'entrada':
+            self.paradas.append((*ubicacion, None))
+        else:
+            self.paradas.insert(0, (*ubicacion, None))
+        self.tramos = [_viaje(a[0], a[1], b[0], b[1], parametros) for a, b in zip(self.paradas, self.paradas[1:])]
+
+        # La entrada se planifica para llegar con margen; la salida parte a la hora del colegio
+        duracion = sum(minutos_tramo for minutos_tramo, _ in self.tramos) + parametros['parada_minutos'] * len(puntos)
+        if tramo == 'entrada':
+            self.inicio_planificado = hora - parametros['margen_minutos'] - duracion
+        else:
+            self.inicio_planificado = hora
+
+    @property
+    def origen(self):
+        return self.paradas[0][:2]
+
+    @property
+    def destino(self):
+        return self.paradas[-1][:2]
+
+
+def _viaje(lat1, lon1, lat2, lon2, parametros):
+    """(minutos, km) entre dos puntos a la velocidad del escenario"""
+    km = distancia_metros(lat1, lon1, lat2, lon2) * parametros['factor_ruta'] / 1000
+    return km * 60 / parametros['velocidad_kmh'], km
+
+
+def _estadisticas(valores):
+    """Promedio, percentiles y máximo redondeados a décimas de minuto"""
+    if not valores:
+        return {'promedio': None, 'p50': None, 'p95': None, 'maximo': None}
+    valores = sorted(valores)
+    n = len(valores)
+    return {
+        'promedio': round(sum(valores) / n, 1),
+        'p50': round(valores[min(n - 1, n // 2)], 1),
+        'p95': round(valores[min(n - 1, int(n * 0.95))], 1),
+        'maximo': round(valores[-1], 1),
+    }
+
+
+def simular_escenario(instantanea, escenario):
+    """
+    Simula el día de un escenario con una cola de eventos por tiempo.
+
+    Cada vehículo recorre sus franjas en orden: sale de su primer punto a la
+    hora planificada, se detiene `parada_minutos` en cada punto y entre una
+    franja y la siguiente viaja vacío al inicio de la próxima; si llega tarde,
+    la franja empieza tarde. La distancia por calles se aproxima con la
+    distancia en línea recta por `factor_ruta`.
+
+    Args:
+        instantanea: Resultado de cargar_instantanea
+        escenario: {'nombre', 'cambios'} ya validado
+
+    Returns:
+        dict: Métricas del escenario
+    """
+    estudiantes, colegios, vehiculos, parametros, advertencias = aplicar_cambios(instantanea, escenario['cambios'])
+    embarques = instantanea['embarques']
+
+    # Viajes del día agrupados por franja y colegio (bit 0 = el día simulado)
+    franjas = defaultdict(lambda: defaultdict(list))
+    padre_de = {}
+    for estudiante_id, padre_id, clave, entrada, salida in estudiantes:
+        padre_de[estudiante_id] = padre_id
+        for (tramo, hora), mascara in mascaras_viaje(colegios[clave]['plan'], entrada, salida).items():
+            if mascara & 1:
+                franjas[(tramo, hora)][clave].append(estudiante_id)
+
+    # Asientos con la misma heurística que la asignación real y una ruta por vehículo y franja
+    rutas = defaultdict(list)  # vehiculo_id -> [Ruta]
+    viajes = sin_asiento = sin_ubicacion = 0
+    for (tramo, hora), grupos in franjas.items():
+        colegio_de = {est: clave for clave, ids in grupos.items() for est in ids}
+        asignados, sin_asiento_franja = empaquetar_franja(grupos, vehiculos)
+        viajes += len(colegio_de)
+        sin_asiento += len(sin_asiento_franja)
+        por_vehiculo = defaultdict(dict)
+        cantidad = defaultdict(int)
+        for estudiante_id, vehiculo_id in asignados.items():
+            colegio = colegios[colegio_de[estudiante_id]]
+            embarque = embarques.get(padre_de[estudiante_id])
+            cantidad[vehiculo_id] += 1
+            if embarque is None or colegio['ubicacion'] is None:
+                sin_ubicacion += 1  # Ocupa asiento pero no se puede ubicar en el mapa
+                continue
+            punto = por_vehiculo[vehiculo_id].setdefault(embarque[0], [embarque[1], embarque[2], []])
+            punto[2].append(estudiante_id)
+        for vehiculo_id, puntos in por_vehiculo.items():
+            clave = colegio_de[next(iter(puntos.values()))[2][0]]
+            rutas[vehiculo_id].append(Ruta(
+                tramo, hora, colegios[clave], ordenar_puntos(puntos, colegios[clave]['ubicacion'], tramo),
+                vehiculos[vehiculo_id], cantidad[vehiculo_id], parametros))
+
+    # Cola de eventos: (minuto, secuencia, vehículo, ruta, parada)
+    eventos = []
+    secuencia = 0
+    for vehiculo_id, lista in rutas.items():
+        lista.sort(key=lambda r: r.inicio_planificado)
+        heapq.heappush(eventos, (lista[0].inicio_planificado, secuencia, vehiculo_id, 0, 0))
+        secuencia += 1
+
+    parada = parametros['parada_minutos']
+    subida = defaultdict(dict)   # vehiculo_id -> {estudiante_id: minuto en que subió}
+    salida_colegio = {}          # vehiculo_id -> minuto en que dejó el colegio en la salida
+    llegadas = 0                 # Estudiantes que llegaron al colegio en la entrada
+    tiempos_viaje = []
+    retrasos = []                # Minutos de atraso de los estudiantes que llegan tarde
+    rutas_tarde = estudiantes_tarde = 0
+    esperas_salida, rutas_demoradas = [], 0
+    tarde_por_colegio = defaultdict(lambda: [0, 0.0])
+    inicio_vehiculo, fin_vehiculo, ocupado = {}, {}, defaultdict(float)
+    km_total = 0.0
+    ocupacion = []
+
+    while eventos:
+        ahora, _, vehiculo_id, indice_ruta, indice_parada = heapq.heappop(eventos)
+        ruta = rutas[vehiculo_id][indice_ruta]
+        lat, lon, ids = ruta.paradas[indice_parada]
+
+        if indice_parada == 0:
+            inicio_vehiculo.setdefault(vehiculo_id, ahora)
+            ocupacion.append(ruta.estudiantes / ruta.capacidad)
+
+        if ids is None:  # Colegio
+            if ruta.tramo == 'entrada':
+                atraso = ahora - ruta.hora
+                llegadas += ruta.estudiantes
+                tiempos_viaje.extend(ahora - minuto for minuto in subida.pop(vehiculo_id, {}).values())
+                if atraso > 0:
+                    rutas_tarde += 1
+                    estudiantes_tarde += ruta.estudiantes
+                    retrasos.extend([atraso] * ruta.estudiantes)
+                    colegio = tarde_por_colegio[ruta.colegio['nombre']]
+                    colegio[0] += ruta.estudiantes
+                    colegio[1] = max(colegio[1], atraso)
+            else:
+                espera = max(ahora - ruta.hora, 0)
+                esperas_salida.append(espera)
+                if espera > 0:
+                    rutas_demoradas += 1
+                salida_colegio[vehiculo_id] = ahora + parada
+        elif ruta.tramo == 'entrada':
+            for estudiante_id in ids:
+                subida[vehiculo_id][estudiante_id] = ahora
+        else:
+            tiempos_viaje.extend([ahora - salida_colegio[vehiculo_id]] * len(ids))
+
+        listo = ahora + parada
+        if indice_parada + 1 < len(ruta.paradas):
+            duracion, km = ruta.tramos[indice_parada]
+            km_total += km
+            ocupado[vehiculo_id] += parada + duracion
+            heapq.heappush(eventos, (listo + duracion, secuencia, vehiculo_id, indice_ruta, indice_parada + 1))
+        else:
+            # Fin de la ruta: viajar vacío al inicio de la siguiente
+            ocupado[vehiculo_id] += parada
+            fin_vehiculo[vehiculo_id] = listo
+            if indice_ruta + 1 < len(rutas[vehiculo_id]):
+                siguiente = rutas[vehiculo_id][indice_ruta + 1]
+                duracion, km = _viaje(*ruta.destino, *siguiente.origen, parametros)
+                km_total += km
+                ocupado[vehiculo_id] += duracion
+                heapq.heappush(eventos, (max(siguiente.inicio_planificado, listo + duracion), secuencia,
+                                         vehiculo_id, indice_ruta + 1, 0))
+        secuencia += 1
+
+    jornada = sum(fin_vehiculo[v] - inicio_vehiculo[v] for v in fin_vehiculo)
+    total_rutas = sum(len(lista) for lista in rutas.values())
+    return {
+        'nombre': escenario['nombre'],
+        'viajes': viajes,
+        'rutas': total_rutas,
+        'sin_asiento': sin_asiento,
+        'sin_ubicacion': sin_ubicacion,
+        'llegada': {
+            'rutas_tarde': rutas_tarde,
+            'estudiantes_tarde': estudiantes_tarde,
+            'porcentaje_tarde': round(100 * estudiantes_tarde / max(llegadas, 1), 1),
+            'retraso_promedio_min': round(sum(retrasos) / len(retrasos), 1) if retrasos else 0,
+            'retraso_maximo_min': round(max(retrasos), 1) if retrasos else 0,
+        },
+        'salida': {
+            'rutas_demoradas': rutas_demoradas,
+            'espera_promedio_min': round(sum(esperas_salida) / len(esperas_salida), 1) if esperas_salida else 0,
+            'espera_maxima_min': round(max(esperas_salida), 1) if esperas_salida else 0,
+        },
+        'tiempo_viaje_min': _estadisticas(tiempos_viaje),
+        'vehiculos': {
+            'disponibles': len(vehiculos),
+            'usados': len(rutas),
+            'km': round(km_total, 1),
+            'horas_en_ruta': round(sum(ocupado.values()) / 60, 1),
+            'ocupacion_asientos': round(100 * sum(ocupacion) / len(ocupacion), 1) if ocupacion else 0,
+            'uso_jornada': round(100 * sum(ocupado.values()) / jornada, 1) if jornada else 0,
+            'primera_salida': hora_texto(min(inicio_vehiculo.values())) if inicio_vehiculo else None,
+        },
+        'colegios_tarde': [
+            {'colegio': nombre, 'estudiantes_tarde': n, 'retraso_maximo_min': round(atraso, 1)}
+            for nombre, (n, atraso) in sorted(tarde_por_colegio.items(), key=lambda item: -item[1][0])[:10]
+        ],
+        'advertencias': advertencias,
+    }
+
+
+# ============================================================================
+# EJECUCIÓN EN PARALELO
+# ============================================================================
+
+def comparar(base, resultado):
+    """
+    Diferencias de las métricas principales de un escenario contra la situación actual.
+
+    Returns:
+        dict: {métrica: resultado - base}
+    """
+    diferencia = {}
+    for nombre, (seccion, metrica) in METRICAS_COMPARADAS.items():
+        valor = resultado[seccion][metrica] if seccion else resultado[metrica]
+        anterior = base[seccion][metrica] if seccion else base[metrica]
+        diferencia[nombre] = None if valor is None or anterior is None else round(valor - anterior, 1)
+    return diferencia
+
+
+def procesos_dedicados():
+    """Procesos del pool en un nodo sin tráfico web (SIMULACION_PROCESOS o uno por CPU)"""
+    return getattr(settings, 'SIMULACION_PROCESOS', None) or os.cpu_count() or 1
+
+
+def simular(fecha, escenarios, procesos=None):
+    """
+    Simula la situación actual y los escenarios del día.
+
+    Con más de un proceso los escenarios se reparten en un pool con inicio
+    'spawn': los procesos nuevos no heredan los hilos del planificador ni las
+    conexiones a la base de datos del proceso web, y reciben la instantánea
+    una sola vez al arrancar.
+
+    Args:
+        fecha: Día que se simula
+        escenarios: Escenarios validados
+        procesos: Procesos del pool; por defecto `procesos_dedicados()` en el
+            trabajador `ejecutar_tareas` y SIMULACION_PROCESOS_WEB en un servidor web
+
+    Returns:
+        list: Métricas por escenario, la situación actual primero; los demás con `diferencia`
+    """
+    instantanea = cargar_instantanea(fecha)
+    todos = [{'nombre': ESCENARIO_ACTUAL, 'cambios': []}, *escenarios]
+    if not procesos:
+        procesos = (procesos_dedicados() if planificador.EN_TRABAJADOR
+                    else getattr(settings, 'SIMULACION_PROCESOS_WEB', 1))
+    procesos = min(procesos, len(todos))
+
+    if procesos <= 1:
+        resultados = [simular_escenario(instantanea, escenario) for escenario in todos]
+    else:
+        with ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=simulacion_proceso.iniciar, initargs=(instantanea,)) as pool:
+            resultados = list(pool.map(simulacion_proceso.simular, todos,
+                                       chunksize=max(1, len(todos) // (procesos * 4))))
+
+    base = resultados[0]
+    for resultado in resultados[1:]:
+        resultado['diferencia'] = comparar(base, resultado)
+    base['colegios_sin_ubicacion'] = sorted(
+        c['nombre'] for c in instantanea['colegios'].values() if c['estimada'])
+    return resultados
+
+
+def tomar_simulacion(simulacion, ahora):
+    """
+    Intenta tomar una simulación con un UPDATE condicional, igual que las
+    tareas del planificador: solo un nodo logra que el UPDATE afecte la fila.
+    Una simulación en curso solo se puede retomar cuando venció su lease.
+
+    Returns:
+        datetime | None: El lease obtenido (fin del plazo), o None si otro nodo la tiene
+    """
+    lease = ahora + timedelta(seconds=getattr(settings, 'SIMULACION_DURACION_MAXIMA', 3600))
+    tomada = SimulacionPlan.objects.filter(pk=simulacion.pk).filter(
+        Q(estado='pendiente') | Q(estado='en_curso', bloqueado_hasta__isnull=True) |
+        Q(estado='en_curso', bloqueado_hasta__lt=ahora)
+    ).update(estado='en_curso', inicio=ahora, bloqueado_hasta=lease)
+    return lease if tomada == 1 else None
+
+
+def ejecutar_simulacion(simulacion):
+    """
+    Procesa una simulación pedida desde el panel y guarda sus resultados.
+
+    Los resultados solo se guardan si el lease sigue siendo de esta
+    ejecución: si venció y otro nodo retomó la simulación, gana la corrida
+    que la tiene ahora y esta se descarta.
+
+    Returns:
+        SimulacionPlan | None: La simulación actualizada (completa o con error),
+            o None si otro nodo la está procesando
+    """
+    lease = tomar_simulacion(simulacion, timezone.now())
+    if lease is None:
+        return None
+    try:
+        resultados, estado, error = simular(simulacion.fecha, simulacion.escenarios), 'completa', ''
+    except Exception:
+        resultados, estado, error = [], 'error', traceback.format_exc()
+    guardada = SimulacionPlan.objects.filter(pk=simulacion.pk, bloqueado_hasta=lease).update(
+        resultados=resultados, estado=estado, error=error, fin=timezone.now(), bloqueado_hasta=None)
+    if not guardada:
+        return None
+    simulacion.refresh_from_db()
+    return simulacion
+
+
+def simular_pendientes():
+    """
+    Tarea periódica: procesa las simulaciones pendientes y las que quedaron
+    en curso con el lease vencido porque se interrumpió el proceso que las corría.
+
+    Returns:
+        list: Simulaciones procesadas por este nodo
+    """
+    candidatas = SimulacionPlan.objects.filter(
+        Q(estado='pendiente') | Q(estado='en_curso', bloqueado_hasta__isnull=True) |
+        Q(estado='en_curso', bloqueado_hasta__lt=timezone.now())).order_by('id')
+    procesadas = (ejecutar_simulacion(simulacion) for simulacion in candidatas)
+    return [simulacion for simulacion in procesadas if simulacion is not None]
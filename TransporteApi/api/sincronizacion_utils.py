@@ -0,0 +1,338 @@
+# Versionado de filas y sincronización incremental ("cambios desde") para los clientes
+import threading
+from contextlib import ContextDecorator
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Max, QuerySet
+from django.utils import timezone
+
+from .models import Padres, Estudiantes, Tutor_receptor, Vehiculo, AsignacionVehiculo, ContadorVersion, Lapida
+
+
+# Contadores: versión de la última fila cambiada y versión más alta de las lápidas ya purgadas
+CONTADOR_FILAS = 'filas'
+CONTADOR_PURGADAS = 'lapidas_purgadas'
+
+# Nombre de cada modelo sincronizado en la respuesta y en las lápidas
+MODELOS = {Padres: 'padres', Estudiantes: 'estudiantes', Tutor_receptor: 'tutores'}
+
+# Filas por consulta o inserción (límite de 2100 parámetros de SQL Server)
+TAMANO_LOTE = 400
+
+
+def incrementar_contador(nombre, valor=None):
+    """
+    Incrementa un contador (o lo fija en `valor`) con un UPDATE que bloquea
+    su fila hasta el final de la transacción. Si no existe, se crea.
+    """
+    cambio = {'valor': valor} if valor is not None else {'valor': F('valor') + 1}
+    if ContadorVersion.objects.filter(nombre=nombre).update(**cambio):
+        return
+    try:
+        with transaction.atomic():
+            ContadorVersion.objects.create(nombre=nombre, valor=1 if valor is None else valor)
+    except IntegrityError:
+        ContadorVersion.objects.filter(nombre=nombre).update(**cambio)
+
+
+def leer_contador(nombre):
+    """Valor actual de un contador (0 si no existe)"""
+    return ContadorVersion.objects.filter(nombre=nombre).values_list('valor', flat=True).first() or 0
+
+
+def siguiente_version():
+    """
+    Reserva la siguiente versión global. Debe llamarse dentro de la
+    transacción del cambio: la fila del contador queda bloqueada hasta el
+    commit, así otra escritura no puede confirmar una versión mayor antes.
+
+    Returns:
+        int: Versión para la fila que se está guardando
+
+    Raises:
+        RuntimeError: Si no hay una transacción abierta (en autocommit el
+            contador se confirmaría antes que la fila y un cliente podría
+            saltarse el cambio)
+    """
+    if not connection.in_atomic_block:
+        raise RuntimeError('siguiente_version() debe llamarse dentro de transaction.atomic()')
+    incrementar_contador(CONTADOR_FILAS)
+    return leer_contador(CONTADOR_FILAS)
+
+
+# ============================================================================
+# VERSIÓN AL CONFIRMAR
+# ============================================================================
+
+# Filas guardadas en el bloque cambios_versionados abierto en cada hilo (None = ninguno)
+_pendientes = threading.local()
+
+
+def versionar(instancia):
+    """
+    Asigna la versión de una fila que se está guardando. Dentro de
+    cambios_versionados la fila se anota y recibe su versión al final del
+    bloque; fuera, la recibe ahora (y el contador queda bloqueado hasta el
+    commit de la transacción en curso).
+    """
+    filas = getattr(_pendientes, 'filas', None)
+    if filas is None:
+        instancia.version = siguiente_version()
+    else:
+        filas.append(instancia)
+
+
+def estampar_versiones(filas):
+    """
+    Una versión para todas las filas anotadas de una transacción (una
+    actualización por modelo). cambios_desde no parte una versión entre
+    páginas, así que pueden compartirla.
+    """
+    filas = [fila for fila in filas if fila.pk is not None]
+    if not filas:
+        return
+    version = siguiente_version()
+    por_modelo = {}
+    for fila in filas:
+        fila.version = version
+        por_modelo.setdefault(type(fila), set()).add(fila.pk)
+    for modelo, ids in por_modelo.items():
+        ids = sorted(ids)
+        for inicio in range(0, len(ids), 1000):
+            modelo.objects.filter(pk__in=ids[inicio:inicio + 1000]).update(version=version)
+
+
+class _BloqueVersionado(ContextDecorator):
+    """Bloque atómico que versiona al final las filas anotadas por versionar()"""
+
+    def _recreate_cm(self):
+        return type(self)()  # Como decorador, cada llamada usa su propio estado
+
+    def __enter__(self):
+        self.atomic = transaction.atomic()
+        self.atomic.__enter__()
+        self.externo = getattr(_pendientes, 'filas', None) is None
+        if self.externo:
+            _pendientes.filas = []
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if self.externo:
+            filas, _pendientes.filas = _pendientes.filas, None
+            if tipo is None:
+                try:
+                    estampar_versiones(filas)
+                except Exception as exc:
+                    self.atomic.__exit__(type(exc), exc, exc.__traceback__)
+                    raise
+        return self.atomic.__exit__(tipo, valor, traza)
+
+
+def cambios_versionados(funcion=None):
+    """
+    transaction.atomic para las escrituras de familias: las filas guardadas
+    en el bloque toman su versión justo antes del commit. Así el contador
+    global solo queda bloqueado entre el final del bloque y el commit, y no
+    durante la asignación de asientos y demás trabajo de la petición.
+
+    Si el bloque está dentro de otra transacción, la versión se toma al
+    salir del bloque y el contador queda bloqueado hasta el commit externo.
+    Se usa como decorador (con o sin paréntesis) o como `with`.
+    """
+    if callable(funcion):
+        return _BloqueVersionado()(funcion)
+    return _BloqueVersionado()
+
+
+# ============================================================================
+# LÁPIDAS (FILAS ELIMINADAS)
+# ============================================================================
+
+def _raiz_del_borrado(origen):
+    """
+    Modelo sincronizado más alto que se elimina en un borrado. Los clientes
+    eliminan en cascada los hijos de un padre o estudiante eliminado, así
+    que solo la raíz necesita lápida.
+    """
+    modelo = origen.model if isinstance(origen, QuerySet) else type(origen)
+    return modelo if modelo in MODELOS else Padres  # Un usuario eliminado arrastra a su Padres
+
+
+def registrar_lapida(instancia, origen=None):
+    """
+    Guarda la lápida de una fila eliminada si es la raíz del borrado.
+
+    Args:
+        instancia: Fila eliminada (Padres, Estudiantes o Tutor_receptor)
+        origen: Instancia o QuerySet que originó el borrado (señal post_delete)
+    """
+    if origen is not None and _raiz_del_borrado(origen) is not type(instancia):
+        return
+    version = siguiente_version()
+    if isinstance(instancia, Padres):
+        usuario_id = instancia.usuario_id
+    elif isinstance(instancia, Estudiantes):
+        usuario_id = Padres.objects.filter(pk=instancia.padres_id).values_list('usuario_id', flat=True).first()
+    else:
+        usuario_id = Estudiantes.objects.filter(pk=instancia.estudiante_id).values_list(
+            'padres__usuario_id', flat=True).first()
+        # Los conductores de su estudiante también lo tienen en su copia
+        vehiculos = AsignacionVehiculo.objects.filter(
+            estudiante_id=instancia.estudiante_id).values_list('vehiculo_id', flat=True).distinct()
+        Lapida.objects.bulk_create([
+            Lapida(modelo='tutores', objeto_id=instancia.pk, vehiculo_id=vehiculo_id, version=version)
+            for vehiculo_id in vehiculos
+        ])
+    Lapida.objects.create(modelo=MODELOS[type(instancia)], objeto_id=instancia.pk,
+                          usuario_id=usuario_id, version=version)
+
+
+def actualizar_conductores(antes, despues):
+    """
+    Mantiene al día la copia de los conductores cuando cambian asignaciones.
+    Un estudiante que deja de viajar en un vehículo recibe una lápida para
+    ese vehículo (el conductor lo borra con sus tutores); uno que empieza a
+    viajar recibe una nueva versión junto con sus tutores, así el conductor
+    los descarga aunque sus datos no cambiaron. Debe llamarse dentro de la
+    transacción del cambio.
+
+    Args:
+        antes, despues: Conjuntos de (vehiculo_id, estudiante_id) antes y después del cambio
+    """
+    salidas = sorted(set(antes) - set(despues))
+    llegadas = sorted({estudiante_id for _, estudiante_id in set(despues) - set(antes)})
+    if not salidas and not llegadas:
+        return
+    version = siguiente_version()
+    Lapida.objects.bulk_create([
+        Lapida(modelo='estudiantes', objeto_id=estudiante_id, vehiculo_id=vehiculo_id, version=version)
+        for vehiculo_id, estudiante_id in salidas
+    ], batch_size=TAMANO_LOTE)
+    for inicio in range(0, len(llegadas), TAMANO_LOTE):
+        lote = llegadas[inicio:inicio + TAMANO_LOTE]
+        Estudiantes.objects.filter(pk__in=lote).update(version=version)
+        Tutor_receptor.objects.filter(estudiante_id__in=lote).update(version=version)
+
+
+def purgar_lapidas():
+    """
+    Elimina las lápidas con más de SYNC_DIAS_LAPIDAS días. Un cliente cuyo
+    cursor es anterior a la última lápida purgada recibe una copia completa.
+
+    Returns:
+        int: Lápidas eliminadas
+    """
+    limite = timezone.now() - timedelta(days=getattr(settings, 'SYNC_DIAS_LAPIDAS', 30))
+    with transaction.atomic():
+        viejas = Lapida.objects.filter(created_at__lt=limite)
+        maxima = viejas.aggregate(maxima=Max('version'))['maxima']
+        if maxima is None:
+            return 0
+        incrementar_contador(CONTADOR_PURGADAS, valor=max(maxima, leer_contador(CONTADOR_PURGADAS)))
+        eliminadas, _ = viejas.delete()
+    return eliminadas
+
+
+# ============================================================================
+# CAMBIOS DESDE UN CURSOR
+# ============================================================================
+
+def alcance(usuario):
+    """
+    Filas que puede sincronizar un usuario.
+
+    - admin: todas (sin las lápidas por vehículo)
+    - padre: las de su familia y sus lápidas
+    - conductor: estudiantes asignados a su vehículo y sus tutores (sin datos de los padres)
+      y las lápidas de su vehículo: estudiantes que dejaron de viajar en él y tutores eliminados
+
+    Returns:
+        tuple | None: ({nombre: QuerySet}, QuerySet de lápidas) o None si el rol no sincroniza
+    """
+    if usuario.is_staff or usuario.role == 'admin':
+        return {
+            'padres': Padres.objects.all(),
+            'estudiantes': Estudiantes.objects.all(),
+            'tutores': Tutor_receptor.objects.all(),
+        }, Lapida.objects.filter(vehiculo_id__isnull=True)
+    if usuario.role == 'padre':
+        return {
+            'padres': Padres.objects.filter(usuario=usuario),
+            'estudiantes': Estudiantes.objects.filter(padres__usuario=usuario),
+            'tutores': Tutor_receptor.objects.filter(estudiante__padres__usuario=usuario),
+        }, Lapida.objects.filter(usuario_id=usuario.pk)
+    if usuario.role == 'conductor':
+        vehiculos = Vehiculo.objects.filter(conductor__usuario=usuario).values('id')
+        asignados = AsignacionVehiculo.objects.filter(vehiculo_id__in=vehiculos).values('estudiante_id')
+        return {
+            'estudiantes': Estudiantes.objects.filter(pk__in=asignados),
+            'tutores': Tutor_receptor.objects.filter(estudiante_id__in=asignados),
+        }, Lapida.objects.filter(vehiculo_id__in=vehiculos)
+    return None
+
+
+def cambios_desde(usuario, desde=None, limite=None):
+    """
+    Filas creadas, modificadas o eliminadas después del cursor `desde`.
+    Cada consulta es un rango sobre el índice de versión, así que un cliente
+    al día solo paga consultas vacías.
+
+    Se devuelven a lo sumo `limite` filas por tipo (más las que comparten la
+    última versión, como las de una aprobación en lote); si quedan más,
+    `mas` es True y el cliente repite la llamada con el nuevo cursor.
+
+    Un estudiante reasignado a otro vehículo llega al nuevo conductor con
+    una versión nueva y sale del anterior con una lápida de su vehículo
+    (actualizar_conductores). Un conductor que cambia de vehículo debe
+    hacer una copia completa.
+
+    Args:
+        usuario: Usuario que sincroniza
+        desde: Cursor de la sincronización anterior (None = copia completa)
+        limite: Máximo de filas por tipo
+
+    Returns:
+        dict | None: {'cursor', 'mas', 'completo', 'filas': {nombre: [instancias]}, 'eliminados': [lapidas]}
+    """
+    permitido = alcance(usuario)
+    if permitido is None:
+        return None
+    consultas, lapidas = permitido
+    limite = limite or getattr(settings, 'SYNC_LIMITE', 500)
+
+    # Cursor ausente o anterior a lápidas ya purgadas: copia completa
+    completo = desde is None or desde < leer_contador(CONTADOR_PURGADAS)
+    if completo:
+        desde = -1
+        lapidas = lapidas.none()
+
+    fuentes = {**consultas, 'eliminados': lapidas}
+    # Hasta limite+1 filas de cada fuente; si una no cabe, el corte es la versión
+    # de su fila número `limite` (la menor entre las fuentes que no caben)
+    resultado, corte = {}, None
+    for nombre, consulta in fuentes.items():
+        filas = list(consulta.filter(version__gt=desde).order_by('version', 'pk')[:limite + 1])
+        if len(filas) > limite:
+            version = filas[limite - 1].version
+            corte = version if corte is None else min(corte, version)
+        resultado[nombre] = filas
+
+    if corte is not None:
+        for nombre, consulta in fuentes.items():
+            if len(resultado[nombre]) > limite:
+                # Las filas con la versión del corte se incluyen todas (no se parte una versión)
+                resultado[nombre] = list(consulta.filter(
+                    version__gt=desde, version__lte=corte).order_by('version', 'pk'))
+            else:
+                resultado[nombre] = [fila for fila in resultado[nombre] if fila.version <= corte]
+
+    versiones = [fila.version for filas in resultado.values() for fila in filas]
+    return {
+        'cursor': max(versiones, default=max(desde, 0)),
+        'mas': corte is not None,
+        'completo': completo,
+        'filas': {nombre: resultado[nombre] for nombre in consultas},
+        'eliminados': resultado['eliminados'],
+    }
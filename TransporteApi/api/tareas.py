@@ -0,0 +1,109 @@
+# Tareas periódicas registradas en el planificador
+from datetime import timedelta
+
+from .planificador import registrar_tarea, salida_de_comando
+from .idempotencia import limpiar_vencidas
+from .email_utils import enviar_pendientes
+from . import eventos_utils
+from . import sincronizacion_utils
+from . import facturacion_utils
+from . import eta_utils
+from . import geocercas_utils
+from . import simulacion_utils
+from . import auditoria_utils
+from . import archivo_utils
+
+
+@registrar_tarea('limpiar_formularios', hora='03:00')
+def limpiar_formularios():
+    """Elimina padres no aprobados con más de 7 días de antigüedad"""
+    return salida_de_comando('limpiar_formularios')
+
+
+@registrar_tarea('generar_manifiestos', hora='22:00', duracion_maxima=timedelta(hours=1), pesada=True)
+def generar_manifiestos():
+    """Genera los manifiestos del día siguiente para cada vehículo"""
+    return salida_de_comando('generar_manifiestos')
+
+
+@registrar_tarea('detectar_duplicados', hora='02:00', duracion_maxima=timedelta(hours=1), pesada=True)
+def detectar_duplicados():
+    """Busca familias y estudiantes duplicados en una sola pasada"""
+    return salida_de_comando('detectar_duplicados')
+
+
+@registrar_tarea('consolidar_analitica', hora='01:00', duracion_maxima=timedelta(hours=1), pesada=True)
+def consolidar_analitica():
+    """Recalcula los resúmenes de analítica y corrige desvíos de la actualización incremental"""
+    return salida_de_comando('consolidar_analitica')
+
+
+@registrar_tarea('limpiar_idempotencia', intervalo=timedelta(hours=1))
+def limpiar_idempotencia():
+    """Elimina las respuestas guardadas de Idempotency-Key ya vencidas"""
+    return f'{limpiar_vencidas()} claves vencidas eliminadas'
+
+
+@registrar_tarea('enviar_correos', intervalo=timedelta(minutes=1))
+def enviar_correos():
+    """Envía los correos en cola y reintenta los que fallaron"""
+    resultado = enviar_pendientes()
+    return f"{resultado['enviados']} enviados, {resultado['fallidos']} fallidos"
+
+
+@registrar_tarea('entregar_eventos', intervalo=timedelta(minutes=1))
+def entregar_eventos():
+    """Entrega los eventos de dominio pendientes a los destinos registrados"""
+    resultado = eventos_utils.entregar_eventos()
+    return ', '.join(f'{destino}: {n}' for destino, n in resultado.items()) or 'Sin destinos activos'
+
+
+@registrar_tarea('limpiar_eventos', hora='04:00')
+def limpiar_eventos():
+    """Elimina los eventos ya entregados a todos los destinos"""
+    return f'{eventos_utils.limpiar_eventos()} eventos eliminados'
+
+
+@registrar_tarea('purgar_lapidas', hora='04:30')
+def purgar_lapidas():
+    """Elimina las lápidas de sincronización más antiguas que SYNC_DIAS_LAPIDAS"""
+    return f'{sincronizacion_utils.purgar_lapidas()} lápidas eliminadas'
+
+
+@registrar_tarea('facturar', intervalo=timedelta(minutes=15), duracion_maxima=timedelta(hours=2), pesada=True)
+def facturar():
+    """Abre la facturación del mes y termina las corridas pendientes o interrumpidas"""
+    corridas = facturacion_utils.facturar_pendientes()
+    return ', '.join(f'{c.periodo:%Y-%m}: {c.facturas} facturas' for c in corridas) or 'Sin corridas pendientes'
+
+
+@registrar_tarea('limpiar_recorridos', hora='04:45')
+def limpiar_recorridos():
+    """Elimina los eventos de recorrido más antiguos que ETA_DIAS_HISTORIAL"""
+    return f'{eta_utils.limpiar_eventos_recorrido()} eventos eliminados'
+
+
+@registrar_tarea('limpiar_avisos', hora='04:50')
+def limpiar_avisos():
+    """Elimina los avisos (AVISOS_DIAS_RETENCION) y estados de recorrido (GEOCERCA_ESTADO_DIAS) vencidos"""
+    avisos = geocercas_utils.limpiar_avisos()
+    return f'{avisos} avisos y {geocercas_utils.limpiar_estados()} estados de recorrido eliminados'
+
+
+@registrar_tarea('purgar_auditoria', hora='05:00')
+def purgar_auditoria():
+    """Elimina los meses del registro de auditoría más antiguos que AUDITORIA_MESES_RETENCION"""
+    return f'{auditoria_utils.purgar_auditoria()} entradas eliminadas'
+
+
+@registrar_tarea('purgar_archivo', hora='05:15')
+def purgar_archivo():
+    """Elimina las familias archivadas más antiguas que ARCHIVO_MESES_RETENCION"""
+    return f'{archivo_utils.purgar_archivo()} familias eliminadas del archivo'
+
+
+@registrar_tarea('simular', intervalo=timedelta(minutes=1), duracion_maxima=timedelta(hours=1), pesada=True)
+def simular():
+    """Procesa las simulaciones de escenarios pendientes o interrumpidas"""
+    simulaciones = simulacion_utils.simular_pendientes()
+    return ', '.join(f'{s.id}: {s.estado}' for s in simulaciones) or 'Sin simulaciones pendientes'
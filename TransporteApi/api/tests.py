@@ -1,3 +1,1467 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time as reloj
+from collections import Counter
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import (
+    aprobacion_utils, asignacion_utils, auditoria_utils, geocodificacion_utils, middleware, perfilado_utils,
+    planificador
+)
+from .analitica_utils import consolidar_inscripciones
+from .calendario_utils import expandir_viajes, CONTADOR_PLANES
+from .aprobacion_utils import aprobar_padres, eliminar_familias
+from .asignacion_utils import OcupacionFranja, empaquetar_franja, reservar_asiento
+from .archivo_utils import descomprimir, purgar_archivo, restaurar
+from .eventos_utils import entregar_destino, huecos_entre, quitar_de_huecos
+from .espacial_utils import METROS_POR_GRADO
+from .facturacion_utils import cargar_tarifas, calcular_facturas
+from .geocercas_utils import (
+    geocercas, leer_pings, procesar_pings, siguiente_estado, FUERA, CERCA, DENTRO, VISITADA
+)
+from .idempotencia import idempotente
+from .recogida_utils import indice_recogida
+from .serializers import TarifaTransporteSerializer
+from .serializers_lectura import (
+    LecturaRapida, lectura_padres, lectura_estudiantes, lectura_tutores, lectura_formularios
+)
+from .models import (
+    Usuario, Padres, Estudiantes, Tutor_receptor, Conductor, Vehiculo, Lapida,
+    RespuestaIdempotente, EventoDominio, DestinoEventos, TarifaTransporte, UbicacionColegio,
+    EstadoRecorrido, AvisoPadre, TareaProgramada, SimulacionPlan, FamiliaArchivada, ResumenAnalitico,
+    VolcadoPerfilado, ExcepcionCalendario, AsignacionVehiculo, CorreoPendiente
+)
+from .simulacion_utils import validar_escenarios, simular, simular_pendientes, tomar_simulacion
+from .sincronizacion_utils import (
+    cambios_desde, purgar_lapidas, actualizar_conductores, cambios_versionados, leer_contador,
+    siguiente_version, incrementar_contador, CONTADOR_FILAS
+)
+
+
+# ============================================================================
+# IDEMPOTENCIA
+# ============================================================================
+
+class IdempotenciaTests(TestCase):
+    """Decorador @idempotente sobre una vista de prueba que cuenta sus ejecuciones"""
+
+    def setUp(self):
+        self.fabrica = APIRequestFactory()
+        self.llamadas = 0
+        self.codigo = 201
+
+        @api_view(['POST'])
+        @permission_classes([AllowAny])
+        @idempotente
+        def vista(request):
+            self.llamadas += 1
+            return Response({'llamada': self.llamadas, 'datos': request.data}, status=self.codigo)
+
+        self.vista = vista
+
+    def enviar(self, datos=None, clave='clave-1'):
+        cabeceras = {'HTTP_IDEMPOTENCY_KEY': clave} if clave else {}
+        return self.vista(self.fabrica.post('/prueba/', datos or {'a': 1}, format='json', **cabeceras))
+
+    def test_reintento_repite_la_respuesta_sin_ejecutar(self):
+        primera = self.enviar()
+        segunda = self.enviar()
+        self.assertEqual(self.llamadas, 1)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.data, primera.data)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+
+    def test_sin_cabecera_siempre_ejecuta(self):
+        self.enviar(clave=None)
+        self.enviar(clave=None)
+        self.assertEqual(self.llamadas, 2)
+
+    def test_clave_reutilizada_con_otros_datos(self):
+        self.enviar({'a': 1})
+        respuesta = self.enviar({'a': 2})
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertEqual(self.llamadas, 1)
+
+    def test_respuesta_4xx_se_guarda(self):
+        self.codigo = 400
+        self.enviar()
+        respuesta = self.enviar()
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(self.llamadas, 1)
+
+    def test_respuesta_5xx_no_se_guarda(self):
+        self.codigo = 503
+        self.enviar()
+        self.codigo = 201
+        respuesta = self.enviar()
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self.llamadas, 2)
+        self.assertNotIn('Idempotent-Replayed', respuesta)
+
+    def test_clave_en_proceso_responde_409(self):
+        self.enviar()
+        RespuestaIdempotente.objects.update(estado='en_proceso', codigo=None, datos=None)
+        respuesta = self.enviar()
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(self.llamadas, 1)
+
+    @override_settings(IDEMPOTENCIA_RESERVA=60, IDEMPOTENCIA_TTL=86400)
+    def test_reserva_abandonada_vence_pronto(self):
+        # Proceso que murió a mitad de la petición: la reserva quedó 'en_proceso'
+        self.enviar()
+        reserva = RespuestaIdempotente.objects.get()
+        RespuestaIdempotente.objects.update(
+            estado='en_proceso', codigo=None, datos=None, expira=timezone.now() - timedelta(seconds=1))
+        respuesta = self.enviar()
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self.llamadas, 2)
+        self.assertNotEqual(RespuestaIdempotente.objects.get().pk, reserva.pk)
+
+    @override_settings(IDEMPOTENCIA_RESERVA=60, IDEMPOTENCIA_TTL=86400)
+    def test_solo_la_respuesta_terminada_guarda_el_ttl_completo(self):
+        antes = timezone.now()
+        self.enviar()
+        registro = RespuestaIdempotente.objects.get()
+        self.assertEqual(registro.estado, 'completa')
+        self.assertGreater(registro.expira, antes + timedelta(hours=23))
+
+    @override_settings(IDEMPOTENCIA_RESERVA=60)
+    def test_reserva_dura_el_plazo_corto(self):
+        duraciones = []
+
+        @api_view(['POST'])
+        @permission_classes([AllowAny])
+        @idempotente
+        def lenta(request):
+            registro = RespuestaIdempotente.objects.get()
+            duraciones.append((registro.estado, registro.expira - timezone.now()))
+            return Response({}, status=201)
+
+        lenta(self.fabrica.post('/lenta/', {}, format='json', HTTP_IDEMPOTENCY_KEY='k'))
+        estado, duracion = duraciones[0]
+        self.assertEqual(estado, 'en_proceso')
+        self.assertLessEqual(duracion, timedelta(seconds=60))
+
+    def test_reserva_tomada_por_otro_no_se_sobrescribe(self):
+        # La petición original sigue viva después de vencer su reserva y otro reintento tomó la clave
+        @api_view(['POST'])
+        @permission_classes([AllowAny])
+        @idempotente
+        def original(request):
+            RespuestaIdempotente.objects.all().delete()
+            RespuestaIdempotente.objects.create(
+                clave='/original/:anonimo:k', huella='x', estado='completa', codigo=200, datos={'de': 'reintento'},
+                expira=timezone.now() + timedelta(hours=1))
+            return Response({'de': 'original'}, status=201)
+
+        original(self.fabrica.post('/original/', {}, format='json', HTTP_IDEMPOTENCY_KEY='k'))
+        self.assertEqual(RespuestaIdempotente.objects.get().datos, {'de': 'reintento'})
+
+
+# ============================================================================
+# ENTREGA DE EVENTOS
+# ============================================================================
+
+class EntregaEventosTests(TestCase):
+    """Cursor de un destino de archivo con IDs que se confirman fuera de orden"""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajustes = override_settings(
+            EVENTOS_DIRECTORIO=self.directorio.name, EVENTOS_MARGEN_SEGUNDOS=0, EVENTOS_ESPERA_HUECOS=600)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.destino = DestinoEventos.objects.create(nombre='archivo', tipo='archivo', destino='eventos.jsonl')
+
+    def crear(self, cantidad):
+        return [EventoDominio.objects.create(tipo='tutor.creado', entidad_id=i) for i in range(cantidad)]
+
+    def entregados(self):
+        with open(os.path.join(self.directorio.name, 'eventos.jsonl'), encoding='utf-8') as archivo:
+            return [json.loads(linea)['id'] for linea in archivo]
+
+    def test_rangos_de_huecos(self):
+        self.assertEqual(huecos_entre(3, [4, 7, 8, 12], 't'), [[5, 6, 't'], [9, 11, 't']])
+        self.assertEqual(quitar_de_huecos([[5, 9, 't'], [20, 20, 't']], [5, 7, 20]),
+                         [[6, 6, 't'], [8, 9, 't']])
+
+    def test_evento_confirmado_tarde_se_entrega(self):
+        uno, dos, tres = self.crear(3)
+        # El evento del medio aún no es visible (su transacción no confirmó)
+        id_dos = dos.id
+        dos.delete()
+        self.assertEqual(entregar_destino(self.destino), 2)
+        self.destino.refresh_from_db()
+        self.assertEqual(self.destino.ultimo_evento, tres.id)
+        self.assertEqual([h[:2] for h in self.destino.huecos], [[id_dos, id_dos]])
+
+        EventoDominio.objects.create(id=id_dos, tipo='tutor.creado', entidad_id=1)  # Ahora confirma, con su ID menor
+        self.assertEqual(entregar_destino(self.destino), 1)
+        self.destino.refresh_from_db()
+        self.assertEqual(self.destino.huecos, [])
+        self.assertEqual(self.entregados(), [uno.id, tres.id, id_dos])
+
+    def test_huecos_vencidos_se_olvidan(self):
+        _, dos, _ = self.crear(3)
+        dos.delete()  # Transacción revertida
+        entregar_destino(self.destino)
+        self.destino.refresh_from_db()
+        self.destino.huecos[0][2] = (timezone.now() - timedelta(seconds=601)).isoformat()
+        self.destino.save()
+        entregar_destino(self.destino)
+        self.destino.refresh_from_db()
+        self.assertEqual(self.destino.huecos, [])
+
+    def test_fallo_no_avanza_el_cursor(self):
+        self.crear(2)
+        self.destino.destino = '../fuera.jsonl'  # Fuera de EVENTOS_DIRECTORIO: la entrega falla
+        self.assertEqual(entregar_destino(self.destino), 0)
+        self.destino.refresh_from_db()
+        self.assertEqual((self.destino.ultimo_evento, self.destino.fallos), (0, 1))
+
+
+# ============================================================================
+# SINCRONIZACIÓN INCREMENTAL
+# ============================================================================
+
+def crear_familia(numero, colegio='Colegio A', entrada=time(7, 0)):
+    """Usuario padre con su formulario, un estudiante y un tutor"""
+    usuario = Usuario.objects.create_user(f'padre{numero}@prueba.test', None, role='padre')
+    padre = Padres.objects.create(usuario=usuario, cedula=f'17{numero:08d}')
+    estudiante = Estudiantes.objects.create(
+        padres=padre, nombre=f'Estudiante {numero}', apellido='Prueba', fecha_nacimiento=date(2015, 1, 1),
+        grado='3ro', Colegio=colegio, H_entrada=entrada)
+    tutor = Tutor_receptor.objects.create(estudiante=estudiante, nombre=f'Tutor {numero}', apellido='Prueba')
+    return usuario, padre, estudiante, tutor
+
+
+def crear_vehiculo(numero, capacidad):
+    """Vehículo con un conductor que tiene usuario"""
+    usuario = Usuario.objects.create_user(f'conductor{numero}@prueba.test', None, role='conductor')
+    conductor = Conductor.objects.create(usuario=usuario, nombre='Conductor', apellido=str(numero),
+                                         cedula=f'09{numero:08d}')
+    vehiculo = Vehiculo.objects.create(placa=f'PRB-{numero:03d}', capacidad=capacidad, conductor=conductor)
+    return usuario, vehiculo
+
+
+def ids(filas):
+    return sorted(fila.pk for fila in filas)
+
+
+def lapidas(cambios):
+    return sorted((lapida.modelo, lapida.objeto_id) for lapida in cambios['eliminados'])
+
+
+class CambiosDesdeTests(TestCase):
+    """cambios_desde por rol: copia completa, cursor, lápidas y límite"""
+
+    def setUp(self):
+        self.admin = Usuario.objects.create_superuser('admin@prueba.test')
+        self.usuario1, self.padre1, self.estudiante1, self.tutor1 = crear_familia(1)
+        self.usuario2, self.padre2, self.estudiante2, self.tutor2 = crear_familia(2)
+
+    def test_copia_completa_solo_de_su_familia(self):
+        cambios = cambios_desde(self.usuario1)
+        self.assertTrue(cambios['completo'])
+        self.assertEqual(ids(cambios['filas']['padres']), [self.padre1.pk])
+        self.assertEqual(ids(cambios['filas']['estudiantes']), [self.estudiante1.pk])
+        self.assertEqual(ids(cambios['filas']['tutores']), [self.tutor1.pk])
+        self.assertEqual(cambios['eliminados'], [])
+
+    def test_cursor_al_dia_no_devuelve_nada(self):
+        cursor = cambios_desde(self.usuario1)['cursor']
+        cambios = cambios_desde(self.usuario1, cursor)
+        self.assertFalse(cambios['completo'])
+        self.assertEqual(cambios['cursor'], cursor)
+        self.assertTrue(all(filas == [] for filas in cambios['filas'].values()))
+
+    def test_solo_las_filas_cambiadas(self):
+        cursor = cambios_desde(self.usuario1)['cursor']
+        self.estudiante1.grado = '4to'
+        self.estudiante1.save()
+        self.estudiante2.grado = '4to'
+        self.estudiante2.save()  # Otra familia: no le llega
+        cambios = cambios_desde(self.usuario1, cursor)
+        self.assertEqual(ids(cambios['filas']['estudiantes']), [self.estudiante1.pk])
+        self.assertEqual(cambios['filas']['padres'], [])
+        self.assertGreater(cambios['cursor'], cursor)
+
+    def test_borrado_llega_como_lapida_solo_a_su_familia(self):
+        cursor1 = cambios_desde(self.usuario1)['cursor']
+        cursor2 = cambios_desde(self.usuario2)['cursor']
+        tutor_id = self.tutor1.pk
+        self.tutor1.delete()
+        self.assertEqual(lapidas(cambios_desde(self.usuario1, cursor1)), [('tutores', tutor_id)])
+        self.assertEqual(lapidas(cambios_desde(self.usuario2, cursor2)), [])
+
+    def test_borrado_en_cascada_deja_solo_la_lapida_raiz(self):
+        cursor = cambios_desde(self.usuario1)['cursor']
+        estudiante_id = self.estudiante1.pk
+        self.estudiante1.delete()
+        self.assertEqual(lapidas(cambios_desde(self.usuario1, cursor)), [('estudiantes', estudiante_id)])
+
+    def test_limite_no_parte_una_version(self):
+        cursor = cambios_desde(self.admin)['cursor']
+        aprobar_padres([self.padre1.pk, self.padre2.pk], True)  # Misma versión para ambos
+        crear_familia(3)
+        cambios = cambios_desde(self.admin, cursor, limite=1)
+        self.assertEqual(ids(cambios['filas']['padres']), [self.padre1.pk, self.padre2.pk])
+        self.assertTrue(cambios['mas'])
+        # El resto llega en la siguiente página
+        siguiente = cambios_desde(self.admin, cambios['cursor'], limite=1)
+        self.assertEqual(len(siguiente['filas']['padres']), 1)
+
+    def test_lapidas_purgadas_fuerzan_copia_completa(self):
+        cursor = cambios_desde(self.usuario1)['cursor']
+        self.tutor1.delete()
+        Lapida.objects.update(created_at=timezone.now() - timedelta(days=60))
+        self.assertEqual(purgar_lapidas(), 1)
+        cambios = cambios_desde(self.usuario1, cursor)
+        self.assertTrue(cambios['completo'])
+        self.assertEqual(cambios['eliminados'], [])
+
+
+class CambiosDesdeConductorTests(TestCase):
+    """Alcance del conductor: estudiantes de su vehículo y solo sus lápidas"""
+
+    def setUp(self):
+        # El estudiante 1 ocupa el vehículo pequeño; el 2 va al grande
+        self.conductor1, self.vehiculo1 = crear_vehiculo(1, capacidad=1)
+        self.conductor2, self.vehiculo2 = crear_vehiculo(2, capacidad=5)
+        _, _, self.estudiante1, self.tutor1 = crear_familia(1)
+        _, _, self.estudiante2, self.tutor2 = crear_familia(2)
+
+    def test_solo_los_estudiantes_de_su_vehiculo(self):
+        cambios = cambios_desde(self.conductor1)
+        self.assertNotIn('padres', cambios['filas'])
+        self.assertEqual(ids(cambios['filas']['estudiantes']), [self.estudiante1.pk])
+        self.assertEqual(ids(cambios['filas']['tutores']), [self.tutor1.pk])
+
+    def test_lapidas_de_otros_vehiculos_no_llegan(self):
+        cursor = cambios_desde(self.conductor1)['cursor']
+        self.tutor2.delete()
+        self.estudiante2.delete()
+        self.assertEqual(lapidas(cambios_desde(self.conductor1, cursor)), [])
+
+    def test_tutor_eliminado_llega_al_conductor(self):
+        cursor1 = cambios_desde(self.conductor1)['cursor']
+        cursor2 = cambios_desde(self.conductor2)['cursor']
+        tutor_id = self.tutor1.pk
+        self.tutor1.delete()
+        self.assertEqual(lapidas(cambios_desde(self.conductor1, cursor1)), [('tutores', tutor_id)])
+        self.assertEqual(lapidas(cambios_desde(self.conductor2, cursor2)), [])
+
+    def test_estudiante_eliminado_llega_al_conductor(self):
+        cursor = cambios_desde(self.conductor1)['cursor']
+        estudiante_id = self.estudiante1.pk
+        self.estudiante1.padres.usuario.delete()  # Baja de toda la familia
+        self.assertEqual(lapidas(cambios_desde(self.conductor1, cursor)), [('estudiantes', estudiante_id)])
+
+    def test_reasignacion_mueve_al_estudiante_entre_conductores(self):
+        cursor1 = cambios_desde(self.conductor1)['cursor']
+        cursor2 = cambios_desde(self.conductor2)['cursor']
+        self.vehiculo1.activo = False
+        self.vehiculo1.save()  # El estudiante 1 pasa al vehículo 2
+
+        anterior = cambios_desde(self.conductor1, cursor1)
+        self.assertEqual(lapidas(anterior), [('estudiantes', self.estudiante1.pk)])
+        nuevo = cambios_desde(self.conductor2, cursor2)
+        self.assertEqual(ids(nuevo['filas']['estudiantes']), [self.estudiante1.pk])
+        self.assertEqual(ids(nuevo['filas']['tutores']), [self.tutor1.pk])
+        self.assertEqual(lapidas(nuevo), [])
+
+    def test_cambio_de_tramo_en_el_mismo_vehiculo_no_borra(self):
+        cursor = cambios_desde(self.conductor1)['cursor']
+        self.estudiante1.H_salida = time(13, 0)
+        self.estudiante1.save()  # Ahora también viaja de salida, en el mismo vehículo
+        self.assertEqual(lapidas(cambios_desde(self.conductor1, cursor)), [])
+
+
+class VersionAlConfirmarTests(TestCase):
+    """Las escrituras en cambios_versionados toman la versión al final del bloque"""
+
+    def setUp(self):
+        self.usuario, _, self.estudiante, self.tutor = crear_familia(1)
+
+    def test_version_al_salir_del_bloque(self):
+        antes = leer_contador(CONTADOR_FILAS)
+        with cambios_versionados():
+            self.estudiante.grado = '4to'
+            self.estudiante.save()
+            self.tutor.nombre = 'Otro'
+            self.tutor.save()
+            # El contador no se tocó durante el bloque
+            self.assertEqual(leer_contador(CONTADOR_FILAS), antes)
+        version = leer_contador(CONTADOR_FILAS)
+        self.assertEqual(version, antes + 1)  # Una versión para todo el bloque
+        self.assertEqual(self.estudiante.version, version)
+        self.assertEqual(Estudiantes.objects.get(pk=self.estudiante.pk).version, version)
+        self.assertEqual(Tutor_receptor.objects.get(pk=self.tutor.pk).version, version)
+
+    def test_bloque_revertido_no_toma_version(self):
+        antes = leer_contador(CONTADOR_FILAS)
+        with self.assertRaises(ValueError):
+            with cambios_versionados():
+                self.estudiante.grado = '4to'
+                self.estudiante.save()
+                raise ValueError
+        self.assertEqual(leer_contador(CONTADOR_FILAS), antes)
+        self.assertEqual(Estudiantes.objects.get(pk=self.estudiante.pk).grado, '3ro')
+
+    def test_cambio_por_la_api_llega_a_la_sincronizacion(self):
+        cursor = cambios_desde(self.usuario)['cursor']
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuario)
+        respuesta = cliente.patch(f'/api/estudiantes/{self.estudiante.pk}/', {'grado': '5to'}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        cambios = cambios_desde(self.usuario, cursor)
+        self.assertEqual(ids(cambios['filas']['estudiantes']), [self.estudiante.pk])
+        self.assertEqual(cambios['cursor'], leer_contador(CONTADOR_FILAS))
+
+
+class VersionSinTransaccionTests(TransactionTestCase):
+    """En autocommit el contador se confirmaría antes que la fila"""
+
+    def test_siguiente_version_exige_transaccion(self):
+        with self.assertRaises(RuntimeError):
+            siguiente_version()
+
+
+class CoordenadasSincronizadasTests(TestCase):
+    """Las coordenadas geocodificadas llegan a los clientes incrementales"""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = os.path.join(directorio.name, 'gazetteer.csv')
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write('nombre,latitud,longitud\nLa Carolina,-0.1850,-78.4850\n')
+        ajustes = override_settings(GAZETTEER_PATH=ruta)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        geocodificacion_utils._gazetteer = None
+        self.addCleanup(setattr, geocodificacion_utils, '_gazetteer', None)
+
+        self.usuario, _, _, self.tutor = crear_familia(1)
+        # La dirección cambia sin señales (como una carga masiva): queda pendiente de geocodificar
+        Tutor_receptor.objects.filter(pk=self.tutor.pk).update(direccion='Av. La Carolina 123')
+        self.cursor = cambios_desde(self.usuario)['cursor']
+
+    def tutores_sincronizados(self):
+        return [(t.pk, t.latitud, t.longitud) for t in cambios_desde(self.usuario, self.cursor)['filas']['tutores']]
+
+    def test_geocodificar_tutor(self):
+        self.assertTrue(geocodificacion_utils.geocodificar_tutor(Tutor_receptor.objects.get(pk=self.tutor.pk)))
+        self.assertEqual(self.tutores_sincronizados(), [(self.tutor.pk, -0.1850, -78.4850)])
+
+    def test_geocodificar_pendientes(self):
+        self.assertEqual(geocodificacion_utils.geocodificar_pendientes()['resueltos'], 1)
+        self.assertEqual(self.tutores_sincronizados(), [(self.tutor.pk, -0.1850, -78.4850)])
+
+
+# ============================================================================
+# VERIFICACIÓN DE RECOGIDA
+# ============================================================================
+
+class VerificacionRecogidaTests(TestCase):
+    """Autenticación de conductores desde el índice en memoria y búsqueda por teléfono"""
+
+    def setUp(self):
+        self.conductor, _ = crear_vehiculo(1, capacidad=5)
+        self.token = Token.objects.create(user=self.conductor)
+        _, _, self.estudiante, self.tutor = crear_familia(1)
+        self.tutor.telefono = '099 123 4567'
+        self.tutor.save()
+        indice_recogida.construir()
+        self.addCleanup(setattr, indice_recogida, 'version', None)
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = f'/api/recogida/estudiantes/{self.estudiante.pk}/tutores/'
+
+    def test_conductor_sin_consultas(self):
+        with self.assertNumQueries(0):
+            respuesta = self.cliente.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([t['id'] for t in respuesta.data['tutores']], [self.tutor.pk])
+
+    def test_usuario_desactivado_en_este_nodo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conductor.is_active = False
+            self.conductor.save()
+        self.assertEqual(self.cliente.get(self.url).status_code, 401)
+
+    def test_cambio_de_rol_en_este_nodo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conductor.role = 'padre'
+            self.conductor.save()
+        self.assertEqual(self.cliente.get(self.url).status_code, 403)
+
+    def test_cierre_de_sesion_en_este_nodo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertEqual(self.cliente.get(self.url).status_code, 401)
+
+    def test_baja_en_otro_nodo_llega_con_el_refresco(self):
+        # Sin señales en este nodo: solo el refresco periódico la ve
+        Usuario.objects.filter(pk=self.conductor.pk).update(is_active=False)
+        indice_recogida.refrescar()
+        self.assertEqual(self.cliente.get(self.url).status_code, 401)
+
+    def test_cambio_de_vehiculo_no_quita_tutores(self):
+        # Las lápidas por vehículo de un estudiante que cambia de vehículo no son bajas
+        vehiculo1 = Vehiculo.objects.get()
+        _, vehiculo2 = crear_vehiculo(2, capacidad=5)
+        actualizar_conductores({(vehiculo1.pk, self.estudiante.pk)}, {(vehiculo2.pk, self.estudiante.pk)})
+        self.assertTrue(Lapida.objects.filter(modelo='estudiantes', vehiculo_id=vehiculo1.pk).exists())
+        indice_recogida.refrescar()
+        self.assertEqual([t['id'] for t in indice_recogida.tutores_de(self.estudiante.pk)], [self.tutor.pk])
+
+    def test_telefono_en_otro_formato(self):
+        respuesta = self.cliente.post('/api/recogida/verificar/', {
+            'estudiante': self.estudiante.pk, 'telefono': '+593 99-123-4567'}, format='json')
+        self.assertTrue(respuesta.data['autorizado'])
+        self.assertEqual(respuesta.data['tutor']['id'], self.tutor.pk)
+
+
+# ============================================================================
+# FACTURACIÓN
+# ============================================================================
+
+PERIODO = date(2026, 3, 1)
+
+
+def estudiante(padre, numero, colegio='Colegio A', entrada=None, salida=None):
+    """Columna de estudiante como la arma facturar_lote"""
+    return (padre, numero, f'Estudiante {numero}', 'Prueba', colegio, entrada, salida)
+
+
+class CalcularFacturasTests(TestCase):
+    """calcular_facturas: tarifa más específica, descuento por hermanos y redondeo"""
+
+    def setUp(self):
+        TarifaTransporte.objects.create(tramo='entrada', monto=Decimal('30.00'))
+        TarifaTransporte.objects.create(tramo='salida', monto=Decimal('20.00'))
+        TarifaTransporte.objects.create(colegio='Colegio A', tramo='entrada', monto=Decimal('40.00'))
+        TarifaTransporte.objects.create(colegio='Colegio A', tramo='entrada', hora_desde=time(6, 0),
+                                        hora_hasta=time(7, 30), monto=Decimal('45.55'))
+        self.padres = [(1, 'Ana', 'Prueba', 'ana@prueba.test'), (2, '', '', '')]
+
+    def calcular(self, estudiantes, padres=None):
+        facturas, sin_tarifa = calcular_facturas(padres or self.padres, estudiantes, cargar_tarifas(), PERIODO)
+        return {f.padre_id: f for f in facturas}, sin_tarifa
+
+    def lineas(self, factura):
+        return {linea['estudiante']: linea for linea in factura.detalle}
+
+    def test_tarifa_mas_especifica(self):
+        facturas, sin_tarifa = self.calcular([
+            estudiante(1, 10, '  colegio   a ', entrada=time(7, 0)),           # Franja del colegio
+            estudiante(1, 11, 'Colegio A', entrada=time(8, 0), salida=time(14, 0)),  # Colegio sin franja
+            estudiante(2, 12, 'Colegio B', entrada=time(7, 0)),                # General
+            estudiante(2, 13, None, salida=time(13, 0)),                       # Sin colegio: general
+        ])
+        self.assertEqual(sin_tarifa, 0)
+        lineas = {**self.lineas(facturas[1]), **self.lineas(facturas[2])}
+        self.assertEqual((lineas[10]['entrada'], lineas[10]['salida']), ('45.55', None))
+        self.assertEqual((lineas[11]['entrada'], lineas[11]['salida']), ('40.00', '20.00'))
+        self.assertEqual(lineas[12]['entrada'], '30.00')
+        self.assertEqual((lineas[13]['colegio'], lineas[13]['salida']), ('', '20.00'))
+        self.assertEqual(facturas[2].nombre, 'Padre 2')
+
+    def test_descuento_por_hermanos_segun_monto(self):
+        # El de mayor monto paga completo aunque tenga el ID más alto; desde el
+        # tercero se repite el último porcentaje
+        facturas, _ = self.calcular([
+            estudiante(1, 10, 'Colegio B', entrada=time(7, 0)),                     # 30.00
+            estudiante(1, 11, 'Colegio B', salida=time(14, 0)),                     # 20.00
+            estudiante(1, 12, 'Colegio B', salida=time(14, 0)),                     # 20.00
+            estudiante(1, 13, 'Colegio A', entrada=time(8, 0), salida=time(14, 0)),  # 60.00
+            estudiante(2, 14, 'Colegio B', salida=time(14, 0)),                     # Otra familia
+        ])
+        factura = facturas[1]
+        self.assertEqual([linea['estudiante'] for linea in factura.detalle], [13, 10, 11, 12])
+        self.assertEqual([linea['descuento'] for linea in factura.detalle], ['0.00', '3.00', '3.00', '3.00'])
+        self.assertEqual((factura.subtotal, factura.descuento, factura.total),
+                         (Decimal('130.00'), Decimal('9.00'), Decimal('121.00')))
+        self.assertEqual(facturas[2].descuento, Decimal('0.00'))
+
+    def test_redondeo_al_centavo(self):
+        # 10 % de 45.55 = 4.555 y 15 % de 45.55 = 6.8325: el descuento se redondea
+        # al centavo más cercano (medio centavo hacia arriba)
+        overrides = override_settings(FACTURACION_DESCUENTO_HERMANOS=[0, 10, 15])
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        facturas, _ = self.calcular([estudiante(1, numero, entrada=time(7, 0)) for numero in (10, 11, 12)])
+        factura = facturas[1]
+        self.assertEqual([linea['descuento'] for linea in factura.detalle], ['0.00', '4.56', '6.83'])
+        self.assertEqual([linea['monto'] for linea in factura.detalle], ['45.55', '40.99', '38.72'])
+        self.assertEqual(factura.total, factura.subtotal - factura.descuento)
+        self.assertEqual(factura.total, Decimal('125.26'))
+
+    def test_sin_tarifa_y_sin_transporte(self):
+        TarifaTransporte.objects.filter(colegio='', tramo='salida').delete()
+        facturas, sin_tarifa = self.calcular([
+            estudiante(1, 10, 'Colegio B', entrada=time(7, 0), salida=time(14, 0)),
+            estudiante(1, 11, 'Colegio B'),     # No usa el transporte: no cuenta como hermano
+            estudiante(1, 12, 'Colegio B', entrada=time(7, 0)),
+            estudiante(2, 13, 'Colegio B'),     # Familia sin tramos: sin factura
+        ])
+        self.assertEqual(sin_tarifa, 1)
+        self.assertEqual(list(facturas), [1])
+        lineas = self.lineas(facturas[1])
+        self.assertEqual(sorted(lineas), [10, 12])
+        self.assertEqual((lineas[10]['salida'], lineas[10]['monto']), (None, '30.00'))
+        self.assertEqual(lineas[12]['descuento'], '3.00')
+        self.assertEqual(facturas[1].estudiantes, 2)
+
+    def test_lote_vacio(self):
+        self.assertEqual(calcular_facturas(self.padres, [], cargar_tarifas(), PERIODO), ([], 0))
+
+
+# ============================================================================
+# LECTURA RÁPIDA
+# ============================================================================
+
+class LecturaRapidaTests(TestCase):
+    """LecturaRapida produce los mismos bytes que el serializer de DRF para las mismas filas"""
+
+    def setUp(self):
+        usuario = Usuario.objects.create_user('padre1@prueba.test', None, role='padre')
+        self.completo = Padres.objects.create(
+            usuario=usuario, cedula='1700000001', celular='0991234567', aprobado=True,
+            fecha_aprobacion=timezone.now().replace(microsecond=123456))
+        estudiante = Estudiantes.objects.create(
+            padres=self.completo, nombre='Ana', apellido='Prueba', fecha_nacimiento=date(2015, 2, 28),
+            grado='3ro', edad=10, Colegio='Colegio A', H_entrada=time(7, 15, 30, 250000), H_salida=time(14, 0))
+        Tutor_receptor.objects.create(estudiante=estudiante, nombre='Tutor', apellido='Prueba',
+                                      direccion='Av. Amazonas', telefono='0991234567', parentesco='Tía')
+        Tutor_receptor.objects.create(estudiante=estudiante, nombre='Sin', apellido='Datos')
+        # Estudiante con todos los opcionales en NULL y sin tutores
+        Estudiantes.objects.create(padres=self.completo, nombre='Luis', apellido='Prueba',
+                                   fecha_nacimiento=date(2016, 1, 1), grado='1ro')
+        # Padre sin usuario, sin celular, sin aprobar y sin estudiantes
+        self.vacio = Padres.objects.create(cedula='1700000002')
+
+    def comparar(self, lectura, queryset):
+        queryset = queryset.order_by('id')
+        filas = list(queryset.values(*lectura.columnas()))
+        rapida = lectura.representar(filas)
+        original = lectura.serializer_class(queryset, many=True).data
+        self.assertEqual(rapida, original)
+        self.assertEqual(JSONRenderer().render(rapida), JSONRenderer().render(original))
+        return rapida
+
+    def test_padres(self):
+        datos = self.comparar(lectura_padres, Padres.objects.all())
+        self.assertEqual((datos[1]['usuario'], datos[1]['fecha_aprobacion']), (None, None))
+
+    def test_padres_en_otra_zona_horaria(self):
+        with timezone.override('America/Guayaquil'):
+            datos = self.comparar(lectura_padres, Padres.objects.all())
+        self.assertTrue(datos[0]['fecha_aprobacion'].endswith('.123456-05:00'))
+
+    def test_estudiantes(self):
+        datos = self.comparar(lectura_estudiantes, Estudiantes.objects.all())
+        self.assertEqual(datos[0]['H_entrada'], '07:15:30.250000')
+        self.assertEqual([datos[1][campo] for campo in ('edad', 'Colegio', 'H_entrada', 'H_salida')],
+                         [None] * 4)
+
+    def test_tutores(self):
+        datos = self.comparar(lectura_tutores, Tutor_receptor.objects.all())
+        self.assertEqual([datos[1][campo] for campo in ('direccion', 'telefono', 'parentesco')], [None] * 3)
+
+    def test_formularios(self):
+        datos = self.comparar(lectura_formularios,
+                              Padres.objects.prefetch_related('estudiantes__tutores_receptores'))
+        self.assertEqual((len(datos[0]['estudiantes']), len(datos[0]['tutores_receptores'])), (2, 2))
+        self.assertEqual((datos[1]['estudiantes'], datos[1]['tutores_receptores']), ([], []))
+
+    def test_formularios_vacio(self):
+        self.assertEqual(lectura_formularios.representar([]), [])
+
+    def test_decimales_y_horas(self):
+        TarifaTransporte.objects.create(tramo='entrada', monto=Decimal('45.5'))
+        TarifaTransporte.objects.create(colegio='Colegio A', tramo='salida', hora_desde=time(13, 0),
+                                        hora_hasta=time(15, 30), monto=Decimal('0'))
+        datos = self.comparar(LecturaRapida(TarifaTransporteSerializer), TarifaTransporte.objects.all())
+        self.assertEqual([fila['monto'] for fila in datos], ['45.50', '0.00'])
+        self.assertEqual((datos[0]['hora_desde'], datos[1]['hora_hasta']), (None, '15:30:00'))
+
+
+# ============================================================================
+# GEOCERCAS
+# ============================================================================
+
+class SiguienteEstadoTests(SimpleTestCase):
+    """Transiciones de una geocerca con llegada a 100 m, aviso a 2000 m e histéresis 1.5"""
+
+    def transicion(self, anterior, distancia):
+        return siguiente_estado(anterior, distancia, 100, 2000, 1.5)
+
+    def test_desde_fuera(self):
+        self.assertEqual(self.transicion(FUERA, 2500), (FUERA, None))
+        self.assertEqual(self.transicion(FUERA, 2000), (CERCA, 'cerca'))    # El borde cuenta como dentro
+        self.assertEqual(self.transicion(FUERA, 100), (DENTRO, 'llegada'))  # Lote espaciado: llega directo
+
+    def test_cerca_no_repite_el_aviso(self):
+        self.assertEqual(self.transicion(CERCA, 1500), (CERCA, None))
+        self.assertEqual(self.transicion(CERCA, 2800), (CERCA, None))  # Ruido en el borde: sigue cerca
+        self.assertEqual(self.transicion(CERCA, 3000), (CERCA, None))  # Justo en radio x histéresis
+        self.assertEqual(self.transicion(CERCA, 3001), (FUERA, None))  # Se alejó: sin aviso
+        self.assertEqual(self.transicion(CERCA, 80), (DENTRO, 'llegada'))
+
+    def test_dentro_sale_con_histeresis(self):
+        self.assertEqual(self.transicion(DENTRO, 20), (DENTRO, None))
+        self.assertEqual(self.transicion(DENTRO, 140), (DENTRO, None))  # Fuera del radio pero dentro del margen
+        self.assertEqual(self.transicion(DENTRO, 150), (DENTRO, None))
+        self.assertEqual(self.transicion(DENTRO, 151), (VISITADA, 'salida'))
+
+    def test_secuencia_con_ruido_avisa_una_vez_por_tipo(self):
+        estado, avisos = FUERA, []
+        for distancia in (2600, 1990, 2050, 1900, 400, 99, 120, 90, 140, 160, 90):
+            if estado == VISITADA:  # procesar_pings ya no revisa las geocercas visitadas
+                break
+            estado, tipo = self.transicion(estado, distancia)
+            avisos.extend([tipo] if tipo else [])
+        self.assertEqual((estado, avisos), (VISITADA, ['cerca', 'llegada', 'salida']))
+
+
+COLEGIO = (-0.2, -78.5)
+
+
+def ping(metros, minuto):
+    """Ping a `metros` al norte del colegio, `minuto` minutos después de las 7:00"""
+    return {'latitud': COLEGIO[0] + metros / METROS_POR_GRADO, 'longitud': COLEGIO[1],
+            'momento': f'2026-03-02T07:{minuto:02d}:00-05:00'}
+
+
+class EstadoRecorridoTests(TestCase):
+    """El estado de las geocercas de un recorrido vive en la base de datos, no en el proceso"""
+
+    def setUp(self):
+        geocercas.invalidar()
+        self.addCleanup(geocercas.invalidar)
+        _, self.vehiculo = crear_vehiculo(1, capacidad=5)
+        _, self.padre, _, _ = crear_familia(1)
+        UbicacionColegio.objects.create(colegio='Colegio A', latitud=COLEGIO[0], longitud=COLEGIO[1],
+                                        radio_metros=100)
+
+    def procesar(self, *pings):
+        return procesar_pings(self.vehiculo.pk, 'entrada', time(7, 0), leer_pings(list(pings)))
+
+    def estado(self):
+        return EstadoRecorrido.objects.get(vehiculo=self.vehiculo, tramo='entrada', hora=time(7, 0))
+
+    def test_lotes_continuan_el_estado_guardado(self):
+        primero = self.procesar(ping(1500, 1))
+        self.assertEqual([c['tipo'] for c in primero['cambios']], ['cerca'])
+        self.assertEqual((self.estado().geocercas, self.estado().fecha), ({'colegio:colegio a': CERCA},
+                                                                           date(2026, 3, 2)))
+        # Otro proceso (índice y rutas nuevos) sigue desde la fila
+        geocercas.invalidar()
+        segundo = self.procesar(ping(1200, 2), ping(50, 3))
+        self.assertEqual([c['tipo'] for c in segundo['cambios']], ['llegada'])
+        self.assertEqual(self.estado().geocercas, {'colegio:colegio a': DENTRO})
+        self.assertEqual(AvisoPadre.objects.filter(padre=self.padre).count(), 2)
+
+    def test_estado_de_otro_proceso_evita_avisos_repetidos(self):
+        self.procesar(ping(1500, 1))
+        # Otro proceso ya registró la llegada en la fila
+        EstadoRecorrido.objects.filter(pk=self.estado().pk).update(geocercas={'colegio:colegio a': DENTRO})
+        self.assertEqual(self.procesar(ping(40, 2))['cambios'], [])
+
+    def test_reintento_del_lote_se_ignora(self):
+        self.procesar(ping(1500, 1), ping(50, 2))
+        reintento = self.procesar(ping(1500, 1), ping(50, 2))
+        self.assertEqual((reintento['procesados'], reintento['ignorados'], reintento['avisos']), (0, 2, 0))
+        self.assertEqual(AvisoPadre.objects.count(), 2)
+
+    def test_admin_con_vehiculo_inexistente(self):
+        cliente = APIClient()
+        cliente.force_authenticate(Usuario.objects.create_superuser('admin@prueba.test'))
+        respuesta = cliente.post('/api/gps/', {'vehiculo': self.vehiculo.pk + 100, 'tramo': 'entrada',
+                                               'hora': '07:00', 'pings': [ping(50, 1)]}, format='json')
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertFalse(EstadoRecorrido.objects.exists())
+
+
+# ============================================================================
+# SIMULACIÓN
+# ============================================================================
+
+class AgregarColegioTests(TestCase):
+    """agregar_colegio ubica a los estudiantes nuevos en familias con coordenadas, o lo advierte"""
+
+    def setUp(self):
+        _, _, _, self.tutor = crear_familia(1)
+        self.escenarios = validar_escenarios([{'nombre': 'Colegio nuevo', 'cambios': [{
+            'tipo': 'agregar_colegio', 'colegio': 'Colegio Nuevo', 'latitud': -0.2, 'longitud': -78.5,
+            'estudiantes': 5, 'h_entrada': '07:30'}]}])
+
+    def test_sin_familias_con_coordenadas_advierte(self):
+        actual, escenario = simular(date(2026, 3, 2), self.escenarios, procesos=1)
+        self.assertEqual(escenario['viajes'], actual['viajes'])
+        self.assertEqual(len(escenario['advertencias']), 1)
+        self.assertIn('no se agregaron los 5 estudiantes', escenario['advertencias'][0])
+        self.assertEqual(actual['advertencias'], [])
+
+    def test_con_familias_con_coordenadas(self):
+        Tutor_receptor.objects.filter(pk=self.tutor.pk).update(latitud=-0.21, longitud=-78.49)
+        actual, escenario = simular(date(2026, 3, 2), self.escenarios, procesos=1)
+        self.assertEqual(escenario['viajes'], actual['viajes'] + 5)
+        self.assertEqual(escenario['advertencias'], [])
+
+
+class SimulacionLeaseTests(TestCase):
+    """Cada simulación la corre un solo nodo a la vez y una corrida retomada no pisa resultados"""
+
+    def setUp(self):
+        self.simulacion = SimulacionPlan.objects.create(fecha=date(2026, 3, 2), escenarios=[])
+
+    def test_simulacion_en_curso_no_se_toma_dos_veces(self):
+        ahora = timezone.now()
+        self.assertIsNotNone(tomar_simulacion(self.simulacion, ahora))
+        self.assertIsNone(tomar_simulacion(self.simulacion, ahora + timedelta(minutes=5)))
+        self.assertEqual(simular_pendientes(), [])
+
+    def test_lease_vencido_se_retoma(self):
+        ahora = timezone.now() - timedelta(hours=2)
+        self.assertIsNotNone(tomar_simulacion(self.simulacion, ahora))
+        procesadas = simular_pendientes()
+        self.assertEqual([s.pk for s in procesadas], [self.simulacion.pk])
+        self.assertEqual(procesadas[0].estado, 'completa')
+        self.assertIsNone(procesadas[0].bloqueado_hasta)
+
+    def test_corrida_retomada_no_pisa_resultados(self):
+        def retomada(*args, **kwargs):
+            # Mientras esta corrida simula, su lease vence y otro nodo retoma la simulación
+            tomar_simulacion(self.simulacion, timezone.now() + timedelta(hours=2))
+            return [{'nombre': 'vieja'}]
+
+        with mock.patch('api.simulacion_utils.simular', side_effect=retomada):
+            self.assertEqual(simular_pendientes(), [])
+        self.simulacion.refresh_from_db()
+        self.assertEqual(self.simulacion.estado, 'en_curso')
+        self.assertEqual(self.simulacion.resultados, [])
+
+    def test_procesos_por_defecto_fuera_del_trabajador(self):
+        with mock.patch('api.simulacion_utils.ProcessPoolExecutor') as pool:
+            simular(date(2026, 3, 2), validar_escenarios([{'nombre': 'Igual', 'cambios': []}]))
+        pool.assert_not_called()
+
+
+# ============================================================================
+# PLANIFICADOR
+# ============================================================================
+
+class PlanificadorTests(TestCase):
+    """Tareas pesadas fuera del hilo web y renovación del bloqueo"""
+
+    def setUp(self):
+        self.ejecutadas = []
+        tareas = {
+            'liviana': planificador.Tarea('liviana', lambda: self.ejecutadas.append('liviana'),
+                                          intervalo=timedelta(minutes=1)),
+            'pesada': planificador.Tarea('pesada', lambda: self.ejecutadas.append('pesada'),
+                                         intervalo=timedelta(minutes=1), pesada=True),
+        }
+        parche = mock.patch.dict(planificador.TAREAS, tareas, clear=True)
+        parche.start()
+        self.addCleanup(parche.stop)
+        for nombre in tareas:
+            TareaProgramada.objects.create(nombre=nombre, proxima_ejecucion=timezone.now() - timedelta(seconds=1))
+
+    def test_hilo_web_omite_las_tareas_pesadas(self):
+        planificador.ejecutar_pendientes(pesadas=False)
+        self.assertEqual(self.ejecutadas, ['liviana'])
+        self.assertIsNone(TareaProgramada.objects.get(nombre='pesada').bloqueado_por)
+        planificador.ejecutar_pendientes()  # ejecutar_tareas
+        self.assertEqual(self.ejecutadas, ['liviana', 'pesada'])
+
+    def test_renovar_solo_el_bloqueo_propio(self):
+        tarea = planificador.TAREAS['pesada']
+        self.assertTrue(planificador.tomar_lease(tarea, timezone.now()))
+        TareaProgramada.objects.filter(nombre='pesada').update(bloqueado_hasta=timezone.now())
+        self.assertTrue(planificador.renovar_lease(tarea))
+        self.assertGreater(TareaProgramada.objects.get(nombre='pesada').bloqueado_hasta,
+                           timezone.now() + timedelta(minutes=29))
+        TareaProgramada.objects.filter(nombre='pesada').update(bloqueado_por='otro:1')
+        self.assertFalse(planificador.renovar_lease(tarea))
+
+
+class RenovacionLeaseTests(TransactionTestCase):
+    """Una ejecución más larga que duracion_maxima conserva su bloqueo"""
+
+    def test_ejecucion_larga_renueva_el_bloqueo(self):
+        vencimientos = []
+
+        def larga():
+            vencimientos.append(TareaProgramada.objects.get(nombre='larga').bloqueado_hasta)
+            reloj.sleep(0.5)
+            vencimientos.append(TareaProgramada.objects.get(nombre='larga').bloqueado_hasta)
+
+        tarea = planificador.Tarea('larga', larga, intervalo=timedelta(minutes=1),
+                                   duracion_maxima=timedelta(seconds=0.3))
+        TareaProgramada.objects.create(nombre='larga', proxima_ejecucion=timezone.now())
+        self.assertTrue(planificador.tomar_lease(tarea, timezone.now()))
+        ejecucion = planificador.ejecutar_tarea(tarea)
+        self.assertEqual(ejecucion.estado, 'exito')
+        self.assertGreater(vencimientos[1], vencimientos[0])
+        self.assertIsNone(TareaProgramada.objects.get(nombre='larga').bloqueado_por)
+
+
+# ============================================================================
+# ARCHIVO DE FAMILIAS
+# ============================================================================
+
+def resumen(metrica):
+    return sorted(ResumenAnalitico.objects.filter(metrica=metrica).exclude(valor=0).values_list(
+        'periodo', 'dimension', 'valor', 'suma'))
+
+
+class ArchivoFamiliasTests(TestCase):
+    """Archivo -> restauración: solo el perfil del usuario y los datos de la familia intactos"""
+
+    def setUp(self):
+        self.usuario, self.padre, self.estudiante, self.tutor = crear_familia(1)
+        self.usuario.set_password('secreta123')
+        self.usuario.token_verificacion = 'token-de-prueba'
+        self.usuario.nombre = 'Ana'
+        self.usuario.save()
+        self.usuario.groups.add(Group.objects.create(name='Representantes'))
+        creado = timezone.now() - timedelta(days=40)
+        Padres.objects.filter(pk=self.padre.pk).update(created_at=creado)
+        consolidar_inscripciones()  # El estudiante se sumó en la semana de hoy
+        aprobar_padres([self.padre.pk], True)
+        self.padre.refresh_from_db()
+        self.inscripciones, self.aprobaciones = resumen('inscripciones'), resumen('aprobaciones')
+
+    def archivar(self):
+        eliminar_familias([self.padre.pk])
+        return FamiliaArchivada.objects.get(padre_original=self.padre.pk)
+
+    def test_archivo_sin_credenciales(self):
+        usuario = descomprimir(self.archivar().datos)['usuario']
+        self.assertEqual(usuario['email'], 'padre1@prueba.test')
+        self.assertEqual(usuario['grupos'], ['Representantes'])
+        for campo in ('password', 'token_verificacion', 'last_login', 'is_superuser', 'id'):
+            self.assertNotIn(campo, usuario)
+
+    def test_ida_y_vuelta(self):
+        archivada = self.archivar()
+        self.assertEqual(resumen('aprobaciones'), [])
+        self.assertEqual(resumen('inscripciones'), [])
+
+        padre = restaurar(archivada)
+        usuario = padre.usuario
+        self.assertNotEqual(usuario.pk, self.usuario.pk)
+        self.assertEqual((usuario.email, usuario.nombre, usuario.role), ('padre1@prueba.test', 'Ana', 'padre'))
+        self.assertFalse(usuario.has_usable_password())
+        self.assertIsNone(usuario.token_verificacion)
+        self.assertEqual(list(usuario.groups.values_list('name', flat=True)), ['Representantes'])
+
+        padre.refresh_from_db()
+        self.assertEqual(padre.created_at, self.padre.created_at)
+        self.assertEqual(padre.fecha_aprobacion, self.padre.fecha_aprobacion)
+        self.assertTrue(padre.aprobado)
+        estudiante = padre.estudiantes.get()
+        self.assertEqual((estudiante.nombre, estudiante.Colegio, estudiante.H_entrada),
+                         (self.estudiante.nombre, self.estudiante.Colegio, self.estudiante.H_entrada))
+        self.assertEqual(list(Tutor_receptor.objects.filter(estudiante=estudiante).values_list('nombre', flat=True)),
+                         [self.tutor.nombre])
+
+        self.assertEqual(resumen('inscripciones'), self.inscripciones)
+        self.assertEqual(resumen('aprobaciones'), self.aprobaciones)
+        with self.assertRaises(ValueError):
+            restaurar(FamiliaArchivada.objects.get(pk=archivada.pk))
+
+    @override_settings(ARCHIVO_MESES_RETENCION=6)
+    def test_purgar_archivo(self):
+        archivada = self.archivar()
+        self.assertEqual(purgar_archivo(), 0)
+        FamiliaArchivada.objects.filter(pk=archivada.pk).update(archivada_en=timezone.now() - timedelta(days=200))
+        self.assertEqual(purgar_archivo(), 1)
+
+
+# ============================================================================
+# PERFILADOR BAJO DEMANDA
+# ============================================================================
+
+class PerfiladoTests(TestCase):
+    """La sesión y las pilas se comparten por la base de datos, no por la caché local"""
+
+    def setUp(self):
+        perfilador = perfilado_utils.perfilador
+        self.addCleanup(setattr, perfilador, 'sesion', None)
+        self.addCleanup(perfilador.hilos.clear)
+
+    def test_otro_proceso_ve_la_sesion(self):
+        sesion = perfilado_utils.iniciar_sesion(vista='perfilado', segundos=60)
+        perfilado_utils.perfilador.sesion = None  # Proceso que no inició la sesión
+        self.assertEqual(perfilado_utils.sesion_actual(), sesion)
+        self.assertTrue(perfilado_utils.sesion_vigente(perfilado_utils.sesion_actual()))
+        perfilado_utils.detener_sesion()
+        self.assertFalse(perfilado_utils.sesion_vigente(perfilado_utils.sesion_actual()))
+
+    def test_peticiones_entre_todos_los_procesos(self):
+        sesion = perfilado_utils.iniciar_sesion(peticiones=2, segundos=60)
+        perfilador = perfilado_utils.perfilador
+        with mock.patch.object(perfilado_utils, 'HiloMuestreo'):  # Sin hilo de muestreo real
+            self.assertTrue(perfilador.entrar('perfilado'))
+            perfilador.sesion = dict(sesion)  # Otro proceso con su propia copia de la sesión
+            self.assertTrue(perfilador.entrar('perfilado'))
+            self.assertFalse(perfilador.entrar('perfilado'))
+        self.assertFalse(perfilado_utils.sesion_vigente(sesion))
+
+    def test_pilas_de_varios_procesos(self):
+        sesion = perfilado_utils.iniciar_sesion(segundos=60)
+        VolcadoPerfilado.objects.create(sesion_id=sesion['id'], nodo='otro:1', pilas={'vista': {'a;b': 3}})
+        hilo = perfilado_utils.HiloMuestreo(perfilado_utils.perfilador, sesion)  # Sin iniciar
+        hilo.pilas['vista'].update({'a;b': 2, 'a;c': 1})
+        hilo.volcar()
+        hilo.volcar()  # Cada proceso reemplaza su volcado
+        self.assertEqual(VolcadoPerfilado.objects.filter(sesion_id=sesion['id']).count(), 2)
+        pilas = perfilado_utils.pilas_sesion(sesion)
+        self.assertEqual(pilas, {'vista': Counter({'a;b': 5, 'a;c': 1})})
+        self.assertEqual(perfilado_utils.formato_colapsado(pilas), 'vista;a;b 5\nvista;a;c 1\n')
+
+
+# ============================================================================
+# CALENDARIO Y PLANES DE VIAJE
+# ============================================================================
+
+class PlanesViajeTests(TestCase):
+    """La generación de los planes cacheados vive en la base de datos y llega a todos los procesos"""
+
+    def setUp(self):
+        cache.clear()  # Las generaciones se repiten entre pruebas al revertir la base de datos
+        self.addCleanup(cache.clear)
+        crear_familia(1)
+        self.lunes, self.viernes = date(2026, 3, 2), date(2026, 3, 6)
+
+    def fechas(self):
+        return [dia['fecha'] for dia in expandir_viajes(self.lunes, self.viernes, Estudiantes.objects.all())['dias']]
+
+    def test_editar_excepcion_cambia_los_viajes(self):
+        self.assertEqual(len(self.fechas()), 5)
+        excepcion = ExcepcionCalendario.objects.create(tipo='feriado', desde=date(2026, 3, 3), hasta=date(2026, 3, 3))
+        self.assertNotIn(date(2026, 3, 3), self.fechas())
+        excepcion.hasta = date(2026, 3, 4)
+        excepcion.save()
+        self.assertEqual(len(self.fechas()), 3)
+        excepcion.delete()
+        self.assertEqual(len(self.fechas()), 5)
+
+    def test_invalidacion_de_otro_proceso(self):
+        self.assertEqual(len(self.fechas()), 5)
+        # Cambio sin señales en este proceso: el plan cacheado sigue vigente...
+        ExcepcionCalendario.objects.bulk_create([
+            ExcepcionCalendario(tipo='feriado', desde=date(2026, 3, 3), hasta=date(2026, 3, 3))])
+        self.assertEqual(len(self.fechas()), 5)
+        # ...hasta que otro proceso incrementa la generación en la base de datos
+        incrementar_contador(CONTADOR_PLANES)
+        self.assertEqual(len(self.fechas()), 4)
+
+
+# ============================================================================
+# FORMULARIOS
+# ============================================================================
+
+class EnviarFormularioTests(TestCase):
+    """Reenviar el formulario solo cambia la cédula y el celular del padre"""
+
+    def test_solo_cedula_y_celular(self):
+        usuario, padre, estudiante, tutor = crear_familia(1)
+        cliente = APIClient()
+        cliente.force_authenticate(usuario)
+        respuesta = cliente.post('/api/formularios/enviar/', {
+            'cedula': '1799999999', 'celular': '0991234567',
+            'estudiantes': [{'id': estudiante.pk, 'nombre': 'Otro'}], 'tutores_receptores': [{'nombre': 'Nuevo'}],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        padre.refresh_from_db()
+        self.assertEqual((padre.cedula, padre.celular), ('1799999999', '0991234567'))
+        self.assertGreater(padre.version, estudiante.version)
+        self.assertEqual(list(Estudiantes.objects.values_list('nombre', flat=True)), ['Estudiante 1'])
+        self.assertEqual(list(Tutor_receptor.objects.values_list('nombre', flat=True)), ['Tutor 1'])
+
+
+# ============================================================================
+# ACCESO POR FAMILIA EN LAS VISTAS CRUD
+# ============================================================================
+
+class AccesoPorFamiliaTests(TestCase):
+    """FiltradoPorPadreMixin: cada padre solo ve y modifica los datos de su familia"""
+
+    def setUp(self):
+        self.usuario, self.padre, self.estudiante, self.tutor = crear_familia(1)
+        _, self.otro_padre, self.otro_estudiante, self.otro_tutor = crear_familia(2)
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.usuario)
+
+    def listado(self, url):
+        respuesta = self.cliente.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return sorted(fila['id'] for fila in respuesta.data['results'])
+
+    def test_listados_solo_de_su_familia(self):
+        self.assertEqual(self.listado('/api/padres/'), [self.padre.pk])
+        self.assertEqual(self.listado('/api/estudiantes/'), [self.estudiante.pk])
+        self.assertEqual(self.listado('/api/tutores/'), [self.tutor.pk])
+
+    def test_otra_familia_no_encontrada(self):
+        for url in (f'/api/padres/{self.otro_padre.pk}/', f'/api/estudiantes/{self.otro_estudiante.pk}/',
+                    f'/api/tutores/{self.otro_tutor.pk}/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.cliente.get(url).status_code, 404)
+                self.assertEqual(self.cliente.patch(url, {'nombre': 'Cambiado'}, format='json').status_code, 404)
+                self.assertEqual(self.cliente.delete(url).status_code, 404)
+        self.otro_estudiante.refresh_from_db()
+        self.assertEqual(self.otro_estudiante.nombre, 'Estudiante 2')
+        self.assertTrue(Tutor_receptor.objects.filter(pk=self.otro_tutor.pk).exists())
+
+    def test_crear_asigna_su_familia(self):
+        respuesta = self.cliente.post('/api/estudiantes/', {
+            'nombre': 'Nuevo', 'apellido': 'Prueba', 'fecha_nacimiento': '2016-01-01', 'grado': '2do',
+            'Colegio': 'Colegio A', 'padres': self.otro_padre.pk,
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(Estudiantes.objects.get(pk=respuesta.data['id']).padres_id, self.padre.pk)
+
+        ajeno = self.cliente.post('/api/tutores/', {
+            'nombre': 'Intruso', 'apellido': 'Prueba', 'estudiante': self.otro_estudiante.pk}, format='json')
+        self.assertEqual(ajeno.status_code, 403)
+        self.assertFalse(Tutor_receptor.objects.filter(nombre='Intruso').exists())
+
+    def test_administrador_y_otros_roles(self):
+        self.cliente.force_authenticate(Usuario.objects.create_superuser('admin@prueba.test'))
+        self.assertEqual(self.listado('/api/estudiantes/'), sorted([self.estudiante.pk, self.otro_estudiante.pk]))
+        conductor, _ = crear_vehiculo(1, 10)
+        self.cliente.force_authenticate(conductor)
+        self.assertEqual(self.listado('/api/estudiantes/'), [])
+        self.assertEqual(self.cliente.get(f'/api/estudiantes/{self.estudiante.pk}/').status_code, 404)
+
+
+# ============================================================================
+# ASIGNACIÓN DE ASIENTOS
+# ============================================================================
+
+class EmpaquetarFranjaTests(SimpleTestCase):
+    """Heurística FFD: colegios de mayor a menor, vehículo más pequeño que alcance"""
+
+    def test_vehiculo_mas_pequeno_que_alcanza(self):
+        asignados, sin_asiento = empaquetar_franja(
+            {'B': [6, 7, 8], 'A': [1, 2, 3, 4, 5]}, {10: 4, 11: 6, 12: 3})
+        self.assertEqual(asignados, {1: 11, 2: 11, 3: 11, 4: 11, 5: 11, 6: 12, 7: 12, 8: 12})
+        self.assertEqual(sin_asiento, [])
+
+    def test_sin_vehiculo_suficiente_llena_el_mas_grande(self):
+        asignados, sin_asiento = empaquetar_franja({'A': list(range(10))}, {1: 4, 2: 6})
+        self.assertEqual([asignados[e] for e in range(10)], [2] * 6 + [1] * 4)
+        self.assertEqual(sin_asiento, [])
+
+    def test_sin_asiento(self):
+        asignados, sin_asiento = empaquetar_franja({'A': [1, 2, 3], 'B': [4]}, {1: 2, 2: 0})
+        self.assertEqual(asignados, {1: 1, 2: 1})
+        self.assertEqual(sin_asiento, [3, 4])
+
+
+class ReservaAsientoTests(TestCase):
+    """Asignación incremental, reubicación al bajar capacidad y reservas concurrentes"""
+
+    def asientos(self):
+        return dict(AsignacionVehiculo.objects.filter(tramo='entrada').values_list('estudiante_id', 'vehiculo_id'))
+
+    def test_bajar_capacidad_reubica_a_los_ultimos(self):
+        _, chico = crear_vehiculo(1, 3)
+        _, grande = crear_vehiculo(2, 5)
+        estudiantes = [crear_familia(n)[2].pk for n in range(1, 4)]
+        self.assertEqual(self.asientos(), {e: chico.pk for e in estudiantes})
+        chico.capacidad = 1
+        chico.save()
+        self.assertEqual(self.asientos(), {estudiantes[0]: chico.pk, estudiantes[1]: grande.pk,
+                                           estudiantes[2]: grande.pk})
+
+    def ocupar_con_otro_colegio(self, vehiculos):
+        """Cada vehículo queda con un estudiante de otro colegio, sin que la búsqueda lo vea"""
+        for n, vehiculo in enumerate(vehiculos, start=10):
+            estudiante = crear_familia(n, colegio='Colegio B')[2]
+            AsignacionVehiculo.objects.update_or_create(estudiante=estudiante, tramo='entrada', defaults={
+                'vehiculo': vehiculo, 'colegio': 'Colegio B', 'hora': time(7, 0)})
+
+    def test_otra_transaccion_ocupo_el_vehiculo(self):
+        estudiante = crear_familia(1)[2]
+        _, chico = crear_vehiculo(1, 1)
+        _, grande = crear_vehiculo(2, 5)
+        self.ocupar_con_otro_colegio([chico])
+        # La búsqueda sin bloqueo todavía no ve la reserva de la otra transacción
+        with mock.patch.object(asignacion_utils, 'cargar_ocupacion',
+                               side_effect=lambda t, h, capacidades, **kw: OcupacionFranja(capacidades)) as cargar:
+            vehiculo = reservar_asiento(estudiante.pk, 'entrada', time(7, 0), 'Colegio A',
+                                        {chico.pk: 1, grande.pk: 5})
+        self.assertEqual(vehiculo, grande.pk)
+        self.assertEqual(cargar.call_count, 2)
+
+    def test_intentos_limitados(self):
+        estudiante = crear_familia(1)[2]
+        vehiculos = [crear_vehiculo(n, 5)[1] for n in range(1, 6)]
+        self.ocupar_con_otro_colegio(vehiculos)
+        with mock.patch.object(asignacion_utils, 'INTENTOS_RESERVA', 3), \
+                mock.patch.object(asignacion_utils, 'cargar_ocupacion',
+                                  side_effect=lambda t, h, capacidades, **kw: OcupacionFranja(capacidades)) as cargar:
+            vehiculo = reservar_asiento(estudiante.pk, 'entrada', time(7, 0), 'Colegio A',
+                                        {v.pk: 5 for v in vehiculos})
+        self.assertIsNone(vehiculo)
+        self.assertEqual(cargar.call_count, 3)
+
+
+# ============================================================================
+# PAGINACIÓN POR CURSOR
+# ============================================================================
+
+class PaginacionCursorTests(TestCase):
+    """PaginacionCursor (paginación global): orden estable, filtros sin duplicados y ?total=1"""
+
+    def setUp(self):
+        cache.clear()  # Totales cacheados de otras pruebas
+        self.addCleanup(cache.clear)
+        self.padres = [crear_familia(n)[1] for n in range(1, 8)]
+        # Dos estudiantes más del mismo colegio en la primera familia
+        for nombre in ('Segundo', 'Tercero'):
+            Estudiantes.objects.create(padres=self.padres[0], nombre=nombre, apellido='Prueba',
+                                       fecha_nacimiento=date(2016, 1, 1), grado='2do', Colegio='Colegio A')
+        crear_familia(8, colegio='Colegio B')
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(Usuario.objects.create_superuser('admin@prueba.test'))
+
+    def recorrer(self, url):
+        """IDs de todas las páginas siguiendo `next`, y cuántas páginas hubo"""
+        ids, paginas = [], 0
+        while url:
+            respuesta = self.cliente.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            ids.extend(fila['id'] for fila in respuesta.data['results'])
+            url, paginas = respuesta.data['next'], paginas + 1
+        return ids, paginas
+
+    def test_cursor_en_orden(self):
+        todos = sorted(Padres.objects.values_list('pk', flat=True))
+        ids, paginas = self.recorrer('/api/admin/formularios/?page_size=3')
+        self.assertEqual(ids, todos[::-1])
+        self.assertEqual(paginas, 3)
+        self.assertEqual(self.recorrer('/api/admin/formularios/?page_size=3&ordering=id')[0], todos)
+
+    def test_filtro_de_muchos_sin_duplicados(self):
+        esperados = sorted((p.pk for p in self.padres), reverse=True)
+        self.assertEqual(self.recorrer('/api/admin/formularios/?colegio=Colegio A')[0], esperados)
+        self.assertEqual(self.recorrer('/api/admin/formularios/?colegio=Colegio A&page_size=1')[0], esperados)
+        self.assertEqual(self.cliente.get('/api/admin/formularios/?aprobado=quizas').status_code, 400)
+
+    def test_total(self):
+        respuesta = self.cliente.get('/api/admin/formularios/?colegio=Colegio A&page_size=2&total=1')
+        self.assertEqual(respuesta.data['total_estimado'], 7)
+        self.assertEqual(len(respuesta.data['results']), 2)
+        self.assertNotIn('total_estimado', self.cliente.get('/api/admin/formularios/').data)
+        # El total queda cacheado por filtros; otra página del mismo listado no vuelve a contar
+        crear_familia(9)
+        siguiente = self.cliente.get(respuesta.data['next'])  # Conserva los filtros y ?total=1
+        self.assertEqual(siguiente.data['total_estimado'], 7)
+
+
+# ============================================================================
+# APROBACIÓN Y ELIMINACIÓN EN LOTE
+# ============================================================================
+
+class AprobacionLoteTests(TestCase):
+    """aprobar_padres y eliminar_familias: versión, correos, eventos, auditoría y lotes"""
+
+    def setUp(self):
+        self.familias = [crear_familia(n) for n in range(1, 4)]
+        self.usuario, self.padre = self.familias[0][:2]
+        Padres.objects.filter(pk=self.familias[1][1].pk).update(aprobado=True, fecha_aprobacion=timezone.now())
+        self.admin = Usuario.objects.create_superuser('admin@prueba.test')
+
+    def aprobar(self, ids):
+        """Aprueba y devuelve el resultado y las entradas de auditoría que pasaron al búfer"""
+        with mock.patch.object(auditoria_utils.buffer, 'agregar') as agregar:
+            with self.captureOnCommitCallbacks(execute=True):
+                resultado = aprobar_padres(ids, True, actor=self.admin)
+        return resultado, [e for llamada in agregar.call_args_list for e in llamada.args[0]]
+
+    def test_aprobar(self):
+        Usuario.objects.filter(pk=self.usuario.pk).update(nombre='<b>Ana</b>')
+        version = self.padre.version
+        (resultados, correos), auditoria = self.aprobar([self.padre.pk, self.familias[1][1].pk, 999999])
+        self.assertEqual(resultados, {
+            self.padre.pk: 'aprobado', self.familias[1][1].pk: 'sin_cambios', 999999: 'no_encontrado'})
+        self.assertEqual(correos, 1)
+
+        self.padre.refresh_from_db()
+        self.assertTrue(self.padre.aprobado)
+        self.assertIsNotNone(self.padre.fecha_aprobacion)
+        self.assertGreater(self.padre.version, version)
+
+        correo = CorreoPendiente.objects.get()
+        self.assertEqual(correo.destinatario, self.usuario.email)
+        self.assertIn('&lt;b&gt;Ana&lt;/b&gt;', correo.contenido_html)
+        self.assertNotIn('<b>Ana</b>', correo.contenido_html)
+        self.assertEqual(list(EventoDominio.objects.values_list('tipo', 'entidad_id')),
+                         [('padre.aprobado', self.padre.pk)])
+        self.assertEqual([(e.accion, e.objetivo_tipo, e.objetivo_id, e.actor_email) for e in auditoria],
+                         [('aprobado', 'padre', self.padre.pk, 'admin@prueba.test')])
+
+    def test_aprobar_sin_cambios(self):
+        (resultados, correos), auditoria = self.aprobar([self.familias[1][1].pk])
+        self.assertEqual(resultados, {self.familias[1][1].pk: 'sin_cambios'})
+        self.assertEqual((correos, auditoria), (0, []))
+        self.assertFalse(CorreoPendiente.objects.exists())
+        self.assertFalse(EventoDominio.objects.exists())
+
+    def test_eliminar_en_lotes(self):
+        padres = [familia[1].pk for familia in self.familias]
+        usuarios = [familia[0].pk for familia in self.familias]
+        with mock.patch.object(aprobacion_utils, 'TAMANO_LOTE', 2), \
+                mock.patch.object(aprobacion_utils, 'archivar_familias',
+                                  wraps=aprobacion_utils.archivar_familias) as archivar:
+            resultados = eliminar_familias(padres + [999999])
+        self.assertEqual(resultados, {**{pk: 'eliminado' for pk in padres}, 999999: 'no_encontrado'})
+        # Dos lotes: [1, 2] y [3, 999999]
+        self.assertEqual([llamada.args[0] for llamada in archivar.call_args_list], [padres[:2], padres[2:]])
+        self.assertFalse(Usuario.objects.filter(pk__in=usuarios).exists())
+        self.assertFalse(Padres.objects.filter(pk__in=padres).exists())
+        self.assertEqual(sorted(FamiliaArchivada.objects.values_list('padre_original', flat=True)), sorted(padres))
+        self.assertEqual(sorted(EventoDominio.objects.filter(tipo='usuario.eliminado')
+                                .values_list('entidad_id', flat=True)), sorted(usuarios))
+
+
+# ============================================================================
+# CONTROL DE ADMISIÓN
+# ============================================================================
+
+CLASES_PRUEBA = {
+    'admin': {'limite': 1.0, 'espera': 5, 'cola': 5, 'reintentar': 5},
+    'padre_lectura': {'limite': 1.0, 'espera': 5, 'cola': 5, 'reintentar': 5},
+    'padre_escritura': {'limite': 0.5, 'espera': 0, 'cola': 5, 'reintentar': 10},
+    'auth': {'limite': 0.5, 'espera': 5, 'cola': 5, 'reintentar': 15},
+}
+
+
+class AdmisionTests(SimpleTestCase):
+    """ControlAdmision y AdmisionMiddleware: cupos por clase, orden de prioridad y 503 al vencer la espera"""
+
+    def esperando(self, control, clase, cantidad):
+        """Espera (a lo sumo 2 s) a que `cantidad` peticiones de la clase estén bloqueadas en entrar()"""
+        limite = reloj.monotonic() + 2
+        while control.metricas[clase]['en_espera'] < cantidad and reloj.monotonic() < limite:
+            reloj.sleep(0.005)
+        self.assertEqual(control.metricas[clase]['en_espera'], cantidad)
+
+    def test_clasificar(self):
+        fabrica = APIRequestFactory()
+        casos = [
+            (fabrica.get('/admin/'), None),
+            (fabrica.post('/api/admin/aprobar/'), 'admin'),
+            (fabrica.get('/api/formularios/'), 'padre_lectura'),
+            (fabrica.post('/api/auth/login/'), 'auth'),
+            (fabrica.post('/api/formularios/'), 'padre_escritura'),
+        ]
+        for peticion, clase in casos:
+            self.assertEqual(middleware.clasificar_peticion(peticion), clase)
+
+    def test_cupo_por_clase(self):
+        control = middleware.ControlAdmision(4, CLASES_PRUEBA)
+        self.assertEqual((control.cupo('admin'), control.cupo('padre_escritura')), (4, 2))
+        self.assertTrue(control.entrar('padre_escritura'))
+        self.assertTrue(control.entrar('padre_escritura'))
+        # Sin espera configurada, la tercera se rechaza enseguida; la reserva queda para admin
+        self.assertFalse(control.entrar('padre_escritura'))
+        self.assertTrue(control.entrar('admin'))
+        self.assertTrue(control.entrar('admin'))
+        self.assertEqual(control.en_curso, 4)
+        control.salir('admin')
+        self.assertFalse(control.entrar('padre_escritura'))  # 3 en curso, sigue sobre su cupo
+        resumen = control.resumen()
+        self.assertEqual(resumen['en_curso'], 3)
+        self.assertEqual(resumen['clases']['padre_escritura']['rechazadas'], 2)
+        self.assertEqual(resumen['clases']['padre_escritura']['en_curso'], 2)
+        self.assertEqual(resumen['clases']['admin']['admitidas'], 2)
+
+    def test_prioridad_al_liberar(self):
+        control = middleware.ControlAdmision(2, CLASES_PRUEBA)
+        self.assertTrue(control.entrar('padre_lectura'))
+        self.assertTrue(control.entrar('padre_lectura'))
+        orden = []
+        hilos = [threading.Thread(target=lambda c=clase: orden.append((c, control.entrar(c))))
+                 for clase in ('auth', 'admin')]
+        hilos[0].start()
+        self.esperando(control, 'auth', 1)
+        hilos[1].start()
+        self.esperando(control, 'admin', 1)
+
+        # Al liberar un lugar entra admin aunque auth esperaba desde antes (su cupo es 1)
+        control.salir('padre_lectura')
+        hilos[1].join(2)
+        self.assertEqual(orden, [('admin', True)])
+        self.assertEqual(control.metricas['auth']['en_espera'], 1)
+
+        control.salir('padre_lectura')
+        control.salir('admin')
+        hilos[0].join(2)
+        self.assertEqual(orden, [('admin', True), ('auth', True)])
+        self.assertEqual(control.en_curso, 1)
+
+    @override_settings(ADMISION_ACTIVA=True, ADMISION_MAX_EN_CURSO=2, ADMISION_CLASES={
+        **CLASES_PRUEBA, 'auth': {**CLASES_PRUEBA['auth'], 'espera': 0.1}})
+    def test_middleware_503_al_vencer_la_espera(self):
+        liberar = threading.Event()
+
+        def vista(request):
+            liberar.wait(2)
+            return JsonResponse({})
+
+        with mock.patch.object(middleware, 'control_admision', None):
+            admision = middleware.AdmisionMiddleware(vista)
+            fabrica = APIRequestFactory()
+            ocupando = threading.Thread(target=admision, args=(fabrica.post('/api/auth/login/'),))
+            ocupando.start()
+            self.addCleanup(ocupando.join, 2)
+            self.addCleanup(liberar.set)
+            limite = reloj.monotonic() + 2
+            while admision.control.en_curso < 1 and reloj.monotonic() < limite:
+                reloj.sleep(0.005)
+
+            inicio = reloj.monotonic()
+            respuesta = admision(fabrica.post('/api/auth/registro/'))
+            self.assertGreaterEqual(reloj.monotonic() - inicio, 0.1)
+            self.assertEqual(respuesta.status_code, 503)
+            self.assertEqual(respuesta['Retry-After'], '15')
+            self.assertEqual(admision.control.metricas['auth']['rechazadas'], 1)
+
+            # Fuera de /api/ no pasa por el control; admin todavía tiene cupo
+            liberar.set()
+            self.assertEqual(admision(fabrica.get('/salud/')).status_code, 200)
+            self.assertEqual(admision(fabrica.post('/api/admin/aprobar/')).status_code, 200)
+            ocupando.join(2)
+            self.assertEqual(admision.control.en_curso, 0)
+
+    @override_settings(ADMISION_ACTIVA=False)
+    def test_desactivado(self):
+        with self.assertRaises(middleware.MiddlewareNotUsed):
+            middleware.AdmisionMiddleware(lambda request: None)
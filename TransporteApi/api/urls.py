@@ -2,12 +2,28 @@
 from django.urls import path  # Para definir rutas URL
 from .views import (  # Importar todas las vistas que vamos a usar
     registro_usuario, login_usuario, logout_usuario, perfil_usuario, dashboard, verificar_email,
-    enviar_formulario, eliminar_usuario, aprobar_padre,
+    enviar_formulario, eliminar_usuario, aprobar_padre, aprobar_padres_lote, eliminar_usuarios_lote,
     PadresListCreateView, PadresDetailView,
     EstudiantesListCreateView, EstudiantesDetailView,
     TutorReceptorListCreateView, TutorReceptorDetailView,
-    FormulariosAdminView, FromularioDetailAdminView
-    
+    FormulariosAdminView, FromularioDetailAdminView,
+    ConductorListCreateView, ConductorDetailView,
+    VehiculoListCreateView, VehiculoDetailView,
+    ocupacion_vehiculos, recalcular_asignaciones_view, asignar_estudiante_view,
+    ParadaListCreateView, ParadaDetailView, parada_cercana, tutores_cercanos, agrupar_paradas,
+    manifiesto_vehiculo, manifiesto_conductor,
+    TareasProgramadasView, EjecucionesTareaView, ejecutar_tarea_ahora,
+    duplicados_padre, duplicados_todos,
+    carga_servidor, perfilado, perfilado_pilas, analitica,
+    DestinoEventosListCreateView, DestinoEventosDetailView,
+    sincronizar, tutores_autorizados, verificar_recogida, credencial_tutor,
+    CalendarioColegioListCreateView, CalendarioColegioDetailView,
+    ExcepcionCalendarioListCreateView, ExcepcionCalendarioDetailView, viajes_programados,
+    TarifaTransporteListCreateView, TarifaTransporteDetailView, CorridaFacturacionListCreateView,
+    FacturasAdminView, FacturaDetailAdminView, FacturasPadreView,
+    registrar_recorrido, eta_padre,
+    UbicacionColegioListCreateView, UbicacionColegioDetailView, recibir_gps, avisos_padre,
+    SimulacionPlanListCreateView, SimulacionPlanDetailView, RegistroAuditoriaView
 )
 
 # Lista de patrones de URL para la aplicación 'api'
@@ -144,4 +160,329 @@ urlpatterns = [
     # Función: eliminar_usuario
     # Permisos: Solo admins
     path('admin/usuarios/<int:pk>/eliminar/', eliminar_usuario, name='eliminar-usuario'),
+    
+    # POST: Aprobar/desaprobar varios padres en una transacción (solo admins)
+    # URL: /api/admin/padres/aprobar/
+    # Body: {"ids": [...], "aprobado": true} o {"filtro": {"aprobado": false, "colegio": "..."}, "aprobado": true}
+    # Función: aprobar_padres_lote
+    path('admin/padres/aprobar/', aprobar_padres_lote, name='aprobar-padres-lote'),
+    
+    # POST: Eliminar varios usuarios y formularios en una transacción (solo admins)
+    # URL: /api/admin/usuarios/eliminar/
+    # Body: {"ids": [...]} o {"filtro": {...}}
+    # Función: eliminar_usuarios_lote
+    path('admin/usuarios/eliminar/', eliminar_usuarios_lote, name='eliminar-usuarios-lote'),
+    
+    # ============================================================================
+    # ENDPOINTS DE LA FLOTA (solo admins)
+    # ============================================================================
+    
+    # GET: Listar conductores / POST: Crear conductor
+    # URL: /api/admin/conductores/
+    path('admin/conductores/', ConductorListCreateView.as_view(), name='conductores-list'),
+    
+    # GET/PUT/PATCH/DELETE: Conductor específico
+    # URL: /api/admin/conductores/<id>/
+    path('admin/conductores/<int:pk>/', ConductorDetailView.as_view(), name='conductores-detail'),
+    
+    # GET: Listar vehículos / POST: Crear vehículo
+    # URL: /api/admin/vehiculos/
+    path('admin/vehiculos/', VehiculoListCreateView.as_view(), name='vehiculos-list'),
+    
+    # GET/PUT/PATCH/DELETE: Vehículo específico
+    # URL: /api/admin/vehiculos/<id>/
+    path('admin/vehiculos/<int:pk>/', VehiculoDetailView.as_view(), name='vehiculos-detail'),
+    
+    # GET: Ocupación de cada vehículo por franja
+    # URL: /api/admin/asignaciones/
+    # Función: ocupacion_vehiculos
+    path('admin/asignaciones/', ocupacion_vehiculos, name='asignaciones-ocupacion'),
+    
+    # POST: Recalcular todas las asignaciones de asientos
+    # URL: /api/admin/asignaciones/recalcular/
+    # Función: recalcular_asignaciones_view
+    path('admin/asignaciones/recalcular/', recalcular_asignaciones_view, name='asignaciones-recalcular'),
+    
+    # POST: Asignar asiento a un estudiante (incremental)
+    # URL: /api/admin/estudiantes/<id>/asignar/
+    # Función: asignar_estudiante_view
+    path('admin/estudiantes/<int:pk>/asignar/', asignar_estudiante_view, name='asignar-estudiante'),
+    
+    # ============================================================================
+    # ENDPOINTS DE PARADAS Y BÚSQUEDAS POR CERCANÍA (solo admins)
+    # ============================================================================
+    
+    # GET: Listar paradas / POST: Crear parada
+    # URL: /api/admin/paradas/
+    path('admin/paradas/', ParadaListCreateView.as_view(), name='paradas-list'),
+    
+    # GET/PUT/PATCH/DELETE: Parada específica
+    # URL: /api/admin/paradas/<id>/
+    path('admin/paradas/<int:pk>/', ParadaDetailView.as_view(), name='paradas-detail'),
+    
+    # GET: Parada más cercana (y paradas en un radio)
+    # URL: /api/admin/paradas/cercana/?lat=&lon=&radio=
+    # Función: parada_cercana
+    path('admin/paradas/cercana/', parada_cercana, name='parada-cercana'),
+    
+    # POST: Agrupar familias cercanas en paradas compartidas
+    # URL: /api/admin/paradas/agrupar/
+    # Función: agrupar_paradas
+    path('admin/paradas/agrupar/', agrupar_paradas, name='agrupar-paradas'),
+    
+    # GET: Tutores receptores dentro de un radio
+    # URL: /api/admin/tutores/cercanos/?lat=&lon=&radio=
+    # Función: tutores_cercanos
+    path('admin/tutores/cercanos/', tutores_cercanos, name='tutores-cercanos'),
+    
+    # ============================================================================
+    # ENDPOINTS DE MANIFIESTOS DIARIOS
+    # ============================================================================
+    
+    # GET: Manifiesto del vehículo del conductor autenticado
+    # URL: /api/conductor/manifiesto/?fecha=&desde_version=
+    # Función: manifiesto_conductor
+    # Permisos: Solo usuarios con rol conductor
+    path('conductor/manifiesto/', manifiesto_conductor, name='manifiesto-conductor'),
+    
+    # GET: Manifiesto de cualquier vehículo (solo admins)
+    # URL: /api/admin/vehiculos/<id>/manifiesto/?fecha=&desde_version=
+    # Función: manifiesto_vehiculo
+    path('admin/vehiculos/<int:pk>/manifiesto/', manifiesto_vehiculo, name='manifiesto-vehiculo'),
+    
+    # ============================================================================
+    # ENDPOINTS DEL PLANIFICADOR DE TAREAS (solo admins)
+    # ============================================================================
+    
+    # GET: Listar tareas periódicas
+    # URL: /api/admin/tareas/
+    # Vista: TareasProgramadasView
+    path('admin/tareas/', TareasProgramadasView.as_view(), name='tareas-list'),
+    
+    # GET: Historial de ejecuciones (?tarea=&estado=&cursor=)
+    # URL: /api/admin/tareas/ejecuciones/
+    # Vista: EjecucionesTareaView
+    path('admin/tareas/ejecuciones/', EjecucionesTareaView.as_view(), name='tareas-ejecuciones'),
+    
+    # POST: Adelantar una tarea a la próxima revisión del planificador
+    # URL: /api/admin/tareas/<nombre>/ejecutar/
+    # Función: ejecutar_tarea_ahora
+    path('admin/tareas/<str:nombre>/ejecutar/', ejecutar_tarea_ahora, name='tarea-ejecutar'),
+    
+    # ============================================================================
+    # ENDPOINTS DE DETECCIÓN DE DUPLICADOS (solo admins)
+    # ============================================================================
+    
+    # GET: Posibles duplicados de un formulario (padre y sus estudiantes)
+    # URL: /api/admin/padres/<id>/duplicados/
+    # Función: duplicados_padre
+    path('admin/padres/<int:pk>/duplicados/', duplicados_padre, name='duplicados-padre'),
+    
+    # GET: Escaneo completo de duplicados
+    # URL: /api/admin/duplicados/
+    # Función: duplicados_todos
+    path('admin/duplicados/', duplicados_todos, name='duplicados-todos'),
+    
+    # ============================================================================
+    # ENDPOINTS DE MÉTRICAS DE CARGA (solo admins)
+    # ============================================================================
+    
+    # GET: Peticiones en curso, en espera y descartadas por clase de ruta
+    # URL: /api/admin/carga/
+    # Función: carga_servidor
+    path('admin/carga/', carga_servidor, name='carga-servidor'),
+    
+    # ============================================================================
+    # ENDPOINTS DEL PERFILADOR BAJO DEMANDA (solo admins)
+    # ============================================================================
+    
+    # GET: Sesión actual o la última | POST: Iniciar sesión | DELETE: Detener
+    # URL: /api/admin/perfilado/
+    # Función: perfilado
+    path('admin/perfilado/', perfilado, name='perfilado'),
+    
+    # GET: Pilas muestreadas en formato colapsado (flame graph)
+    # URL: /api/admin/perfilado/pilas/?vista=
+    # Función: perfilado_pilas
+    path('admin/perfilado/pilas/', perfilado_pilas, name='perfilado-pilas'),
+    
+    # ============================================================================
+    # ENDPOINTS DE ANALÍTICA (solo admins)
+    # ============================================================================
+    
+    # GET: Series de inscripciones, latencia de aprobación y ocupación por franja
+    # URL: /api/admin/analitica/?desde=&hasta=
+    # Función: analitica
+    path('admin/analitica/', analitica, name='analitica'),
+    
+    # ============================================================================
+    # ENDPOINTS DE DESTINOS DE EVENTOS (solo admins)
+    # ============================================================================
+    
+    # GET: Listar destinos / POST: Registrar destino (webhook o archivo)
+    # URL: /api/admin/eventos/destinos/
+    # Vista: DestinoEventosListCreateView
+    path('admin/eventos/destinos/', DestinoEventosListCreateView.as_view(), name='eventos-destinos-list'),
+    
+    # GET/PUT/PATCH/DELETE: Destino específico
+    # URL: /api/admin/eventos/destinos/<id>/
+    # Vista: DestinoEventosDetailView
+    path('admin/eventos/destinos/<int:pk>/', DestinoEventosDetailView.as_view(), name='eventos-destinos-detail'),
+    
+    # ============================================================================
+    # ENDPOINT DE SINCRONIZACIÓN INCREMENTAL
+    # ============================================================================
+    
+    # GET: Filas creadas, modificadas o eliminadas desde un cursor
+    # URL: /api/sync/?since=<cursor>&limite=<n>
+    # Función: sincronizar
+    # Permisos: admin (todo), padre (su familia), conductor (estudiantes de su vehículo)
+    path('sync/', sincronizar, name='sincronizar'),
+    
+    # ============================================================================
+    # ENDPOINTS DE VERIFICACIÓN DE RECOGIDA
+    # ============================================================================
+    
+    # GET: Tutores autorizados de un estudiante (conductores y admins, desde memoria)
+    # URL: /api/recogida/estudiantes/<id>/tutores/
+    # Función: tutores_autorizados
+    path('recogida/estudiantes/<int:pk>/tutores/', tutores_autorizados, name='recogida-tutores'),
+    
+    # POST: Verificar al adulto que recoge por credencial QR o teléfono
+    # URL: /api/recogida/verificar/
+    # Función: verificar_recogida
+    path('recogida/verificar/', verificar_recogida, name='recogida-verificar'),
+    
+    # GET: Credencial firmada (QR) de un tutor (su padre o admins)
+    # URL: /api/recogida/tutores/<id>/credencial/
+    # Función: credencial_tutor
+    path('recogida/tutores/<int:pk>/credencial/', credencial_tutor, name='recogida-credencial'),
+    
+    # ============================================================================
+    # ENDPOINTS DE CALENDARIOS Y VIAJES PROGRAMADOS
+    # ============================================================================
+    
+    # GET: Listar calendarios / POST: Crear calendario de un colegio (solo admins)
+    # URL: /api/admin/calendarios/
+    # Vista: CalendarioColegioListCreateView
+    path('admin/calendarios/', CalendarioColegioListCreateView.as_view(), name='calendarios-list'),
+    
+    # GET/PUT/PATCH/DELETE: Calendario específico
+    # URL: /api/admin/calendarios/<id>/
+    # Vista: CalendarioColegioDetailView
+    path('admin/calendarios/<int:pk>/', CalendarioColegioDetailView.as_view(), name='calendarios-detail'),
+    
+    # GET: Listar excepciones / POST: Crear feriado, medio día o semana de exámenes
+    # URL: /api/admin/calendarios/excepciones/
+    # Vista: ExcepcionCalendarioListCreateView
+    path('admin/calendarios/excepciones/', ExcepcionCalendarioListCreateView.as_view(), name='excepciones-list'),
+    
+    # GET/PUT/PATCH/DELETE: Excepción específica
+    # URL: /api/admin/calendarios/excepciones/<id>/
+    # Vista: ExcepcionCalendarioDetailView
+    path('admin/calendarios/excepciones/<int:pk>/', ExcepcionCalendarioDetailView.as_view(), name='excepciones-detail'),
+    
+    # GET: Viajes concretos de un rango de fechas según los calendarios
+    # URL: /api/viajes/?desde=&hasta=&colegio=&estudiante=
+    # Función: viajes_programados
+    # Permisos: admin (totales o un estudiante), padre (sus hijos), conductor (sus estudiantes)
+    path('viajes/', viajes_programados, name='viajes-programados'),
+    
+    # ============================================================================
+    # ENDPOINTS DE FACTURACIÓN MENSUAL
+    # ============================================================================
+    
+    # GET: Listar tarifas / POST: Crear tarifa (solo admins)
+    # URL: /api/admin/facturacion/tarifas/
+    # Vista: TarifaTransporteListCreateView
+    path('admin/facturacion/tarifas/', TarifaTransporteListCreateView.as_view(), name='tarifas-list'),
+    
+    # GET/PUT/PATCH/DELETE: Tarifa específica
+    # URL: /api/admin/facturacion/tarifas/<id>/
+    # Vista: TarifaTransporteDetailView
+    path('admin/facturacion/tarifas/<int:pk>/', TarifaTransporteDetailView.as_view(), name='tarifas-detail'),
+    
+    # GET: Corridas con su avance / POST: Iniciar o reabrir la corrida de un mes
+    # URL: /api/admin/facturacion/corridas/
+    # Vista: CorridaFacturacionListCreateView
+    path('admin/facturacion/corridas/', CorridaFacturacionListCreateView.as_view(), name='facturacion-corridas'),
+    
+    # GET: Facturas de todas las familias (filtros: periodo, estado, padre)
+    # URL: /api/admin/facturacion/facturas/
+    # Vista: FacturasAdminView
+    path('admin/facturacion/facturas/', FacturasAdminView.as_view(), name='facturas-admin'),
+    
+    # GET/PATCH: Factura específica (cambiar estado a pagada o anulada)
+    # URL: /api/admin/facturacion/facturas/<id>/
+    # Vista: FacturaDetailAdminView
+    path('admin/facturacion/facturas/<int:pk>/', FacturaDetailAdminView.as_view(), name='facturas-admin-detail'),
+    
+    # GET: Facturas de la familia del usuario
+    # URL: /api/facturas/
+    # Vista: FacturasPadreView
+    path('facturas/', FacturasPadreView.as_view(), name='facturas-padre'),
+    
+    # ============================================================================
+    # ENDPOINTS DE RECORRIDOS Y TIEMPOS DE LLEGADA
+    # ============================================================================
+    
+    # POST: Registrar eventos del recorrido (inicio, paradas, fin)
+    # URL: /api/recorridos/eventos/
+    # Función: registrar_recorrido
+    # Permisos: conductor (su vehículo) o admin
+    path('recorridos/eventos/', registrar_recorrido, name='recorridos-eventos'),
+    
+    # GET: Hora estimada de llegada de hoy para los hijos del padre
+    # URL: /api/eta/
+    # Función: eta_padre
+    path('eta/', eta_padre, name='eta-padre'),
+    
+    # ============================================================================
+    # ENDPOINTS DE GPS Y AVISOS DE LLEGADA
+    # ============================================================================
+    
+    # GET: Listar ubicaciones de colegios | POST: Crear ubicación
+    # URL: /api/admin/colegios/ubicaciones/
+    # Vista: UbicacionColegioListCreateView
+    path('admin/colegios/ubicaciones/', UbicacionColegioListCreateView.as_view(), name='ubicaciones-colegio-list'),
+    
+    # GET: Obtener | PUT/PATCH: Actualizar | DELETE: Eliminar ubicación
+    # URL: /api/admin/colegios/ubicaciones/<id>/
+    # Vista: UbicacionColegioDetailView
+    path('admin/colegios/ubicaciones/<int:pk>/', UbicacionColegioDetailView.as_view(),
+         name='ubicaciones-colegio-detail'),
+    
+    # POST: Lote de posiciones GPS del vehículo (geocercas de paradas y colegios)
+    # URL: /api/gps/
+    # Función: recibir_gps
+    # Permisos: conductor (su vehículo) o admin
+    path('gps/', recibir_gps, name='gps'),
+    
+    # GET: Avisos de llegada del transporte para el padre
+    # URL: /api/avisos/?desde=<id>
+    # Función: avisos_padre
+    path('avisos/', avisos_padre, name='avisos-padre'),
+    
+    # ============================================================================
+    # ENDPOINTS DEL SIMULADOR DE ESCENARIOS
+    # ============================================================================
+    
+    # GET: Listar simulaciones | POST: Pedir una simulación (la procesa la tarea `simular`)
+    # URL: /api/admin/simulaciones/
+    # Vista: SimulacionPlanListCreateView
+    path('admin/simulaciones/', SimulacionPlanListCreateView.as_view(), name='simulaciones-list'),
+    
+    # GET: Resultados por escenario | DELETE: Eliminar simulación
+    # URL: /api/admin/simulaciones/<id>/
+    # Vista: SimulacionPlanDetailView
+    path('admin/simulaciones/<int:pk>/', SimulacionPlanDetailView.as_view(), name='simulaciones-detail'),
+    
+    # ============================================================================
+    # ENDPOINTS DEL REGISTRO DE AUDITORÍA
+    # ============================================================================
+    
+    # GET: Quién cambió qué, con valores antes y después
+    # URL: /api/admin/auditoria/?actor=<id>&tipo=<tipo>&objetivo=<id>&desde=<fecha>&hasta=<fecha>
+    # Vista: RegistroAuditoriaView
+    path('admin/auditoria/', RegistroAuditoriaView.as_view(), name='auditoria'),
 ]
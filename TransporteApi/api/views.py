@@ -1,30 +1,90 @@
 # Importaciones necesarias para Django y Django REST Framework
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.shortcuts import render
 # Para crear vistas y manejar estados HTTP
 from rest_framework import status, generics
 # Decoradores para vistas
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes
 # Permisos de acceso
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response  # Para respuestas HTTP
+from rest_framework.views import APIView
+from rest_framework.exceptions import PermissionDenied, ValidationError
 # Para manejar tokens de autenticación
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login, logout  # Para manejar sesiones
 from django.views.decorators.csrf import csrf_exempt  # Para eximir CSRF
 from django.utils.decorators import method_decorator  # Para decorar métodos
-from django.http import JsonResponse  # Para respuestas JSON
+from django.http import JsonResponse, HttpResponse  # Para respuestas JSON y binarias
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
 
 
 # Importar nuestros modelos y serializers
-from .models import Usuario, Padres, Estudiantes, Tutor_receptor
+from .models import (
+    Usuario, Padres, Estudiantes, Tutor_receptor, Conductor, Vehiculo, Parada,
+    TareaProgramada, EjecucionTarea, DestinoEventos, AsignacionVehiculo, CalendarioColegio, ExcepcionCalendario,
+    TarifaTransporte, CorridaFacturacion, Factura, UbicacionColegio, AvisoPadre, SimulacionPlan, RegistroAuditoria
+)
 from .serializers import (
     UsuarioSerializer, RegistroSerializer, LoginSerializer,
     PadresSerializer, EstudiantesSerializer, TutorReceptorSerializer, FormularioSerializer,
-    EstudiantesSerializer
+    EstudiantesSerializer, ConductorSerializer, VehiculoSerializer, AsignacionVehiculoSerializer,
+    ParadaSerializer, TareaProgramadaSerializer, EjecucionTareaSerializer, DestinoEventosSerializer,
+    EstudiantesSincronizacionSerializer, TutoresSincronizacionSerializer, LapidaSerializer,
+    CalendarioColegioSerializer, ExcepcionCalendarioSerializer,
+    TarifaTransporteSerializer, CorridaFacturacionSerializer, FacturaSerializer, EventoRecorridoSerializer,
+    SesionPerfiladoSerializer, UbicacionColegioSerializer, AvisoPadreSerializer,
+    SimulacionPlanSerializer, SimulacionPlanResumenSerializer, RegistroAuditoriaSerializer
 )
 
 # Importar utilidades de email
 from .email_utils import enviar_email_verificacion, enviar_email_bienvenida
+# Importar el soporte de Idempotency-Key
+from .idempotencia import idempotente
+# Importar el motor de asignación de asientos
+from .asignacion_utils import asignar_estudiante, recalcular_asignaciones, resumen_ocupacion
+# Importar el índice espacial y el agrupamiento en paradas
+from .espacial_utils import indice_tutores, indice_paradas, agrupar_en_paradas, puntos_por_familia
+# Importar la descarga de manifiestos diarios
+from .manifiestos_utils import obtener_manifiesto
+# Importar la detección de duplicados
+from .duplicados_utils import buscar_duplicados_padre, escanear_duplicados
+# Importar los resúmenes de analítica
+from .analitica_utils import series_analitica
+# Importar la aprobación y eliminación en lote
+from .aprobacion_utils import aprobar_padres, eliminar_familias, MAXIMO_POR_OPERACION
+from .archivo_utils import archivar_familias
+from .filters import filtrar_por_campos, convertir_valor
+# Importar la bandeja de salida de eventos
+from .eventos_utils import evento, registrar_evento, registrar_eventos, datos_entidad
+# Importar la sincronización incremental
+from .sincronizacion_utils import cambios_desde, cambios_versionados
+# Importar la verificación de recogida en memoria
+from .recogida_utils import indice_recogida, emitir_credencial, leer_credencial, TokenCacheadoAuthentication
+# Importar la expansión de calendarios a viajes
+from .calendario_utils import expandir_viajes
+# Importar la facturación mensual
+from .facturacion_utils import iniciar_corrida
+# Importar los tiempos de llegada estimados
+from .eta_utils import registrar_eventos_recorrido, eta_estudiantes
+# Importar la serialización rápida de los listados
+from .serializers_lectura import lectura_padres, lectura_estudiantes, lectura_tutores, lectura_formularios
+# Importar el control de admisión (métricas de carga)
+from . import middleware
+from .planificador import NODO
+# Importar el perfilado por muestreo
+from .perfilado_utils import (
+    iniciar_sesion, detener_sesion, sesion_actual, sesion_vigente, pilas_sesion, formato_colapsado
+)
+# Importar el procesamiento de pings GPS y geocercas
+from .geocercas_utils import leer_pings, procesar_pings
+# Importar la bitácora de auditoría
+from . import auditoria_utils
 
 
 def home(request):
@@ -52,6 +112,7 @@ def home(request):
 
 @api_view(['POST'])  # Solo acepta peticiones POST
 @permission_classes([AllowAny])  # Cualquiera puede acceder (sin autenticación)
+@idempotente  # Un reintento con la misma Idempotency-Key no crea otro usuario ni reenvía el email
 def registro_usuario(request):
     """
     Endpoint para registrar un nuevo usuario.
@@ -188,7 +249,7 @@ def logout_usuario(request):
         Response: Mensaje de confirmación
     """
     try:
-        # Eliminar el token de autenticación
+        # Eliminar el token de autenticación (una señal lo quita del índice de recogida)
         request.user.auth_token.delete()
 
         # Cerrar sesión
@@ -268,9 +329,12 @@ def dashboard(request):  # DASHBOARD
 @api_view(['POST'])  # Solo acepta peticiones POST
 # Solo usuarios autenticados pueden acceder
 @permission_classes([IsAuthenticated])
+@idempotente  # Un reintento con la misma Idempotency-Key devuelve la respuesta original
 def enviar_formulario(request):
     """
-    Endpoint para que un padre envíe el formulario con sus datos, estudiantes y tutores
+    Endpoint para que un padre envíe o actualice su formulario. Solo se
+    guardan la cédula y el celular; los estudiantes y tutores se agregan y
+    editan en sus propios endpoints (los del cuerpo se ignoran).
     Args:
         request: Objeto de petición HTTP (usuario debe estar autenticado como padre)
     """
@@ -292,9 +356,9 @@ def enviar_formulario(request):
     # Me aseguro que la relacion al padre sea gestionada por el serializer
     # El Formularioserilazer no debe recibir el campo 'usuario' directamente
 
-    serializer = FormularioSerializer(data=data)
+    serializer = FormularioSerializer(padre_obj, data=data, context={'padre': padre_obj})
     if serializer.is_valid():
-        serializer(padre=padre_obj)  # Asignar el padre al serializer
+        serializer.save()  # Actualiza el formulario del padre
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -314,15 +378,11 @@ def eliminar_usuario(request, pk):
         Response: Mensaje de confirmación o error
     """
     try:
-
-        padre = Padres.objects.get(pk=pk)
-        user = padre.usuario
-        padre.delete()
-        user.delete()  # Eliminar el usuario asociado
+        # Misma ruta que la eliminación en lote (una transacción con su evento)
+        if eliminar_familias([pk], actor=request.user)[pk] == 'no_encontrado':
+            # Si no existe, retornar error 404
+            return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'message': 'Formulario y Usuario eliminado exitosamente'}, status=status.HTTP_200_OK)
-    except Padres.DoesNotExist:
-        # Si no existe, retornar error 404
-        return Response({'error': 'Usuario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         # Otros errores
         return Response({'error': f'Error eliminando usuario: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -342,9 +402,7 @@ def aprobar_padre(request, pk):
     Returns:
         Response: Padre aprobado o mensaje de error
     """
-    try:
-        padre = Padres.objects.get(pk=pk)  # Obtener el padre por ID
-    except Padres.DoesNotExist:
+    if not Padres.objects.filter(pk=pk).exists():
         # Si no existe, retornar error 404
         return Response({'error': 'Padre no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -354,8 +412,9 @@ def aprobar_padre(request, pk):
         # Si no se envía el campo, retornar error 400
         return Response({'error': 'Campo "aprobado" es obligatorio'}, status=status.HTTP_400_BAD_REQUEST)
 
-    padre.aprobado = bool(aprobado)  # Actualizar el estado de aprobación
-    padre.save()  # Guardar los cambios
+    # Misma ruta que la aprobación en lote (analítica y email de aviso incluidos)
+    aprobar_padres([pk], bool(aprobado), actor=request.user)
+    padre = Padres.objects.get(pk=pk)
 
     return Response({
         # Mensaje de éxito
@@ -364,26 +423,247 @@ def aprobar_padre(request, pk):
 
     }, status=status.HTTP_200_OK)  # Retornar el padre actualizado
 
+
+# ============================================================================
+# OPERACIONES EN LOTE SOBRE FORMULARIOS (solo admins)
+# ============================================================================
+
+def ids_de_operacion(request):
+    """
+    Obtiene los IDs de Padres de una operación en lote. El cuerpo trae
+    una lista de IDs o un filtro con los mismos parámetros del listado
+    de formularios, por ejemplo {"filtro": {"aprobado": false, "colegio": "X"}}.
+
+    Returns:
+        list: IDs de Padres
+
+    Raises:
+        ValidationError: Si el cuerpo no es válido (respuesta 400)
+    """
+    ids = request.data.get('ids')
+    filtro = request.data.get('filtro')
+    if (ids is None) == (filtro is None):
+        raise ValidationError({'error': 'Envíe "ids" o "filtro" (solo uno)'})
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            raise ValidationError({'ids': 'Debe ser una lista de números'})
+    else:
+        campos = FormulariosAdminView.campos_filtro
+        if not isinstance(filtro, dict) or not any(filtro.get(clave) not in (None, '') for clave in campos):
+            # Un filtro vacío seleccionaría todos los formularios
+            raise ValidationError({'filtro': f'Debe incluir al menos uno de: {", ".join(campos)}'})
+        ids = list(filtrar_por_campos(Padres.objects.all(), campos, filtro).order_by('id').values_list('id', flat=True)[:MAXIMO_POR_OPERACION + 1])
+
+    if len(ids) > MAXIMO_POR_OPERACION:
+        raise ValidationError({'error': f'Máximo {MAXIMO_POR_OPERACION} formularios por operación'})
+    return ids
+
+
+def respuesta_lote(resultados, **extra):
+    """Respuesta de una operación en lote: resultado por ID y conteo por resultado"""
+    return Response({
+        'resultados': [{'id': pk, 'resultado': resultado} for pk, resultado in resultados.items()],
+        'resumen': dict(Counter(resultados.values())),
+        **extra,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def aprobar_padres_lote(request):
+    """
+    Aprueba o desaprueba varios formularios en una sola transacción.
+    Los emails de aviso quedan en cola y se envían en segundo plano.
+
+    Body: {"ids": [1, 2, 3], "aprobado": true} o {"filtro": {...}, "aprobado": true}
+
+    Returns:
+        Response: Resultado por ID (aprobado, desaprobado, sin_cambios, no_encontrado)
+    """
+    aprobado = request.data.get('aprobado')
+    if not isinstance(aprobado, bool):
+        return Response({'error': 'Campo "aprobado" es obligatorio (true o false)'}, status=status.HTTP_400_BAD_REQUEST)
+
+    resultados, correos = aprobar_padres(ids_de_operacion(request), aprobado, actor=request.user)
+    return respuesta_lote(resultados, correos_encolados=correos)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def eliminar_usuarios_lote(request):
+    """
+    Elimina varios formularios y sus usuarios en una sola transacción.
+
+    Body: {"ids": [1, 2, 3]} o {"filtro": {...}}
+
+    Returns:
+        Response: Resultado por ID (eliminado, no_encontrado)
+    """
+    return respuesta_lote(eliminar_familias(ids_de_operacion(request), actor=request.user))
+
+
+# ============================================================================
+# ACCESO POR USUARIO EN LAS VISTAS CRUD
+# ============================================================================
+
+def es_administrador(user):
+    """Indica si el usuario puede ver y modificar los datos de todas las familias"""
+    return user.is_staff or user.role == 'admin'
+
+
+class FiltradoPorPadreMixin:
+    """
+    Limita las vistas genéricas a los datos de la familia del usuario.
+
+    - admin: ve todas las filas
+    - padre: solo las filas cuyo `campo_usuario` es él (consulta por índice)
+    - otros roles: ninguna fila
+
+    Al crear o actualizar, un padre no puede asignar los datos a otra familia.
+    Si la vista declara `entidad_evento`, cada cambio registra su evento de
+    dominio ('<entidad>.creado', '.actualizado' o '.eliminado') en la misma transacción.
+    Cada cambio queda en el registro de auditoría como `entidad_auditoria`.
+    """
+    campo_usuario = None  # Lookup hasta el usuario dueño, por ejemplo 'padres__usuario'
+    entidad_evento = None  # Por ejemplo 'estudiante'; None = sin eventos
+    entidad_auditoria = None  # Tipo de objetivo en el registro de auditoría
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if es_administrador(user):
+            return queryset
+        if user.role == 'padre':
+            return queryset.filter(**{self.campo_usuario: user})
+        return queryset.none()
+
+    def datos_propietario(self, serializer):
+        """
+        Campos que se fuerzan al guardar los datos de un padre.
+
+        Returns:
+            dict: Campos y valores que se pasan a serializer.save()
+        """
+        return {}
+
+    def registrar_cambio(self, accion, instancia, antes=None):
+        """Registra el evento de dominio del cambio si la vista lo declara, y su auditoría"""
+        if self.entidad_evento:
+            registrar_evento(f'{self.entidad_evento}.{accion}', instancia.pk, datos_entidad(instancia))
+        auditoria_utils.registrar_cambio(self.request.user, accion, self.entidad_auditoria, instancia, antes)
+
+    @cambios_versionados
+    def perform_create(self, serializer):
+        if es_administrador(self.request.user):
+            serializer.save()
+        elif self.request.user.role == 'padre':
+            serializer.save(**self.datos_propietario(serializer))
+        else:
+            raise PermissionDenied('Solo los padres y administradores pueden registrar datos')
+        self.registrar_cambio('creado', serializer.instance)
+
+    @cambios_versionados
+    def perform_update(self, serializer):
+        antes = datos_entidad(serializer.instance)
+        if es_administrador(self.request.user):
+            serializer.save()
+        else:
+            serializer.save(**self.datos_propietario(serializer))
+        self.registrar_cambio('actualizado', serializer.instance, antes)
+
+    @cambios_versionados
+    def perform_destroy(self, instance):
+        self.registrar_cambio('eliminado', instance)
+        instance.delete()
+
+
+class PadresDelUsuarioMixin(FiltradoPorPadreMixin):
+    """Registro de padre: cada padre solo tiene el suyo"""
+    campo_usuario = 'usuario'
+    entidad_auditoria = 'padre'
+
+    def datos_propietario(self, serializer):
+        return {'usuario': self.request.user}
+
+
+class EstudiantesDelUsuarioMixin(FiltradoPorPadreMixin):
+    """Estudiantes: se registran siempre en la familia del padre"""
+    campo_usuario = 'padres__usuario'
+    entidad_evento = 'estudiante'
+    entidad_auditoria = 'estudiante'
+
+    def datos_propietario(self, serializer):
+        padre = Padres.objects.filter(usuario=self.request.user).first()
+        if padre is None:
+            raise ValidationError({'error': 'Debe enviar el formulario antes de registrar estudiantes'})
+        return {'padres': padre}
+
+
+class TutoresDelUsuarioMixin(FiltradoPorPadreMixin):
+    """Tutores: el estudiante indicado debe ser de la familia del padre"""
+    campo_usuario = 'estudiante__padres__usuario'
+    entidad_evento = 'tutor'
+    entidad_auditoria = 'tutor'
+
+    def datos_propietario(self, serializer):
+        estudiante = serializer.validated_data.get('estudiante')
+        if estudiante is not None and estudiante.padres.usuario_id != self.request.user.id:
+            raise PermissionDenied('El estudiante no pertenece a su familia')
+        return {}
+
+
+class ListadoRapidoMixin:
+    """
+    GET de listados serializado con una LecturaRapida: las filas se leen con
+    .values() y se arman con el plan compilado del serializer de la vista,
+    con la misma salida. Filtros, orden y paginación por cursor no cambian.
+    """
+    lectura = None  # LecturaRapida equivalente a serializer_class
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        # El cursor lee la columna de orden de cada fila
+        columnas = list(dict.fromkeys([*self.lectura.columnas(), *(getattr(self, 'ordering_fields', None) or [])]))
+        filas = self.paginate_queryset(queryset.values(*columnas))
+        if filas is None:
+            return Response(self.lectura.representar(list(queryset.values(*columnas))))
+        return self.get_paginated_response(self.lectura.representar(filas))
+
+
 # ============================================================================
 # VISTAS PARA CRUD DE PADRES
 # ============================================================================
 
+# Filtros comunes de los listados de padres y formularios
+FILTROS_PADRES = {
+    'aprobado': 'aprobado',
+    'desde': 'created_at__gte',
+    'hasta': 'created_at__lte',
+}
 
-class PadresListCreateView(generics.ListCreateAPIView):
+
+class PadresListCreateView(ListadoRapidoMixin, PadresDelUsuarioMixin, generics.ListCreateAPIView):
     """
-    Vista para listar todos los padres y crear nuevos padres.
+    Vista para listar padres y crear nuevos padres.
+    Un padre solo ve su propio registro; los administradores ven todos.
 
-    GET: Retorna lista de todos los padres
+    GET: Retorna lista paginada de padres
+    Filtros opcionales: ?aprobado=true|false&desde=<fecha>&hasta=<fecha>
     POST: Crea un nuevo padre
     """
     queryset = Padres.objects.all()  # Todos los padres
     serializer_class = PadresSerializer  # Serializer a usar
+    lectura = lectura_padres  # Misma salida para GET sin instanciar modelos
     permission_classes = [IsAuthenticated]  # Solo usuarios autenticados
+    campos_filtro = FILTROS_PADRES  # Filtros por parámetros de consulta
+    ordering_fields = ['id', 'created_at']  # Columnas con índice
 
 
-class PadresDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PadresDetailView(PadresDelUsuarioMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para obtener, actualizar o eliminar un padre específico.
+    Un padre solo puede acceder a su propio registro.
 
     GET: Retorna datos de un padre específico
     PUT/PATCH: Actualiza datos de un padre
@@ -398,21 +678,27 @@ class PadresDetailView(generics.RetrieveUpdateDestroyAPIView):
 # VISTAS PARA CRUD DE ESTUDIANTES
 # ============================================================================
 
-class EstudiantesListCreateView(generics.ListCreateAPIView):
+class EstudiantesListCreateView(ListadoRapidoMixin, EstudiantesDelUsuarioMixin, generics.ListCreateAPIView):
     """
-    Vista para listar todos los estudiantes y crear nuevos estudiantes.
+    Vista para listar estudiantes y crear nuevos estudiantes.
+    Un padre solo ve y registra a sus propios hijos; los administradores ven todos.
 
-    GET: Retorna lista de todos los estudiantes
+    GET: Retorna lista paginada de estudiantes
+    Filtros opcionales: ?colegio=<nombre>&grado=<grado>&padre=<id>
     POST: Crea un nuevo estudiante
     """
     queryset = Estudiantes.objects.all()  # Todos los estudiantes
     serializer_class = EstudiantesSerializer  # Serializer a usar
+    lectura = lectura_estudiantes  # Misma salida para GET sin instanciar modelos
     permission_classes = [IsAuthenticated]  # Solo usuarios autenticados
+    campos_filtro = {'colegio': 'Colegio', 'grado': 'grado', 'padre': 'padres'}
+    ordering_fields = ['id']
 
 
-class EstudiantesDetailView(generics.RetrieveUpdateDestroyAPIView):
+class EstudiantesDetailView(EstudiantesDelUsuarioMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para obtener, actualizar o eliminar un estudiante específico.
+    Un padre solo puede acceder a sus propios hijos.
 
     GET: Retorna datos de un estudiante específico
     PUT/PATCH: Actualiza datos de un estudiante
@@ -427,21 +713,27 @@ class EstudiantesDetailView(generics.RetrieveUpdateDestroyAPIView):
 # VISTAS PARA CRUD DE TUTORES RECEPTORES
 # ============================================================================
 
-class TutorReceptorListCreateView(generics.ListCreateAPIView):
+class TutorReceptorListCreateView(ListadoRapidoMixin, TutoresDelUsuarioMixin, generics.ListCreateAPIView):
     """
-    Vista para listar todos los tutores receptores y crear nuevos tutores.
+    Vista para listar tutores receptores y crear nuevos tutores.
+    Un padre solo ve y registra los tutores de sus hijos; los administradores ven todos.
 
-    GET: Retorna lista de todos los tutores
+    GET: Retorna lista paginada de tutores
+    Filtros opcionales: ?estudiante=<id>
     POST: Crea un nuevo tutor
     """
     queryset = Tutor_receptor.objects.all()  # Todos los tutores
     serializer_class = TutorReceptorSerializer  # Serializer a usar
+    lectura = lectura_tutores  # Misma salida para GET sin instanciar modelos
     permission_classes = [IsAuthenticated]  # Solo usuarios autenticados
+    campos_filtro = {'estudiante': 'estudiante'}
+    ordering_fields = ['id']
 
 
-class TutorReceptorDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TutorReceptorDetailView(TutoresDelUsuarioMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para obtener, actualizar o eliminar un tutor específico.
+    Un padre solo puede acceder a los tutores de sus hijos.
 
     GET: Retorna datos de un tutor específico
     PUT/PATCH: Actualiza datos de un tutor
@@ -452,16 +744,25 @@ class TutorReceptorDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]  # Solo usuarios autenticados
 
 
-class FormulariosAdminView(generics.ListAPIView):
+class FormulariosAdminView(ListadoRapidoMixin, generics.ListAPIView):
     """
     Vista para que los administradores vean todos los formularios enviados por los padres.
 
-    GET: Retorna lista de todos los formularios con estudiantes y tutores anidados
+    GET: Retorna lista paginada de formularios con estudiantes y tutores anidados
+    Filtros opcionales: ?aprobado=true|false&desde=<fecha>&hasta=<fecha>&colegio=<nombre>&grado=<grado>
     """
-    queryset = Padres.objects.all()  # Todos los padres (formularios)
+    # Padres (formularios) de la página, con estudiantes y tutores precargados en 2 consultas
+    queryset = Padres.objects.prefetch_related('estudiantes__tutores_receptores')
     serializer_class = FormularioSerializer  # Serializer a usar
+    lectura = lectura_formularios  # Misma salida para GET sin instanciar modelos
     # Solo admins pueden acceder
     permission_classes = [IsAuthenticated, IsAdminUser]
+    campos_filtro = {
+        **FILTROS_PADRES,
+        'colegio': 'estudiantes__Colegio',
+        'grado': 'estudiantes__grado',
+    }
+    ordering_fields = ['id', 'created_at']
 
 
 class FromularioDetailAdminView(generics.RetrieveDestroyAPIView):
@@ -475,3 +776,1291 @@ class FromularioDetailAdminView(generics.RetrieveDestroyAPIView):
     serializer_class = FormularioSerializer  # Serializer a usar
     # Solo admins pueden acceder
     permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Los estudiantes se eliminan en cascada; los sistemas externos reciben su evento
+        registrar_eventos([
+            evento('estudiante.eliminado', estudiante.pk, datos_entidad(estudiante))
+            for estudiante in instance.estudiantes.all()
+        ])
+        # El formulario completo (padre, estudiantes y tutores) queda en el archivo
+        archivar_familias([instance.pk], 'eliminada', self.request.user)
+        instance.delete()
+
+
+# ============================================================================
+# VISTAS PARA LA FLOTA (CONDUCTORES, VEHÍCULOS Y ASIGNACIONES)
+# ============================================================================
+
+class ConductorListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para listar todos los conductores y crear nuevos conductores.
+
+    GET: Retorna lista de todos los conductores
+    POST: Crea un nuevo conductor
+    """
+    queryset = Conductor.objects.all()  # Todos los conductores
+    serializer_class = ConductorSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+class ConductorDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Vista para obtener, actualizar o eliminar un conductor específico.
+
+    GET: Retorna datos de un conductor específico
+    PUT/PATCH: Actualiza datos de un conductor
+    DELETE: Elimina un conductor
+    """
+    queryset = Conductor.objects.all()  # Todos los conductores
+    serializer_class = ConductorSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+class VehiculoListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para listar todos los vehículos y crear nuevos vehículos.
+
+    GET: Retorna lista de todos los vehículos
+    POST: Crea un nuevo vehículo
+    """
+    queryset = Vehiculo.objects.all()  # Todos los vehículos
+    serializer_class = VehiculoSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+class VehiculoDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Vista para obtener, actualizar o eliminar un vehículo específico.
+
+    GET: Retorna datos de un vehículo específico
+    PUT/PATCH: Actualiza datos de un vehículo
+    DELETE: Elimina un vehículo
+    """
+    queryset = Vehiculo.objects.all()  # Todos los vehículos
+    serializer_class = VehiculoSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo admins pueden ver la ocupación
+@permission_classes([IsAuthenticated, IsAdminUser])
+def ocupacion_vehiculos(request):
+    """
+    Endpoint para ver la ocupación de cada vehículo por franja (tramo, hora, colegio).
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+
+    Returns:
+        Response: Lista de franjas con asientos ocupados y capacidad
+    """
+    return Response(resumen_ocupacion(), status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])  # Solo acepta peticiones POST
+# Solo admins pueden recalcular
+@permission_classes([IsAuthenticated, IsAdminUser])
+def recalcular_asignaciones_view(request):
+    """
+    Endpoint para recalcular desde cero los asientos de todos los estudiantes.
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+
+    Returns:
+        Response: Total de asientos asignados y estudiantes sin asiento
+    """
+    resumen = recalcular_asignaciones()
+    return Response(resumen, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])  # Solo acepta peticiones POST
+# Solo admins pueden asignar
+@permission_classes([IsAuthenticated, IsAdminUser])
+def asignar_estudiante_view(request, pk):
+    """
+    Endpoint para asignar (o reasignar) el asiento de un solo estudiante.
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+        pk: ID del estudiante
+
+    Returns:
+        Response: Asientos del estudiante por tramo o mensaje de error
+    """
+    try:
+        estudiante = Estudiantes.objects.get(pk=pk)  # Obtener el estudiante por ID
+    except Estudiantes.DoesNotExist:
+        # Si no existe, retornar error 404
+        return Response({'error': 'Estudiante no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+    resultado = asignar_estudiante(estudiante)
+    return Response({
+        'sin_asiento': [tramo for tramo, vehiculo in resultado.items() if vehiculo is None],
+        'asignaciones': AsignacionVehiculoSerializer(estudiante.asignaciones.select_related('vehiculo'), many=True).data
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# VISTAS PARA PARADAS Y BÚSQUEDAS POR CERCANÍA
+# ============================================================================
+
+def _coordenadas_de(request):
+    """
+    Lee `lat`, `lon` y `radio` (metros, opcional) de los parámetros de la petición.
+
+    Returns:
+        tuple: (lat, lon, radio) o None si los parámetros no son válidos
+    """
+    try:
+        latitud = float(request.query_params['lat'])
+        longitud = float(request.query_params['lon'])
+        radio = request.query_params.get('radio')
+        return latitud, longitud, float(radio) if radio else None
+    except (KeyError, ValueError):
+        return None
+
+
+class ParadaListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para listar todas las paradas y crear nuevas paradas.
+
+    GET: Retorna lista de todas las paradas
+    POST: Crea una nueva parada
+    """
+    queryset = Parada.objects.all()  # Todas las paradas
+    serializer_class = ParadaSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+class ParadaDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Vista para obtener, actualizar o eliminar una parada específica.
+
+    GET: Retorna datos de una parada específica
+    PUT/PATCH: Actualiza datos de una parada
+    DELETE: Elimina una parada
+    """
+    queryset = Parada.objects.all()  # Todas las paradas
+    serializer_class = ParadaSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo admins pueden consultar
+@permission_classes([IsAuthenticated, IsAdminUser])
+def parada_cercana(request):
+    """
+    Endpoint para buscar la parada más cercana a una coordenada.
+    Con `radio` también retorna todas las paradas dentro de ese radio.
+
+    Args:
+        request: Objeto de petición HTTP con ?lat=&lon=&radio=
+
+    Returns:
+        Response: Parada más cercana y distancia en metros
+    """
+    coordenadas = _coordenadas_de(request)
+    if coordenadas is None:
+        return Response({'error': 'Parámetros "lat" y "lon" numéricos son obligatorios'}, status=status.HTTP_400_BAD_REQUEST)
+    latitud, longitud, radio = coordenadas
+
+    indice = indice_paradas.obtener()
+    cercana = indice.mas_cercano(latitud, longitud)
+    data = {'parada': None, 'distancia': None}
+    if cercana:
+        distancia, parada_id = cercana
+        data = {'parada': ParadaSerializer(Parada.objects.get(pk=parada_id)).data, 'distancia': round(distancia, 1)}
+    if radio is not None:
+        data['en_radio'] = [
+            {'parada': parada_id, 'distancia': round(distancia, 1)}
+            for distancia, parada_id in indice.en_radio(latitud, longitud, radio)
+        ]
+    return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo admins pueden consultar
+@permission_classes([IsAuthenticated, IsAdminUser])
+def tutores_cercanos(request):
+    """
+    Endpoint para buscar los tutores receptores dentro de un radio (por defecto 500 m).
+
+    Args:
+        request: Objeto de petición HTTP con ?lat=&lon=&radio=
+
+    Returns:
+        Response: Lista de tutores con su distancia en metros
+    """
+    coordenadas = _coordenadas_de(request)
+    if coordenadas is None:
+        return Response({'error': 'Parámetros "lat" y "lon" numéricos son obligatorios'}, status=status.HTTP_400_BAD_REQUEST)
+    latitud, longitud, radio = coordenadas
+
+    encontrados = indice_tutores.obtener().en_radio(latitud, longitud, radio or 500)
+    return Response([
+        {'tutor': tutor_id, 'distancia': round(distancia, 1)}
+        for distancia, tutor_id in encontrados
+    ], status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])  # Solo acepta peticiones POST
+# Solo admins pueden agrupar
+@permission_classes([IsAuthenticated, IsAdminUser])
+def agrupar_paradas(request):
+    """
+    Endpoint para agrupar familias cercanas en paradas compartidas.
+
+    Cuerpo:
+        radio: Radio máximo en metros (por defecto 300)
+        guardar: Si es verdadero, reemplaza las paradas existentes por las calculadas
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+
+    Returns:
+        Response: Paradas propuestas con las familias (IDs de Padres) de cada una
+    """
+    try:
+        radio = float(request.data.get('radio', 300))
+    except (TypeError, ValueError):
+        return Response({'error': 'Campo "radio" debe ser numérico'}, status=status.HTTP_400_BAD_REQUEST)
+
+    grupos = agrupar_en_paradas(puntos_por_familia(), radio)
+
+    if request.data.get('guardar'):
+        Parada.objects.all().delete()
+        Parada.objects.bulk_create([
+            Parada(nombre=f'Parada {numero}', latitud=grupo['latitud'], longitud=grupo['longitud'])
+            for numero, grupo in enumerate(grupos, start=1)
+        ])
+        indice_paradas.invalidar()  # bulk_create no dispara señales
+
+    return Response({
+        'total_paradas': len(grupos),
+        'paradas': [
+            {'latitud': grupo['latitud'], 'longitud': grupo['longitud'], 'familias': grupo['miembros']}
+            for grupo in grupos
+        ]
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# VISTAS PARA MANIFIESTOS DIARIOS DE LOS CONDUCTORES
+# ============================================================================
+
+def _respuesta_manifiesto(request, vehiculo_id):
+    """
+    Construye la respuesta de descarga del manifiesto de un vehículo.
+
+    Parámetros opcionales:
+        fecha: Día de servicio (YYYY-MM-DD, por defecto hoy)
+        desde_version: Versión que ya tiene el dispositivo (para recibir solo el delta)
+
+    El cuerpo es JSON comprimido con gzip (Content-Encoding: gzip), listo tal
+    como se guardó, así que no se serializa nada por petición.
+    """
+    fecha = parse_date(request.query_params.get('fecha', '')) or timezone.localdate()
+    try:
+        desde_version = int(request.query_params['desde_version']) if 'desde_version' in request.query_params else None
+    except ValueError:
+        return Response({'error': 'Parámetro "desde_version" debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+
+    resultado = obtener_manifiesto(vehiculo_id, fecha, desde_version)
+    if resultado is None:
+        return Response({'error': 'No hay manifiesto generado para esa fecha'}, status=status.HTTP_404_NOT_FOUND)
+
+    contenido, version, tipo = resultado
+    etag = f'"{vehiculo_id}-{fecha.isoformat()}-{version}"'
+    if tipo == 'sin_cambios' or request.headers.get('If-None-Match') == etag:
+        respuesta = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        respuesta = HttpResponse(contenido, content_type='application/json')
+        respuesta['Content-Encoding'] = 'gzip'
+        respuesta['X-Manifiesto-Tipo'] = tipo
+    respuesta['ETag'] = etag
+    respuesta['X-Manifiesto-Version'] = str(version)
+    return respuesta
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo admins pueden descargar cualquier manifiesto
+@permission_classes([IsAuthenticated, IsAdminUser])
+def manifiesto_vehiculo(request, pk):
+    """
+    Endpoint para descargar el manifiesto diario de un vehículo.
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+        pk: ID del vehículo
+
+    Returns:
+        HttpResponse: Manifiesto completo o delta en JSON comprimido
+    """
+    return _respuesta_manifiesto(request, pk)
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo usuarios autenticados pueden acceder
+@permission_classes([IsAuthenticated])
+def manifiesto_conductor(request):
+    """
+    Endpoint para que un conductor descargue el manifiesto de su vehículo.
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe tener rol conductor)
+
+    Returns:
+        HttpResponse: Manifiesto completo o delta en JSON comprimido
+    """
+    if request.user.role != 'conductor':
+        # Forbidden
+        return Response({'error': 'No autorizado, solo los conductores pueden descargar su manifiesto'}, status=status.HTTP_403_FORBIDDEN)
+
+    vehiculo = Vehiculo.objects.filter(conductor__usuario=request.user).values_list('id', flat=True).first()
+    if vehiculo is None:
+        return Response({'error': 'No tienes un vehículo asignado'}, status=status.HTTP_404_NOT_FOUND)
+    return _respuesta_manifiesto(request, vehiculo)
+
+
+# ============================================================================
+# VISTAS PARA EL PLANIFICADOR DE TAREAS
+# ============================================================================
+
+class TareasProgramadasView(generics.ListAPIView):
+    """
+    Vista para que los administradores vean las tareas periódicas registradas.
+
+    GET: Retorna las tareas con su próxima y última ejecución
+    """
+    queryset = TareaProgramada.objects.all()  # Todas las tareas
+    serializer_class = TareaProgramadaSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    ordering = 'nombre'  # Orden alfabético (nombre es único)
+
+
+class EjecucionesTareaView(generics.ListAPIView):
+    """
+    Vista para consultar el historial de ejecuciones de las tareas.
+
+    GET: Retorna las ejecuciones paginadas, de la más reciente a la más antigua
+    Filtros opcionales: ?tarea=<nombre>&estado=<exito|error>
+    """
+    queryset = EjecucionTarea.objects.select_related('tarea')
+    serializer_class = EjecucionTareaSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    campos_filtro = {'tarea': 'tarea__nombre', 'estado': 'estado'}
+    ordering = '-inicio'  # Más recientes primero
+
+
+@api_view(['POST'])  # Solo acepta peticiones POST
+# Solo admins pueden adelantar tareas
+@permission_classes([IsAuthenticated, IsAdminUser])
+def ejecutar_tarea_ahora(request, nombre):
+    """
+    Endpoint para adelantar una tarea: el planificador la ejecutará en su próxima revisión.
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+        nombre: Nombre de la tarea
+
+    Returns:
+        Response: Tarea reprogramada o mensaje de error
+    """
+    actualizadas = TareaProgramada.objects.filter(nombre=nombre).update(proxima_ejecucion=timezone.now())
+    if not actualizadas:
+        return Response({'error': 'Tarea no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'message': f'Tarea {nombre} programada para la próxima revisión',
+        'tarea': TareaProgramadaSerializer(TareaProgramada.objects.get(nombre=nombre)).data
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# VISTAS PARA DETECCIÓN DE DUPLICADOS
+# ============================================================================
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo admins pueden consultar duplicados
+@permission_classes([IsAuthenticated, IsAdminUser])
+def duplicados_padre(request, pk):
+    """
+    Endpoint para revisar si un formulario (padre) duplica otra familia o estudiante.
+    Usa la tabla de claves de bloqueo, así que el costo no depende del total de registros.
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+        pk: ID del padre
+
+    Returns:
+        Response: Familias y estudiantes posiblemente duplicados
+    """
+    try:
+        padre = Padres.objects.select_related('usuario').get(pk=pk)  # Obtener el padre por ID
+    except Padres.DoesNotExist:
+        # Si no existe, retornar error 404
+        return Response({'error': 'Padre no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(buscar_duplicados_padre(padre), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo admins pueden consultar duplicados
+@permission_classes([IsAuthenticated, IsAdminUser])
+def duplicados_todos(request):
+    """
+    Endpoint para escanear todas las familias y estudiantes en busca de duplicados.
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+
+    Returns:
+        Response: Grupos de familias y pares de estudiantes posiblemente duplicados
+    """
+    return Response(escanear_duplicados(), status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# VISTAS DE MÉTRICAS DE CARGA
+# ============================================================================
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo admins pueden consultar las métricas
+@permission_classes([IsAuthenticated, IsAdminUser])
+def carga_servidor(request):
+    """
+    Endpoint con las métricas del control de admisión de este proceso:
+    peticiones en curso y en espera, tiempo de espera y tasa de rechazo por clase de ruta.
+    Sirve para dimensionar workers (cada worker tiene sus propios contadores).
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+
+    Returns:
+        Response: Métricas por clase de ruta
+    """
+    if middleware.control_admision is None:
+        return Response({'error': 'El control de admisión está desactivado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'nodo': NODO, **middleware.control_admision.resumen()}, status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# VISTAS DEL PERFILADOR BAJO DEMANDA
+# ============================================================================
+
+def vistas_perfilables():
+    """Nombres de las vistas de este módulo (de clase o con @api_view)"""
+    return {
+        nombre for nombre, objeto in globals().items()
+        if getattr(objeto, '__module__', None) == __name__
+        and (hasattr(objeto, 'view_class') or (isinstance(objeto, type) and issubclass(objeto, APIView)))
+    }
+
+
+def resumen_sesion(sesion):
+    """Sesión de perfilado con su estado y las muestras tomadas por vista"""
+    pilas = pilas_sesion(sesion)
+    return {
+        **sesion,
+        'inicio': datetime.fromtimestamp(sesion['inicio'], tz=dt_timezone.utc),
+        'hasta': datetime.fromtimestamp(sesion['hasta'], tz=dt_timezone.utc),
+        'activa': sesion_vigente(sesion),
+        'muestras': {vista: sum(conteo.values()) for vista, conteo in sorted(pilas.items())},
+    }
+
+
+@api_view(['GET', 'POST', 'DELETE'])
+# Solo admins pueden perfilar la API
+@permission_classes([IsAuthenticated, IsAdminUser])
+def perfilado(request):
+    """
+    Endpoint para el perfilador por muestreo de producción (todos los procesos).
+
+    GET: Estado de la sesión actual o la última y muestras por vista
+    POST: Inicia una sesión {vista?, segundos?, peticiones?, intervalo_ms?};
+          sin `vista` se perfilan todas las vistas de la API
+    DELETE: Detiene la sesión (las pilas quedan disponibles)
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+
+    Returns:
+        Response: Sesión de perfilado o mensaje de error
+    """
+    if request.method == 'POST':
+        serializer = SesionPerfiladoSerializer(data=request.data, context={'vistas': vistas_perfilables()})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        sesion = iniciar_sesion(**serializer.validated_data)
+        return Response(resumen_sesion(sesion), status=status.HTTP_201_CREATED)
+
+    sesion = detener_sesion() if request.method == 'DELETE' else sesion_actual()
+    if sesion is None:
+        return Response({'error': 'No hay sesiones de perfilado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(resumen_sesion(sesion), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo admins pueden perfilar la API
+@permission_classes([IsAuthenticated, IsAdminUser])
+def perfilado_pilas(request):
+    """
+    Endpoint con las pilas muestreadas de la sesión actual o la última, en
+    formato colapsado (una pila por línea con su número de muestras), que
+    abren directamente speedscope, flamegraph.pl o inferno.
+
+    Parámetros opcionales: ?vista=<nombre> para una sola vista
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+
+    Returns:
+        HttpResponse: Texto plano con las pilas
+    """
+    sesion = sesion_actual()
+    if sesion is None:
+        return Response({'error': 'No hay sesiones de perfilado'}, status=status.HTTP_404_NOT_FOUND)
+    texto = formato_colapsado(pilas_sesion(sesion), request.query_params.get('vista') or None)
+    response = HttpResponse(texto, content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = f'inline; filename="perfil-{sesion["id"]}.folded"'
+    return response
+
+
+# ============================================================================
+# VISTAS DE ANALÍTICA
+# ============================================================================
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+# Solo admins pueden consultar la analítica
+@permission_classes([IsAuthenticated, IsAdminUser])
+def analitica(request):
+    """
+    Endpoint con las series de tendencias para las gráficas del panel:
+    inscripciones por colegio y semana, latencia de aprobación y ocupación por franja.
+    Se leen de la tabla de resúmenes, sin recorrer las tablas de origen.
+
+    Parámetros opcionales: ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD (por defecto las últimas 26 semanas)
+
+    Args:
+        request: Objeto de petición HTTP (usuario debe ser admin)
+
+    Returns:
+        Response: Series listas para graficar
+    """
+    fechas = {}
+    for parametro in ('desde', 'hasta'):
+        valor = request.query_params.get(parametro)
+        try:
+            fechas[parametro] = parse_date(valor) if valor else None
+        except ValueError:
+            fechas[parametro] = None
+        if valor and fechas[parametro] is None:
+            return Response({'error': f'Fecha "{parametro}" inválida, use YYYY-MM-DD'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(series_analitica(fechas['desde'], fechas['hasta']), status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# VISTAS PARA LOS DESTINOS DE EVENTOS (solo admins)
+# ============================================================================
+
+class DestinoEventosListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para listar y registrar destinos de eventos (webhook o archivo).
+
+    GET: Retorna los destinos con su cursor y estado de entrega
+    POST: Registra un destino; recibe los eventos desde `ultimo_evento` (0 = todos los guardados)
+    """
+    queryset = DestinoEventos.objects.all()  # Todos los destinos
+    serializer_class = DestinoEventosSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    ordering = 'id'
+
+
+class DestinoEventosDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Vista para obtener, actualizar o eliminar un destino de eventos.
+
+    GET: Retorna datos de un destino
+    PUT/PATCH: Actualiza un destino (bajar `ultimo_evento` vuelve a entregar eventos)
+    DELETE: Elimina un destino
+    """
+    queryset = DestinoEventos.objects.all()  # Todos los destinos
+    serializer_class = DestinoEventosSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+# ============================================================================
+# SINCRONIZACIÓN INCREMENTAL PARA CLIENTES
+# ============================================================================
+
+# Serializer de cada tipo de fila en la respuesta de sincronización
+SERIALIZERS_SINCRONIZACION = {
+    'padres': PadresSerializer,
+    'estudiantes': EstudiantesSincronizacionSerializer,
+    'tutores': TutoresSincronizacionSerializer,
+}
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+@permission_classes([IsAuthenticated])
+def sincronizar(request):
+    """
+    Endpoint de sincronización incremental: filas creadas, modificadas o
+    eliminadas desde el cursor de la llamada anterior.
+
+    Parámetros:
+        ?since=<cursor>  Cursor devuelto por la llamada anterior (sin él: copia completa)
+        ?limite=<n>      Máximo de filas por tipo (máximo SYNC_LIMITE_MAXIMO)
+
+    Returns:
+        Response: {cursor, mas, completo, padres, estudiantes, tutores, eliminados}.
+        Si `completo` es true el cliente reemplaza su copia local; si `mas` es
+        true repite la llamada con el nuevo cursor.
+    """
+    try:
+        desde = int(request.query_params['since']) if request.query_params.get('since') else None
+        limite = int(request.query_params.get('limite') or getattr(settings, 'SYNC_LIMITE', 500))
+    except ValueError:
+        return Response({'error': 'since y limite deben ser números'}, status=status.HTTP_400_BAD_REQUEST)
+    limite = max(1, min(limite, getattr(settings, 'SYNC_LIMITE_MAXIMO', 2000)))
+
+    cambios = cambios_desde(request.user, desde, limite)
+    if cambios is None:
+        return Response({'error': 'Su rol no tiene datos para sincronizar'}, status=status.HTTP_403_FORBIDDEN)
+
+    return Response({
+        'cursor': cambios['cursor'],
+        'mas': cambios['mas'],
+        'completo': cambios['completo'],
+        **{
+            nombre: SERIALIZERS_SINCRONIZACION[nombre](filas, many=True).data
+            for nombre, filas in cambios['filas'].items()
+        },
+        'eliminados': LapidaSerializer(cambios['eliminados'], many=True).data,
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# VERIFICACIÓN DE RECOGIDA EN LA PUERTA DEL COLEGIO
+# ============================================================================
+# Las consultas de los conductores se responden desde el índice en memoria y
+# con autenticación cacheada: no consultan la base de datos.
+
+def puede_verificar(user):
+    """Solo conductores y administradores verifican recogidas"""
+    return es_administrador(user) or user.role == 'conductor'
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+@authentication_classes([TokenCacheadoAuthentication])
+@permission_classes([IsAuthenticated])
+def tutores_autorizados(request, pk):
+    """
+    Endpoint para que el conductor vea los tutores autorizados de un estudiante.
+
+    Args:
+        request: Objeto de petición HTTP (conductor o admin)
+        pk: ID del estudiante
+
+    Returns:
+        Response: Lista de tutores autorizados (id, nombre, apellido, parentesco)
+    """
+    if not puede_verificar(request.user):
+        return Response({'error': 'No autorizado, solo conductores y administradores'}, status=status.HTTP_403_FORBIDDEN)
+    return Response({
+        'estudiante': pk,
+        'tutores': indice_recogida.listo().tutores_de(pk),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])  # Solo acepta peticiones POST
+@authentication_classes([TokenCacheadoAuthentication])
+@permission_classes([IsAuthenticated])
+def verificar_recogida(request):
+    """
+    Endpoint para verificar en la puerta que un adulto puede recoger al estudiante.
+
+    Body:
+        estudiante: ID del estudiante
+        credencial: Texto del QR del tutor, o
+        telefono: Teléfono del adulto
+
+    Returns:
+        Response: {autorizado, tutor, motivo}
+    """
+    if not puede_verificar(request.user):
+        return Response({'error': 'No autorizado, solo conductores y administradores'}, status=status.HTTP_403_FORBIDDEN)
+
+    estudiante = request.data.get('estudiante')
+    credencial = request.data.get('credencial')
+    telefono = request.data.get('telefono')
+    if not isinstance(estudiante, int) or not (credencial or telefono):
+        return Response({'error': 'Envíe "estudiante" y "credencial" o "telefono"'}, status=status.HTTP_400_BAD_REQUEST)
+
+    indice = indice_recogida.listo()
+    if credencial:
+        datos = leer_credencial(credencial)
+        if datos is None:
+            return Response({'autorizado': False, 'tutor': None, 'motivo': 'Credencial inválida o vencida'}, status=status.HTTP_200_OK)
+        tutor_id, estudiante_credencial = datos
+        if estudiante_credencial != estudiante:
+            return Response({'autorizado': False, 'tutor': None, 'motivo': 'La credencial es de otro estudiante'}, status=status.HTTP_200_OK)
+        tutor = indice.autorizado(estudiante, tutor_id=tutor_id)
+    else:
+        tutor = indice.autorizado(estudiante, telefono=telefono)
+
+    return Response({
+        'autorizado': tutor is not None,
+        'tutor': tutor,
+        'motivo': None if tutor else 'No es un tutor autorizado del estudiante',
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+@permission_classes([IsAuthenticated])
+def credencial_tutor(request, pk):
+    """
+    Endpoint para obtener la credencial firmada (contenido del QR) de un tutor.
+    El padre solo puede obtener las de sus tutores; los administradores, todas.
+
+    Args:
+        request: Objeto de petición HTTP
+        pk: ID del tutor
+
+    Returns:
+        Response: {tutor, estudiante, credencial}
+    """
+    tutores = Tutor_receptor.objects.all()
+    if not es_administrador(request.user):
+        tutores = tutores.filter(estudiante__padres__usuario=request.user)
+    tutor = tutores.filter(pk=pk).values('id', 'estudiante_id').first()
+    if tutor is None:
+        return Response({'error': 'Tutor no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({
+        'tutor': tutor['id'],
+        'estudiante': tutor['estudiante_id'],
+        'credencial': emitir_credencial(tutor['id'], tutor['estudiante_id']),
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# CALENDARIOS DE LOS COLEGIOS Y VIAJES PROGRAMADOS
+# ============================================================================
+
+class CalendarioColegioListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para listar y crear calendarios de colegios (solo admins).
+
+    GET: Retorna los calendarios
+    POST: Crea el calendario de un colegio (sin calendario: servicio de lunes a viernes)
+    """
+    queryset = CalendarioColegio.objects.all()  # Todos los calendarios
+    serializer_class = CalendarioColegioSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    ordering = 'colegio'  # Orden alfabético (colegio es único)
+
+
+class CalendarioColegioDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Vista para obtener, actualizar o eliminar el calendario de un colegio.
+
+    GET: Retorna datos de un calendario
+    PUT/PATCH: Actualiza un calendario
+    DELETE: Elimina un calendario y sus excepciones
+    """
+    queryset = CalendarioColegio.objects.all()  # Todos los calendarios
+    serializer_class = CalendarioColegioSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+class ExcepcionCalendarioListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para listar y crear feriados, medios días y semanas de exámenes.
+
+    GET: Retorna las excepciones, filtros opcionales ?calendario=<id>&tipo=<tipo>&desde=&hasta=
+    POST: Crea una excepción (sin calendario aplica a todos los colegios)
+    """
+    queryset = ExcepcionCalendario.objects.all()  # Todas las excepciones
+    serializer_class = ExcepcionCalendarioSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    # Excepciones que se cruzan con el rango desde-hasta
+    campos_filtro = {'calendario': 'calendario', 'tipo': 'tipo', 'desde': 'hasta__gte', 'hasta': 'desde__lte'}
+    ordering = 'id'
+
+
+class ExcepcionCalendarioDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Vista para obtener, actualizar o eliminar una excepción del calendario.
+
+    GET: Retorna datos de una excepción
+    PUT/PATCH: Actualiza una excepción
+    DELETE: Elimina una excepción
+    """
+    queryset = ExcepcionCalendario.objects.all()  # Todas las excepciones
+    serializer_class = ExcepcionCalendarioSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+@permission_classes([IsAuthenticated])
+def viajes_programados(request):
+    """
+    Endpoint con los viajes concretos de un rango de fechas según el
+    calendario de cada colegio (feriados, medios días y exámenes).
+
+    Parámetros opcionales:
+        ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD  Rango (por defecto hoy y los 6 días siguientes)
+        ?colegio=<nombre>                  Solo un colegio (admins)
+        ?estudiante=<id>                   Viajes de un estudiante (admins)
+
+    - admin: cantidad de estudiantes por colegio, tramo y hora de cada día
+      (o los viajes de un estudiante)
+    - padre: viajes de sus hijos
+    - conductor: viajes de los estudiantes asignados a su vehículo
+
+    Returns:
+        Response: {desde, hasta, dias_con_servicio, total_viajes, dias: [{fecha, viajes}]}
+    """
+    fechas = {}
+    for parametro in ('desde', 'hasta'):
+        valor = request.query_params.get(parametro)
+        try:
+            fechas[parametro] = parse_date(valor) if valor else None
+        except ValueError:
+            fechas[parametro] = None
+        if valor and fechas[parametro] is None:
+            return Response({'error': f'Fecha "{parametro}" inválida, use YYYY-MM-DD'},
+                            status=status.HTTP_400_BAD_REQUEST)
+    desde = fechas['desde'] or timezone.localdate()
+    hasta = fechas['hasta'] or desde + timedelta(days=6)
+    maximo = getattr(settings, 'VIAJES_DIAS_MAXIMO', 186)
+    if hasta < desde or (hasta - desde).days >= maximo:
+        return Response({'error': f'El rango debe tener entre 1 y {maximo} días'}, status=status.HTTP_400_BAD_REQUEST)
+
+    estudiantes = Estudiantes.objects.all()
+    por_estudiante = True
+    if es_administrador(request.user):
+        if request.query_params.get('colegio'):
+            estudiantes = estudiantes.filter(Colegio__iexact=request.query_params['colegio'].strip())
+        if request.query_params.get('estudiante'):
+            if not request.query_params['estudiante'].isdigit():
+                return Response({'error': 'El parámetro estudiante debe ser un ID'}, status=status.HTTP_400_BAD_REQUEST)
+            estudiantes = estudiantes.filter(pk=request.query_params['estudiante'])
+        else:
+            por_estudiante = False  # Totales por colegio y horario
+    elif request.user.role == 'padre':
+        estudiantes = estudiantes.filter(padres__usuario=request.user)
+    elif request.user.role == 'conductor':
+        estudiantes = estudiantes.filter(pk__in=AsignacionVehiculo.objects.filter(
+            vehiculo__conductor__usuario=request.user).values('estudiante_id'))
+    else:
+        return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
+
+    resultado = expandir_viajes(desde, hasta, estudiantes, por_estudiante)
+    return Response({'desde': desde, 'hasta': hasta, **resultado}, status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# FACTURACIÓN MENSUAL DEL TRANSPORTE
+# ============================================================================
+
+class TarifaTransporteListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para listar y crear tarifas de transporte (solo admins).
+
+    GET: Retorna las tarifas
+    POST: Crea una tarifa mensual por colegio (vacío = todos), tramo y franja horaria opcional
+    """
+    queryset = TarifaTransporte.objects.all()  # Todas las tarifas
+    serializer_class = TarifaTransporteSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    ordering = 'id'
+
+
+class TarifaTransporteDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Vista para obtener, actualizar o eliminar una tarifa.
+    Los cambios se aplican a las próximas corridas; las facturas ya emitidas no cambian.
+    """
+    queryset = TarifaTransporte.objects.all()  # Todas las tarifas
+    serializer_class = TarifaTransporteSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+class CorridaFacturacionListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para consultar e iniciar corridas de facturación (solo admins).
+
+    GET: Retorna las corridas con su avance
+    POST: Inicia la corrida de un mes (body: periodo=YYYY-MM, reabrir=true para
+          facturar a los padres aprobados después de una corrida completa).
+          La corrida la procesa la tarea `facturar` en su próxima revisión.
+    """
+    queryset = CorridaFacturacion.objects.all()  # Todas las corridas
+    serializer_class = CorridaFacturacionSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    ordering = '-periodo'  # Más recientes primero (periodo es único)
+
+    def create(self, request, *args, **kwargs):
+        periodo = str(request.data.get('periodo') or '')
+        fecha = parse_date(f'{periodo}-01') if len(periodo) == 7 else None
+        if fecha is None:
+            return Response({'error': 'Envíe "periodo" con el formato YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+
+        corrida = iniciar_corrida(fecha, reabrir=request.data.get('reabrir') is True)
+        if corrida.estado == 'pendiente':
+            # Adelantar la tarea para que el planificador procese la corrida en su próxima revisión
+            TareaProgramada.objects.filter(nombre='facturar').update(proxima_ejecucion=timezone.now())
+        return Response(self.get_serializer(corrida).data, status=status.HTTP_202_ACCEPTED)
+
+
+class FacturasAdminView(generics.ListAPIView):
+    """
+    Vista para que los administradores consulten las facturas.
+
+    GET: Retorna las facturas paginadas
+    Filtros opcionales: ?periodo=YYYY-MM-01&estado=<pendiente|pagada|anulada>&padre=<id>
+    """
+    queryset = Factura.objects.all()  # Todas las facturas
+    serializer_class = FacturaSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    campos_filtro = {'periodo': 'periodo', 'estado': 'estado', 'padre': 'padre'}
+    ordering = 'id'
+
+
+class FacturaDetailAdminView(generics.RetrieveUpdateAPIView):
+    """
+    Vista para ver una factura y marcarla como pagada o anulada.
+
+    GET: Retorna la factura con su detalle por estudiante
+    PATCH: Cambia el estado
+    """
+    queryset = Factura.objects.all()  # Todas las facturas
+    serializer_class = FacturaSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+class FacturasPadreView(generics.ListAPIView):
+    """
+    Vista para que un padre consulte sus facturas.
+
+    GET: Retorna las facturas de la familia, de la más reciente a la más antigua
+    """
+    serializer_class = FacturaSerializer  # Serializer a usar
+    # Solo usuarios autenticados pueden acceder
+    permission_classes = [IsAuthenticated]
+    ordering = '-id'
+
+    def get_queryset(self):
+        """Solo las facturas de la familia del usuario"""
+        return Factura.objects.filter(padre__usuario=self.request.user)
+
+
+# ============================================================================
+# RECORRIDOS Y TIEMPOS DE LLEGADA ESTIMADOS
+# ============================================================================
+
+def _ruta_del_conductor(request):
+    """
+    Vehículo, tramo y franja del cuerpo de una petición de un conductor (usa
+    su vehículo) o de un admin (envía "vehiculo").
+
+    Returns:
+        tuple: (vehiculo_id, tramo, hora, None) o (None, None, None, Response de error)
+    """
+    if es_administrador(request.user):
+        vehiculo = request.data.get('vehiculo')
+    elif request.user.role == 'conductor':
+        vehiculo = Vehiculo.objects.filter(conductor__usuario=request.user).values_list('id', flat=True).first()
+        if vehiculo is None:
+            return None, None, None, Response({'error': 'No tienes un vehículo asignado'},
+                                              status=status.HTTP_404_NOT_FOUND)
+    else:
+        return None, None, None, Response({'error': 'No autorizado, solo conductores y administradores'},
+                                          status=status.HTTP_403_FORBIDDEN)
+
+    tramo = request.data.get('tramo')
+    hora = parse_time(str(request.data.get('hora') or ''))
+    if tramo not in ('entrada', 'salida') or hora is None or not isinstance(vehiculo, int):
+        return None, None, None, Response(
+            {'error': 'Envíe "tramo" (entrada o salida), "hora" (HH:MM) y, si es admin, "vehiculo"'},
+            status=status.HTTP_400_BAD_REQUEST)
+    if es_administrador(request.user) and not Vehiculo.objects.filter(pk=vehiculo).exists():
+        return None, None, None, Response({'error': 'Vehículo no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    return vehiculo, tramo, hora, None
+
+
+@api_view(['POST'])  # Solo acepta peticiones POST
+@permission_classes([IsAuthenticated])
+def registrar_recorrido(request):
+    """
+    Endpoint para que el conductor registre los eventos de su recorrido
+    (uno o varios, por ejemplo los guardados sin conexión).
+
+    Body:
+        tramo: 'entrada' o 'salida'
+        hora: Franja del recorrido (HH:MM)
+        eventos: [{tipo: inicio|parada|fin, estudiante: ID (solo paradas), momento: ISO 8601}]
+        vehiculo: ID del vehículo (solo admins; el conductor usa el suyo)
+
+    Returns:
+        Response: Eventos registrados
+    """
+    vehiculo, tramo, hora, error = _ruta_del_conductor(request)
+    if error is not None:
+        return error
+
+    serializer = EventoRecorridoSerializer(data=request.data.get('eventos'), many=True)
+    serializer.is_valid(raise_exception=True)
+    eventos = [{**evento, 'momento': evento.get('momento') or timezone.now()} for evento in serializer.validated_data]
+
+    # Las paradas deben ser de estudiantes asignados a la ruta
+    asignados = set(AsignacionVehiculo.objects.filter(vehiculo_id=vehiculo, tramo=tramo, hora=hora).values_list(
+        'estudiante_id', flat=True))
+    ajenos = sorted({e['estudiante_id'] for e in eventos if e['tipo'] == 'parada'} - asignados)
+    if ajenos:
+        return Response({'error': 'Estudiantes que no están asignados a este recorrido', 'estudiantes': ajenos},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    registrados = registrar_eventos_recorrido(vehiculo, tramo, hora, eventos)
+    return Response({'registrados': registrados}, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+@permission_classes([IsAuthenticated])
+def eta_padre(request):
+    """
+    Endpoint con la hora estimada de llegada del transporte de hoy para cada
+    hijo del padre (panel del padre). Las predicciones se leen de la caché
+    que actualiza cada evento de recorrido.
+
+    Parámetro opcional (admins): ?estudiante=<id>
+
+    Returns:
+        Response: {estudiantes: [{id, nombre, apellido, viajes: [{tramo, hora_programada,
+        hora_estimada, margen_minutos, estado, muestras}]}]}
+    """
+    estudiantes = Estudiantes.objects.all()
+    if es_administrador(request.user):
+        if not str(request.query_params.get('estudiante', '')).isdigit():
+            return Response({'error': 'Indique ?estudiante=<id>'}, status=status.HTTP_400_BAD_REQUEST)
+        estudiantes = estudiantes.filter(pk=request.query_params['estudiante'])
+    elif request.user.role == 'padre':
+        estudiantes = estudiantes.filter(padres__usuario=request.user)
+    else:
+        return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
+
+    filas = list(estudiantes.order_by('id').values('id', 'nombre', 'apellido'))
+    viajes = eta_estudiantes([fila['id'] for fila in filas])
+    return Response({
+        'estudiantes': [{**fila, 'viajes': viajes[fila['id']]} for fila in filas],
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# GPS DE LOS VEHÍCULOS Y AVISOS DE LLEGADA
+# ============================================================================
+
+class UbicacionColegioListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para listar y crear las ubicaciones de los colegios (solo admins).
+    Cada ubicación es una geocerca de llegada para los avisos a los padres.
+
+    GET: Retorna las ubicaciones
+    POST: Crea la ubicación de un colegio
+    """
+    queryset = UbicacionColegio.objects.all()  # Todas las ubicaciones
+    serializer_class = UbicacionColegioSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    ordering = 'colegio'  # Orden alfabético (colegio es único)
+
+
+class UbicacionColegioDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Vista para obtener, actualizar o eliminar la ubicación de un colegio.
+
+    GET: Retorna datos de una ubicación
+    PUT/PATCH: Actualiza una ubicación
+    DELETE: Elimina una ubicación
+    """
+    queryset = UbicacionColegio.objects.all()  # Todas las ubicaciones
+    serializer_class = UbicacionColegioSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+@api_view(['POST'])  # Solo acepta peticiones POST
+@permission_classes([IsAuthenticated])
+def recibir_gps(request):
+    """
+    Endpoint para que el dispositivo del conductor envíe sus posiciones en
+    lotes (por ejemplo cada 10 a 30 segundos). Cada ping se compara con las
+    geocercas de la ruta; las llegadas y salidas generan avisos a los padres.
+
+    Body:
+        tramo: 'entrada' o 'salida'
+        hora: Franja del recorrido (HH:MM)
+        pings: [{latitud, longitud, momento: ISO 8601}] (hasta GPS_MAXIMO_LOTE)
+        vehiculo: ID del vehículo (solo admins; el conductor usa el suyo)
+
+    Returns:
+        Response: Pings procesados, avisos creados y cambios de geocerca
+    """
+    vehiculo, tramo, hora, error = _ruta_del_conductor(request)
+    if error is not None:
+        return error
+    try:
+        pings = leer_pings(request.data.get('pings'))
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(procesar_pings(vehiculo, tramo, hora, pings), status=status.HTTP_200_OK)
+
+
+# Avisos por respuesta en el panel del padre
+MAXIMO_AVISOS = 100
+
+
+@api_view(['GET'])  # Solo acepta peticiones GET
+@permission_classes([IsAuthenticated])
+def avisos_padre(request):
+    """
+    Endpoint con los avisos de llegada del transporte de los hijos del padre.
+    El panel consulta periódicamente con el último ID recibido.
+
+    Parámetros opcionales: ?desde=<id> (solo avisos posteriores);
+    admins: ?padre=<id> (obligatorio)
+
+    Returns:
+        Response: {avisos: [...], ultimo: ID del último aviso entregado}
+    """
+    desde = request.query_params.get('desde', '0')
+    if not str(desde).isdigit():
+        return Response({'error': 'Parámetro "desde" debe ser un ID numérico'}, status=status.HTTP_400_BAD_REQUEST)
+
+    avisos = AvisoPadre.objects.select_related('vehiculo').filter(id__gt=int(desde))
+    if es_administrador(request.user):
+        if not str(request.query_params.get('padre', '')).isdigit():
+            return Response({'error': 'Indique ?padre=<id>'}, status=status.HTTP_400_BAD_REQUEST)
+        avisos = avisos.filter(padre_id=request.query_params['padre'])
+    elif request.user.role == 'padre':
+        avisos = avisos.filter(padre__usuario=request.user)
+    else:
+        return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
+
+    datos = AvisoPadreSerializer(avisos.order_by('id')[:MAXIMO_AVISOS], many=True).data
+    return Response({
+        'avisos': datos,
+        'ultimo': datos[-1]['id'] if datos else int(desde),
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================================================
+# SIMULACIÓN DE ESCENARIOS
+# ============================================================================
+
+class SimulacionPlanListCreateView(generics.ListCreateAPIView):
+    """
+    Vista para pedir y listar simulaciones de un día de viajes (solo admins).
+
+    GET: Retorna las simulaciones (sin resultados; ver el detalle)
+    POST: Pide una simulación (body: fecha=YYYY-MM-DD opcional, escenarios=[{nombre, cambios}]).
+          Cambios: desplazar_horario {tramo, minutos, colegio?}, agregar_colegio {colegio, latitud,
+          longitud, estudiantes, h_entrada?, h_salida?, semilla?}, agregar_vehiculos {cantidad, capacidad},
+          quitar_vehiculos {vehiculos}, velocidad {kmh}.
+          La simulación la procesa la tarea `simular` en su próxima revisión.
+    """
+    queryset = SimulacionPlan.objects.all()  # Todas las simulaciones
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    ordering = '-id'  # Más recientes primero
+
+    def get_serializer_class(self):
+        return SimulacionPlanResumenSerializer if self.request.method == 'GET' else SimulacionPlanSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(creado_por=self.request.user,
+                        fecha=serializer.validated_data.get('fecha') or timezone.localdate())
+        # Adelantar la tarea para que el planificador procese la simulación en su próxima revisión
+        TareaProgramada.objects.filter(nombre='simular').update(proxima_ejecucion=timezone.now())
+
+    def create(self, request, *args, **kwargs):
+        respuesta = super().create(request, *args, **kwargs)
+        respuesta.status_code = status.HTTP_202_ACCEPTED
+        return respuesta
+
+
+class SimulacionPlanDetailView(generics.RetrieveDestroyAPIView):
+    """
+    Vista para consultar o eliminar una simulación.
+
+    GET: Retorna la simulación con los resultados de cada escenario
+    DELETE: Elimina la simulación
+    """
+    queryset = SimulacionPlan.objects.all()  # Todas las simulaciones
+    serializer_class = SimulacionPlanSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+
+# ============================================================================
+# REGISTRO DE AUDITORÍA
+# ============================================================================
+
+class RegistroAuditoriaView(generics.ListAPIView):
+    """
+    Vista para consultar el registro de auditoría (solo admins). Las entradas
+    se escriben en lote, así que un cambio aparece hasta AUDITORIA_INTERVALO
+    segundos después.
+
+    GET: Retorna las entradas, las más recientes primero
+    Filtros opcionales: ?actor=<id usuario>&tipo=<padre|estudiante|tutor>&objetivo=<id>
+                        &accion=<creado|actualizado|eliminado|aprobado|desaprobado>&desde=<fecha>&hasta=<fecha>
+    """
+    queryset = RegistroAuditoria.objects.all()  # Todas las entradas
+    serializer_class = RegistroAuditoriaSerializer  # Serializer a usar
+    # Solo admins pueden acceder
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    campos_filtro = {
+        'actor': 'actor',
+        'tipo': 'objetivo_tipo',
+        'objetivo': 'objetivo_id',
+        'accion': 'accion',
+        'desde': 'momento__gte',
+        'hasta': 'momento__lte',
+    }
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Las fechas también limitan los meses (inicio del índice de tiempo)
+        campo = RegistroAuditoria._meta.get_field('momento')
+        for parametro, lookup in (('desde', 'periodo__gte'), ('hasta', 'periodo__lte')):
+            valor = self.request.query_params.get(parametro)
+            if valor:
+                periodo = auditoria_utils.periodo_de(convertir_valor(campo, valor, parametro))
+                queryset = queryset.filter(**{lookup: periodo})
+        return queryset
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os   # Importa el módulo os para manejar variables de entorno
+from importlib.util import find_spec  # Para detectar dependencias opcionales
 from dotenv import load_dotenv
 
 # Carga las variables de entorno desde el archivo .env
@@ -66,6 +67,10 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     # Maneja CORS (debe ir primero)
     'corsheaders.middleware.CorsMiddleware',
+    # Compresión gzip/brotli de respuestas (debe ir antes de los que modifican el contenido)
+    'api.middleware.CompresionMiddleware',
+    # Control de admisión: con el servidor saturado descarta primero lo de baja prioridad
+    'api.middleware.AdmisionMiddleware',
     'django.middleware.security.SecurityMiddleware',  # Seguridad
     'django.contrib.sessions.middleware.SessionMiddleware',  # Sesiones
     'django.middleware.common.CommonMiddleware',    # Funcionalidad común
@@ -73,6 +78,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',  # Autenticación
     'django.contrib.messages.middleware.MessageMiddleware',  # Mensajes
     'django.middleware.clickjacking.XFrameOptionsMiddleware',  # Protección clickjacking
+    # Perfilador por muestreo bajo demanda (debe ir último: las pilas empiezan en él)
+    'api.middleware.PerfiladoMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -188,6 +195,7 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',  # Reintentos seguros de registro y envío de formularios
 ]
 
 # Métodos HTTP permitidos
@@ -218,10 +226,297 @@ REST_FRAMEWORK = {
 
     # Renderizadores por defecto (formato de respuesta)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',  # Respuestas en formato JSON
+        'api.renderers.JSONRapidoRenderer',  # Respuestas en formato JSON (orjson si está instalado)
+    ] + (
+        # MessagePack solo si msgpack está instalado (Accept: application/msgpack)
+        ['api.renderers.MessagePackRenderer'] if find_spec('msgpack') else []
+    ),
+
+    # Paginación por cursor en todos los listados (?cursor=, ?page_size=, ?total=1)
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PaginacionCursor',
+    'PAGE_SIZE': 50,
+
+    # Filtros por parámetros (campos_filtro de cada vista) y orden (?ordering=)
+    'DEFAULT_FILTER_BACKENDS': [
+        'api.filters.FiltroCamposBackend',
+        'api.filters.OrdenamientoIndexado',
     ],
 }
 
+# Segundos que se cachea el total de filas de un listado (?total=1)
+PAGINACION_TTL_TOTAL = 300
+
+# ============================================================================
+# CONFIGURACIÓN DE COMPRESIÓN DE RESPUESTAS
+# ============================================================================
+
+COMPRESION_TAMANO_MINIMO = 1024  # Bytes mínimos para comprimir una respuesta
+COMPRESION_NIVEL_GZIP = 6        # Nivel de gzip (1 = rápido, 9 = más compresión)
+COMPRESION_CALIDAD_BROTLI = 5    # Calidad de brotli (0 = rápido, 11 = más compresión)
+
+# ============================================================================
+# CONFIGURACIÓN DEL CONTROL DE ADMISIÓN
+# ============================================================================
+
+ADMISION_ACTIVA = os.getenv('ADMISION_ACTIVA', 'True') == 'True'
+
+# Peticiones simultáneas por proceso (normalmente los hilos de cada worker)
+ADMISION_MAX_EN_CURSO = int(os.getenv('ADMISION_MAX_EN_CURSO', '32'))
+
+# Por clase de ruta:
+#   limite: fracción de ADMISION_MAX_EN_CURSO que puede ocupar (menor = menos prioridad)
+#   espera: segundos máximos esperando cupo antes de responder 503
+#   cola: peticiones máximas esperando a la vez
+#   reintentar: segundos sugeridos en la cabecera Retry-After
+ADMISION_CLASES = {
+    'admin': {'limite': 1.0, 'espera': 10, 'cola': 50, 'reintentar': 5},
+    'padre_lectura': {'limite': 0.9, 'espera': 5, 'cola': 50, 'reintentar': 5},
+    'padre_escritura': {'limite': 0.75, 'espera': 3, 'cola': 20, 'reintentar': 10},
+    'auth': {'limite': 0.6, 'espera': 2, 'cola': 20, 'reintentar': 15},
+}
+
+# ============================================================================
+# CONFIGURACIÓN DE IDEMPOTENCIA
+# ============================================================================
+
+# Segundos que se guarda la respuesta de una petición con Idempotency-Key
+IDEMPOTENCIA_TTL = 24 * 60 * 60
+# Segundos que una petición en curso retiene su clave; si el proceso muere,
+# un reintento puede tomarla cuando vence (debe superar la petición más lenta)
+IDEMPOTENCIA_RESERVA = 60
+
+# ============================================================================
+# CONFIGURACIÓN DE CACHÉ
+# ============================================================================
+
+# Caché en memoria por defecto; con varios nodos conviene un backend compartido
+# (por ejemplo Redis o Memcached) configurado aquí
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'transporte-alegria',
+    }
+}
+
+# ============================================================================
+# CONFIGURACIÓN DE MANIFIESTOS DIARIOS
+# ============================================================================
+
+# Días que se conservan los manifiestos generados
+MANIFIESTOS_DIAS_RETENCION = 7
+
+# ============================================================================
+# CONFIGURACIÓN DE GEOCODIFICACIÓN E ÍNDICE ESPACIAL
+# ============================================================================
+
+# Archivo CSV local (nombre,latitud,longitud) usado para geocodificar direcciones sin internet
+GAZETTEER_PATH = os.getenv('GAZETTEER_PATH', os.path.join(BASE_DIR, 'data', 'gazetteer.csv'))
+
+# Tamaño de cada celda del índice espacial en grados (0.005 ≈ 550 m)
+INDICE_ESPACIAL_CELDA_GRADOS = 0.005
+
+# Segundos antes de reconstruir el índice espacial desde la base de datos
+INDICE_ESPACIAL_TTL = 3600
+
+# ============================================================================
+# CONFIGURACIÓN DE EVENTOS PARA SISTEMAS EXTERNOS
+# ============================================================================
+
+# Eventos por lote enviado a cada destino (webhook o archivo)
+EVENTOS_LOTE = 200
+
+# Segundos de espera de la respuesta de un webhook
+EVENTOS_TIMEOUT = 10
+
+# Solo se entregan eventos con esta antigüedad mínima, para que casi todos
+# lleguen en orden aunque haya transacciones aún abiertas
+EVENTOS_MARGEN_SEGUNDOS = 5
+
+# Segundos que un destino espera los IDs que saltó (transacción aún abierta
+# al pasar el cursor); después se dan por revertidos. Una transacción que
+# tarde más en confirmar pierde sus eventos
+EVENTOS_ESPERA_HUECOS = 600
+
+# Días que se conservan los eventos ya entregados
+EVENTOS_DIAS_RETENCION = 7
+
+# Directorio donde pueden escribir los destinos de tipo archivo; su ruta
+# debe quedar dentro de él (None = destinos de archivo deshabilitados)
+EVENTOS_DIRECTORIO = os.getenv('EVENTOS_DIRECTORIO', os.path.join(BASE_DIR, 'eventos'))
+
+# ============================================================================
+# CONFIGURACIÓN DE LA SINCRONIZACIÓN INCREMENTAL (/api/sync/)
+# ============================================================================
+
+# Filas por tipo en cada respuesta (por defecto y máximo con ?limite=)
+SYNC_LIMITE = 500
+SYNC_LIMITE_MAXIMO = 2000
+
+# Días que se conservan las lápidas de filas eliminadas; un cliente con un
+# cursor más antiguo recibe una copia completa
+SYNC_DIAS_LAPIDAS = 30
+
+# ============================================================================
+# CONFIGURACIÓN DE LA VERIFICACIÓN DE RECOGIDA
+# ============================================================================
+
+# Segundos entre cada aplicación de cambios de otros nodos al índice en memoria
+# (tutores y tokens de conductores y administradores)
+RECOGIDA_REFRESCO = 15
+
+# Días de validez de las credenciales QR firmadas de los tutores
+RECOGIDA_CREDENCIAL_DIAS = 365
+
+# ============================================================================
+# CONFIGURACIÓN DE CALENDARIOS Y VIAJES PROGRAMADOS
+# ============================================================================
+
+# Máximo de días por consulta de /api/viajes/ (un semestre)
+VIAJES_DIAS_MAXIMO = 186
+
+# Segundos que se conserva en caché el plan de cada colegio y semana
+# (un cambio de calendario o excepción invalida todos los planes al instante)
+VIAJES_CACHE_TTL = 86400
+
+# ============================================================================
+# CONFIGURACIÓN DE LA FACTURACIÓN MENSUAL
+# ============================================================================
+
+# Día del mes desde el que la tarea `facturar` abre la corrida del mes en curso
+FACTURACION_DIA = 1
+
+# Padres por lote (cada lote se confirma en su propia transacción)
+FACTURACION_LOTE = 1000
+
+# Porcentaje de descuento por posición del hijo en la familia, del monto más
+# alto al más bajo: el primero paga completo y del tercero en adelante 15%
+FACTURACION_DESCUENTO_HERMANOS = [0, 10, 15]
+
+# ============================================================================
+# CONFIGURACIÓN DE LOS TIEMPOS DE LLEGADA ESTIMADOS
+# ============================================================================
+
+# Peso de cada nuevo recorrido en las medias móviles (0.2 ≈ últimas 10 semanas)
+ETA_ALFA = 0.2
+
+# Segundos que se conservan en caché las predicciones sin eventos nuevos
+ETA_CACHE_TTL = 900
+
+# Días que se conservan los eventos de recorrido (los modelos ya los incorporaron)
+ETA_DIAS_HISTORIAL = 180
+
+# ============================================================================
+# CONFIGURACIÓN DEL GPS Y LAS GEOCERCAS
+# ============================================================================
+
+# Pings máximos por lote enviado desde el dispositivo del conductor
+GPS_MAXIMO_LOTE = 500
+
+# Metros alrededor de una parada (o colegio sin radio propio) que cuentan como llegada
+GEOCERCA_RADIO_LLEGADA = 100
+
+# Metros a los que se avisa que el vehículo está por llegar (≈ 5 minutos a 25 km/h)
+GEOCERCA_RADIO_AVISO = 2000
+
+# Para salir de un radio hay que alejarse este múltiplo del radio (evita avisos repetidos por ruido del GPS)
+GEOCERCA_HISTERESIS = 1.5
+
+# Distancia máxima entre una familia y su parada para recibir los avisos de esa parada
+GEOCERCA_DISTANCIA_PARADA = 500
+
+# Segundos que se conserva en memoria el mapa de padres de cada ruta
+GEOCERCA_RUTA_TTL = 300
+
+# Días que se conserva el estado de cada recorrido (geocercas en las que está el vehículo)
+GEOCERCA_ESTADO_DIAS = 2
+
+# Días que se conservan los avisos enviados a los padres
+AVISOS_DIAS_RETENCION = 30
+
+# ============================================================================
+# CONFIGURACIÓN DEL PERFILADOR BAJO DEMANDA
+# ============================================================================
+
+# Con False el middleware se desactiva por completo
+PERFILADO_ACTIVO = os.getenv('PERFILADO_ACTIVO', 'True') == 'True'
+
+# Milisegundos entre muestras de las pilas durante una sesión
+PERFILADO_INTERVALO_MS = 5
+
+# Duración máxima de una sesión (también si se pide por número de peticiones)
+PERFILADO_SEGUNDOS_MAXIMO = 600
+
+# Segundos entre lecturas de la sesión en la base de datos (lo que tarda cada proceso en enterarse)
+PERFILADO_REFRESCO = 1
+
+# Segundos que se conservan las sesiones y sus pilas (se purgan al iniciar una sesión nueva)
+PERFILADO_TTL = 3600
+
+# ============================================================================
+# CONFIGURACIÓN DEL SIMULADOR DE ESCENARIOS
+# ============================================================================
+
+# Velocidad promedio de los vehículos en la ciudad
+SIMULACION_VELOCIDAD_KMH = 25
+
+# Multiplica la distancia en línea recta para aproximar la distancia por calles
+SIMULACION_FACTOR_RUTA = 1.3
+
+# Segundos detenido en cada punto de recogida o entrega
+SIMULACION_PARADA_SEGUNDOS = 60
+
+# Minutos de holgura con que se planifica llegar al colegio antes de la entrada
+SIMULACION_MARGEN_MINUTOS = 5
+
+# Procesos que simulan escenarios en paralelo en el trabajador `ejecutar_tareas` y en el
+# comando `simular_escenarios` (None = uno por CPU)
+SIMULACION_PROCESOS = None
+
+# Procesos cuando la simulación corre en un servidor web (PLANIFICADOR_TAREAS_PESADAS),
+# para no llenar de procesos el nodo que atiende las peticiones
+SIMULACION_PROCESOS_WEB = int(os.getenv('SIMULACION_PROCESOS_WEB', '1'))
+
+# Segundos que un nodo retiene una simulación; vencido el plazo otro nodo puede retomarla
+SIMULACION_DURACION_MAXIMA = 3600
+
+# Escenarios máximos por simulación
+SIMULACION_MAXIMO_ESCENARIOS = 500
+
+# ============================================================================
+# CONFIGURACIÓN DEL REGISTRO DE AUDITORÍA
+# ============================================================================
+
+# Segundos entre cada escritura en lote del búfer de auditoría de cada proceso
+AUDITORIA_INTERVALO = 1
+
+# Entradas por inserción; al juntarse estas en el búfer se escriben sin esperar el intervalo
+AUDITORIA_LOTE = 500
+
+# Entradas máximas en memoria si la base de datos no responde (las más antiguas se descartan)
+AUDITORIA_MAXIMO_BUFFER = 100000
+
+# Meses completos que se conservan (None = conservar todo)
+AUDITORIA_MESES_RETENCION = 24
+
+# Meses que se conservan las familias archivadas antes de purgarlas (None = conservar todo)
+ARCHIVO_MESES_RETENCION = 24
+
+# ============================================================================
+# CONFIGURACIÓN DEL PLANIFICADOR DE TAREAS
+# ============================================================================
+
+# Cada nodo de la app corre el planificador; un bloqueo en la base de datos
+# garantiza que cada tarea se ejecute una sola vez
+PLANIFICADOR_ACTIVO = os.getenv('PLANIFICADOR_ACTIVO', 'True') == 'True'
+
+# Segundos entre cada revisión de tareas vencidas
+PLANIFICADOR_INTERVALO = 30
+
+# Las tareas pesadas (facturación, simulaciones, procesos nocturnos) solo corren en
+# `manage.py ejecutar_tareas --bucle`; con True también las corre el hilo de los
+# servidores web (instalaciones de un solo nodo sin ese proceso)
+PLANIFICADOR_TAREAS_PESADAS = os.getenv('PLANIFICADOR_TAREAS_PESADAS', 'False') == 'True'
+
 # ============================================================================
 # CONFIGURACIÓN DE EMAIL (GMAIL)
 # ============================================================================
@@ -238,3 +533,6 @@ EMAIL_HOST_PASSWORD = 'aixr qssh ijtz vlhf'  # Contraseña de aplicación de Gma
 EMAIL_USE_SSL = False  # No usar SSL (usamos TLS)
 # Email desde el cual se envían los correos
 DEFAULT_FROM_EMAIL = 'livecoding0910@gmail.com'
+
+# Reintentos de la cola de correos (espera de 2, 4, 8... minutos entre intentos)
+CORREOS_MAX_INTENTOS = 5
@@ -14,3 +14,18 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Iniciar el planificador de tareas periódicas de este nodo
+from api.planificador import iniciar_planificador  # noqa: E402
+
+iniciar_planificador()
+
+# Índice en memoria de tutores autorizados para la verificación de recogida
+from api.recogida_utils import iniciar_refresco_recogida  # noqa: E402
+
+iniciar_refresco_recogida()
+
+# Sesión del perfilador bajo demanda, leída fuera de las peticiones
+from api.perfilado_utils import iniciar_refresco_perfilado  # noqa: E402
+
+iniciar_refresco_perfilado()